@@ -1,108 +1,112 @@
+import asyncio
 import json
-import re
-from fastapi import APIRouter, HTTPException
+import time
+from typing import Annotated, Any, Dict, List, Literal, Optional, Tuple
+from fastapi import APIRouter, Header, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import ValidationError
+from starlette.background import BackgroundTask, BackgroundTasks
 from ..models.aiModel import (
     AssistantRequest,
     AssistantResponse,
-    FilterCondition,
+    BatchAssistantRequest,
+    BatchAssistantResponse,
+    BatchItemResult,
     FilterObject,
 )
-# Commented out the python filter engine
-# from ..services.filter_engine import process_filter
-from ..services.sql_engine import generate_sql_query, execute_sql_query
+from ..services.column_store import get_traffic_columns
+from ..services.engine_router import get_engine_router
+from ..services.indexes import explain_selection
+from ..services.llm_client import LLMError, LLMTimeout, get_llm_client
+from ..services.metrics import (
+    RequestTimings,
+    begin_request,
+    current_request_timings,
+    get_metrics,
+    server_timing_enabled,
+)
+from ..services.pagination import AGGREGATE_OPERATIONS, split_page
+from ..services.query_pool import PoolSaturated, QueryTimeout, get_query_pool
+from ..services.question_parser import normalize_question, parse_question, parse_question_json
+from ..services.result_cache import MISSING, canonical_filter_key, get_result_cache
+from ..services.sampling import estimate_filter, supports_approximation
+from ..services.serialization import RowSet, encode_json, is_rows, to_shape
+from ..services.single_flight import get_query_flight, get_question_flight
+from ..services.slow_queries import get_slow_query_log
+from ..services.standing_queries import Subscriber, Subscription, get_standing_queries
+from ..services.sql_engine import (
+    SqlStatement,
+    build_sql_statement,
+    execute_sql_batch,
+    explain_sql_statement,
+    plan_sql_statement,
+    render_sql,
+    returns_single_row,
+    statement_cache_stats,
+    stream_sql_query_ndjson,
+)
+from ..services.traffic_store import get_store
 
 router = APIRouter()
 
-VALID_OPERATORS = {"==", "!=", ">", "<", ">=", "<="}
 
+def slow_query_task(timings: RequestTimings) -> Optional[BackgroundTask]:
+    # The duration is taken now. Explaining the plan and writing the entry run
+    # after the response is sent, in Starlette's thread pool.
+    log = get_slow_query_log()
+    duration_ms = log.slow_ms(timings)
+    if duration_ms is None:
+        return None
+    return BackgroundTask(log.record, timings, duration_ms)
 
-def build_mock_filter(question: str) -> FilterObject:
-    # For production: replace this heuristic with a real LLM call that emits the
-    # structured filter JSON described in docs/llm_integration.md, then validate
-    # with validate_json before processing.
-    question_lower = question.lower()
-    conditions = []
-
-    # Direction filters
-    if "north" in question_lower:
-        conditions.append(
-            FilterCondition(field="Direction", operator="==", value="North")
-        )
-    elif "south" in question_lower:
-        conditions.append(
-            FilterCondition(field="Direction", operator="==", value="South")
-        )
 
-    # Speed filters
-    speed_match = re.search(r"(\d+)\s*(?:kph|km/h|mph)?", question_lower)
-    if speed_match:
-        speed_value = speed_match.group(1)
-        if any(keyword in question_lower for keyword in ["faster", "over", "greater", "above"]):
-            conditions.append(
-                FilterCondition(field="Speed", operator=">", value=speed_value)
-            )
-        elif any(keyword in question_lower for keyword in ["slower", "under", "below", "less"]):
-            conditions.append(
-                FilterCondition(field="Speed", operator="<", value=speed_value)
-            )
+class TimedJSONResponse(JSONResponse):
+    """JSONResponse that times its own serialization and reports the request's stages.
 
-    # Lane filters
-    lane_match = re.search(r"lane\s*(\d+)", question_lower)
-    if lane_match:
-        lane_value = lane_match.group(1)
-        conditions.append(
-            FilterCondition(field="Lane", operator="==", value=lane_value)
-        )
+    Rendering is the last stage of a request, so this is where its timings
+    are recorded and, if enabled, sent back in a Server-Timing header.
+    """
+
+    def __init__(self, content, *args, **kwargs):
+        timings = current_request_timings()
+        if timings is None:
+            super().__init__(content, *args, **kwargs)
+            return
+        with timings.stage("serialize"):
+            super().__init__(content, *args, **kwargs)
+        get_metrics().record(timings)
+        slow = slow_query_task(timings)
+        if slow is not None:
+            if self.background is None:
+                self.background = slow
+            else:
+                self.background = BackgroundTasks([self.background, slow])
+        if server_timing_enabled():
+            self.headers["Server-Timing"] = timings.server_timing()
+
+    def render(self, content: Any) -> bytes:
+        # Same bytes as JSONResponse, but list results are encoded from their row tuples.
+        return encode_json(content)
 
-    # Determine operation
-    operation = ""
-    if "how many" in question_lower or "count" in question_lower:
-        operation = "count_vehicles"
-    elif "average" in question_lower:
-        operation = "average_speed"
-    elif "max" in question_lower or "highest" in question_lower:
-        operation = "max_speed"
-    elif "list" in question_lower or "show me" in question_lower:
-        operation = "list_vehicles"
-
-    # Check if there are conditions or operation early
-    if not conditions and not operation:
-        raise ValueError("Question must include at least one filter condition or an operation (count, average, max, list).")
-
-    # Sorting instructions
-    sort_by = None
-    sort_direction = None
-    if "sorted by speed" in question_lower or "order by speed" in question_lower:
-        sort_by = "Speed"
-    elif "sorted by lane" in question_lower or "order by lane" in question_lower:
-        sort_by = "Lane"
-    elif "sorted by time" in question_lower or "order by time" in question_lower or "sorted by collection" in question_lower:
-        sort_by = "CollectionTime"
-    
-    if "ascending" in question_lower or "from lowest to highest" in question_lower:
-        sort_direction = "ascending"
-    elif "descending" in question_lower or "from highest to lowest" in question_lower:
-        sort_direction = "descending"
-    else:
-        # Default to ascending if sorting is mentioned but no direction specified
-        if sort_by:
-            sort_direction = "ascending"
-
-    return FilterObject(
-        conditions=conditions,
-        operation=operation,
-        sort_by=sort_by,
-        sort_direction=sort_direction,
-    )
+
+VALID_OPERATORS = {"==", "!=", ">", "<", ">=", "<="}
+MAX_BATCH_QUESTIONS = 500
+MAX_LIVE_SUBSCRIPTIONS = 100  # Per WebSocket connection
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def build_mock_filter(question: str) -> FilterObject:
+    # The keyword heuristic behind MockLLMClient. In production, ROSA_LLM_URL
+    # points HttpLLMClient at a real model that emits the structured filter
+    # JSON described in docs/llm_integration.md; validate_json checks it.
+    return parse_question(question)
 
 
 # mimic LLM response generation(JSON format)
 def generate_mock_llm_response(question: str) -> str:
-    # get pydantic model and convert to python dict using model_dump
-    filter_payload = build_mock_filter(question).model_dump()
-    # convert to json string
-    return json.dumps(filter_payload)
+    # Memoized on the normalized question, so repeated questions skip both
+    # parsing and serialization.
+    return parse_question_json(question)
 
 
 def validate_json(raw_response: str) -> FilterObject:
@@ -145,33 +149,400 @@ def validate_json(raw_response: str) -> FilterObject:
         ) from exc
 
 
-@router.post("/api/assistant", response_model=AssistantResponse)
-async def assistant_endpoint(payload: AssistantRequest):
-    question = payload.question.strip()
+async def ask_llm(question: str) -> str:
+    # Concurrent requests for the same normalized question share one LLM call.
+    client = get_llm_client()
+    return await get_question_flight().run(normalize_question(question), lambda: client.complete(question))
+
+
+async def question_to_filter(question: str, timings: Optional[RequestTimings] = None) -> FilterObject:
+    # Shared by the single and batch endpoints; raises HTTPException on bad input.
+    question = question.strip()
     if not question:
         raise HTTPException(status_code=400, detail="Question cannot be empty.")
+    timings = timings or RequestTimings()
 
-    # Mock LLM response generation
+    # LLM response generation (the mock parser unless ROSA_LLM_URL is set)
     try:
-        raw_response = generate_mock_llm_response(question)
+        with timings.stage("parse"):
+            raw_response = await ask_llm(question)
+    except LLMTimeout as exc:
+        raise HTTPException(status_code=504, detail=str(exc)) from exc
+    except LLMError as exc:
+        raise HTTPException(status_code=502, detail=str(exc)) from exc
     except ValueError as exc:
-        # Catch early validation from build_mock_filter
+        # The model could not turn the question into a filter
         raise HTTPException(status_code=400, detail=str(exc)) from exc
     
     # Validate and parse the response
-    filter_object = validate_json(raw_response)
-    
-    # Generate SQL query
-    sql_query = generate_sql_query(filter_object)
+    with timings.stage("validate"):
+        return validate_json(raw_response)
+
+
+def apply_paging(filter_object: FilterObject, payload: AssistantRequest) -> FilterObject:
+    # Paging fields on the request override anything inferred from the question.
+    updates = {
+        name: getattr(payload, name)
+        for name in ("limit", "offset", "cursor")
+        if getattr(payload, name) is not None
+    }
+    if updates:
+        filter_object = filter_object.model_copy(update=updates)
+    # A bad cursor is reported by filter_to_statement.
+    return filter_object
+
+
+def filter_to_statement(filter_object: FilterObject) -> SqlStatement:
+    try:
+        return build_sql_statement(filter_object)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+
+def answer_filter(filter_object: FilterObject):
+    # Blocking part of a request; runs on the query pool, never on the event loop.
+    # Returns the page, the next cursor and the timings of this part.
+    timings = RequestTimings()
+    # Aggregates may be planned onto the rollup tables, which give the same answer.
+    # The router then picks SQL or the in-memory Python engine, whichever is cheaper.
+    with timings.stage("plan"):
+        statement = plan_sql_statement(filter_object)
+        single_row = returns_single_row(filter_object)
+        store = get_store()
+        store.ensure_current()
+        engines = get_engine_router()
+        choice = engines.choose(filter_object, statement)
+    # Run the query, reusing a cached result for equivalent filters
+    lookup_started = time.perf_counter()
+    result = get_result_cache().get_or_compute(
+        canonical_filter_key(filter_object),
+        store.version,
+        lambda: engines.execute(choice, filter_object, statement, single_row, timings),
+    )
+    timings.engine = choice.engine
+    if timings.rows_scanned is None:
+        timings.add("cache_hit", time.perf_counter() - lookup_started)
+        timings.rows_scanned = 0
+        timings.engine = "cache"
+    # Cached pages keep their row ids; they are only dropped from the response.
+    with timings.stage("page"):
+        page, next_cursor = split_page(filter_object, result)
+    timings.rows_returned = len(page) if is_rows(page) else 1
+    return page, next_cursor, timings
+
+
+def answer_approximate(filter_object: FilterObject):
+    # Blocking; runs on the query pool. Estimates the aggregate from the
+    # stratified sample of the current snapshot instead of scanning it.
+    timings = RequestTimings()
+    with timings.stage("plan"):
+        get_store().ensure_current()
+        columns = get_traffic_columns()
+    with timings.stage("sample"):
+        estimate = estimate_filter(columns, filter_object)
+    timings.rows_scanned = estimate.approximation["sample_rows"]
+    timings.rows_returned = 1
+    timings.engine = "sample"
+    return estimate.result, estimate.approximation, timings
+
+
+def explain_filter(filter_object: FilterObject) -> Dict[str, Any]:
+    # Blocking; runs on the query pool. Both engines' plans are shown, with the
+    # router's pick and the cost estimates behind it.
+    statement = plan_sql_statement(filter_object)
+    choice = get_engine_router().plan(filter_object, statement)
+    return {
+        "engine": choice.engine,
+        "reason": choice.reason,
+        "estimated_cost_us": choice.costs,
+        "estimated_rows": choice.estimated_rows,
+        "sql": explain_sql_statement(statement),
+        "python": explain_selection(get_traffic_columns(), filter_object.conditions),
+    }
+
+
+async def run_on_pool(fn, *args):
+    # Backpressure and timeouts surface as HTTP errors the client can act on.
+    try:
+        return await get_query_pool().run(fn, *args)
+    except PoolSaturated as exc:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many queries in progress; please retry shortly.",
+            headers={"Retry-After": "1"},
+        ) from exc
+    except QueryTimeout as exc:
+        raise HTTPException(status_code=504, detail="Query timed out.") from exc
+
+
+async def assistant_endpoint(
+    payload: AssistantRequest,
+    stream: bool = False,
+    explain: bool = False,
+    approximate: bool = False,
+    accept: Annotated[Optional[str], Header()] = None,
+):
+    timings = begin_request("assistant")
+    filter_object = apply_paging(await question_to_filter(payload.question, timings), payload)
+    timings.filter_object = filter_object
     
-    # Execute SQL and get the result
-    result = execute_sql_query(sql_query)
+    # Generate SQL query. Execution uses the parameterized statement; users
+    # see it with the values inlined.
+    with timings.stage("sql"):
+        statement = filter_to_statement(filter_object)
+        sql_query = render_sql(statement)
+
+    # Large listings can be streamed as NDJSON (?stream=true or Accept: application/x-ndjson).
+    # Aggregates are a single object either way.
+    wants_stream = stream or (accept is not None and NDJSON_MEDIA_TYPE in accept)
+    if wants_stream and filter_object.operation not in AGGREGATE_OPERATIONS:
+        with timings.stage("plan"):
+            planned = plan_sql_statement(filter_object)
+        # Rows are produced after the response starts, so only the stages before it are timed.
+        timings.endpoint = "assistant_stream"
+        timings.engine = "sql"
+        get_metrics().record(timings)
+        headers = {"X-Query-SQL": sql_query}
+        if server_timing_enabled():
+            headers["Server-Timing"] = timings.server_timing()
+        return StreamingResponse(
+            stream_sql_query_ndjson(planned.sql, planned.params),
+            media_type=NDJSON_MEDIA_TYPE,
+            headers=headers,
+            background=slow_query_task(timings),
+        )
     
-    # Comment out Python filter engine result
-    # result = process_filter(filter_object)
+    # Identical filters already running are joined instead of executed again.
+    # Only aggregates the sample can estimate are approximated; the rest run exactly.
+    submitted = time.perf_counter()
+    approximation = None
+    key = canonical_filter_key(filter_object)
+    if approximate and supports_approximation(filter_object):
+        result, approximation, worker_timings = await get_query_flight().run(
+            ("approximate", key), lambda: run_on_pool(answer_approximate, filter_object)
+        )
+        next_cursor = None
+    else:
+        result, next_cursor, worker_timings = await get_query_flight().run(
+            key, lambda: run_on_pool(answer_filter, filter_object)
+        )
+    # Time spent on the pool but not inside the worker: waiting for a worker.
+    timings.add("queue", max(time.perf_counter() - submitted - worker_timings.total(), 0.0))
+    timings.merge(worker_timings)
+
+    # Explaining is a separate job, so it never slows down normal requests.
+    if explain and approximation is not None:
+        plan = {"engine": "sample", "reason": "approximate=true", "sample_rows": approximation["sample_rows"]}
+    else:
+        plan = await run_on_pool(explain_filter, filter_object) if explain else None
 
+    # TimedJSONResponse adds the serialize stage and records the timings.
     return AssistantResponse(
         # filter=filter_object,
         result=result,
         sql=sql_query,
+        next_cursor=next_cursor,
+        plan=plan,
+        approximation=approximation,
     )
+
+
+@router.post("/api/assistant", response_model=AssistantResponse, response_class=TimedJSONResponse)
+async def assistant_route(
+    payload: AssistantRequest,
+    stream: bool = False,
+    explain: bool = False,
+    approximate: bool = False,
+    shape: Literal["records", "columnar"] = "records",
+    accept: Annotated[Optional[str], Header()] = None,
+):
+    """Answer a question; ``shape=columnar`` returns list results as ``{columns, rows}``.
+
+    The answer is rendered here rather than by FastAPI, which would validate
+    it against AssistantResponse again and rebuild every row as a dict.
+    The bytes are the same as the response model gives.
+    """
+    response = await assistant_endpoint(payload, stream=stream, explain=explain, approximate=approximate, accept=accept)
+    if isinstance(response, Response):
+        return response
+    return TimedJSONResponse({
+        "result": to_shape(response.result, shape),
+        "sql": response.sql,
+        "next_cursor": response.next_cursor,
+        "plan": response.plan,
+        "approximation": response.approximation,
+    })
+
+
+def answer_batch(parsed: List[Tuple[BatchItemResult, FilterObject]]) -> List[BatchItemResult]:
+    # Blocking part of a batch; fills in each item and returns them.
+    store = get_store()
+    store.ensure_current()
+    cache = get_result_cache()
+
+    # Answer what the cache already knows.
+    pending = []
+    for item, filter_object in parsed:
+        key = canonical_filter_key(filter_object)
+        cached = cache.get(key, store.version)
+        if cached is MISSING:
+            pending.append((item, filter_object, key))
+        else:
+            item.result, item.next_cursor = split_page(filter_object, cached)
+            if isinstance(item.result, RowSet):
+                # Cached by /api/assistant; batch items are serialized by the response model.
+                item.result = list(item.result)
+
+    # Everything else runs together in one read transaction.
+    outcomes = execute_sql_batch([filter_object for _, filter_object, _ in pending])
+    for (item, filter_object, key), (result, error) in zip(pending, outcomes):
+        if error is not None:
+            item.error = error
+            continue
+        cache.set(key, store.version, result)
+        item.result, item.next_cursor = split_page(filter_object, result)
+    return [item for item, _ in parsed]
+
+
+@router.post("/api/assistant/batch", response_model=BatchAssistantResponse)
+async def assistant_batch_endpoint(payload: BatchAssistantRequest):
+    """Answer many questions at once; each item carries its own result or error."""
+    if len(payload.questions) > MAX_BATCH_QUESTIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"A batch may contain at most {MAX_BATCH_QUESTIONS} questions.",
+        )
+
+    items = [BatchItemResult(question=question) for question in payload.questions]
+
+    async def parse_item(item: BatchItemResult) -> Optional[FilterObject]:
+        try:
+            filter_object = await question_to_filter(item.question)
+            item.sql = render_sql(filter_to_statement(filter_object))
+        except HTTPException as exc:
+            item.error = exc.detail
+            return None
+        return filter_object
+
+    # All questions go to the LLM together, so its client can batch them.
+    filter_objects = await asyncio.gather(*(parse_item(item) for item in items))
+    parsed = [(item, filter_object) for item, filter_object in zip(items, filter_objects) if filter_object is not None]
+
+    # Items come back as copies from a process pool, so copy the answers over.
+    answered = await run_on_pool(answer_batch, parsed)
+    for (item, _), done in zip(parsed, answered):
+        item.result, item.next_cursor, item.error = done.result, done.next_cursor, done.error
+    return BatchAssistantResponse(results=items)
+
+
+async def handle_live_message(
+    raw: str, subscriber: Subscriber, subscriptions: Dict[int, Subscription]
+) -> Dict[str, Any]:
+    # One client message of /api/assistant/live; returns the reply to send.
+    try:
+        message = json.loads(raw)
+    except json.JSONDecodeError:
+        return {"type": "error", "detail": "Messages must be JSON objects."}
+    if not isinstance(message, dict):
+        return {"type": "error", "detail": "Messages must be JSON objects."}
+
+    action = message.get("action")
+    registry = get_standing_queries()
+    if action == "subscribe":
+        question = str(message.get("question", ""))
+        if len(subscriptions) >= MAX_LIVE_SUBSCRIPTIONS:
+            return {"type": "error", "question": question,
+                    "detail": f"A connection may hold at most {MAX_LIVE_SUBSCRIPTIONS} subscriptions."}
+        try:
+            filter_object = await question_to_filter(question)
+            subscription = await registry.subscribe(subscriber, filter_object, question)
+        except HTTPException as exc:
+            return {"type": "error", "question": question, "detail": exc.detail}
+        except ValueError as exc:
+            return {"type": "error", "question": question, "detail": str(exc)}
+        subscriptions[subscription.id] = subscription
+        return {"type": "subscribed", "subscription": subscription.id, "question": question,
+                "result": subscription.result()}
+    if action == "unsubscribe":
+        subscription = subscriptions.pop(message.get("subscription"), None)
+        if subscription is None:
+            return {"type": "error", "detail": f"Unknown subscription {message.get('subscription')!r}."}
+        registry.unsubscribe(subscription)
+        return {"type": "unsubscribed", "subscription": subscription.id}
+    return {"type": "error", "detail": "action must be 'subscribe' or 'unsubscribe'."}
+
+
+@router.websocket("/api/assistant/live")
+async def live_endpoint(websocket: WebSocket):
+    """Standing questions: subscribe once and receive new results as rows are ingested.
+
+    Send ``{"action": "subscribe", "question": ...}``. The reply carries a
+    subscription id and the current result. After that, an ``update``
+    message with the new result and the number of matching rows added
+    arrives whenever ingested rows change it.
+    ``{"action": "unsubscribe", "subscription": id}`` stops the updates.
+    """
+    await websocket.accept()
+    subscriber = Subscriber()
+    subscriptions: Dict[int, Subscription] = {}
+    sending = asyncio.Lock()
+
+    async def send(message: Dict[str, Any]) -> None:
+        async with sending:
+            await websocket.send_json(message)
+
+    async def send_updates() -> None:
+        while True:
+            for update in await subscriber.updates():
+                if update["subscription"] in subscriptions:
+                    await send(update)
+
+    sender = asyncio.ensure_future(send_updates())
+    try:
+        while True:
+            await send(await handle_live_message(await websocket.receive_text(), subscriber, subscriptions))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        for subscription in subscriptions.values():
+            get_standing_queries().unsubscribe(subscription)
+
+
+@router.get("/api/assistant/cache")
+async def cache_stats():
+    """Hit/miss counters and size of the result cache and the SQL statement cache."""
+    return {**get_result_cache().stats(), "statements": statement_cache_stats()}
+
+
+@router.get("/api/assistant/llm")
+async def llm_stats():
+    """LLM client counters and how many questions and queries were coalesced in flight."""
+    return {
+        **get_llm_client().stats(),
+        "coalesced": {"questions": get_question_flight().stats(), "queries": get_query_flight().stats()},
+    }
+
+
+@router.get("/api/assistant/live")
+async def live_stats():
+    """Standing queries, subscriptions and the work done keeping them current."""
+    return get_standing_queries().stats()
+
+
+@router.get("/api/assistant/slow-queries")
+async def slow_queries():
+    """Recent requests over the slow-query threshold (ROSA_SLOW_QUERY_MS), newest first."""
+    return get_slow_query_log().stats()
+
+
+@router.get("/api/assistant/engines")
+async def engine_stats():
+    """Engine mode, how often each engine was picked and shadow-mode mismatches."""
+    return get_engine_router().stats()
+
+
+@router.get("/api/assistant/pool")
+async def pool_stats():
+    """Queue depth, wait times and rejection counters of the query pool."""
+    return get_query_pool().stats()
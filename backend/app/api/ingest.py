@@ -0,0 +1,33 @@
+from typing import List, Union
+from fastapi import APIRouter, Body, HTTPException
+from ..models.aiModel import IngestResponse, IngestRow
+from ..services.ingest import get_ingest_batcher
+from ..services.standing_queries import get_standing_queries
+from ..services.traffic_store import get_store
+
+router = APIRouter()
+
+MAX_INGEST_ROWS = 50_000
+
+
+@router.post("/api/ingest", response_model=IngestResponse)
+async def ingest_endpoint(payload: Union[List[IngestRow], IngestRow] = Body(...)):
+    """Append one detection or an array of them to the live store.
+
+    Rollups, indexes, cached results and standing queries pick the rows up
+    incrementally; no rebuild happens. Queries see all of a commit's rows or
+    none of them.
+    """
+    rows = payload if isinstance(payload, list) else [payload]
+    if not rows:
+        raise HTTPException(status_code=400, detail="No rows to ingest.")
+    if len(rows) > MAX_INGEST_ROWS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {MAX_INGEST_ROWS} rows can be ingested per request.",
+        )
+
+    row_count = await get_ingest_batcher().submit([row.as_tuple() for row in rows])
+    # Subscribers of /api/assistant/live get their updates in the background.
+    get_standing_queries().notify()
+    return IngestResponse(ingested=len(rows), row_count=row_count, version=get_store().version)
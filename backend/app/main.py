@@ -1,8 +1,32 @@
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.api import assistant
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import PlainTextResponse
+from app.api import assistant, ingest
+from app.services.column_store import get_traffic_columns
+from app.services.llm_client import close_llm_client
+from app.services.metrics import PROMETHEUS_CONTENT_TYPE, get_metrics
+from app.services.parallel_scan import shutdown_parallel_scanner
+from app.services.query_pool import get_query_pool, shutdown_query_pool
+from app.services.traffic_store import get_store
 
-app = FastAPI(title="Rosa Traffic API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Build (or reuse) the SQLite store and the indexed columns once so the
+    # first request doesn't pay for them.
+    get_store().ensure_current()
+    get_traffic_columns()
+    get_query_pool()
+    yield
+    await close_llm_client()
+    shutdown_query_pool()
+    shutdown_parallel_scanner()
+
+
+app = FastAPI(title="Rosa Traffic API", lifespan=lifespan)
 
 allowed_origins = [
     "http://localhost:5173",
@@ -18,7 +42,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress large responses only, at a fast level: small answers go out
+# byte-for-byte as before, and big listings shrink about tenfold for a few
+# milliseconds per megabyte.
+app.add_middleware(
+    GZipMiddleware,
+    minimum_size=int(os.environ.get("ROSA_GZIP_MIN_BYTES", 64 * 1024)),
+    compresslevel=int(os.environ.get("ROSA_GZIP_LEVEL", 1)),
+)
+
 app.include_router(assistant.router)
+app.include_router(ingest.router)
 
 
 @app.get("/health")
@@ -27,6 +61,12 @@ async def health_check():
     return {"status": "ok"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Per-stage latency and row count histograms in the Prometheus text format."""
+    return PlainTextResponse(get_metrics().render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
 @app.get("/")
 async def root():
     return {"message": "Welcome to Rosa Traffic API"}
@@ -1,9 +1,56 @@
-from typing import List, Optional, Any
-from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import Dict, List, Optional, Any, Tuple
+from pydantic import BaseModel, Field, field_validator, model_validator
+
+# CollectionTime layout used by the CSV and every stored row.
+COLLECTION_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+# Columns an aggregate can be broken down by.
+GROUP_BY_FIELDS = ("Direction", "Lane", "Speed")
+# Fields holding whole numbers.
+NUMERIC_FIELDS = ("Lane", "Speed")
+# Shorter forms accepted in filters; missing parts default to the start of the period.
+PARTIAL_TIME_FORMATS = ("%Y-%m-%d", "%Y-%m-%d %H:%M", COLLECTION_TIME_FORMAT)
+
+
+def normalize_collection_time(value: str) -> str:
+    """Expand a date or timestamp to the stored ``YYYY-MM-DD HH:MM:SS`` layout.
+
+    Stored times compare correctly as text only in that exact layout, so
+    "2025-12-07" becomes "2025-12-07 00:00:00". Raises ValueError otherwise.
+    """
+    text = value.strip().replace("T", " ")
+    for layout in PARTIAL_TIME_FORMATS:
+        try:
+            return datetime.strptime(text, layout).strftime(COLLECTION_TIME_FORMAT)
+        except ValueError:
+            continue
+    raise ValueError(f"CollectionTime '{value}' is not a YYYY-MM-DD[ HH:MM[:SS]] timestamp.")
+
+
+def normalize_number(value: str) -> str:
+    """Canonical text of a whole number, so "02", " 2" and "2.0" all become "2".
+
+    SQL binds numbers by value while the Python engines compare values, so
+    every engine only agrees if each number has exactly one spelling. Other
+    values are returned unchanged.
+    """
+    try:
+        return str(int(value))
+    except ValueError:
+        pass
+    try:
+        number = float(value)
+    except ValueError:
+        return value
+    return str(int(number)) if number.is_integer() else value
 
 
 class AssistantRequest(BaseModel):
     question: str
+    # Optional paging overrides for list questions
+    limit: Optional[int] = Field(default=None, ge=1)
+    offset: Optional[int] = Field(default=None, ge=0)
+    cursor: Optional[str] = None
 
 
 class FilterCondition(BaseModel):
@@ -11,15 +58,92 @@ class FilterCondition(BaseModel):
     operator: str
     value: str
 
+    @model_validator(mode="after")
+    def normalize_value(self) -> "FilterCondition":
+        # Time ranges compare stored text, so the bound must use the stored layout.
+        if self.field == "CollectionTime":
+            self.value = normalize_collection_time(self.value)
+        elif self.field in NUMERIC_FIELDS:
+            self.value = normalize_number(self.value)
+        return self
+
 
 class FilterObject(BaseModel):
     conditions: List[FilterCondition] = Field(default_factory=list)
     operation: Optional[str] = None
     sort_by: Optional[str] = None
     sort_direction: Optional[str] = None
+    limit: Optional[int] = Field(default=None, ge=1)
+    offset: Optional[int] = Field(default=None, ge=0)
+    cursor: Optional[str] = None  # Keyset cursor from a previous page's next_cursor
+    window_minutes: Optional[int] = Field(default=None, ge=1, le=1440)  # Window size for count_by_window
+    group_by: Optional[List[str]] = None  # Aggregate once per distinct combination of these columns
+
+    @field_validator("window_minutes")
+    @classmethod
+    def check_window_minutes(cls, value: Optional[int]) -> Optional[int]:
+        # Windows start at midnight, so they must tile the day exactly.
+        if value is not None and 1440 % value:
+            raise ValueError("window_minutes must divide a day evenly (e.g. 5, 15, 60).")
+        return value
+
+    @field_validator("group_by")
+    @classmethod
+    def check_group_by(cls, value: Optional[List[str]]) -> Optional[List[str]]:
+        # Group columns are spliced into SQL and become result keys, so only known columns pass.
+        if value is None:
+            return None
+        for field in value:
+            if field not in GROUP_BY_FIELDS:
+                raise ValueError(f"Cannot group by '{field}'; use one of {', '.join(GROUP_BY_FIELDS)}.")
+        if len(set(value)) != len(value):
+            raise ValueError("group_by lists a column twice.")
+        return value or None
 
 
 class AssistantResponse(BaseModel):
     # filter: FilterObject
     result: Any = None
     sql: Optional[str] = None  # Generated SQL query for transparency
+    next_cursor: Optional[str] = None  # Pass back as `cursor` to fetch the next page
+    plan: Optional[Dict[str, Any]] = None  # How the query was executed, with ?explain=true
+    approximation: Optional[Dict[str, Any]] = None  # Confidence intervals and sample sizes, with ?approximate=true
+
+
+class BatchAssistantRequest(BaseModel):
+    questions: List[str]
+
+
+class BatchItemResult(BaseModel):
+    question: str
+    result: Any = None
+    sql: Optional[str] = None
+    next_cursor: Optional[str] = None
+    error: Optional[str] = None  # Set instead of result when this question failed
+
+
+class BatchAssistantResponse(BaseModel):
+    results: List[BatchItemResult]
+
+
+class IngestRow(BaseModel):
+    CollectionTime: str
+    Direction: str = Field(min_length=1)
+    Lane: int = Field(ge=0)
+    Speed: int = Field(ge=0)
+
+    @field_validator("CollectionTime")
+    @classmethod
+    def check_collection_time(cls, value: str) -> str:
+        # Stored times must sort and bucket like the CSV's, so the layout is fixed.
+        datetime.strptime(value, COLLECTION_TIME_FORMAT)
+        return value
+
+    def as_tuple(self) -> Tuple[str, str, int, int]:
+        return self.CollectionTime, self.Direction, self.Lane, self.Speed
+
+
+class IngestResponse(BaseModel):
+    ingested: int
+    row_count: int  # Rows in the store after the commit that included these
+    version: str  # Data version the new rows are visible in
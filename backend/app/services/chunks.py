@@ -0,0 +1,126 @@
+import operator
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class ChunkedColumn:
+    """One column held as consecutive immutable arrays (chunks).
+
+    Supports the part of the ndarray interface the engines use on whole
+    columns: ``len``, gathers by row ids or masks, slices and comparisons
+    with a scalar. Gathers and slices only touch the chunks they cover;
+    comparisons run chunk by chunk into one mask. Anything else goes
+    through ``__array__``, which concatenates the chunks.
+
+    Appending builds a new ChunkedColumn that shares every chunk it keeps,
+    so the memory-mapped chunk a snapshot was loaded from is never copied.
+    """
+
+    __slots__ = ("chunks", "starts", "dtype")
+
+    def __init__(self, chunks: Sequence[np.ndarray]):
+        self.chunks: Tuple[np.ndarray, ...] = tuple(chunks)
+        # starts[i] is the first row of chunk i; starts[-1] the row count.
+        self.starts = np.cumsum([0] + [len(chunk) for chunk in self.chunks])
+        self.dtype = self.chunks[0].dtype
+
+    def __len__(self) -> int:
+        return int(self.starts[-1])
+
+    @property
+    def shape(self) -> Tuple[int]:
+        return (len(self),)
+
+    def bounds(self) -> List[Tuple[int, int]]:
+        """``(start, stop)`` rows of every chunk."""
+        starts = self.starts.tolist()
+        return list(zip(starts[:-1], starts[1:]))
+
+    def locate(self, start: int, stop: int) -> Optional[Tuple[np.ndarray, int]]:
+        # The chunk holding rows [start, stop) and where they start in it, if one chunk holds them all.
+        index = int(np.searchsorted(self.starts, start, side="right")) - 1
+        first = int(self.starts[index])
+        if index >= len(self.chunks) or stop > int(self.starts[index + 1]):
+            return None
+        return self.chunks[index], start - first
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        array = np.concatenate(self.chunks)
+        return array if dtype is None else array.astype(dtype)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return self._slice(key)
+        if isinstance(key, (int, np.integer)):
+            row = int(key) + len(self) if key < 0 else int(key)
+            chunk, local = self.locate(row, row + 1) or (None, 0)
+            if chunk is None:
+                raise IndexError(f"row {key} out of range for {len(self)} rows")
+            return chunk[local]
+        rows = np.asarray(key)
+        if rows.dtype == bool:
+            rows = np.flatnonzero(rows)
+        return self._take(rows)
+
+    def _slice(self, key: slice) -> np.ndarray:
+        start, stop, step = key.indices(len(self))
+        if step != 1:
+            return self._take(np.arange(start, stop, step))
+        if stop <= start:
+            return np.empty(0, dtype=self.dtype)
+        located = self.locate(start, stop)
+        if located is not None:
+            chunk, local = located
+            return chunk[local:local + stop - start]
+        pieces = [
+            chunk[max(start - first, 0):max(min(stop, last) - first, 0)]
+            for chunk, (first, last) in zip(self.chunks, self.bounds())
+            if first < stop and last > start
+        ]
+        return np.concatenate(pieces)
+
+    def _take(self, rows: np.ndarray) -> np.ndarray:
+        if len(rows) == 0:
+            return np.empty(0, dtype=self.dtype)
+        # Row ids of a query mostly fall in the first (largest) chunk.
+        if int(rows.max()) < int(self.starts[1]):
+            return self.chunks[0][rows]
+        which = np.searchsorted(self.starts[1:-1], rows, side="right")
+        taken = np.empty(len(rows), dtype=self.dtype)
+        for index, chunk in enumerate(self.chunks):
+            picked = which == index
+            if picked.any():
+                taken[picked] = chunk[rows[picked] - self.starts[index]]
+        return taken
+
+    def _compare(self, compare, other) -> np.ndarray:
+        return np.concatenate([compare(chunk, other) for chunk in self.chunks])
+
+    def __eq__(self, other):  # type: ignore[override]
+        return self._compare(operator.eq, other)
+
+    def __ne__(self, other):  # type: ignore[override]
+        return self._compare(operator.ne, other)
+
+    def __lt__(self, other):
+        return self._compare(operator.lt, other)
+
+    def __le__(self, other):
+        return self._compare(operator.le, other)
+
+    def __gt__(self, other):
+        return self._compare(operator.gt, other)
+
+    def __ge__(self, other):
+        return self._compare(operator.ge, other)
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return f"ChunkedColumn({len(self)} rows in {len(self.chunks)} chunks, {self.dtype})"
+
+
+def chunks_of(column) -> List[np.ndarray]:
+    """The chunks of a column, a plain array being a single chunk."""
+    return list(column.chunks) if isinstance(column, ChunkedColumn) else [column]
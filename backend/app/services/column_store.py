@@ -0,0 +1,227 @@
+import csv
+import itertools
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from .columnar_engine import TIME_FORMAT_UNIT, TrafficColumns
+from .indexes import build_indexes, extend_snapshot
+from .traffic_store import get_store, source_signature, traffic_csv_path
+
+# Bump when the cache layout changes so stale caches get rebuilt.
+CACHE_FORMAT_VERSION = 1
+CHUNK_ROWS = 65_536
+
+# File name and on-disk dtype for every cached column.
+COLUMN_FILES = {
+    "collection_time": ("collection_time.bin", f"datetime64[{TIME_FORMAT_UNIT}]"),
+    "direction_codes": ("direction_codes.bin", "uint8"),
+    "lane": ("lane.bin", "int32"),
+    "speed": ("speed.bin", "int32"),
+}
+META_FILE = "meta.json"
+
+
+def default_cache_dir(csv_path: Path) -> Path:
+    # traffic.csv -> traffic.columns, right next to the source file.
+    return csv_path.with_suffix(".columns")
+
+
+def _iter_csv_chunks(csv_path: Path, chunk_rows: int):
+    # Yield lists of raw CSV rows so parsing never holds more than one chunk.
+    with open(csv_path, mode="r", newline="") as file:
+        reader = csv.reader(file)
+        header = next(reader, None)
+        if header is None:
+            return
+        positions = [header.index(name) for name in ("CollectionTime", "Direction", "Lane", "Speed")]
+        rows = (row for row in reader if row)
+        while True:
+            chunk = list(itertools.islice(rows, chunk_rows))
+            if not chunk:
+                return
+            yield positions, chunk
+
+
+def write_column_cache(
+    csv_path: Path, cache_dir: Path, chunk_rows: int = CHUNK_ROWS
+) -> None:
+    """Parse ``csv_path`` chunk by chunk and write one raw binary file per column."""
+    signature = source_signature(csv_path)
+    tmp_dir = cache_dir.with_name(f"{cache_dir.name}.tmp-{os.getpid()}-{threading.get_ident()}")
+    if tmp_dir.exists():
+        shutil.rmtree(tmp_dir)
+    tmp_dir.mkdir(parents=True)
+
+    labels: Dict[str, int] = {}
+    row_count = 0
+    handles = {name: open(tmp_dir / file_name, "wb") for name, (file_name, _) in COLUMN_FILES.items()}
+    try:
+        for positions, chunk in _iter_csv_chunks(csv_path, chunk_rows):
+            time_pos, direction_pos, lane_pos, speed_pos = positions
+            directions = [row[direction_pos] for row in chunk]
+            for label in directions:
+                if label not in labels:
+                    labels[label] = len(labels)
+            if len(labels) > 255:
+                raise ValueError("Too many distinct Direction values for a uint8 code column.")
+
+            arrays = {
+                "collection_time": np.array(
+                    [row[time_pos] for row in chunk], dtype=f"datetime64[{TIME_FORMAT_UNIT}]"
+                ),
+                "direction_codes": np.array([labels[d] for d in directions], dtype=np.uint8),
+                "lane": np.array([row[lane_pos] for row in chunk], dtype=np.int64).astype(np.int32),
+                "speed": np.array([row[speed_pos] for row in chunk], dtype=np.int64).astype(np.int32),
+            }
+            for name, array in arrays.items():
+                handles[name].write(array.tobytes())
+            row_count += len(chunk)
+    finally:
+        for handle in handles.values():
+            handle.close()
+
+    size, mtime_ns = signature
+    meta = {
+        "format_version": CACHE_FORMAT_VERSION,
+        "source_size": size,
+        "source_mtime_ns": mtime_ns,
+        "row_count": row_count,
+        "direction_labels": list(labels),
+    }
+    # meta.json is written last; a cache without it is never trusted.
+    (tmp_dir / META_FILE).write_text(json.dumps(meta))
+
+    if cache_dir.exists():
+        shutil.rmtree(cache_dir)
+    os.replace(tmp_dir, cache_dir)
+
+
+def _read_meta(cache_dir: Path) -> Optional[dict]:
+    try:
+        return json.loads((cache_dir / META_FILE).read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def open_column_cache(cache_dir: Path, signature: Tuple[int, int]) -> Optional[TrafficColumns]:
+    """Memory-map a cache written for ``signature``, or return None if it is stale."""
+    meta = _read_meta(cache_dir)
+    if meta is None or meta.get("format_version") != CACHE_FORMAT_VERSION:
+        return None
+    if (meta.get("source_size"), meta.get("source_mtime_ns")) != signature:
+        return None
+
+    row_count = meta["row_count"]
+    arrays = {}
+    for name, (file_name, dtype) in COLUMN_FILES.items():
+        if row_count == 0:
+            # numpy cannot map an empty file.
+            arrays[name] = np.empty(0, dtype=dtype)
+        else:
+            arrays[name] = np.memmap(cache_dir / file_name, dtype=dtype, mode="r", shape=(row_count,))
+    return TrafficColumns(direction_labels=meta["direction_labels"], **arrays)
+
+
+def load_traffic_columns(csv_path: Path, cache_dir: Optional[Path] = None) -> TrafficColumns:
+    # Reuse the on-disk cache when it matches the CSV, otherwise rebuild it first.
+    cache_dir = cache_dir or default_cache_dir(csv_path)
+    signature = source_signature(csv_path)
+    columns = open_column_cache(cache_dir, signature)
+    if columns is None:
+        write_column_cache(csv_path, cache_dir)
+        columns = open_column_cache(cache_dir, signature)
+        if columns is None:
+            raise RuntimeError(f"CSV {csv_path} changed while its column cache was being written.")
+    columns.lineage = (str(csv_path), signature)
+    return columns
+
+
+# csv path -> (cache key, snapshot, next store row id the snapshot covers).
+_columns_cache: Dict[Path, Tuple[Tuple, TrafficColumns, int]] = {}
+_columns_lock = threading.Lock()
+
+
+def get_traffic_columns(csv_path: Optional[Path] = None) -> TrafficColumns:
+    """Return the indexed columns for ``csv_path``, reloading only when the file changes.
+
+    ``csv_path`` defaults to the CSV the app serves (see traffic_csv_path).
+
+    For the CSV behind the live store, rows appended to the store since the
+    last call are folded into a new snapshot with incrementally updated
+    indexes, instead of reloading everything. Only the snapshot's open
+    chunk is copied (see TrafficColumns.extended), so this stays cheap
+    however large the table is. When retention has dropped partitions the
+    snapshot is trimmed to match (see trim_to_partitions).
+    """
+    csv_path = traffic_csv_path() if csv_path is None else csv_path
+    signature = source_signature(csv_path)
+    store = get_store()
+    live = Path(csv_path) == store.csv_path
+    revision = None
+    if live:
+        store.ensure_current()
+        revision = store.revision
+    key = (signature, revision)
+
+    cached = _columns_cache.get(csv_path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    with _columns_lock:
+        cached = _columns_cache.get(csv_path)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        if cached is not None and cached[0][0] == signature:
+            _, columns, next_id = cached
+        else:
+            columns = load_traffic_columns(csv_path)
+            # Indexes are built once per load and shared by every query on this snapshot.
+            build_indexes(columns)
+            # The store numbers the CSV's rows 1..N (see TrafficStore._build).
+            next_id = len(columns) + 1
+        if live:
+            head_id, row_count = store.next_row_id, store.row_count
+            appended = store.rows_after(next_id - 1, before=head_id, with_ids=True)
+            if appended:
+                columns = extend_snapshot(columns, [row[1:] for row in appended], [row[0] for row in appended])
+            next_id = max(next_id, head_id)
+            if len(columns) != row_count:
+                columns = trim_to_partitions(columns, store.partitions())
+        _columns_cache[csv_path] = (key, columns, next_id)
+        return columns
+
+
+def trim_to_partitions(columns: TrafficColumns, partitions) -> TrafficColumns:
+    """The rows of ``columns`` on or after the oldest remaining partition's day.
+
+    Retention only ever drops the oldest days, so this leaves exactly the
+    rows the store still holds. The trimmed snapshot gets fresh indexes and
+    a new lineage, which tells samples, standing queries and parallel scans
+    that rows went away rather than being appended.
+    """
+    if partitions:
+        first_day = partitions[0][0]
+        keep = np.flatnonzero(columns.collection_time >= np.datetime64(first_day, TIME_FORMAT_UNIT))
+    else:
+        first_day = None
+        keep = np.empty(0, dtype=np.int64)
+    trimmed = TrafficColumns(
+        collection_time=columns.collection_time[keep],
+        direction_codes=columns.direction_codes[keep],
+        direction_labels=columns.direction_labels,
+        lane=columns.lane[keep],
+        speed=columns.speed[keep],
+    )
+    root = columns.lineage
+    if isinstance(root, tuple) and len(root) == 3 and root[1] == "from":
+        root = root[0]
+    trimmed.lineage = (root, "from", first_day)
+    # The kept rows keep their store ids, so pages and cursors match the SQL engine's.
+    trimmed.row_ids = columns.row_id(keep)
+    build_indexes(trimmed)
+    return trimmed
@@ -0,0 +1,545 @@
+import bisect
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..models.aiModel import FilterCondition, FilterObject
+from .operations import (
+    DEFAULT_WINDOW_MINUTES,
+    SPEED_PERCENTILES,
+    empty_percentiles,
+    percentile_key,
+    percentile_positions,
+)
+from .chunks import ChunkedColumn, chunks_of
+from .pagination import AGGREGATE_OPERATIONS, ROWID_KEY, decode_cursor, is_paged
+from .serialization import RowSet, is_rows
+
+TIME_FORMAT_UNIT = "s"
+NUMERIC_FIELDS = ("Lane", "Speed")
+RANGE_OPERATORS = {">", "<", ">=", "<="}
+# Fields whose values are ordered, so range operators apply.
+RANGE_FIELDS = NUMERIC_FIELDS + ("CollectionTime",)
+RECORD_FIELDS = ("CollectionTime", "Direction", "Lane", "Speed")
+COLUMN_NAMES = ("collection_time", "direction_codes", "lane", "speed")
+# Appended rows collect in an open chunk of at most this many rows; past
+# that it is sealed and never changes again.
+DELTA_ROWS = 65_536
+
+
+class TrafficColumns:
+    """Traffic data held as one typed NumPy array per field.
+
+    Direction is stored as small integer codes into ``direction_labels`` and
+    CollectionTime as ``datetime64[s]`` so every predicate and aggregate can
+    run as a vectorized operation instead of a per-row Python loop.
+
+    A loaded snapshot holds plain (memory-mapped) arrays. Snapshots extended
+    with appended rows hold ChunkedColumns instead: the loaded arrays stay
+    the first chunk, appended rows go to chunks after it, and every column
+    is split at the same rows.
+    """
+
+    def __init__(
+        self,
+        collection_time: np.ndarray,
+        direction_codes: np.ndarray,
+        direction_labels: Sequence[str],
+        lane: np.ndarray,
+        speed: np.ndarray,
+    ):
+        self.collection_time = collection_time
+        self.direction_codes = direction_codes
+        self.direction_labels = list(direction_labels)
+        self.lane = lane
+        self.speed = speed
+        # Secondary indexes, attached once by indexes.get_traffic_indexes.
+        self.indexes = None
+        # Where the rows came from (set by column_store). Snapshots extended from
+        # one another share it, since rows are only ever appended.
+        self.lineage: Any = None
+        # Rows in the last chunk that later appends may still grow (see extended).
+        self.open_rows = 0
+        # The store's id of every row, or None while they are simply 1..N, as
+        # TrafficStore numbers the CSV's rows. Retention trims and skipped ids
+        # break that; paging and cursors must use the store's ids.
+        self.row_ids: Any = None
+
+    def __len__(self) -> int:
+        return len(self.speed)
+
+    @classmethod
+    def from_rows(cls, rows) -> "TrafficColumns":
+        # rows are (CollectionTime, Direction, Lane, Speed) tuples.
+        times, directions, lanes, speeds = [], [], [], []
+        for collection_time, direction, lane, speed in rows:
+            times.append(collection_time)
+            directions.append(direction)
+            lanes.append(lane)
+            speeds.append(speed)
+
+        labels = sorted(set(directions))
+        lookup = {label: code for code, label in enumerate(labels)}
+        return cls(
+            collection_time=np.array(times, dtype=f"datetime64[{TIME_FORMAT_UNIT}]"),
+            direction_codes=np.array([lookup[d] for d in directions], dtype=np.uint8),
+            direction_labels=labels,
+            lane=np.array(lanes, dtype=np.int32),
+            speed=np.array(speeds, dtype=np.int32),
+        )
+
+    def row_id(self, indices: np.ndarray) -> np.ndarray:
+        """Store ids of the rows at ``indices``, the same ids the SQL engine pages by."""
+        if self.row_ids is None:
+            return indices + 1
+        return np.asarray(self.row_ids[indices], dtype=np.int64)
+
+    def chunk_bounds(self) -> List[Tuple[int, int]]:
+        """``(start, stop)`` rows of every chunk; a plain snapshot is one chunk."""
+        if isinstance(self.speed, ChunkedColumn):
+            return self.speed.bounds()
+        return [(0, len(self))]
+
+    def chunk(self, start: int, stop: int) -> "TrafficColumns":
+        # Rows [start, stop) of one chunk as plain array views; nothing is copied.
+        return TrafficColumns(
+            direction_labels=self.direction_labels,
+            **{name: getattr(self, name)[start:stop] for name in COLUMN_NAMES},
+        )
+
+    def extended(self, rows, row_ids: Optional[Sequence[int]] = None) -> "TrafficColumns":
+        """New snapshot with ``(time, direction, lane, speed)`` rows appended.
+
+        This snapshot is left untouched, so queries already running on it
+        keep a consistent view. New Direction labels get the next codes.
+        ``row_ids`` are the rows' store ids; by default they follow on from
+        the last row's.
+
+        Only the open chunk at the end is copied to grow it, so appending
+        costs O(DELTA_ROWS) at most, whatever the snapshot's size. A full
+        open chunk is sealed, and runs of sealed chunks are merged once the
+        later one is as large as the one before it, which keeps the number
+        of chunks logarithmic. The first chunk is never merged, so a
+        memory-mapped cache stays mapped.
+        """
+        rows = list(rows)
+        labels = list(self.direction_labels)
+        lookup = {label: code for code, label in enumerate(labels)}
+        codes = []
+        for _, direction, _, _ in rows:
+            if direction not in lookup:
+                lookup[direction] = len(labels)
+                labels.append(direction)
+            codes.append(lookup[direction])
+        appended = {
+            "collection_time": np.array([r[0] for r in rows], dtype=f"datetime64[{TIME_FORMAT_UNIT}]"),
+            "direction_codes": np.array(codes, dtype=np.uint8),
+            "lane": np.array([r[2] for r in rows], dtype=np.int32),
+            "speed": np.array([r[3] for r in rows], dtype=np.int32),
+        }
+
+        names = COLUMN_NAMES
+        chunks = {name: chunks_of(getattr(self, name)) for name in COLUMN_NAMES}
+        last_id = int(self.row_id(np.array([len(self) - 1]))[0]) if len(self) else 0
+        if row_ids is None:
+            row_ids = np.arange(last_id + 1, last_id + 1 + len(rows), dtype=np.int64)
+        row_ids = np.asarray(row_ids, dtype=np.int64)
+        implicit = self.row_ids is None and np.array_equal(
+            row_ids, np.arange(len(self) + 1, len(self) + 1 + len(rows))
+        )
+        if not implicit:
+            # Ids no longer follow positions: keep them as a column, chunked like the others.
+            names = COLUMN_NAMES + ("row_ids",)
+            appended["row_ids"] = row_ids
+            if self.row_ids is not None:
+                chunks["row_ids"] = chunks_of(self.row_ids)
+            else:
+                chunks["row_ids"] = [np.arange(start + 1, stop + 1, dtype=np.int64)
+                                     for start, stop in self.chunk_bounds()]
+        open_rows = self.open_rows
+        if open_rows + len(rows) <= DELTA_ROWS:
+            # Grow the open chunk, or open one.
+            for name, values in appended.items():
+                if open_rows:
+                    values = np.concatenate([chunks[name].pop(), values])
+                chunks[name].append(values)
+            open_rows += len(rows)
+        else:
+            # Seal the open chunk; the new rows open the next one unless they fill it already.
+            for name, values in appended.items():
+                chunks[name].append(values)
+            open_rows = len(rows) if len(rows) <= DELTA_ROWS else 0
+            sealed = len(chunks["speed"]) - (1 if open_rows else 0)
+            while sealed > 2 and len(chunks["speed"][sealed - 2]) <= len(chunks["speed"][sealed - 1]):
+                for name in names:
+                    merged = np.concatenate(chunks[name][sealed - 2:sealed])
+                    chunks[name][sealed - 2:sealed] = [merged]
+                sealed -= 1
+
+        extended = TrafficColumns(
+            direction_labels=labels,
+            **{name: ChunkedColumn(chunks[name]) for name in COLUMN_NAMES},
+        )
+        extended.lineage = self.lineage
+        extended.open_rows = open_rows
+        if not implicit:
+            extended.row_ids = ChunkedColumn(chunks["row_ids"])
+        return extended
+
+    def direction_code(self, label: str) -> Optional[int]:
+        try:
+            return self.direction_labels.index(label)
+        except ValueError:
+            return None
+
+    def to_records(self, indices: np.ndarray) -> RowSet:
+        # Rows in the same shape as load_traffic_data, read as dicts but kept as tuples.
+        if len(indices) == 0:
+            return RowSet(RECORD_FIELDS, [])
+        times = np.char.replace(
+            np.datetime_as_string(self.collection_time[indices], unit=TIME_FORMAT_UNIT), "T", " "
+        ).tolist()
+        labels = self.direction_labels
+        directions = [labels[code] for code in self.direction_codes[indices].tolist()]
+        lanes = self.lane[indices].tolist()
+        speeds = self.speed[indices].tolist()
+        return RowSet(RECORD_FIELDS, list(zip(times, directions, lanes, speeds)))
+
+
+def range_key(field: str, value: str) -> Any:
+    # Stored representation of a range bound on ``field``.
+    if field == "CollectionTime":
+        moment = _parse_time(value)
+        if moment is None:
+            raise ValueError(f"Invalid CollectionTime '{value}'.")
+        return moment
+    return int(value)
+
+
+def _parse_time(value: str) -> Optional[np.datetime64]:
+    try:
+        return np.datetime64(value.replace(" ", "T"), TIME_FORMAT_UNIT)
+    except ValueError:
+        return None
+
+
+def _int_value(value: str) -> Optional[int]:
+    # FilterCondition already wrote whole numbers canonically; anything else matches no row.
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+
+def column_for(columns: TrafficColumns, field: str) -> np.ndarray:
+    # The stored array behind a FilterCondition field name.
+    if field == "Direction":
+        return columns.direction_codes
+    if field == "CollectionTime":
+        return columns.collection_time
+    if field in NUMERIC_FIELDS:
+        return getattr(columns, field.lower())
+    raise ValueError(f"Unknown field '{field}'.")
+
+
+def _field_values(columns: TrafficColumns, field: str, rows: Optional[np.ndarray]) -> np.ndarray:
+    # The whole column, or just the candidate rows when a planner narrowed them down.
+    column = column_for(columns, field)
+    return column if rows is None else column[rows]
+
+
+def equality_key(columns: TrafficColumns, field: str, value: str) -> Any:
+    """Translate ``value`` into the stored representation for ``field``.
+
+    Returns None when no row can compare equal, e.g. an unknown direction or
+    a fractional lane.
+    """
+    if field == "Direction":
+        return columns.direction_code(value)
+    if field in NUMERIC_FIELDS:
+        return _int_value(value)
+    if field == "CollectionTime":
+        moment = _parse_time(value)
+        if moment is None or np.datetime_as_string(moment).replace("T", " ") != value:
+            return None
+        return moment
+    raise ValueError(f"Unknown field '{field}'.")
+
+
+def _equality_mask(
+    columns: TrafficColumns, field: str, value: str, rows: Optional[np.ndarray] = None
+) -> np.ndarray:
+    key = equality_key(columns, field, value)
+    if key is None:
+        return np.zeros(len(columns) if rows is None else len(rows), dtype=bool)
+    return _field_values(columns, field, rows) == key
+
+
+def _range_mask(
+    columns: TrafficColumns, field: str, operator: str, value: str, rows: Optional[np.ndarray] = None
+) -> np.ndarray:
+    if field not in RANGE_FIELDS:
+        raise ValueError(f"Operator '{operator}' requires a numeric or time field, got '{field}'.")
+    number = range_key(field, value)
+    column = _field_values(columns, field, rows)
+    if operator == ">":
+        return column > number
+    if operator == "<":
+        return column < number
+    if operator == ">=":
+        return column >= number
+    return column <= number
+
+
+def condition_mask(
+    columns: TrafficColumns, condition: FilterCondition, rows: Optional[np.ndarray] = None
+) -> np.ndarray:
+    # Boolean mask of the rows (all of them, or only ``rows``) that satisfy a condition.
+    field = condition.field
+    operator = condition.operator
+    value = condition.value
+
+    if operator == "==":
+        return _equality_mask(columns, field, value, rows)
+    if operator == "!=":
+        return ~_equality_mask(columns, field, value, rows)
+    if operator in RANGE_OPERATORS:
+        return _range_mask(columns, field, operator, value, rows)
+    # Unknown operators are ignored, matching apply_filter_conditions.
+    return np.ones(len(columns) if rows is None else len(rows), dtype=bool)
+
+
+def apply_filter_mask(columns: TrafficColumns, conditions: List[FilterCondition]) -> np.ndarray:
+    # AND all condition masks together and return the matching row indices.
+    mask = np.ones(len(columns), dtype=bool)
+    for condition in conditions:
+        mask &= condition_mask(columns, condition)
+    return np.flatnonzero(mask)
+
+
+def _sort_key(columns: TrafficColumns, sort_by: str, indices: np.ndarray) -> np.ndarray:
+    if sort_by in NUMERIC_FIELDS:
+        return getattr(columns, sort_by.lower())[indices].astype(np.int64)
+    if sort_by == "CollectionTime":
+        return columns.collection_time[indices].astype(np.int64)
+    if sort_by == "Direction":
+        # Rank codes by label so the order matches a string sort.
+        ranks = np.argsort(np.argsort(columns.direction_labels, kind="stable"), kind="stable")
+        return ranks[columns.direction_codes[indices]].astype(np.int64)
+    raise ValueError(f"Unknown sort field '{sort_by}'.")
+
+
+def _directed_key(columns: TrafficColumns, indices: np.ndarray, sort_by: str, sort_direction: str) -> np.ndarray:
+    # Ascending order of this key is the requested order.
+    key = _sort_key(columns, sort_by, indices)
+    return -key if sort_direction.lower() == "descending" else key
+
+
+def sort_indices(
+    columns: TrafficColumns, indices: np.ndarray, sort_by: str, sort_direction: str = "ascending"
+) -> np.ndarray:
+    # Stable sort, so ties keep their original order exactly like sorted().
+    if not sort_by:
+        return indices
+    key = _directed_key(columns, indices, sort_by, sort_direction)
+    return indices[np.argsort(key, kind="stable")]
+
+
+def top_k_indices(
+    columns: TrafficColumns, indices: np.ndarray, sort_by: str, sort_direction: str, k: int
+) -> np.ndarray:
+    """First ``k`` rows of sort_indices without sorting everything.
+
+    np.partition finds the k-th key in linear time; only rows at or before it
+    are sorted, and ties keep row order exactly as the full stable sort would.
+    """
+    if k >= len(indices):
+        return sort_indices(columns, indices, sort_by, sort_direction)
+    if k <= 0:
+        return indices[:0]
+    key = _directed_key(columns, indices, sort_by, sort_direction)
+    kth = np.partition(key, k - 1)[k - 1]
+    candidates = np.flatnonzero(key <= kth)
+    order = np.argsort(key[candidates], kind="stable")[:k]
+    return indices[candidates[order]]
+
+
+def _cursor_key(columns: TrafficColumns, sort_by: str, value: Any) -> float:
+    # Place a cursor's sort value on the same scale as _sort_key.
+    if sort_by in NUMERIC_FIELDS:
+        return int(value)
+    if sort_by == "CollectionTime":
+        moment = _parse_time(str(value))
+        if moment is None:
+            raise ValueError("Invalid pagination cursor.")
+        return int(moment.astype(np.int64))
+    if sort_by == "Direction":
+        labels = sorted(columns.direction_labels)
+        position = bisect.bisect_left(labels, str(value))
+        if position < len(labels) and labels[position] == value:
+            return position
+        # Unknown label: sits between its neighbours.
+        return position - 0.5
+    raise ValueError(f"Unknown sort field '{sort_by}'.")
+
+
+def rows_after_cursor(columns: TrafficColumns, indices: np.ndarray, filter_object: FilterObject) -> np.ndarray:
+    # Keyset pagination: keep rows strictly after the cursor in (sort key, rowid) order.
+    sort_value, rowid = decode_cursor(filter_object.cursor, filter_object.sort_by)
+    row_ids = columns.row_id(indices)
+    if not filter_object.sort_by:
+        return indices[row_ids > rowid]
+    direction = filter_object.sort_direction or "ascending"
+    key = _directed_key(columns, indices, filter_object.sort_by, direction)
+    cursor_key = _cursor_key(columns, filter_object.sort_by, sort_value)
+    if direction.lower() == "descending":
+        cursor_key = -cursor_key
+    return indices[(key > cursor_key) | ((key == cursor_key) & (row_ids > rowid))]
+
+
+def _window_counts(columns: TrafficColumns, indices: np.ndarray, minutes: int) -> List[Dict[str, Any]]:
+    # One bincount over window numbers instead of a group-by per window.
+    if len(indices) == 0:
+        return []
+    width = minutes * 60
+    windows = columns.collection_time[indices].astype(np.int64) // width
+    first = int(windows.min())
+    counts = np.bincount(windows - first)
+    present = np.flatnonzero(counts)
+    starts = ((present + first) * width).astype(f"datetime64[{TIME_FORMAT_UNIT}]")
+    labels = np.char.replace(np.datetime_as_string(starts, unit=TIME_FORMAT_UNIT), "T", " ").tolist()
+    return [{"window_start": label, "count": int(n)} for label, n in zip(labels, counts[present].tolist())]
+
+
+def execute_columnar_operation(
+    columns: TrafficColumns, indices: np.ndarray, operation: str, window_minutes: Optional[int] = None
+) -> Any:
+    # Vectorized counterpart of filter_engine.execute_operation.
+    if operation == "count_vehicles":
+        return {"count": int(len(indices))}
+
+    elif operation == "average_speed":
+        if len(indices) == 0:
+            return {"average_speed": 0}
+        total_speed = int(columns.speed[indices].sum(dtype=np.int64))
+        return {"average_speed": round(total_speed / len(indices), 2)}
+
+    elif operation == "max_speed":
+        if len(indices) == 0:
+            return {"max_speed": None}
+        return {"max_speed": int(columns.speed[indices].max())}
+
+    elif operation == "min_speed":
+        if len(indices) == 0:
+            return {"min_speed": None}
+        return {"min_speed": int(columns.speed[indices].min())}
+
+    elif operation == "speed_percentiles":
+        if len(indices) == 0:
+            return empty_percentiles()
+        # A single multi-kth partition places every percentile, no full sort.
+        positions = percentile_positions(len(indices))
+        speeds = np.partition(columns.speed[indices], positions)
+        return {percentile_key(p): int(speeds[i]) for p, i in zip(SPEED_PERCENTILES, positions)}
+
+    elif operation == "count_by_window":
+        return _window_counts(columns, indices, window_minutes or DEFAULT_WINDOW_MINUTES)
+
+    # list_vehicles, no operation and unknown operations return the rows
+    return columns.to_records(indices)
+
+
+def group_rows(columns: TrafficColumns, indices: np.ndarray, group_by: Sequence[str]) -> List[tuple]:
+    """Split ``indices`` by the values of the ``group_by`` columns.
+
+    Each column's values become dense codes, the codes combine into one
+    integer key per row, and a single stable sort on that key yields every
+    group. Returns ``(values, rows)`` pairs ordered by the group values.
+    """
+    if len(indices) == 0:
+        return []
+    key = np.zeros(len(indices), dtype=np.int64)
+    distinct = []
+    for field in group_by:
+        uniques, codes = np.unique(column_for(columns, field)[indices], return_inverse=True)
+        key = key * len(uniques) + codes
+        distinct.append(uniques)
+
+    group_keys, group_of_row = np.unique(key, return_inverse=True)
+    order = np.argsort(group_of_row, kind="stable")
+    bounds = np.cumsum(np.bincount(group_of_row))
+
+    groups = []
+    start = 0
+    for group_key, end in zip(group_keys.tolist(), bounds.tolist()):
+        values = []
+        for field, uniques in zip(reversed(group_by), reversed(distinct)):
+            group_key, code = divmod(group_key, len(uniques))
+            value = uniques[code].item()
+            values.append(columns.direction_labels[value] if field == "Direction" else value)
+        groups.append((tuple(reversed(values)), indices[order[start:end]]))
+        start = end
+    # Direction codes follow insertion, not label order, so sort on the values themselves.
+    groups.sort(key=lambda group: group[0])
+    return groups
+
+
+def execute_grouped_columnar_operation(
+    columns: TrafficColumns,
+    indices: np.ndarray,
+    operation: str,
+    group_by: Sequence[str],
+    window_minutes: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    # Vectorized counterpart of filter_engine.execute_grouped_operation.
+    results = []
+    for values, rows in group_rows(columns, indices, group_by):
+        labels = dict(zip(group_by, values))
+        result = execute_columnar_operation(columns, rows, operation, window_minutes)
+        if is_rows(result):
+            results.extend({**labels, **row} for row in result)
+        else:
+            results.append({**labels, **result})
+    return results
+
+
+def process_filter_columnar(columns: TrafficColumns, filter_object: FilterObject) -> Any:
+    if columns.indexes is not None:
+        indices = columns.indexes.select_rows(filter_object.conditions)
+    else:
+        indices = apply_filter_mask(columns, filter_object.conditions)
+    return finish_filter(columns, filter_object, indices)
+
+
+def finish_filter(columns: TrafficColumns, filter_object: FilterObject, indices: np.ndarray) -> Any:
+    """Answer ``filter_object`` from the ascending ids of the rows matching its conditions.
+
+    ``indices`` may also be any ascending superset of the rows the answer
+    needs, e.g. the first ``offset + limit`` matches of a page.
+    """
+    if filter_object.group_by and filter_object.operation in AGGREGATE_OPERATIONS:
+        return execute_grouped_columnar_operation(
+            columns, indices, filter_object.operation, filter_object.group_by, filter_object.window_minutes
+        )
+
+    paged = is_paged(filter_object)
+    if paged and filter_object.cursor is not None:
+        indices = rows_after_cursor(columns, indices, filter_object)
+
+    offset = (filter_object.offset or 0) if paged else 0
+    limit = filter_object.limit if paged else None
+    if filter_object.sort_by:
+        direction = filter_object.sort_direction or "ascending"
+        if limit is not None:
+            # Only the first offset + limit rows are needed: partial selection, not a full sort.
+            indices = top_k_indices(columns, indices, filter_object.sort_by, direction, offset + limit)
+        else:
+            indices = sort_indices(columns, indices, filter_object.sort_by, direction)
+    if paged:
+        indices = indices[offset:] if limit is None else indices[offset:offset + limit]
+
+    result = execute_columnar_operation(columns, indices, filter_object.operation, filter_object.window_minutes)
+    if paged:
+        # Row ids for the next-page cursor, like the SQL engine's rowid column.
+        result = result.with_column(ROWID_KEY, columns.row_id(indices).tolist())
+    return result
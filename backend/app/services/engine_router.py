@@ -0,0 +1,438 @@
+import logging
+import math
+import os
+import threading
+from collections import Counter, deque
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+from ..models.aiModel import FilterCondition, FilterObject
+from .column_store import get_traffic_columns
+from .columnar_engine import TrafficColumns
+from .metrics import RequestTimings
+from .pagination import AGGREGATE_OPERATIONS, is_paged
+from .parallel_scan import get_parallel_scanner, process_filter_parallel
+from .partitions import prune_partitions
+from .rollups import ROLLUP_TABLES
+from .serialization import is_rows
+from .sql_engine import SqlStatement, execute_sql_query, rollups_read, rows_scanned
+from .traffic_store import get_store
+
+ENGINES = ("sql", "python")
+ENGINE_MODES = ("auto",) + ENGINES
+# The Python engine rounds averages to two decimals and reports 0 for no rows,
+# so averages always go to SQL to keep answers identical across engines.
+SQL_ONLY_OPERATIONS = {"average_speed"}
+# Statistics are rebuilt once the row count drifts this far, like re-running ANALYZE.
+STATS_REFRESH_RATIO = 0.1
+MAX_MISMATCHES = 50
+
+# Estimated cost per unit of work, in microseconds. Measured with the
+# benchmark harness (python -m benchmarks) on 1e5 rows; only the ratios matter.
+COSTS = {
+    "sql_fixed": 20.0,
+    "sql_rollup_row": 0.08,  # per rollup bucket read
+    "sql_scan_row": 0.1,  # per partition row read
+    "sql_return_row": 1.6,  # per row fetched and turned into a dict
+    "sql_sort_row": 0.05,  # per row and log2(rows) of an ORDER BY
+    "sql_top_k_row": 0.02,  # per row of an ORDER BY ... LIMIT
+    "sql_group_row": 0.3,
+    "sql_rank_row": 1.7,  # ROW_NUMBER() window for percentiles
+    "sql_window_row": 0.9,  # strftime bucketing for count_by_window
+    "python_fixed": 40.0,
+    "python_parallel_fixed": 2000.0,  # dispatching a scan to the process pool
+    "python_mask_row": 0.004,  # per row and condition of a full mask scan
+    "python_index_row": 0.01,  # per row returned by an index lookup
+    "python_filter_row": 0.01,  # per surviving row and remaining condition
+    "python_return_row": 1.2,  # per row turned into a dict
+    "python_sort_row": 0.01,
+    "python_top_k_row": 0.005,
+    "python_group_row": 0.07,
+    "python_rank_row": 0.015,
+    "python_window_row": 0.035,
+}
+
+logger = logging.getLogger("rosa.engine_router")
+
+
+def _bound_count(cumulative: np.ndarray, operator: str, value: float) -> float:
+    # Rows of an integer column satisfying ``column <operator> value``, from
+    # cumulative per-value counts (cumulative[v] = rows below v).
+    total = float(cumulative[-1])
+
+    def below(limit: int) -> float:
+        return float(cumulative[min(max(limit, 0), len(cumulative) - 1)])
+
+    if operator == "<":
+        return below(math.ceil(value))
+    if operator == "<=":
+        return below(math.floor(value) + 1)
+    if operator == ">":
+        return total - below(math.floor(value) + 1)
+    if operator == ">=":
+        return total - below(math.ceil(value))
+    exact = below(int(value) + 1) - below(int(value)) if float(value).is_integer() else 0.0
+    return exact if operator == "==" else total - exact
+
+
+class TableStats:
+    """Row count, per-value counts of Direction and Lane, a Speed histogram and rows per day.
+
+    Enough for the row estimates a cost model needs; columns are assumed
+    independent of each other, as most query planners do.
+    """
+
+    def __init__(
+        self,
+        row_count: int,
+        direction_counts: Dict[str, int],
+        lane_counts: np.ndarray,
+        speed_counts: np.ndarray,
+        day_counts: Dict[str, int],
+    ):
+        self.row_count = row_count
+        self.direction_counts = direction_counts
+        # Cumulative counts per integer value: [v] holds the rows below v.
+        self.lane_cumulative = np.concatenate([[0], np.cumsum(lane_counts)])
+        self.speed_cumulative = np.concatenate([[0], np.cumsum(speed_counts)])
+        self.lanes = int(np.count_nonzero(lane_counts))
+        self.day_counts = day_counts
+
+    @classmethod
+    def from_columns(cls, columns: TrafficColumns, day_counts: Dict[str, int]) -> "TableStats":
+        codes = np.bincount(columns.direction_codes, minlength=len(columns.direction_labels))
+        return cls(
+            row_count=len(columns),
+            direction_counts={label: int(n) for label, n in zip(columns.direction_labels, codes.tolist()) if n},
+            lane_counts=np.bincount(np.clip(columns.lane, 0, None)),
+            speed_counts=np.bincount(np.clip(columns.speed, 0, None)),
+            day_counts=day_counts,
+        )
+
+    def _time_rows(self, operator: str, value: str) -> float:
+        # Rows are assumed evenly spread over their day.
+        day = value[:10]
+        try:
+            hours, minutes, seconds = (int(part) for part in value[11:19].split(":"))
+        except ValueError:
+            return float(self.row_count)
+        fraction = (hours * 3600 + minutes * 60 + seconds) / 86400
+        today = self.day_counts.get(day, 0)
+        before = sum(n for other, n in self.day_counts.items() if other < day) + today * fraction
+        if operator in ("<", "<="):
+            return before
+        if operator in (">", ">="):
+            return self.row_count - before
+        exact = today / 86400
+        return exact if operator == "==" else self.row_count - exact
+
+    def estimate_rows(self, condition: FilterCondition) -> float:
+        field, operator, value = condition.field, condition.operator, condition.value
+        if field == "Direction":
+            count = self.direction_counts.get(value, 0)
+            if operator == "==":
+                return float(count)
+            if operator == "!=":
+                return float(self.row_count - count)
+        elif field in ("Lane", "Speed"):
+            try:
+                number = float(value)
+            except ValueError:
+                return float(self.row_count)
+            cumulative = self.lane_cumulative if field == "Lane" else self.speed_cumulative
+            return _bound_count(cumulative, operator, number)
+        elif field == "CollectionTime":
+            return self._time_rows(operator, value)
+        return float(self.row_count)
+
+    def estimate_matched(self, conditions: List[FilterCondition]) -> float:
+        """Rows matching every condition.
+
+        A lower and an upper bound on the same column select the rows between
+        them; conditions on different columns are treated as independent.
+        """
+        total = float(self.row_count)
+        if total == 0:
+            return 0.0
+        by_field: Dict[str, List[FilterCondition]] = {}
+        for condition in conditions:
+            by_field.setdefault(condition.field, []).append(condition)
+        matched = total
+        for field_conditions in by_field.values():
+            lower = upper = total
+            fraction = 1.0
+            for condition in field_conditions:
+                rows = min(max(self.estimate_rows(condition), 0.0), total)
+                if condition.operator in (">", ">="):
+                    lower = min(lower, rows)
+                elif condition.operator in ("<", "<="):
+                    upper = min(upper, rows)
+                else:
+                    fraction *= rows / total
+            fraction *= max(lower + upper - total, 0.0) / total
+            matched *= fraction
+        return matched
+
+    def estimate_time_range(self, conditions: List[FilterCondition]) -> Optional[float]:
+        # Rows inside the CollectionTime bounds, or None without any.
+        bounds = [c for c in conditions if c.field == "CollectionTime" and c.operator != "!="]
+        return self.estimate_matched(bounds) if bounds else None
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "row_count": self.row_count,
+            "directions": self.direction_counts,
+            "lanes": self.lanes,
+            "days": len(self.day_counts),
+        }
+
+
+class EngineChoice(NamedTuple):
+    """Engine picked for one filter, with the estimates behind the pick."""
+
+    engine: str
+    reason: str
+    # Estimated microseconds per engine; None when an engine may not answer.
+    costs: Dict[str, Optional[float]]
+    estimated_rows: Optional[float] = None
+    python_rows_scanned: Optional[int] = None
+
+
+def _sort_cost(rows: float, paged: bool, full: str, top_k: str) -> float:
+    if paged:
+        return rows * COSTS[top_k]
+    return rows * math.log2(max(rows, 2.0)) * COSTS[full]
+
+
+def _operation_cost(filter_object: FilterObject, matched: float, returned: float, engine: str) -> float:
+    operation = filter_object.operation
+    if filter_object.group_by and operation in AGGREGATE_OPERATIONS:
+        extra = matched * COSTS[f"{engine}_group_row"]
+    else:
+        extra = 0.0
+    if operation == "speed_percentiles":
+        return extra + matched * COSTS[f"{engine}_rank_row"]
+    if operation == "count_by_window":
+        return extra + matched * COSTS[f"{engine}_window_row"]
+    if operation in AGGREGATE_OPERATIONS:
+        return extra
+    cost = returned * COSTS[f"{engine}_return_row"]
+    if filter_object.sort_by:
+        cost += _sort_cost(matched, is_paged(filter_object), f"{engine}_sort_row", f"{engine}_top_k_row")
+    return cost
+
+
+def _returned_rows(filter_object: FilterObject, matched: float) -> float:
+    if filter_object.operation in AGGREGATE_OPERATIONS:
+        return 1.0
+    if is_paged(filter_object) and filter_object.limit is not None:
+        return min(matched, float(filter_object.limit))
+    return matched
+
+
+def results_match(filter_object: FilterObject, first: Any, second: Any) -> bool:
+    """Whether two engines' answers to ``filter_object`` agree.
+
+    Unpaged lists have no defined order, so they are compared as multisets,
+    plus the sequence of sort keys when sorted (ties may come back in any order).
+    """
+    if is_rows(first) and is_rows(second):
+        if is_paged(filter_object) or filter_object.operation in AGGREGATE_OPERATIONS:
+            return first == second
+        if len(first) != len(second):
+            return False
+        if filter_object.sort_by:
+            sort_by = filter_object.sort_by
+            if [row.get(sort_by) for row in first] != [row.get(sort_by) for row in second]:
+                return False
+        as_items = lambda rows: Counter(tuple(sorted(row.items())) for row in rows)  # noqa: E731
+        return as_items(first) == as_items(second)
+    return first == second
+
+
+class EngineRouter:
+    """Sends each FilterObject to whichever engine should answer it fastest.
+
+    ``mode`` forces an engine ("sql" or "python") or lets the cost model pick
+    ("auto"). The Python engine is only used while its in-memory snapshot
+    holds exactly the rows the store does, and never for averages. In shadow
+    mode every freshly computed answer is recomputed on the other engine and
+    the two are compared; mismatches are counted and logged.
+    """
+
+    def __init__(self, mode: str = "auto", shadow: bool = False):
+        if mode not in ENGINE_MODES:
+            raise ValueError(f"Unknown engine mode '{mode}'; use one of {', '.join(ENGINE_MODES)}.")
+        self.mode = mode
+        self.shadow = shadow
+        self._stats: Optional[TableStats] = None
+        self._lock = threading.Lock()
+        self.chosen: Counter = Counter()
+        self.shadow_runs = 0
+        self.shadow_skipped = 0
+        self.mismatches = 0
+        self._recent_mismatches: "deque[Dict[str, Any]]" = deque(maxlen=MAX_MISMATCHES)
+
+    def table_stats(self, columns: TrafficColumns) -> TableStats:
+        stats = self._stats
+        if stats is None or abs(len(columns) - stats.row_count) > stats.row_count * STATS_REFRESH_RATIO:
+            store = get_store()
+            sizes = store.partition_sizes()
+            day_counts = {day: sizes.get(table, 0) for day, table in store.partitions()}
+            stats = self._stats = TableStats.from_columns(columns, day_counts)
+        return stats
+
+    def python_available(self) -> Optional[TrafficColumns]:
+        # The snapshot, if it holds the same rows as the store; retention may have dropped some.
+        columns = get_traffic_columns()
+        if len(columns) != sum(get_store().partition_sizes().values()):
+            return None
+        return columns
+
+    def estimate(self, filter_object: FilterObject, statement: SqlStatement, columns: TrafficColumns) -> EngineChoice:
+        stats = self.table_stats(columns)
+        conditions = filter_object.conditions
+        matched = stats.estimate_matched(conditions)
+        returned = _returned_rows(filter_object, matched)
+
+        rollups = rollups_read(statement.sql)
+        if rollups:
+            tables = prune_partitions(get_store().partitions(), conditions)
+            days = len(stats.day_counts) if tables is None else len(tables)
+            per_day = 1440 if ROLLUP_TABLES["minute"][0] in rollups else 24
+            buckets = days * per_day * max(len(stats.direction_counts), 1) * max(stats.lanes, 1)
+            sql_cost = COSTS["sql_fixed"] + buckets * COSTS["sql_rollup_row"]
+        else:
+            # Each partition has a CollectionTime index, so time bounds narrow the scan.
+            scanned = float(rows_scanned(statement.sql))
+            in_range = stats.estimate_time_range(conditions)
+            if in_range is not None:
+                scanned = min(scanned, in_range)
+            sql_cost = (
+                COSTS["sql_fixed"]
+                + scanned * COSTS["sql_scan_row"]
+                + _operation_cost(filter_object, matched, returned, "sql")
+            )
+
+        best = columns.indexes.choose_index(conditions) if columns.indexes is not None else None
+        if best is None:
+            scanned = len(columns)
+            access = scanned * max(len(conditions), 1) * COSTS["python_mask_row"]
+            scanner = get_parallel_scanner()
+            if scanner.applies(columns, conditions):
+                access = access / scanner.workers + COSTS["python_parallel_fixed"]
+        else:
+            scanned = best[0]
+            access = scanned * (COSTS["python_index_row"] + (len(conditions) - 1) * COSTS["python_filter_row"])
+        python_cost = COSTS["python_fixed"] + access + _operation_cost(filter_object, matched, returned, "python")
+
+        costs = {"sql": round(sql_cost, 1), "python": round(python_cost, 1)}
+        engine = "python" if python_cost < sql_cost else "sql"
+        return EngineChoice(engine, "cheaper", costs, round(matched, 1), scanned)
+
+    def plan(self, filter_object: FilterObject, statement: SqlStatement) -> EngineChoice:
+        """The engine that would answer ``filter_object``, without counting it as a pick."""
+        if self.mode == "sql":
+            choice = EngineChoice("sql", "configured", {"sql": None, "python": None})
+        else:
+            columns = self.python_available()
+            if columns is None:
+                choice = EngineChoice("sql", "python snapshot is behind the store", {"sql": None, "python": None})
+            else:
+                choice = self.estimate(filter_object, statement, columns)
+                if filter_object.operation in SQL_ONLY_OPERATIONS:
+                    choice = choice._replace(engine="sql", reason="only sql answers this operation exactly")
+                elif self.mode == "python":
+                    choice = choice._replace(engine="python", reason="configured")
+        return choice
+
+    def choose(self, filter_object: FilterObject, statement: SqlStatement) -> EngineChoice:
+        choice = self.plan(filter_object, statement)
+        with self._lock:
+            self.chosen[choice.engine] += 1
+        return choice
+
+    def run(self, engine: str, filter_object: FilterObject, statement: SqlStatement, single_row: bool,
+            timings: Optional[RequestTimings] = None) -> Any:
+        if engine == "sql":
+            return execute_sql_query(statement.sql, statement.params, single_row, timings)
+        columns = get_traffic_columns()
+        if timings is None:
+            return process_filter_parallel(columns, filter_object)
+        with timings.stage("execute"):
+            return process_filter_parallel(columns, filter_object)
+
+    def execute(self, choice: EngineChoice, filter_object: FilterObject, statement: SqlStatement,
+                single_row: bool, timings: RequestTimings) -> Any:
+        """Answer with the chosen engine and, in shadow mode, check it against the other one."""
+        result = self.run(choice.engine, filter_object, statement, single_row, timings)
+        if choice.engine == "python":
+            timings.rows_scanned = choice.python_rows_scanned
+        if self.shadow:
+            with timings.stage("shadow"):
+                self.compare(choice.engine, filter_object, statement, single_row, result)
+        return result
+
+    def compare(self, engine: str, filter_object: FilterObject, statement: SqlStatement,
+                single_row: bool, result: Any) -> Optional[bool]:
+        """Recompute ``result`` on the other engine; returns whether they agree, or None if skipped."""
+        other = "python" if engine == "sql" else "sql"
+        if filter_object.operation in SQL_ONLY_OPERATIONS or self.python_available() is None:
+            with self._lock:
+                self.shadow_skipped += 1
+            return None
+        try:
+            other_result = self.run(other, filter_object, statement, single_row)
+        except Exception as exc:  # The answer already exists; a failing shadow only gets reported.
+            other_result = {"error": str(exc)}
+        matched = results_match(filter_object, result, other_result)
+        with self._lock:
+            self.shadow_runs += 1
+            if not matched:
+                self.mismatches += 1
+                self._recent_mismatches.append({
+                    "filter": filter_object.model_dump(exclude_none=True),
+                    "engine": engine,
+                    "rows": {engine: _size(result), other: _size(other_result)},
+                })
+        if not matched:
+            logger.warning(
+                "engine mismatch: %s answered %s differently from %s", engine,
+                filter_object.model_dump_json(exclude_none=True), other,
+            )
+        return matched
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "shadow": self.shadow,
+                "chosen": {engine: self.chosen[engine] for engine in ENGINES},
+                "shadow_runs": self.shadow_runs,
+                "shadow_skipped": self.shadow_skipped,
+                "mismatches": self.mismatches,
+                "recent_mismatches": list(reversed(self._recent_mismatches)),
+                "table": None if self._stats is None else self._stats.summary(),
+            }
+
+
+def _size(result: Any) -> int:
+    return len(result) if is_rows(result) else 1
+
+
+_engine_router: Optional[EngineRouter] = None
+_engine_router_lock = threading.Lock()
+
+
+def get_engine_router() -> EngineRouter:
+    """Process-wide router configured from ROSA_ENGINE (auto, sql, python) and ROSA_ENGINE_SHADOW."""
+    global _engine_router
+    if _engine_router is None:
+        with _engine_router_lock:
+            if _engine_router is None:
+                _engine_router = EngineRouter(
+                    mode=os.environ.get("ROSA_ENGINE", "auto").lower() or "auto",
+                    shadow=os.environ.get("ROSA_ENGINE_SHADOW", "").lower() in ("1", "true", "yes", "on"),
+                )
+    return _engine_router
@@ -1,12 +1,25 @@
 import csv
-from typing import List, Dict, Any
+import heapq
+from collections import Counter
+from typing import List, Dict, Any, Optional
 from pathlib import Path
 from ..models.aiModel import FilterObject, FilterCondition
+from .column_store import get_traffic_columns
+from .operations import (
+    DEFAULT_WINDOW_MINUTES,
+    SPEED_PERCENTILES,
+    empty_percentiles,
+    percentile_key,
+    percentile_positions,
+    window_start,
+)
+from .parallel_scan import process_filter_parallel
+from .traffic_store import traffic_csv_path
 
 
-def load_traffic_data() -> List[Dict[str, Any]]:
-    # Load traffic data from CSV file.
-    data_path = Path(__file__).parent.parent / "data" / "traffic.csv"
+def load_traffic_data(data_path: Optional[Path] = None) -> List[Dict[str, Any]]:
+    # Load traffic data from CSV file (by default the one the app serves).
+    data_path = traffic_csv_path() if data_path is None else data_path
     
     records = []
     with open(data_path, mode='r') as file:
@@ -23,6 +36,11 @@ def load_traffic_data() -> List[Dict[str, Any]]:
     return records
 
 
+def _range_value(field: str, value: Any) -> Any:
+    # Times are compared as text; the stored layout sorts chronologically.
+    return str(value) if field == "CollectionTime" else int(value)
+
+
 def apply_filter_conditions(records: List[Dict[str, Any]], conditions: List[FilterCondition]) -> List[Dict[str, Any]]:
     # Filter records based on conditions.
     filtered_records = records
@@ -45,22 +63,22 @@ def apply_filter_conditions(records: List[Dict[str, Any]], conditions: List[Filt
         elif operator == ">":
             filtered_records = [
                 r for r in filtered_records
-                if int(r.get(field, 0)) > int(value)
+                if _range_value(field, r.get(field, 0)) > _range_value(field, value)
             ]
         elif operator == "<":
             filtered_records = [
                 r for r in filtered_records
-                if int(r.get(field, 0)) < int(value)
+                if _range_value(field, r.get(field, 0)) < _range_value(field, value)
             ]
         elif operator == ">=":
             filtered_records = [
                 r for r in filtered_records
-                if int(r.get(field, 0)) >= int(value)
+                if _range_value(field, r.get(field, 0)) >= _range_value(field, value)
             ]
         elif operator == "<=":
             filtered_records = [
                 r for r in filtered_records
-                if int(r.get(field, 0)) <= int(value)
+                if _range_value(field, r.get(field, 0)) <= _range_value(field, value)
             ]
     
     return filtered_records
@@ -81,7 +99,19 @@ def apply_sorting(records: List[Dict[str, Any]], sort_by: str, sort_direction: s
         return sorted(records, key=lambda x: str(x.get(sort_by, "")), reverse=reverse)
 
 
-def execute_operation(records: List[Dict[str, Any]], operation: str) -> Any:
+def apply_top_k(records: List[Dict[str, Any]], sort_by: str, sort_direction: str, k: int) -> List[Dict[str, Any]]:
+    # First k rows of apply_sorting, selected with a bounded heap instead of a full sort.
+    # heapq.nsmallest/nlargest are documented to match sorted(...)[:k], ties included.
+    select = heapq.nlargest if sort_direction.lower() == "descending" else heapq.nsmallest
+    try:
+        return select(k, records, key=lambda x: int(x.get(sort_by, 0)))
+    except (ValueError, TypeError):
+        return select(k, records, key=lambda x: str(x.get(sort_by, "")))
+
+
+def execute_operation(
+    records: List[Dict[str, Any]], operation: str, window_minutes: Optional[int] = None
+) -> Any:
     # Execute the specified operation on filtered records.
     if not operation or operation == "list_vehicles":
         # Return the filtered records
@@ -105,37 +135,65 @@ def execute_operation(records: List[Dict[str, Any]], operation: str) -> Any:
             return {"max_speed": None}
         max_speed = max(int(r.get("Speed", 0)) for r in records)
         return {"max_speed": max_speed}
+
+    elif operation == "min_speed":
+        # Find minimum speed
+        if not records:
+            return {"min_speed": None}
+        return {"min_speed": min(int(r.get("Speed", 0)) for r in records)}
+
+    elif operation == "speed_percentiles":
+        # Nearest-rank percentiles from one sort of the speeds
+        if not records:
+            return empty_percentiles()
+        speeds = sorted(int(r.get("Speed", 0)) for r in records)
+        positions = percentile_positions(len(speeds))
+        return {percentile_key(p): speeds[i] for p, i in zip(SPEED_PERCENTILES, positions)}
+
+    elif operation == "count_by_window":
+        # Count vehicles per fixed window, in time order
+        minutes = window_minutes or DEFAULT_WINDOW_MINUTES
+        counts = Counter(window_start(r["CollectionTime"], minutes) for r in records)
+        return [{"window_start": start, "count": counts[start]} for start in sorted(counts)]
     
     else:
         # Default: return records
         return records
 
 
+def execute_grouped_operation(
+    records: List[Dict[str, Any]], operation: str, group_by: List[str], window_minutes: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    # Hash aggregation: one pass buckets the rows by group, then each bucket
+    # is aggregated. Rows come back in group order, each naming its group.
+    groups: Dict[tuple, List[Dict[str, Any]]] = {}
+    for r in records:
+        groups.setdefault(tuple(r[field] for field in group_by), []).append(r)
+
+    results = []
+    for key in sorted(groups):
+        labels = dict(zip(group_by, key))
+        result = execute_operation(groups[key], operation, window_minutes)
+        if isinstance(result, list):
+            results.extend({**labels, **row} for row in result)
+        else:
+            results.append({**labels, **result})
+    return results
+
+
 def process_filter(filter_object: FilterObject) -> Any:
     """
     Main function to process a filter object.
     
     Steps:
-    1. Load traffic data
-    2. Apply filter conditions
+    1. Load traffic data as typed columns (cached until the CSV changes)
+    2. Resolve conditions through the secondary indexes, then boolean masks;
+       large full scans are split across a process pool (parallel_scan)
     3. Apply sorting if specified
     4. Execute operation and return response
+
+    The dict-based helpers above remain as the reference implementation
+    the columnar engine is tested against.
     """
-    # Load traffic data
-    records = load_traffic_data()
-    
-    # Apply conditions
-    filtered_records = apply_filter_conditions(records, filter_object.conditions)
-    
-    # Apply sorting if specified
-    if filter_object.sort_by:
-        filtered_records = apply_sorting(
-            filtered_records,
-            filter_object.sort_by,
-            filter_object.sort_direction or "ascending"
-        )
-    
-    # Execute operation and return response
-    result = execute_operation(filtered_records, filter_object.operation)
-    
-    return result
\ No newline at end of file
+    columns = get_traffic_columns()
+    return process_filter_parallel(columns, filter_object)
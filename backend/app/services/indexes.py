@@ -0,0 +1,274 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..models.aiModel import FilterCondition
+from .columnar_engine import (
+    RANGE_OPERATORS,
+    TrafficColumns,
+    apply_filter_mask,
+    condition_mask,
+    equality_key,
+    range_key,
+)
+
+# Above this fraction of the table an index lookup plus gather costs more
+# than a straight vectorized scan, so the planner falls back to scanning.
+INDEX_SCAN_RATIO = 0.3
+
+EMPTY_ROWS = np.empty(0, dtype=np.int64)
+
+
+def _postings(values: np.ndarray, offset: int = 0) -> Dict[Any, np.ndarray]:
+    order = np.argsort(values, kind="stable")
+    keys, starts, counts = np.unique(values[order], return_index=True, return_counts=True)
+    # A stable argsort keeps every posting list in ascending row order.
+    return {
+        key: order[start:start + count] + offset
+        for key, start, count in zip(keys.tolist(), starts.tolist(), counts.tolist())
+    }
+
+
+class HashIndex:
+    """Posting lists of row ids per distinct value (used for Direction and Lane)."""
+
+    def __init__(self, values: np.ndarray):
+        self._postings: Dict[Any, np.ndarray] = _postings(values)
+
+    def extended(self, new_values: np.ndarray, offset: int) -> "HashIndex":
+        # Appended rows have the highest ids, so they go at the end of each list.
+        index = HashIndex.__new__(HashIndex)
+        index._postings = dict(self._postings)
+        for key, rows in _postings(new_values, offset).items():
+            existing = self._postings.get(key)
+            index._postings[key] = rows if existing is None else np.concatenate([existing, rows])
+        return index
+
+    def count(self, key: Any) -> int:
+        rows = self._postings.get(key)
+        return 0 if rows is None else len(rows)
+
+    def lookup(self, key: Any) -> np.ndarray:
+        return self._postings.get(key, EMPTY_ROWS)
+
+
+class SortedIndex:
+    """Row ids ordered by value so equality and range lookups are two binary searches."""
+
+    def __init__(self, values: np.ndarray):
+        self.order = np.argsort(values, kind="stable")
+        self.sorted_values = values[self.order]
+
+    def extended(self, new_values: np.ndarray, offset: int) -> "SortedIndex":
+        """Merge appended rows in without re-sorting the existing ones.
+
+        Only the new rows are sorted. Each goes after every existing equal
+        value, so the result equals a stable sort of all rows.
+        """
+        new_order = np.argsort(new_values, kind="stable")
+        new_sorted = new_values[new_order]
+        positions = np.searchsorted(self.sorted_values, new_sorted, side="right")
+        index = SortedIndex.__new__(SortedIndex)
+        index.sorted_values = np.insert(self.sorted_values, positions, new_sorted)
+        index.order = np.insert(self.order, positions, new_order + offset)
+        return index
+
+    def bounds(self, operator: str, key: Any) -> Tuple[int, int]:
+        values = self.sorted_values
+        if operator == "==":
+            return int(np.searchsorted(values, key, "left")), int(np.searchsorted(values, key, "right"))
+        if operator == ">":
+            return int(np.searchsorted(values, key, "right")), len(values)
+        if operator == ">=":
+            return int(np.searchsorted(values, key, "left")), len(values)
+        if operator == "<":
+            return 0, int(np.searchsorted(values, key, "left"))
+        return 0, int(np.searchsorted(values, key, "right"))
+
+    def lookup(self, operator: str, key: Any) -> np.ndarray:
+        start, stop = self.bounds(operator, key)
+        # Back to row order so results match a full scan.
+        return np.sort(self.order[start:stop])
+
+
+class ChunkIndexes:
+    """Hash and sorted indexes over the rows of one chunk, by row id within it.
+
+    Direction and Lane get hash indexes; Speed and CollectionTime get sorted
+    indexes.
+    """
+
+    def __init__(self, columns: TrafficColumns):
+        self.rows = len(columns)
+        self.hash_indexes = {
+            "Direction": HashIndex(columns.direction_codes),
+            "Lane": HashIndex(columns.lane),
+        }
+        self.sorted_indexes = {
+            "Speed": SortedIndex(columns.speed),
+            "CollectionTime": SortedIndex(columns.collection_time),
+        }
+
+    def extended(self, appended: TrafficColumns) -> "ChunkIndexes":
+        # Indexes for this chunk grown by the ``appended`` rows.
+        offset = self.rows
+        indexes = ChunkIndexes.__new__(ChunkIndexes)
+        indexes.rows = offset + len(appended)
+        indexes.hash_indexes = {
+            "Direction": self.hash_indexes["Direction"].extended(appended.direction_codes, offset),
+            "Lane": self.hash_indexes["Lane"].extended(appended.lane, offset),
+        }
+        indexes.sorted_indexes = {
+            "Speed": self.sorted_indexes["Speed"].extended(appended.speed, offset),
+            "CollectionTime": self.sorted_indexes["CollectionTime"].extended(appended.collection_time, offset),
+        }
+        return indexes
+
+    def count(self, field: str, operator: str, key: Any) -> int:
+        if operator == "==" and field in self.hash_indexes:
+            return self.hash_indexes[field].count(key)
+        start, stop = self.sorted_indexes[field].bounds(operator, key)
+        return stop - start
+
+    def lookup(self, field: str, operator: str, key: Any) -> np.ndarray:
+        if operator == "==" and field in self.hash_indexes:
+            return self.hash_indexes[field].lookup(key)
+        return self.sorted_indexes[field].lookup(operator, key)
+
+
+class TrafficIndexes:
+    """Secondary indexes over one TrafficColumns snapshot plus a small planner.
+
+    Every chunk of the snapshot has its own ChunkIndexes; lookups run on each
+    and are concatenated, which keeps row ids ascending. ``select_rows``
+    resolves the most selective indexable condition first and evaluates the
+    remaining ones only on the surviving rows.
+    """
+
+    HASH_FIELDS = ("Direction", "Lane")
+    SORTED_FIELDS = ("Speed", "CollectionTime")
+
+    def __init__(self, columns: TrafficColumns, parts: Optional[Dict[Tuple[int, int], ChunkIndexes]] = None):
+        self.columns = columns
+        # ChunkIndexes per (start, stop) rows of each chunk.
+        parts = parts or {}
+        self.parts: Dict[Tuple[int, int], ChunkIndexes] = {
+            bounds: parts.get(bounds) or ChunkIndexes(columns.chunk(*bounds)) for bounds in columns.chunk_bounds()
+        }
+
+    def extended(self, columns: TrafficColumns) -> "TrafficIndexes":
+        """Indexes for ``columns``, which is this snapshot's columns plus appended rows.
+
+        Chunks both snapshots share keep their indexes. The open chunk's
+        indexes are grown by the appended rows rather than rebuilt; only
+        chunks that were sealed and merged are indexed from scratch.
+        """
+        parts = dict(self.parts)
+        last_start, last_stop = max(self.parts) if self.parts else (0, 0)
+        for start, stop in columns.chunk_bounds():
+            if start == last_start and stop > last_stop and (start, stop) not in parts:
+                parts[(start, stop)] = self.parts[(last_start, last_stop)].extended(columns.chunk(last_stop, stop))
+        return TrafficIndexes(columns, parts)
+
+    def _key(self, condition: FilterCondition) -> Any:
+        # (operator, stored key) for an index lookup, or None if no index applies.
+        # A key of None means no row can match.
+        field, operator, value = condition.field, condition.operator, condition.value
+        if operator == "==" and field in self.HASH_FIELDS + self.SORTED_FIELDS:
+            return operator, equality_key(self.columns, field, value)
+        if operator in RANGE_OPERATORS and field in self.SORTED_FIELDS:
+            return operator, range_key(field, value)
+        return None
+
+    def estimate(self, condition: FilterCondition) -> Optional[int]:
+        # Exact number of rows an index lookup would return, or None if no index applies.
+        resolved = self._key(condition)
+        if resolved is None:
+            return None
+        operator, key = resolved
+        if key is None:
+            return 0
+        return sum(part.count(condition.field, operator, key) for part in self.parts.values())
+
+    def lookup(self, condition: FilterCondition) -> np.ndarray:
+        operator, key = self._key(condition)
+        if key is None:
+            return EMPTY_ROWS
+        found = [part.lookup(condition.field, operator, key) + start for (start, _), part in self.parts.items()]
+        return found[0] if len(found) == 1 else np.concatenate(found)
+
+    def choose_index(self, conditions: List[FilterCondition]) -> Optional[Tuple[int, int]]:
+        # ``(estimate, position)`` of the condition to resolve through an index, or None to scan.
+        best: Optional[Tuple[int, int]] = None
+        for position, condition in enumerate(conditions):
+            estimate = self.estimate(condition)
+            if estimate is not None and (best is None or estimate < best[0]):
+                best = (estimate, position)
+        if best is None or best[0] > len(self.columns) * INDEX_SCAN_RATIO:
+            return None
+        return best
+
+    def index_kind(self, field: str) -> str:
+        return "hash" if field in self.HASH_FIELDS else "sorted"
+
+    def select_rows(self, conditions: List[FilterCondition]) -> np.ndarray:
+        """Return the ascending row ids matching every condition."""
+        best = self.choose_index(conditions)
+        if best is None:
+            return apply_filter_mask(self.columns, conditions)
+
+        rows = self.lookup(conditions[best[1]])
+        for position, condition in enumerate(conditions):
+            if position != best[1]:
+                rows = rows[condition_mask(self.columns, condition, rows)]
+        return rows
+
+
+def _describe(condition: FilterCondition) -> str:
+    return f"{condition.field} {condition.operator} {condition.value}"
+
+
+def explain_selection(columns: TrafficColumns, conditions: List[FilterCondition]) -> Dict[str, Any]:
+    """How the Python engine resolves ``conditions`` on ``columns``, step by step.
+
+    Mirrors TrafficIndexes.select_rows: either one index lookup followed by
+    filtering the surviving rows, or a full scan ANDing one mask per
+    condition. Each step reports the rows left after it.
+    """
+    indexes = columns.indexes
+    best = indexes.choose_index(conditions) if indexes is not None else None
+    steps = []
+    if best is None:
+        mask = np.ones(len(columns), dtype=bool)
+        for condition in conditions:
+            mask &= condition_mask(columns, condition)
+            steps.append({"condition": _describe(condition), "access": "scan", "rows_after": int(mask.sum())})
+        matched = int(mask.sum())
+        return {"engine": "python", "index": None, "rows_scanned": len(columns), "rows_matched": matched, "steps": steps}
+
+    estimate, position = best
+    indexed = conditions[position]
+    index = {"field": indexed.field, "kind": indexes.index_kind(indexed.field), "condition": _describe(indexed)}
+    rows = indexes.lookup(indexed)
+    steps.append({"condition": _describe(indexed), "access": f"{index['kind']} index", "rows_after": len(rows)})
+    for other, condition in enumerate(conditions):
+        if other != position:
+            rows = rows[condition_mask(columns, condition, rows)]
+            steps.append({"condition": _describe(condition), "access": "filter", "rows_after": len(rows)})
+    return {"engine": "python", "index": index, "rows_scanned": estimate, "rows_matched": len(rows), "steps": steps}
+
+
+def build_indexes(columns: TrafficColumns) -> TrafficIndexes:
+    # Attach indexes to the snapshot so every query on it can reuse them.
+    columns.indexes = TrafficIndexes(columns)
+    return columns.indexes
+
+
+def extend_snapshot(columns: TrafficColumns, rows, row_ids=None) -> TrafficColumns:
+    """Indexed snapshot of ``columns`` plus ``rows``, updating the indexes incrementally."""
+    extended = columns.extended(rows, row_ids)
+    if columns.indexes is not None:
+        extended.indexes = columns.indexes.extended(extended)
+    else:
+        build_indexes(extended)
+    return extended
@@ -0,0 +1,88 @@
+import asyncio
+import threading
+from typing import List, Optional, Sequence, Tuple
+
+from .traffic_store import TrafficStore, get_store
+
+# A commit waits at most this long for more rows from concurrent requests,
+# or until this many rows are pending.
+INGEST_MAX_DELAY_SECONDS = 0.005
+INGEST_MAX_BATCH_ROWS = 5_000
+
+Row = Tuple[str, str, int, int]
+
+
+class IngestBatcher:
+    """Group commit for ingest requests.
+
+    Rows from requests arriving within a few milliseconds of each other are
+    written by one store transaction instead of one each, which is what keeps
+    a stream of single-row posts cheap. Every caller gets the row count of
+    the commit that included its rows.
+    """
+
+    def __init__(
+        self,
+        store: TrafficStore,
+        max_delay_seconds: float = INGEST_MAX_DELAY_SECONDS,
+        max_batch_rows: int = INGEST_MAX_BATCH_ROWS,
+    ):
+        self.store = store
+        self.max_delay_seconds = max_delay_seconds
+        self.max_batch_rows = max_batch_rows
+        self._pending: List[Tuple[Sequence[Row], asyncio.Future]] = []
+        self._pending_rows = 0
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self.commits = 0
+        self.rows = 0
+
+    async def submit(self, rows: Sequence[Row]) -> int:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((rows, future))
+        self._pending_rows += len(rows)
+        if self._pending_rows >= self.max_batch_rows:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_delay_seconds, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        pending, self._pending = self._pending, []
+        self._pending_rows = 0
+        if not pending:
+            return
+
+        rows = [row for batch, _ in pending for row in batch]
+        task = asyncio.ensure_future(asyncio.to_thread(self.store.append_rows, rows))
+
+        def finish(done: asyncio.Future) -> None:
+            error = done.exception()
+            if error is None:
+                self.commits += 1
+                self.rows += len(rows)
+            for _, future in pending:
+                if future.done():
+                    continue  # the request went away; its rows are committed anyway
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(done.result())
+
+        task.add_done_callback(finish)
+
+
+_batcher: Optional[IngestBatcher] = None
+_batcher_lock = threading.Lock()
+
+
+def get_ingest_batcher() -> IngestBatcher:
+    global _batcher
+    if _batcher is None:
+        with _batcher_lock:
+            if _batcher is None:
+                _batcher = IngestBatcher(get_store())
+    return _batcher
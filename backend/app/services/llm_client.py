@@ -0,0 +1,329 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from .question_parser import parse_question_json
+
+DEFAULT_TIMEOUT_SECONDS = 10.0
+DEFAULT_BATCH_WINDOW_MS = 5.0
+DEFAULT_MAX_BATCH = 16
+DEFAULT_MAX_CONNECTIONS = 4
+MAX_RESPONSE_BYTES = 16 * 1024 * 1024
+
+
+class LLMError(Exception):
+    """The LLM service failed or answered with something unusable."""
+
+
+class LLMTimeout(LLMError):
+    """The LLM service did not answer within the client's timeout."""
+
+
+class LLMClient(ABC):
+    """Turns a question into the raw filter JSON text an LLM would emit.
+
+    ``complete`` raises ValueError for questions the model cannot map to a
+    filter, LLMTimeout when the service is too slow and LLMError for any
+    other failure. The JSON itself is checked later by validate_json.
+    """
+
+    @abstractmethod
+    async def complete(self, question: str) -> str:
+        """The filter JSON text for ``question``."""
+
+    async def close(self) -> None:
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {"client": type(self).__name__}
+
+
+class MockLLMClient(LLMClient):
+    """The keyword parser standing in for a model; answers in-process."""
+
+    async def complete(self, question: str) -> str:
+        return parse_question_json(question)
+
+
+class _LoopState:
+    # Connections and the pending batch of one event loop.
+
+    def __init__(self, max_connections: int):
+        self.idle: Deque[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = deque()
+        self.slots = asyncio.Semaphore(max_connections)
+        self.pending: List[Tuple[str, "asyncio.Future[str]"]] = []
+        self.flush_handle: Optional[asyncio.TimerHandle] = None
+        self.sending: set = set()
+
+
+class HttpLLMClient(LLMClient):
+    """Async client for an LLM service speaking a small batch protocol over HTTP/1.1.
+
+    Questions arriving within ``batch_window_ms`` of each other (up to
+    ``max_batch``) go out as one request::
+
+        POST <url>  {"questions": ["...", ...]}
+        200         {"results": [{"output": "<filter JSON text>"} | {"error": "..."}, ...]}
+
+    Results come back in question order; an ``error`` item means the model
+    rejected that question. At most ``max_connections`` keep-alive
+    connections are opened and reused across batches. Every batch must be
+    answered within ``timeout_seconds``.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        timeout_seconds: float = DEFAULT_TIMEOUT_SECONDS,
+        batch_window_ms: float = DEFAULT_BATCH_WINDOW_MS,
+        max_batch: int = DEFAULT_MAX_BATCH,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+    ):
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"LLM URL must be an http(s) URL, got '{url}'.")
+        self.url = url
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == "https" else 80)
+        self.ssl = parts.scheme == "https"
+        self.path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        self.timeout_seconds = timeout_seconds
+        self.batch_window = batch_window_ms / 1000
+        self.max_batch = max_batch
+        self.max_connections = max_connections
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._state: Optional[_LoopState] = None
+        self._lock = threading.Lock()
+        self.questions = 0
+        self.batches = 0
+        self.connections_opened = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.batch_seconds = 0.0
+
+    def _loop_state(self) -> _LoopState:
+        # Streams and futures belong to one loop; a new loop starts with fresh state.
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop or self._state is None:
+            self._loop, self._state = loop, _LoopState(self.max_connections)
+        return self._state
+
+    async def complete(self, question: str) -> str:
+        state = self._loop_state()
+        future: "asyncio.Future[str]" = asyncio.get_running_loop().create_future()
+        state.pending.append((question, future))
+        if len(state.pending) >= self.max_batch:
+            self._flush(state)
+        elif state.flush_handle is None:
+            state.flush_handle = asyncio.get_running_loop().call_later(self.batch_window, self._flush, state)
+        return await future
+
+    def _flush(self, state: _LoopState) -> None:
+        if state.flush_handle is not None:
+            state.flush_handle.cancel()
+            state.flush_handle = None
+        batch, state.pending = state.pending, []
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._send_batch(state, batch))
+            state.sending.add(task)
+            task.add_done_callback(state.sending.discard)
+
+    async def _send_batch(self, state: _LoopState, batch: List[Tuple[str, "asyncio.Future[str]"]]) -> None:
+        started = time.perf_counter()
+        body = json.dumps({"questions": [question for question, _ in batch]}).encode()
+        try:
+            payload = await asyncio.wait_for(self._post(state, body), self.timeout_seconds)
+            results = json.loads(payload)["results"]
+            if not isinstance(results, list) or len(results) != len(batch):
+                raise LLMError("LLM service returned the wrong number of results.")
+            outcomes: List[Any] = []
+            for result in results:
+                if isinstance(result, dict) and isinstance(result.get("output"), str):
+                    outcomes.append(result["output"])
+                elif isinstance(result, dict) and "error" in result:
+                    outcomes.append(ValueError(str(result["error"])))
+                else:
+                    outcomes.append(LLMError("LLM service returned a malformed result."))
+        except asyncio.TimeoutError:
+            with self._lock:
+                self.timeouts += 1
+            message = f"LLM service did not answer within {self.timeout_seconds:g}s."
+            outcomes = [LLMTimeout(message) for _ in batch]
+        except (OSError, ValueError, KeyError, TypeError, LLMError) as exc:
+            with self._lock:
+                self.errors += 1
+            message = str(exc) if isinstance(exc, LLMError) else f"LLM service request failed: {exc}"
+            outcomes = [LLMError(message) for _ in batch]
+
+        with self._lock:
+            self.questions += len(batch)
+            self.batches += 1
+            self.batch_seconds += time.perf_counter() - started
+        for (_, future), outcome in zip(batch, outcomes):
+            if future.done():  # The caller gave up waiting.
+                continue
+            if isinstance(outcome, Exception):
+                future.set_exception(outcome)
+            else:
+                future.set_result(outcome)
+
+    async def _post(self, state: _LoopState, body: bytes) -> bytes:
+        request = (
+            f"POST {self.path} HTTP/1.1\r\n"
+            f"Host: {self.host}:{self.port}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Connection: keep-alive\r\n\r\n"
+        ).encode() + body
+        async with state.slots:
+            # A reused connection may have been closed by the server while idle; retry once on a new one.
+            for attempt in range(2):
+                reused = bool(state.idle)
+                connection = state.idle.popleft() if reused else await self._connect()
+                try:
+                    status, keep_alive, payload = await self._exchange(connection, request)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    connection[1].close()
+                    if reused and attempt == 0:
+                        continue
+                    raise
+                except BaseException:
+                    connection[1].close()
+                    raise
+                if keep_alive:
+                    state.idle.append(connection)
+                else:
+                    connection[1].close()
+                if status != 200:
+                    raise LLMError(f"LLM service answered HTTP {status}.")
+                return payload
+        raise LLMError("LLM service closed the connection.")  # pragma: no cover
+
+    async def _connect(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        connection = await asyncio.open_connection(self.host, self.port, ssl=self.ssl or None)
+        with self._lock:
+            self.connections_opened += 1
+        return connection
+
+    async def _exchange(self, connection, request: bytes) -> Tuple[int, bool, bytes]:
+        reader, writer = connection
+        writer.write(request)
+        await writer.drain()
+        status_line = await reader.readuntil(b"\r\n")
+        parts = status_line.decode("latin-1").split()
+        if len(parts) < 2 or not parts[1].isdigit():
+            raise LLMError(f"Malformed HTTP status line {status_line!r}.")
+        headers = {}
+        while True:
+            line = await reader.readuntil(b"\r\n")
+            if line == b"\r\n":
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        keep_alive = headers.get("connection", "").lower() != "close"
+        if "chunked" in headers.get("transfer-encoding", "").lower():
+            payload = await self._read_chunked(reader)
+        elif "content-length" in headers:
+            length = int(headers["content-length"])
+            if length > MAX_RESPONSE_BYTES:
+                raise LLMError("LLM service response is too large.")
+            payload = await reader.readexactly(length)
+        else:
+            # Neither framing: the body runs until the server closes the connection.
+            payload = await reader.read(MAX_RESPONSE_BYTES + 1)
+            if len(payload) > MAX_RESPONSE_BYTES:
+                raise LLMError("LLM service response is too large.")
+            keep_alive = False
+        return int(parts[1]), keep_alive, payload
+
+    @staticmethod
+    async def _read_chunked(reader: asyncio.StreamReader) -> bytes:
+        # Transfer-Encoding: chunked, as proxies and streaming servers send it.
+        chunks: List[bytes] = []
+        received = 0
+        while True:
+            size_line = await reader.readuntil(b"\r\n")
+            try:
+                size = int(size_line.split(b";", 1)[0].strip(), 16)
+            except ValueError:
+                raise LLMError(f"Malformed chunk size line {size_line!r}.") from None
+            if size == 0:
+                break
+            received += size
+            if received > MAX_RESPONSE_BYTES:
+                raise LLMError("LLM service response is too large.")
+            chunks.append(await reader.readexactly(size))
+            if await reader.readexactly(2) != b"\r\n":
+                raise LLMError("Malformed chunk terminator.")
+        # Optional trailer fields, then the empty line ending the message.
+        while await reader.readuntil(b"\r\n") != b"\r\n":
+            pass
+        return b"".join(chunks)
+
+    async def close(self) -> None:
+        state, self._state = self._state, None
+        if state is None:
+            return
+        if state.flush_handle is not None:
+            state.flush_handle.cancel()
+        for _, future in state.pending:
+            if not future.done():
+                future.set_exception(LLMError("LLM client closed."))
+        while state.idle:
+            _, writer = state.idle.popleft()
+            writer.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "client": type(self).__name__,
+                "url": self.url,
+                "questions": self.questions,
+                "batches": self.batches,
+                "mean_batch_size": round(self.questions / self.batches, 2) if self.batches else None,
+                "mean_batch_ms": round(self.batch_seconds / self.batches * 1000, 3) if self.batches else None,
+                "connections_opened": self.connections_opened,
+                "errors": self.errors,
+                "timeouts": self.timeouts,
+            }
+
+
+_llm_client: Optional[LLMClient] = None
+_llm_client_lock = threading.Lock()
+
+
+def get_llm_client() -> LLMClient:
+    """Process-wide client: HttpLLMClient when ROSA_LLM_URL is set, else the mock parser.
+
+    ROSA_LLM_TIMEOUT_SECONDS, ROSA_LLM_BATCH_MS, ROSA_LLM_BATCH_SIZE and
+    ROSA_LLM_CONNECTIONS tune the HTTP client.
+    """
+    global _llm_client
+    if _llm_client is None:
+        with _llm_client_lock:
+            if _llm_client is None:
+                url = os.environ.get("ROSA_LLM_URL")
+                if url:
+                    _llm_client = HttpLLMClient(
+                        url,
+                        timeout_seconds=float(os.environ.get("ROSA_LLM_TIMEOUT_SECONDS", DEFAULT_TIMEOUT_SECONDS)),
+                        batch_window_ms=float(os.environ.get("ROSA_LLM_BATCH_MS", DEFAULT_BATCH_WINDOW_MS)),
+                        max_batch=int(os.environ.get("ROSA_LLM_BATCH_SIZE", DEFAULT_MAX_BATCH)),
+                        max_connections=int(os.environ.get("ROSA_LLM_CONNECTIONS", DEFAULT_MAX_CONNECTIONS)),
+                    )
+                else:
+                    _llm_client = MockLLMClient()
+    return _llm_client
+
+
+async def close_llm_client() -> None:
+    global _llm_client
+    client, _llm_client = _llm_client, None
+    if client is not None:
+        await client.close()
@@ -0,0 +1,185 @@
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ROW_BUCKETS = (0, 1, 10, 100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _label_text(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Histogram:
+    """Prometheus-style histogram with fixed buckets, one series per label set."""
+
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float], label_names: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self.label_names = tuple(label_names)
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        with self._lock:
+            # Per-bucket counts (not cumulative), then sum and count.
+            series = self._series.setdefault(labels, [0] * (len(self.buckets) + 2))
+            for position, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[position] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def series(self, *labels: str) -> Optional[Dict[str, float]]:
+        # Count and sum of one label set, or None if it was never observed.
+        with self._lock:
+            series = self._series.get(labels)
+            return None if series is None else {"count": series[-1], "sum": series[-2]}
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = sorted((labels, list(series)) for labels, series in self._series.items())
+        for labels, series in snapshot:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), series[:-2] + [series[-1] - sum(series[:-2])]):
+                cumulative += count
+                le = _label_text(self.label_names, labels, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            plain = _label_text(self.label_names, labels)
+            lines.append(f"{self.name}_sum{plain} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{plain} {series[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    """The assistant's histograms, rendered together in the Prometheus text format."""
+
+    def __init__(self):
+        self.stage_seconds = Histogram(
+            "rosa_stage_duration_seconds", "Time spent in each assistant pipeline stage.", LATENCY_BUCKETS, ("stage",)
+        )
+        self.request_seconds = Histogram(
+            "rosa_request_duration_seconds", "Time to answer an assistant request.", LATENCY_BUCKETS, ("endpoint",)
+        )
+        self.rows_scanned = Histogram(
+            "rosa_rows_scanned",
+            "Rows in the day partitions a query read; rollup and cached answers read none.",
+            ROW_BUCKETS,
+            ("endpoint",),
+        )
+        self.rows_returned = Histogram(
+            "rosa_rows_returned", "Rows in an answer; aggregates count as one.", ROW_BUCKETS, ("endpoint",)
+        )
+
+    def record(self, timings: "RequestTimings") -> None:
+        endpoint = timings.endpoint or "unknown"
+        for stage, stage_seconds in timings.stages:
+            self.stage_seconds.observe(stage_seconds, stage)
+        self.request_seconds.observe(timings.elapsed(), endpoint)
+        if timings.rows_scanned is not None:
+            self.rows_scanned.observe(timings.rows_scanned, endpoint)
+        if timings.rows_returned is not None:
+            self.rows_returned.observe(timings.rows_returned, endpoint)
+
+    def render(self) -> str:
+        histograms = (self.stage_seconds, self.request_seconds, self.rows_scanned, self.rows_returned)
+        return "\n".join(line for histogram in histograms for line in histogram.render()) + "\n"
+
+
+class RequestTimings:
+    """Stage durations and row counts of one request, in the order they happened.
+
+    Plain data, so it survives the trip back from a process pool worker.
+    """
+
+    def __init__(self, endpoint: Optional[str] = None):
+        self.endpoint = endpoint
+        self.started = time.perf_counter()
+        self.stages: List[Tuple[str, float]] = []
+        self.rows_scanned: Optional[int] = None
+        self.rows_returned: Optional[int] = None
+        # The FilterObject being answered, for the slow-query log.
+        self.filter_object: Any = None
+        # What answered it ("sql", "python", "cache" or "sample"), for the same log.
+        self.engine: Optional[str] = None
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name: str, seconds: float) -> None:
+        self.stages.append((name, seconds))
+
+    def merge(self, other: "RequestTimings") -> None:
+        self.stages.extend(other.stages)
+        if other.rows_scanned is not None:
+            self.rows_scanned = other.rows_scanned
+        if other.rows_returned is not None:
+            self.rows_returned = other.rows_returned
+        if other.engine is not None:
+            self.engine = other.engine
+
+    def total(self) -> float:
+        return sum(seconds for _, seconds in self.stages)
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def server_timing(self) -> str:
+        # Server-Timing header value; durations are in milliseconds.
+        return ", ".join(f"{name};dur={seconds * 1000:.3f}" for name, seconds in self.stages)
+
+
+def server_timing_enabled() -> bool:
+    # The Server-Timing header exposes internals, so it is opt-in through ROSA_SERVER_TIMING.
+    return os.environ.get("ROSA_SERVER_TIMING", "").lower() in ("1", "true", "yes", "on")
+
+
+# Timings of the request being handled; each request runs in its own context.
+_request_timings: ContextVar[Optional[RequestTimings]] = ContextVar("rosa_request_timings", default=None)
+
+
+def begin_request(endpoint: str) -> RequestTimings:
+    """Start timing a request; the response picks the timings up via current_request_timings."""
+    timings = RequestTimings(endpoint)
+    _request_timings.set(timings)
+    return timings
+
+
+def current_request_timings() -> Optional[RequestTimings]:
+    return _request_timings.get()
+
+
+_metrics: Optional[MetricsRegistry] = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics() -> MetricsRegistry:
+    """Return the process-wide registry."""
+    global _metrics
+    if _metrics is None:
+        with _metrics_lock:
+            if _metrics is None:
+                _metrics = MetricsRegistry()
+    return _metrics
@@ -0,0 +1,37 @@
+import math
+from typing import List
+
+from ..models.aiModel import FilterObject
+
+# Speed percentiles reported by speed_percentiles; p85 is the usual design speed.
+SPEED_PERCENTILES = (50, 85, 95)
+DEFAULT_WINDOW_MINUTES = 15
+
+
+def percentile_key(percentile: int) -> str:
+    return f"p{percentile}"
+
+
+def percentile_positions(count: int) -> List[int]:
+    """0-based positions of SPEED_PERCENTILES in ``count`` sorted speeds.
+
+    Nearest-rank definition: the p-th percentile is the smallest value with at
+    least p% of the values at or below it, so every engine returns an actual
+    observed speed and the results match exactly.
+    """
+    return [max(math.ceil(p * count / 100), 1) - 1 for p in SPEED_PERCENTILES]
+
+
+def window_minutes(filter_object: FilterObject) -> int:
+    return filter_object.window_minutes or DEFAULT_WINDOW_MINUTES
+
+
+def window_start(collection_time: str, minutes: int) -> str:
+    # Windows divide the day evenly, so they start at midnight plus a multiple of ``minutes``.
+    minute_of_day = int(collection_time[11:13]) * 60 + int(collection_time[14:16])
+    start = minute_of_day - minute_of_day % minutes
+    return f"{collection_time[:10]} {start // 60:02d}:{start % 60:02d}:00"
+
+
+def empty_percentiles() -> dict:
+    return {percentile_key(p): None for p in SPEED_PERCENTILES}
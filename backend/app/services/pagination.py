@@ -0,0 +1,84 @@
+import base64
+import json
+from typing import Any, Optional, Tuple
+
+from ..models.aiModel import FilterObject
+from .serialization import RowSet, is_rows
+
+# Engines add this key to paged list rows so the next-page cursor can be built;
+# split_page strips it before rows leave the API.
+ROWID_KEY = "_rowid"
+
+AGGREGATE_OPERATIONS = {
+    "count_vehicles",
+    "average_speed",
+    "max_speed",
+    "min_speed",
+    "speed_percentiles",
+    "count_by_window",
+}
+
+
+def is_paged(filter_object: FilterObject) -> bool:
+    # Only list queries are paginated; aggregates return one object or one row per window.
+    if filter_object.operation in AGGREGATE_OPERATIONS:
+        return False
+    return (
+        filter_object.limit is not None
+        or bool(filter_object.offset)
+        or filter_object.cursor is not None
+    )
+
+
+def encode_cursor(sort_value: Any, rowid: int) -> str:
+    payload = [rowid] if sort_value is None else [sort_value, rowid]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_by: Optional[str]) -> Tuple[Any, int]:
+    """Return ``(sort_value, rowid)`` from a cursor; sort_value is None when unsorted.
+
+    Raises ValueError for anything that is not a cursor issued for this sort.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError) as exc:
+        raise ValueError("Invalid pagination cursor.") from exc
+
+    expected_length = 2 if sort_by else 1
+    if not isinstance(payload, list) or len(payload) != expected_length:
+        raise ValueError("Pagination cursor does not match the requested sort order.")
+    rowid = payload[-1]
+    if not isinstance(rowid, int) or isinstance(rowid, bool):
+        raise ValueError("Invalid pagination cursor.")
+    sort_value = payload[0] if sort_by else None
+    if sort_by and not isinstance(sort_value, (int, str)):
+        raise ValueError("Invalid pagination cursor.")
+    return sort_value, rowid
+
+
+def split_page(filter_object: FilterObject, result: Any) -> Tuple[Any, Optional[str]]:
+    """Strip row ids from a paged result and build the next-page cursor.
+
+    A cursor is only returned when the page is full, i.e. more rows may follow.
+    """
+    if not is_paged(filter_object) or not is_rows(result):
+        return result, None
+
+    if isinstance(result, RowSet):
+        rows: Any = result.without(ROWID_KEY)
+    else:
+        rows = []
+        for row in result:
+            row = dict(row)
+            row.pop(ROWID_KEY, None)
+            rows.append(row)
+
+    next_cursor = None
+    if filter_object.limit is not None and result and len(result) == filter_object.limit:
+        last = result[-1]
+        sort_value = last[filter_object.sort_by] if filter_object.sort_by else None
+        next_cursor = encode_cursor(sort_value, last[ROWID_KEY])
+    return rows, next_cursor
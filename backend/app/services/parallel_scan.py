@@ -0,0 +1,409 @@
+import atexit
+import mmap
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..models.aiModel import FilterCondition, FilterObject
+from .chunks import ChunkedColumn
+from .column_store import COLUMN_FILES
+from .columnar_engine import (
+    TIME_FORMAT_UNIT,
+    TrafficColumns,
+    apply_filter_mask,
+    finish_filter,
+    process_filter_columnar,
+    top_k_indices,
+)
+from .operations import DEFAULT_WINDOW_MINUTES, SPEED_PERCENTILES, empty_percentiles, percentile_key, percentile_positions
+from .pagination import AGGREGATE_OPERATIONS, is_paged
+from .query_pool import QueryCancelled, query_cancelled
+
+# Rows per shared segment file; full segments never change once written.
+SEGMENT_ROWS = 1 << 22
+# Rows per task; smaller tasks balance better across workers.
+MIN_TASK_ROWS = 1 << 18
+DEFAULT_MIN_ROWS = 2_000_000
+# Memory maps each worker keeps open between tasks.
+WORKER_MAPS = 256
+SHARED_MEMORY_DIR = "/dev/shm"
+
+
+class SegmentColumn(NamedTuple):
+    """Where one column of a segment lives: a file and the byte offset of its first row."""
+
+    path: str
+    offset: int
+
+
+class Segment(NamedTuple):
+    """Rows ``[start, stop)`` of a snapshot, as memory-mappable column files."""
+
+    start: int
+    stop: int
+    columns: Dict[str, SegmentColumn]
+
+
+# Worker side. Runs in the pool's processes; only segment descriptions,
+# conditions and partial results cross the process boundary.
+_worker_maps: "OrderedDict[Tuple[str, int, int, str], np.ndarray]" = OrderedDict()
+
+
+def _map_column(column: SegmentColumn, rows: int, dtype: str) -> np.ndarray:
+    key = (column.path, column.offset, rows, dtype)
+    array = _worker_maps.get(key)
+    if array is None:
+        array = np.memmap(column.path, dtype=dtype, mode="r", offset=column.offset, shape=(rows,))
+        _worker_maps[key] = array
+        if len(_worker_maps) > WORKER_MAPS:
+            _worker_maps.popitem(last=False)
+    else:
+        _worker_maps.move_to_end(key)
+    return array
+
+
+def _attach(segment: Segment, labels: Sequence[str], lo: int, hi: int) -> TrafficColumns:
+    rows = segment.stop - segment.start
+    arrays = {
+        name: _map_column(segment.columns[name], rows, dtype)[lo:hi]
+        for name, (_, dtype) in COLUMN_FILES.items()
+    }
+    return TrafficColumns(direction_labels=labels, **arrays)
+
+
+def scan_segment(
+    segment: Segment, labels: Sequence[str], lo: int, hi: int, conditions: List[FilterCondition], task: Tuple
+) -> Any:
+    """Evaluate ``conditions`` on rows ``[lo, hi)`` of a segment and return one partial result.
+
+    Row ids in the result are global, so the parent can merge partials
+    from every segment directly.
+    """
+    columns = _attach(segment, labels, lo, hi)
+    rows = apply_filter_mask(columns, conditions)
+    first_row = segment.start + lo
+    kind = task[0]
+    if kind == "count":
+        return len(rows)
+    if kind == "sum":
+        return len(rows), int(columns.speed[rows].sum(dtype=np.int64))
+    if kind in ("max", "min"):
+        if len(rows) == 0:
+            return None
+        speeds = columns.speed[rows]
+        return int(speeds.max() if kind == "max" else speeds.min())
+    if kind == "histogram":
+        # Speeds as (smallest, counts per speed from there): exact percentiles after merging.
+        if len(rows) == 0:
+            return None
+        speeds = columns.speed[rows].astype(np.int64)
+        low = int(speeds.min())
+        return low, np.bincount(speeds - low)
+    if kind == "windows":
+        if len(rows) == 0:
+            return None
+        windows = columns.collection_time[rows].astype(np.int64) // task[1]
+        first = int(windows.min())
+        return first, np.bincount(windows - first)
+    if kind == "top_k":
+        _, sort_by, direction, k = task
+        return top_k_indices(columns, rows, sort_by, direction, k) + first_row
+    if kind == "first":
+        return rows[:task[1]] + first_row
+    return rows + first_row
+
+
+# Parent side.
+
+
+def _merge_counts(partials: List[Optional[Tuple[int, np.ndarray]]]) -> Optional[Tuple[int, np.ndarray]]:
+    # Add up (first value, counts from there) pairs into one such pair.
+    present = [partial for partial in partials if partial is not None]
+    if not present:
+        return None
+    low = min(first for first, _ in present)
+    high = max(first + len(counts) for first, counts in present)
+    merged = np.zeros(high - low, dtype=np.int64)
+    for first, counts in present:
+        merged[first - low:first - low + len(counts)] += counts
+    return low, merged
+
+
+def _percentiles(partials) -> Dict[str, Optional[int]]:
+    merged = _merge_counts(partials)
+    if merged is None:
+        return empty_percentiles()
+    low, counts = merged
+    cumulative = np.cumsum(counts)
+    positions = percentile_positions(int(cumulative[-1]))
+    speeds = np.searchsorted(cumulative, positions, side="right") + low
+    return {percentile_key(p): int(speed) for p, speed in zip(SPEED_PERCENTILES, speeds.tolist())}
+
+
+def _window_counts(partials, width: int) -> List[Dict[str, Any]]:
+    merged = _merge_counts(partials)
+    if merged is None:
+        return []
+    first, counts = merged
+    present = np.flatnonzero(counts)
+    starts = ((present + first) * width).astype(f"datetime64[{TIME_FORMAT_UNIT}]")
+    labels = np.char.replace(np.datetime_as_string(starts, unit=TIME_FORMAT_UNIT), "T", " ").tolist()
+    return [{"window_start": label, "count": int(n)} for label, n in zip(labels, counts[present].tolist())]
+
+
+def _scan_task(filter_object: FilterObject) -> Tuple:
+    # The partial each segment returns for this filter.
+    operation = filter_object.operation
+    if filter_object.group_by and operation in AGGREGATE_OPERATIONS:
+        return ("rows",)
+    if operation == "count_vehicles":
+        return ("count",)
+    if operation == "average_speed":
+        return ("sum",)
+    if operation == "max_speed":
+        return ("max",)
+    if operation == "min_speed":
+        return ("min",)
+    if operation == "speed_percentiles":
+        return ("histogram",)
+    if operation == "count_by_window":
+        return ("windows", (filter_object.window_minutes or DEFAULT_WINDOW_MINUTES) * 60)
+    if is_paged(filter_object) and filter_object.cursor is None and filter_object.limit is not None:
+        needed = (filter_object.offset or 0) + filter_object.limit
+        if filter_object.sort_by:
+            return ("top_k", filter_object.sort_by, filter_object.sort_direction or "ascending", needed)
+        return ("first", needed)
+    return ("rows",)
+
+
+def _merge(columns: TrafficColumns, filter_object: FilterObject, task: Tuple, partials: List[Any]) -> Any:
+    kind = task[0]
+    if kind == "count":
+        return {"count": sum(partials)}
+    if kind == "sum":
+        count = sum(n for n, _ in partials)
+        if count == 0:
+            return {"average_speed": 0}
+        return {"average_speed": round(sum(total for _, total in partials) / count, 2)}
+    if kind in ("max", "min"):
+        values = [value for value in partials if value is not None]
+        pick = max if kind == "max" else min
+        return {f"{kind}_speed": pick(values) if values else None}
+    if kind == "histogram":
+        return _percentiles(partials)
+    if kind == "windows":
+        return _window_counts(partials, task[1])
+    # Row ids come back per segment in ascending order; the serial engine finishes from them.
+    indices = np.concatenate(partials) if partials else np.empty(0, dtype=np.int64)
+    return finish_filter(columns, filter_object, indices)
+
+
+def _shared_dir() -> str:
+    # /dev/shm is RAM-backed on Linux; elsewhere the page cache shares a temp file just as well.
+    parent = SHARED_MEMORY_DIR if os.path.isdir(SHARED_MEMORY_DIR) else None
+    return tempfile.mkdtemp(prefix=f"rosa-scan-{os.getpid()}-", dir=parent)
+
+
+def _file_backed(array: Any, start: int, stop: int) -> Optional[SegmentColumn]:
+    # Rows [start, stop) of a column, if they lie in a whole memory-mapped
+    # cache file (not a view of one), which can be shared as is.
+    if isinstance(array, ChunkedColumn):
+        located = array.locate(start, stop)
+        if located is None:
+            return None
+        array, start = located
+    if isinstance(array, np.memmap) and isinstance(array.base, mmap.mmap) and array.filename:
+        return SegmentColumn(str(array.filename), int(array.offset) + start * array.itemsize)
+    return None
+
+
+class ParallelScanner:
+    """Splits full scans of the Python engine across a process pool.
+
+    A snapshot is published as fixed-size segments of memory-mapped column
+    files: the on-disk column cache is mapped directly, and rows only held in
+    memory (appended by ingestion) are written once to shared memory. Workers
+    map the same pages, so no rows are copied or pickled. Each worker
+    filters its slice and returns a partial aggregate (count, sum, min, max,
+    a speed histogram, window counts, top-K or first-K row ids); the parent
+    merges them into exactly the answer a serial scan gives.
+
+    Segments never span two chunks of a snapshot. Snapshots of the same
+    lineage only grow and keep their chunks, so every segment but those of
+    the open chunk is published once and reused by every later snapshot.
+    """
+
+    def __init__(self, workers: int, min_rows: int = DEFAULT_MIN_ROWS, segment_rows: int = SEGMENT_ROWS):
+        self.workers = workers
+        self.min_rows = min_rows
+        self.segment_rows = segment_rows
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lineage: Any = None
+        # Published segments by their first row.
+        self._segments: Dict[int, Segment] = {}
+        self._dir: Optional[str] = None
+        self._written = 0
+        self.scans = 0
+
+    def applies(self, columns: TrafficColumns, conditions: List[FilterCondition]) -> bool:
+        """Whether a query would scan ``columns`` in parallel: large, and no index narrows it first."""
+        if self.workers < 2 or len(columns) < self.min_rows:
+            return False
+        return columns.indexes is None or columns.indexes.choose_index(conditions) is None
+
+    def process(self, columns: TrafficColumns, filter_object: FilterObject) -> Any:
+        """Answer ``filter_object`` like process_filter_columnar, in parallel when it pays off."""
+        if not self.applies(columns, filter_object.conditions):
+            return process_filter_columnar(columns, filter_object)
+
+        segments = self.publish(columns)
+        task = _scan_task(filter_object)
+        labels = list(columns.direction_labels)
+        executor = self._pool()
+        task_rows = max(MIN_TASK_ROWS, -(-len(columns) // (self.workers * 4)))
+        futures = [
+            executor.submit(scan_segment, segment, labels, lo, min(lo + task_rows, segment.stop - segment.start),
+                            filter_object.conditions, task)
+            for segment in segments
+            for lo in range(0, segment.stop - segment.start, task_rows)
+        ]
+        partials = []
+        try:
+            for future in futures:
+                if query_cancelled():
+                    raise QueryCancelled()
+                partials.append(future.result())
+        finally:
+            for future in futures:
+                future.cancel()
+        with self._lock:
+            self.scans += 1
+        return _merge(columns, filter_object, task, partials)
+
+    def publish(self, columns: TrafficColumns) -> List[Segment]:
+        """Segments covering every row of ``columns``, writing only the ones not yet shared."""
+        with self._lock:
+            lineage = columns.lineage if columns.lineage is not None else ("snapshot", id(columns))
+            if lineage != self._lineage:
+                self._discard_segments()
+                self._lineage = lineage
+            bounds = [
+                (start, min(start + self.segment_rows, chunk_stop))
+                for chunk_start, chunk_stop in columns.chunk_bounds()
+                for start in range(chunk_start, chunk_stop, self.segment_rows)
+            ]
+            current = dict(bounds)
+            for start, segment in list(self._segments.items()):
+                if current.get(start) != segment.stop:
+                    self._remove_files(segment)
+                    del self._segments[start]
+            segments = []
+            for start, stop in bounds:
+                segment = self._segments.get(start)
+                if segment is None:
+                    segment = self._segments[start] = self._write_segment(columns, start, stop)
+                segments.append(segment)
+            return segments
+
+    def _write_segment(self, columns: TrafficColumns, start: int, stop: int) -> Segment:
+        files = {}
+        for name, (_, dtype) in COLUMN_FILES.items():
+            array = getattr(columns, name)
+            shared = _file_backed(array, start, stop)
+            if shared is not None:
+                files[name] = shared
+                continue
+            if self._dir is None:
+                self._dir = _shared_dir()
+            # Never reuse a name: workers cache their maps by path.
+            self._written += 1
+            path = os.path.join(self._dir, f"{name}-{start}-{self._written}.bin")
+            np.ascontiguousarray(array[start:stop], dtype=dtype).tofile(path)
+            files[name] = SegmentColumn(path, 0)
+        return Segment(start, stop, files)
+
+    def _remove_files(self, segment: Segment) -> None:
+        # Only files this scanner wrote; workers that still map them keep their pages.
+        for column in segment.columns.values():
+            if self._dir is not None and os.path.dirname(column.path) == self._dir:
+                try:
+                    os.remove(column.path)
+                except OSError:
+                    pass
+
+    def _discard_segments(self) -> None:
+        for segment in self._segments.values():
+            self._remove_files(segment)
+        self._segments = {}
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # Never fork: the server process runs threads.
+                method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context(method))
+            return self._executor
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "min_rows": self.min_rows,
+                "segments": len(self._segments),
+                "scans": self.scans,
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+            self._discard_segments()
+            self._lineage = None
+            if self._dir is not None:
+                shutil.rmtree(self._dir, ignore_errors=True)
+                self._dir = None
+
+
+_scanner: Optional[ParallelScanner] = None
+_scanner_lock = threading.Lock()
+
+
+def get_parallel_scanner() -> ParallelScanner:
+    """Process-wide scanner configured from ROSA_SCAN_WORKERS and ROSA_PARALLEL_SCAN_ROWS.
+
+    ROSA_SCAN_WORKERS defaults to the number of CPUs; 0 or 1 keeps scans serial.
+    """
+    global _scanner
+    if _scanner is None:
+        with _scanner_lock:
+            if _scanner is None:
+                _scanner = ParallelScanner(
+                    workers=int(os.environ.get("ROSA_SCAN_WORKERS", os.cpu_count() or 1)),
+                    min_rows=int(os.environ.get("ROSA_PARALLEL_SCAN_ROWS", DEFAULT_MIN_ROWS)),
+                )
+    return _scanner
+
+
+def shutdown_parallel_scanner() -> None:
+    global _scanner
+    with _scanner_lock:
+        if _scanner is not None:
+            _scanner.shutdown()
+            _scanner = None
+
+
+atexit.register(shutdown_parallel_scanner)
+
+
+def process_filter_parallel(columns: TrafficColumns, filter_object: FilterObject) -> Any:
+    """Entry point of the Python engine: serial or parallel, the answer is the same."""
+    return get_parallel_scanner().process(columns, filter_object)
@@ -0,0 +1,150 @@
+import re
+import sqlite3
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from ..models.aiModel import FilterCondition
+
+# Every day of data lives in its own table, vehicles_YYYYMMDD, listed in the
+# partitions catalog. Row ids are global, so a row keeps its id whichever
+# partition holds it.
+PARTITION_PREFIX = "vehicles_"
+ROW_COLUMNS = "id, CollectionTime, Direction, Lane, Speed"
+DATA_COLUMNS = "CollectionTime, Direction, Lane, Speed"
+# Union of every partition with row ids, used when a query cannot be pruned.
+ALL_ROWS_VIEW = "vehicle_rows"
+# What callers outside the engine query: all partitions, data columns only.
+PUBLIC_VIEW = "vehicles"
+DEFAULT_RETENTION_DAYS = 90
+# Days after today that still count as "now" when placing the retention
+# horizon, to allow for clock skew and time zones.
+FUTURE_TOLERANCE_DAYS = 1
+
+_DAY_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+Row = Tuple[str, str, int, int]
+
+
+def partition_day(collection_time: str) -> str:
+    return collection_time[:10]
+
+
+def partition_table(day: str) -> str:
+    # Table names are spliced into SQL, so the day must really be a date.
+    if not _DAY_RE.match(day):
+        raise ValueError(f"Cannot partition on malformed CollectionTime day '{day}'.")
+    return PARTITION_PREFIX + day.replace("-", "")
+
+
+def create_partition_catalog(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        "CREATE TABLE partitions (day TEXT PRIMARY KEY, table_name TEXT NOT NULL, row_count INTEGER NOT NULL)"
+    )
+    refresh_views(conn)
+
+
+def refresh_views(conn: sqlite3.Connection) -> None:
+    # Rebuild the union views after partitions were added or dropped.
+    tables = [row[0] for row in conn.execute("SELECT table_name FROM partitions ORDER BY day")]
+    if tables:
+        rows_sql = " UNION ALL ".join(f"SELECT {ROW_COLUMNS} FROM {table}" for table in tables)
+    else:
+        rows_sql = "SELECT NULL AS id, NULL AS CollectionTime, NULL AS Direction, NULL AS Lane, NULL AS Speed WHERE 0"
+    conn.execute(f"DROP VIEW IF EXISTS {PUBLIC_VIEW}")
+    conn.execute(f"DROP VIEW IF EXISTS {ALL_ROWS_VIEW}")
+    conn.execute(f"CREATE VIEW {ALL_ROWS_VIEW} AS {rows_sql}")
+    conn.execute(f"CREATE VIEW {PUBLIC_VIEW} AS SELECT {DATA_COLUMNS} FROM {ALL_ROWS_VIEW}")
+
+
+def write_rows(conn: sqlite3.Connection, rows: Sequence[Row], first_id: int) -> bool:
+    """Insert rows with ids ``first_id, first_id + 1, ...`` into their day partitions.
+
+    Creates missing partitions and returns True if it did, in which case the
+    caller must refresh the views before committing.
+    """
+    by_day: Dict[str, List[tuple]] = {}
+    for row_id, row in enumerate(rows, start=first_id):
+        by_day.setdefault(partition_day(row[0]), []).append((row_id,) + tuple(row))
+
+    existing = {day for (day,) in conn.execute("SELECT day FROM partitions")}
+    created = False
+    for day, day_rows in by_day.items():
+        table = partition_table(day)
+        if day not in existing:
+            conn.execute(
+                f"CREATE TABLE {table} (id INTEGER PRIMARY KEY, CollectionTime TEXT,"
+                " Direction TEXT, Lane INTEGER, Speed INTEGER)"
+            )
+            conn.execute(f"CREATE INDEX {table}_time ON {table} (CollectionTime)")
+            conn.execute("INSERT INTO partitions VALUES (?, ?, 0)", (day, table))
+            created = True
+        conn.executemany(f"INSERT INTO {table} VALUES (?, ?, ?, ?, ?)", day_rows)
+        conn.execute("UPDATE partitions SET row_count = row_count + ? WHERE day = ?", (len(day_rows), day))
+    return created
+
+
+def drop_partitions_before(conn: sqlite3.Connection, day: str) -> List[str]:
+    """Drop every partition older than ``day`` and return the dropped days.
+
+    Each partition goes with one DROP TABLE, independent of how much data
+    the other partitions hold. The caller refreshes views and rollups.
+    """
+    old = conn.execute("SELECT day, table_name FROM partitions WHERE day < ? ORDER BY day", (day,)).fetchall()
+    for old_day, table in old:
+        conn.execute(f"DROP TABLE {table}")
+        conn.execute("DELETE FROM partitions WHERE day = ?", (old_day,))
+    return [old_day for old_day, _ in old]
+
+
+def retention_cutoff(
+    conn: sqlite3.Connection, retention_days: int, today: Optional[date] = None
+) -> Optional[str]:
+    """First day to keep so that ``retention_days`` days up to the newest one remain.
+
+    Days later than today (plus FUTURE_TOLERANCE_DAYS) are ignored, so a row
+    with a bogus future timestamp cannot push every real day out of retention.
+    """
+    if retention_days <= 0:
+        return None
+    latest = (today or date.today()) + timedelta(days=FUTURE_TOLERANCE_DAYS)
+    newest = conn.execute("SELECT MAX(day) FROM partitions WHERE day <= ?", (latest.isoformat(),)).fetchone()[0]
+    if newest is None:
+        return None
+    return (date.fromisoformat(newest) - timedelta(days=retention_days - 1)).isoformat()
+
+
+def day_bounds(conditions: Iterable[FilterCondition]) -> Tuple[Optional[str], Optional[str]]:
+    """Inclusive (first day, last day) that CollectionTime conditions allow.
+
+    None means unbounded on that side. Values are already normalized to
+    ``YYYY-MM-DD HH:MM:SS`` by FilterCondition.
+    """
+    first: Optional[str] = None
+    last: Optional[str] = None
+    for condition in conditions:
+        if condition.field != "CollectionTime":
+            continue
+        day = partition_day(condition.value)
+        operator = condition.operator
+        if operator in ("==", ">", ">="):
+            first = day if first is None else max(first, day)
+        if operator in ("==", "<", "<="):
+            if operator == "<" and condition.value.endswith("00:00:00"):
+                # "< midnight" ends on the previous day.
+                day = (date.fromisoformat(day) - timedelta(days=1)).isoformat()
+            last = day if last is None else min(last, day)
+    return first, last
+
+
+def prune_partitions(
+    partitions: Sequence[Tuple[str, str]], conditions: Iterable[FilterCondition]
+) -> Optional[List[str]]:
+    """Tables of the partitions a query must read, or None when it needs all of them."""
+    first, last = day_bounds(conditions)
+    if first is None and last is None:
+        return None
+    return [
+        table
+        for day, table in partitions
+        if (first is None or day >= first) and (last is None or day <= last)
+    ]
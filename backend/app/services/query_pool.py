@@ -0,0 +1,195 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+DEFAULT_MAX_QUEUE = 64
+DEFAULT_TIMEOUT_SECONDS = 10.0
+POOL_KINDS = ("thread", "process")
+
+
+class PoolSaturated(Exception):
+    """Every worker is busy and the wait queue is full."""
+
+
+class QueryTimeout(Exception):
+    """A query did not finish within the pool's timeout."""
+
+
+class QueryCancelled(Exception):
+    """A query was cancelled before or while it ran."""
+
+
+# The cancel event of the job running on this worker thread.
+_worker_state = threading.local()
+
+
+def query_cancelled() -> bool:
+    """True when the job running on this thread has been cancelled.
+
+    Long-running work polls this; SQLite connections check it from a
+    progress handler so a cancelled SELECT stops mid-scan.
+    """
+    event = getattr(_worker_state, "cancel_event", None)
+    return event is not None and event.is_set()
+
+
+def _run_job(fn: Callable[..., Any], args: tuple, enqueued_at: float, cancel_event: Optional[threading.Event]):
+    # Runs on the worker. Returns (seconds spent queued, result).
+    started_at = time.monotonic()
+    if cancel_event is not None and cancel_event.is_set():
+        raise QueryCancelled()
+    _worker_state.cancel_event = cancel_event
+    try:
+        return started_at - enqueued_at, fn(*args)
+    finally:
+        _worker_state.cancel_event = None
+
+
+class QueryPool:
+    """Bounded pool that runs blocking query work off the event loop.
+
+    At most ``max_workers`` jobs run at once and at most ``max_queue`` more
+    wait for a worker; anything beyond that is rejected with PoolSaturated
+    instead of piling up. Each job gets ``timeout_seconds``. On timeout or
+    when the awaiting request is cancelled, a queued job is dropped and a
+    running job on a thread pool is told to stop (see query_cancelled). A
+    process pool can only drop queued jobs. Jobs for a process pool must be
+    picklable top-level functions.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = DEFAULT_WORKERS,
+        max_queue: int = DEFAULT_MAX_QUEUE,
+        timeout_seconds: float = DEFAULT_TIMEOUT_SECONDS,
+        kind: str = "thread",
+    ):
+        if kind not in POOL_KINDS:
+            raise ValueError(f"Unknown pool kind '{kind}'; expected one of {POOL_KINDS}.")
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout_seconds = timeout_seconds
+        self.kind = kind
+        self._executor: Executor = (
+            ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="rosa-query")
+            if kind == "thread"
+            else ProcessPoolExecutor(max_workers=max_workers)
+        )
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.cancelled = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._wait_count = 0
+
+    async def run(self, fn: Callable[..., Any], *args: Any, timeout: Optional[float] = None) -> Any:
+        """Run ``fn(*args)`` on the pool and await its result.
+
+        Raises PoolSaturated when the queue is full, QueryTimeout when the
+        job takes longer than the timeout, and re-raises the job's own errors.
+        """
+        with self._lock:
+            if self.in_flight >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise PoolSaturated()
+            self.in_flight += 1
+
+        cancel_event = threading.Event() if self.kind == "thread" else None
+        future = self._executor.submit(_run_job, fn, args, time.monotonic(), cancel_event)
+        try:
+            waited, result = await asyncio.wait_for(
+                asyncio.wrap_future(future), timeout or self.timeout_seconds
+            )
+        except asyncio.TimeoutError:
+            self._abandon(future, cancel_event)
+            with self._lock:
+                self.timed_out += 1
+            raise QueryTimeout() from None
+        except asyncio.CancelledError:
+            self._abandon(future, cancel_event)
+            with self._lock:
+                self.cancelled += 1
+            raise
+        except Exception:
+            with self._lock:
+                self.failed += 1
+            raise
+        finally:
+            if future.done():
+                self._release()
+            else:
+                # The slot frees up when the abandoned job actually stops.
+                future.add_done_callback(lambda _: self._release())
+
+        with self._lock:
+            self.completed += 1
+            self._wait_total += waited
+            self._wait_count += 1
+            self._wait_max = max(self._wait_max, waited)
+        return result
+
+    def _abandon(self, future, cancel_event: Optional[threading.Event]) -> None:
+        future.cancel()
+        if cancel_event is not None:
+            cancel_event.set()
+
+    def _release(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            average_wait = self._wait_total / self._wait_count if self._wait_count else 0.0
+            return {
+                "kind": self.kind,
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "timeout_seconds": self.timeout_seconds,
+                "in_flight": self.in_flight,
+                "queue_depth": max(0, self.in_flight - self.max_workers),
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "timed_out": self.timed_out,
+                "cancelled": self.cancelled,
+                "average_wait_ms": round(average_wait * 1000, 3),
+                "max_wait_ms": round(self._wait_max * 1000, 3),
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_query_pool: Optional[QueryPool] = None
+_query_pool_lock = threading.Lock()
+
+
+def get_query_pool() -> QueryPool:
+    """Process-wide pool configured from ROSA_QUERY_* environment variables."""
+    global _query_pool
+    if _query_pool is None:
+        with _query_pool_lock:
+            if _query_pool is None:
+                _query_pool = QueryPool(
+                    max_workers=int(os.environ.get("ROSA_QUERY_WORKERS", DEFAULT_WORKERS)),
+                    max_queue=int(os.environ.get("ROSA_QUERY_QUEUE", DEFAULT_MAX_QUEUE)),
+                    timeout_seconds=float(os.environ.get("ROSA_QUERY_TIMEOUT", DEFAULT_TIMEOUT_SECONDS)),
+                    kind=os.environ.get("ROSA_QUERY_POOL", "thread"),
+                )
+    return _query_pool
+
+
+def shutdown_query_pool() -> None:
+    global _query_pool
+    with _query_pool_lock:
+        if _query_pool is not None:
+            _query_pool.shutdown()
+            _query_pool = None
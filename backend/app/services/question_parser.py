@@ -0,0 +1,298 @@
+import json
+import re
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from ..models.aiModel import FilterCondition, FilterObject
+
+# Every phrase the mock LLM reacts to, mapped to (slot, value). Phrases are
+# matched as plain substrings of the lowercased question, like the original
+# chain of `in` checks, so "northbound" still counts as "north".
+KEYWORDS: Dict[str, Tuple[str, str]] = {
+    "north": ("direction", "North"),
+    "south": ("direction", "South"),
+    "faster": ("comparative", ">"),
+    "over": ("comparative", ">"),
+    "greater": ("comparative", ">"),
+    "above": ("comparative", ">"),
+    "slower": ("comparative", "<"),
+    "under": ("comparative", "<"),
+    "below": ("comparative", "<"),
+    "less": ("comparative", "<"),
+    "how many": ("operation", "count_vehicles"),
+    "count": ("operation", "count_vehicles"),
+    "average": ("operation", "average_speed"),
+    "max": ("operation", "max_speed"),
+    "highest": ("operation", "max_speed"),
+    "min speed": ("operation", "min_speed"),
+    "minimum": ("operation", "min_speed"),
+    "lowest speed": ("operation", "min_speed"),
+    "percentile": ("operation", "speed_percentiles"),
+    "median": ("operation", "speed_percentiles"),
+    "p85": ("operation", "speed_percentiles"),
+    "list": ("operation", "list_vehicles"),
+    "show me": ("operation", "list_vehicles"),
+    "sorted by speed": ("sort_by", "Speed"),
+    "order by speed": ("sort_by", "Speed"),
+    "sorted by lane": ("sort_by", "Lane"),
+    "order by lane": ("sort_by", "Lane"),
+    "sorted by time": ("sort_by", "CollectionTime"),
+    "order by time": ("sort_by", "CollectionTime"),
+    "sorted by collection": ("sort_by", "CollectionTime"),
+    "ascending": ("sort_direction", "ascending"),
+    "from lowest to highest": ("sort_direction", "ascending"),
+    "descending": ("sort_direction", "descending"),
+    "from highest to lowest": ("sort_direction", "descending"),
+    "lane": ("lane", ""),
+    "top": ("limit", ""),
+    "first": ("limit", ""),
+    "fastest": ("superlative", "descending"),
+    "slowest": ("superlative", "ascending"),
+    "per lane": ("group_by", "Lane"),
+    "each lane": ("group_by", "Lane"),
+    "by lane": ("by", "Lane"),
+    "per direction": ("group_by", "Direction"),
+    "each direction": ("group_by", "Direction"),
+    "by direction": ("by", "Direction"),
+    "lane and direction": ("group_by", "Direction"),
+    "direction and lane": ("group_by", "Lane"),
+    "min": ("window", ""),
+    "per minute": ("window", "1"),
+    "hourly": ("window", "60"),
+    "per hour": ("window", "60"),
+    "each hour": ("window", "60"),
+    "every hour": ("window", "60"),
+}
+
+# When several phrases fill the same slot, the earlier value wins. This is
+# the order of the original if/elif chains.
+SLOT_PRIORITY: Dict[str, List[str]] = {
+    "direction": ["North", "South"],
+    "comparative": [">", "<"],
+    "operation": ["count_vehicles", "average_speed", "max_speed", "min_speed", "speed_percentiles", "list_vehicles"],
+    "sort_by": ["Speed", "Lane", "CollectionTime"],
+    "sort_direction": ["ascending", "descending"],
+    "superlative": ["descending", "ascending"],
+    "window": ["60", "1"],
+}
+
+_END = ""
+
+
+def _build_trie(words) -> dict:
+    root: dict = {}
+    for word in words:
+        node = root
+        for char in word:
+            node = node.setdefault(char, {})
+        node[_END] = {}
+    return root
+
+
+def _trie_to_pattern(node: dict) -> str:
+    # Turn the trie into a nested regex so shared prefixes are matched once.
+    branches = [re.escape(char) + _trie_to_pattern(child) for char, child in sorted(node.items()) if char != _END]
+    if not branches:
+        return ""
+    body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    if _END in node:
+        return "(?:" + body + ")?"
+    return body
+
+
+# The trie regex sits inside a zero-width lookahead, so findall reports every
+# keyword occurrence in one pass, including overlapping ones like "highest"
+# inside "from lowest to highest" or "lane" inside "sorted by lane".
+_KEYWORD_RE = re.compile("(?=(" + _trie_to_pattern(_build_trie(KEYWORDS)) + "))")
+_NUMBER_RE = re.compile(r"(\d+)\s*(?:kph|km/h|mph)?")
+_LANE_NUMBER_RE = re.compile(r"lane\s*(\d+)")
+_LIMIT_RE = re.compile(r"\b(?:top|first)\s*(\d+)")
+_WINDOW_RE = re.compile(r"\b(\d+)\s*-?\s*min(?:ute)?s?\b")
+_TIME_RE = re.compile(r"\b(after|since|before|on)\s+(\d{4}-\d{2}-\d{2}(?:[ t]\d{2}:\d{2}(?::\d{2})?)?)")
+# "by lane" groups unless it is the tail of a sort clause like "sorted by lane".
+_GROUP_BY_RE = re.compile(r"(?<!sort )(?<!sorted )(?<!order )(?<!ordered )\bby (lane|direction)\b")
+# Time phrase -> operator on CollectionTime. "on <day>" becomes a whole-day range.
+TIME_OPERATORS = {"after": ">", "since": ">=", "before": "<", "on": "=="}
+
+
+class ParsedQuestion(NamedTuple):
+    direction: Optional[str]
+    speed_operator: Optional[str]
+    speed_value: Optional[str]
+    lane_value: Optional[str]
+    operation: str
+    sort_by: Optional[str]
+    sort_direction: Optional[str]
+    limit: Optional[int]
+    window_minutes: Optional[int]
+    group_by: Tuple[str, ...]
+    time_conditions: Tuple[Tuple[str, str], ...]
+
+
+def _time_conditions(text: str) -> Tuple[Tuple[Tuple[str, str], ...], List[Tuple[int, int]]]:
+    # (operator, value) pairs for every time phrase, plus the spans the dates
+    # occupy so their digits are not read as speeds.
+    conditions: List[Tuple[str, str]] = []
+    spans: List[Tuple[int, int]] = []
+    for match in _TIME_RE.finditer(text):
+        phrase, value = match.groups()
+        value = value.replace("t", " ")  # the question is lowercased
+        spans.append(match.span(2))
+        operator = TIME_OPERATORS[phrase]
+        if operator == "==" and len(value) == 10:
+            start = date.fromisoformat(value)
+            conditions.append((">=", value))
+            conditions.append(("<", (start + timedelta(days=1)).isoformat()))
+        else:
+            conditions.append((operator, value))
+    return tuple(conditions), spans
+
+
+def _pick(slot: str, found: set) -> Optional[str]:
+    for value in SLOT_PRIORITY[slot]:
+        if (slot, value) in found:
+            return value
+    return None
+
+
+@lru_cache(maxsize=4096)
+def _parse_normalized(text: str) -> ParsedQuestion:
+    found = {KEYWORDS[keyword] for keyword in _KEYWORD_RE.findall(text)}
+
+    # Numbers are only looked up when a phrase needs one. "top 10" is a page
+    # size, so its number is never taken as a speed.
+    limit = None
+    limit_start = None
+    if ("limit", "") in found:
+        limit_match = _LIMIT_RE.search(text)
+        if limit_match and int(limit_match.group(1)) > 0:
+            limit = int(limit_match.group(1))
+            limit_start = limit_match.start(1)
+
+    # "per 15 minutes", "5-minute windows", "hourly": counts per window
+    window_minutes = None
+    window_start = None
+    if ("window", "") in found:
+        window_match = _WINDOW_RE.search(text)
+        if window_match and int(window_match.group(1)) > 0:
+            window_minutes = int(window_match.group(1))
+            window_start = window_match.start(1)
+    if window_minutes is None and _pick("window", found):
+        window_minutes = int(_pick("window", found))
+
+    time_conditions: Tuple[Tuple[str, str], ...] = ()
+    date_spans: List[Tuple[int, int]] = []
+    if "-" in text:
+        time_conditions, date_spans = _time_conditions(text)
+
+    speed_operator = None
+    speed_value = None
+    comparative = _pick("comparative", found)
+    if comparative:
+        for speed_match in _NUMBER_RE.finditer(text):
+            in_date = any(start <= speed_match.start(1) < end for start, end in date_spans)
+            if speed_match.start(1) not in (limit_start, window_start) and not in_date:
+                speed_operator = comparative
+                speed_value = speed_match.group(1)
+                break
+
+    lane_value = None
+    if ("lane", "") in found:
+        lane_match = _LANE_NUMBER_RE.search(text)
+        if lane_match:
+            lane_value = lane_match.group(1)
+
+    sort_by = _pick("sort_by", found)
+    sort_direction = _pick("sort_direction", found)
+    superlative = _pick("superlative", found)
+    if sort_by is None and superlative:
+        # "fastest"/"slowest" rank by speed unless another sort was asked for
+        sort_by = "Speed"
+        sort_direction = sort_direction or superlative
+    if sort_direction is None and sort_by:
+        # Default to ascending if sorting is mentioned but no direction specified
+        sort_direction = "ascending"
+
+    operation = _pick("operation", found) or ""
+    if not operation and limit is not None:
+        # "top 10 ..." asks for rows even without a filter
+        operation = "list_vehicles"
+    # "per lane", "by direction": one result row per group
+    grouped = {field for slot, field in found if slot == "group_by"}
+    if ("by", "Lane") in found or ("by", "Direction") in found:
+        grouped.update(match.title() for match in _GROUP_BY_RE.findall(text))
+    group_by = tuple(field for field in ("Direction", "Lane") if field in grouped)
+    if group_by and not operation:
+        operation = "count_vehicles"
+    if window_minutes is not None and operation in ("", "count_vehicles"):
+        operation = "count_by_window"
+    else:
+        window_minutes = None
+    if operation == "list_vehicles":
+        group_by = ()
+
+    return ParsedQuestion(
+        direction=_pick("direction", found),
+        speed_operator=speed_operator,
+        speed_value=speed_value,
+        lane_value=lane_value,
+        operation=operation,
+        sort_by=sort_by,
+        sort_direction=sort_direction,
+        limit=limit,
+        window_minutes=window_minutes,
+        group_by=group_by,
+        time_conditions=time_conditions,
+    )
+
+
+def normalize_question(question: str) -> str:
+    return question.strip().lower()
+
+
+def parse_question(question: str) -> FilterObject:
+    """Turn a question into a FilterObject with a single keyword scan.
+
+    Parses are memoized on the normalized text; each call still gets its own
+    FilterObject, so callers may mutate the result freely.
+    """
+    parsed = _parse_normalized(normalize_question(question))
+
+    conditions = []
+    if parsed.direction:
+        conditions.append(FilterCondition(field="Direction", operator="==", value=parsed.direction))
+    if parsed.speed_operator:
+        conditions.append(FilterCondition(field="Speed", operator=parsed.speed_operator, value=parsed.speed_value))
+    if parsed.lane_value is not None:
+        conditions.append(FilterCondition(field="Lane", operator="==", value=parsed.lane_value))
+    for operator, value in parsed.time_conditions:
+        # "after 2025-12-07" etc.; the value is expanded to a full timestamp
+        conditions.append(FilterCondition(field="CollectionTime", operator=operator, value=value))
+
+    # Check if there are conditions or operation early
+    if not conditions and not parsed.operation:
+        raise ValueError(
+            "Question must include at least one filter condition or an operation "
+            "(count, average, max, min, percentiles, list)."
+        )
+
+    return FilterObject(
+        conditions=conditions,
+        operation=parsed.operation,
+        sort_by=parsed.sort_by,
+        sort_direction=parsed.sort_direction,
+        limit=parsed.limit,
+        window_minutes=parsed.window_minutes,
+        group_by=list(parsed.group_by) or None,
+    )
+
+
+@lru_cache(maxsize=4096)
+def _parse_normalized_json(text: str) -> str:
+    return json.dumps(parse_question(text).model_dump())
+
+
+def parse_question_json(question: str) -> str:
+    """JSON form of parse_question, memoized like an LLM response cache."""
+    return _parse_normalized_json(normalize_question(question))
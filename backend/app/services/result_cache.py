@@ -0,0 +1,273 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..models.aiModel import FilterCondition, FilterObject
+from .columnar_engine import TrafficColumns, condition_mask
+from .operations import window_minutes
+from .pagination import AGGREGATE_OPERATIONS
+from .serialization import json_default
+from .traffic_store import get_store
+
+NUMERIC_FIELDS = ("Lane", "Speed")
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_TTL_SECONDS = 300.0
+
+# Returned by ResultCache.get on a miss, since None can be a valid result.
+MISSING = object()
+
+
+def _typed_value(field: str, value: str) -> Any:
+    # "55" and "055" select the same rows in SQL, so they share a cache entry.
+    if field in NUMERIC_FIELDS:
+        try:
+            return int(value)
+        except ValueError:
+            return value
+    return value
+
+
+def canonical_filter_key(filter_object: FilterObject) -> str:
+    """Stable cache key for a validated FilterObject.
+
+    Conditions are ANDed, so their order does not matter; they are typed and
+    sorted so equivalent questions map to the same key.
+    """
+    conditions = sorted(
+        (
+            (c.field, c.operator, _typed_value(c.field, c.value))
+            for c in filter_object.conditions
+        ),
+        key=lambda item: (item[0], item[1], str(item[2])),
+    )
+    sort_direction = None
+    if filter_object.sort_by:
+        sort_direction = filter_object.sort_direction or "ascending"
+    payload = {
+        "conditions": conditions,
+        "operation": filter_object.operation or "list_vehicles",
+        "sort_by": filter_object.sort_by,
+        "sort_direction": sort_direction,
+        # Each page of a paginated listing is its own entry.
+        "limit": filter_object.limit,
+        "offset": filter_object.offset or None,
+        "cursor": filter_object.cursor,
+        "window_minutes": window_minutes(filter_object) if filter_object.operation == "count_by_window" else None,
+        # Group order decides the result's row order, so it is kept as given.
+        "group_by": filter_object.group_by if filter_object.operation in AGGREGATE_OPERATIONS else None,
+    }
+    return json.dumps(payload, sort_keys=True, separators=(",", ":"))
+
+
+def key_conditions(key: str) -> Optional[List[FilterCondition]]:
+    """The conditions a canonical_filter_key was built from, or None for any other key."""
+    try:
+        return [
+            FilterCondition(field=field, operator=operator, value=str(value))
+            for field, operator, value in json.loads(key)["conditions"]
+        ]
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+class SqliteCacheTier:
+    """Optional second cache tier in a local SQLite file that survives restarts."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS result_cache ("
+            "key TEXT PRIMARY KEY, version TEXT, expires_at REAL, value TEXT)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str, version: str, now: float) -> Any:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM result_cache WHERE key = ? AND version = ? AND expires_at > ?",
+                (key, version, now),
+            ).fetchone()
+        return MISSING if row is None else json.loads(row[0])
+
+    def set(self, key: str, version: str, value: Any, expires_at: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO result_cache VALUES (?, ?, ?, ?)",
+                (key, version, expires_at, json.dumps(value, default=json_default)),
+            )
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM result_cache")
+            self._conn.commit()
+
+
+# Given the old and the new data version, the rows appended in between, or
+# None when something other than an append changed the data.
+RowsBetween = Callable[[str, str], Optional[Sequence[Tuple[str, str, int, int]]]]
+
+
+class ResultCache:
+    """In-process LRU cache of query results with a TTL.
+
+    Every entry records the data version it was computed against. When a
+    lookup comes with a new version, ``rows_between`` is asked what changed.
+    If rows were only appended, each entry's conditions are evaluated on
+    those rows and only the entries some new row matches are dropped; the
+    others are still exact. Anything else (a reload, dropped partitions, or
+    keys that are not canonical_filter_key) drops the whole cache.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        second_tier: Optional[SqliteCacheTier] = None,
+        clock: Callable[[], float] = time.time,
+        rows_between: Optional[RowsBetween] = None,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.second_tier = second_tier
+        self._clock = clock
+        self._rows_between = rows_between
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._version: Optional[str] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.retained = 0
+
+    def _check_version(self, version: str) -> None:
+        if self._version == version:
+            return
+        if self._version is not None:
+            self.invalidations += 1
+            appended = None
+            if self._rows_between is not None and self._entries:
+                appended = self._rows_between(self._version, version)
+            if appended is None:
+                self._entries.clear()
+            elif appended:
+                self._drop_affected(TrafficColumns.from_rows(appended))
+            self.retained += len(self._entries)
+        self._version = version
+
+    def _drop_affected(self, batch: TrafficColumns) -> None:
+        # Each distinct condition is evaluated once over the new rows.
+        masks: Dict[Tuple[str, str, str], np.ndarray] = {}
+        for key in list(self._entries):
+            conditions = key_conditions(key)
+            if conditions is None:
+                del self._entries[key]
+                continue
+            matched = np.ones(len(batch), dtype=bool)
+            for condition in conditions:
+                condition_key = (condition.field, condition.operator, condition.value)
+                mask = masks.get(condition_key)
+                if mask is None:
+                    mask = masks[condition_key] = condition_mask(batch, condition)
+                matched &= mask
+            if matched.any():
+                del self._entries[key]
+
+    def get(self, key: str, version: str) -> Any:
+        """Return the cached value, or the ``MISSING`` sentinel."""
+        now = self._clock()
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+
+        if self.second_tier is not None:
+            value = self.second_tier.get(key, version, now)
+            if value is not MISSING:
+                self._store(key, version, value, now + self.ttl_seconds)
+                with self._lock:
+                    self.hits += 1
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return MISSING
+
+    def set(self, key: str, version: str, value: Any) -> None:
+        expires_at = self._clock() + self.ttl_seconds
+        self._store(key, version, value, expires_at)
+        if self.second_tier is not None:
+            self.second_tier.set(key, version, value, expires_at)
+
+    def _store(self, key: str, version: str, value: Any, expires_at: float) -> None:
+        with self._lock:
+            self._check_version(version)
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key: str, version: str, compute: Callable[[], Any]) -> Any:
+        value = self.get(key, version)
+        if value is MISSING:
+            value = compute()
+            self.set(key, version, value)
+        return value
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+        if self.second_tier is not None:
+            self.second_tier.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "retained": self.retained,
+                "second_tier": self.second_tier is not None,
+            }
+
+
+_result_cache: Optional[ResultCache] = None
+_result_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> ResultCache:
+    """Process-wide cache configured from ROSA_RESULT_CACHE_* environment variables."""
+    global _result_cache
+    if _result_cache is None:
+        with _result_cache_lock:
+            if _result_cache is None:
+                tier_path = os.environ.get("ROSA_RESULT_CACHE_DB")
+                _result_cache = ResultCache(
+                    rows_between=get_store().rows_between,
+                    max_entries=int(os.environ.get("ROSA_RESULT_CACHE_SIZE", DEFAULT_MAX_ENTRIES)),
+                    ttl_seconds=float(os.environ.get("ROSA_RESULT_CACHE_TTL", DEFAULT_TTL_SECONDS)),
+                    second_tier=SqliteCacheTier(Path(tier_path)) if tier_path else None,
+                )
+    return _result_cache
@@ -0,0 +1,131 @@
+import sqlite3
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Rollup table per time bucket, with the CollectionTime prefix that names the
+# bucket: "2025-12-07 06:05" for minutes, "2025-12-07 06" for hours.
+ROLLUP_TABLES = {
+    "minute": ("vehicle_rollup_minute", 16),
+    "hour": ("vehicle_rollup_hour", 13),
+}
+# Coarsest table first; the planner takes the first one that can answer a query.
+ROLLUP_ORDER = ("hour", "minute")
+BUCKET_MINUTES = {"minute": 1, "hour": 60}
+
+# Conditions on these columns are answered per group, so they never need raw rows.
+GROUP_FIELDS = ("Direction", "Lane")
+
+# Aggregate operation -> expression over a rollup table, matching the raw
+# SQL aggregate exactly (COUNT(*) is 0 and AVG/MAX/MIN are NULL with no rows).
+ROLLUP_AGGREGATES = {
+    "count_vehicles": ("COALESCE(SUM(vehicle_count), 0)", "count"),
+    "average_speed": ("CAST(SUM(speed_sum) AS REAL) / SUM(vehicle_count)", "average_speed"),
+    "max_speed": ("MAX(speed_max)", "max_speed"),
+    "min_speed": ("MIN(speed_min)", "min_speed"),
+}
+
+GroupKey = Tuple[str, int, str]
+GroupTotals = List[int]  # [count, speed_sum, speed_min, speed_max]
+
+
+def create_rollup_tables(conn: sqlite3.Connection) -> None:
+    for table, _ in ROLLUP_TABLES.values():
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                Direction TEXT,
+                Lane INTEGER,
+                Bucket TEXT,
+                vehicle_count INTEGER,
+                speed_sum INTEGER,
+                speed_min INTEGER,
+                speed_max INTEGER,
+                PRIMARY KEY (Direction, Lane, Bucket)
+            )
+        """)
+
+
+def _group_rows(rows: Iterable[Tuple[str, str, int, int]], prefix: int) -> Dict[GroupKey, GroupTotals]:
+    groups: Dict[GroupKey, GroupTotals] = {}
+    for collection_time, direction, lane, speed in rows:
+        key = (direction, lane, collection_time[:prefix])
+        totals = groups.get(key)
+        if totals is None:
+            groups[key] = [1, speed, speed, speed]
+        else:
+            totals[0] += 1
+            totals[1] += speed
+            if speed < totals[2]:
+                totals[2] = speed
+            if speed > totals[3]:
+                totals[3] = speed
+    return groups
+
+
+def add_rows_to_rollups(conn: sqlite3.Connection, rows: Sequence[Tuple[str, str, int, int]]) -> None:
+    """Fold newly ingested ``(time, direction, lane, speed)`` rows into every rollup.
+
+    Rows are grouped in Python first, so each touched bucket costs one upsert
+    however many rows landed in it. Runs inside the caller's transaction.
+    """
+    for table, prefix in ROLLUP_TABLES.values():
+        groups = _group_rows(rows, prefix)
+        conn.executemany(
+            f"""
+            INSERT INTO {table} VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (Direction, Lane, Bucket) DO UPDATE SET
+                vehicle_count = vehicle_count + excluded.vehicle_count,
+                speed_sum = speed_sum + excluded.speed_sum,
+                speed_min = MIN(speed_min, excluded.speed_min),
+                speed_max = MAX(speed_max, excluded.speed_max)
+            """,
+            [key + tuple(totals) for key, totals in groups.items()],
+        )
+
+
+def delete_rollups_before(conn: sqlite3.Connection, day: str) -> None:
+    # Forget buckets of dropped partitions; bucket names sort like the days they start with.
+    for table, _ in ROLLUP_TABLES.values():
+        conn.execute(f"DELETE FROM {table} WHERE Bucket < ?", (day,))
+
+
+def _bucket_bound(operator: str, value: str, prefix: int) -> Optional[str]:
+    # A ">=" or "<" on CollectionTime that falls on a bucket boundary (the rest
+    # of the timestamp is all zeros) selects whole buckets, so it becomes the
+    # same comparison on Bucket.
+    if operator in (">=", "<") and not value[prefix:].strip(":0"):
+        return value[:prefix]
+    return None
+
+
+def rollup_plan(
+    conditions: Iterable[Tuple[str, str, str]],
+    window_minutes: Optional[int] = None,
+    group_by: Sequence[str] = (),
+) -> Optional[Tuple[str, List[Tuple[str, str, str]]]]:
+    """Rollup table that can answer an aggregate over ``(field, operator, value)`` conditions.
+
+    Returns the table and the conditions rewritten against it, or None. Only
+    Direction and Lane are kept per group, and CollectionTime only per
+    bucket, so a Speed condition (or a time bound inside a bucket) needs a
+    raw scan. With ``window_minutes``, the buckets must also tile the
+    windows, and ``group_by`` may only name group columns. The coarsest
+    table that fits wins.
+    """
+    if any(field not in GROUP_FIELDS for field in group_by):
+        return None
+    conditions = list(conditions)
+    for name in ROLLUP_ORDER:
+        if window_minutes is not None and window_minutes % BUCKET_MINUTES[name]:
+            continue
+        table, prefix = ROLLUP_TABLES[name]
+        rewritten = []
+        for field, operator, value in conditions:
+            if field in GROUP_FIELDS:
+                rewritten.append((field, operator, value))
+                continue
+            bucket = _bucket_bound(operator, value, prefix) if field == "CollectionTime" else None
+            if bucket is None:
+                break
+            rewritten.append(("Bucket", operator, bucket))
+        else:
+            return table, rewritten
+    return None
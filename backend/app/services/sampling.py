@@ -0,0 +1,231 @@
+import math
+import os
+import threading
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from ..models.aiModel import FilterObject
+from .columnar_engine import TrafficColumns, apply_filter_mask
+from .operations import SPEED_PERCENTILES, empty_percentiles, percentile_key
+
+# Operations approximate=true answers from the sample; others run exactly.
+APPROXIMATE_OPERATIONS = frozenset({"count_vehicles", "average_speed", "speed_percentiles"})
+DEFAULT_SAMPLE_ROWS = 100_000
+# Every stratum keeps at least this many rows, so rare lanes still get usable estimates.
+MIN_STRATUM_ROWS = 500
+CONFIDENCE = 0.95
+Z_SCORE = 1.959964  # Two-sided normal quantile for CONFIDENCE
+SAMPLE_SEED = 0
+
+
+class Estimate(NamedTuple):
+    result: Any
+    # Interval, sample sizes and method, returned next to the result.
+    approximation: Dict[str, Any]
+
+
+def supports_approximation(filter_object: FilterObject) -> bool:
+    return filter_object.operation in APPROXIMATE_OPERATIONS and not filter_object.group_by
+
+
+def _strata(columns: TrafficColumns, start: int = 0) -> np.ndarray:
+    # One key per (Direction, Lane) pair. Codes of existing labels never change
+    # when rows are appended, so keys stay stable across snapshots.
+    return (columns.direction_codes[start:].astype(np.int64) << 32) | columns.lane[start:].astype(np.int64)
+
+
+def _rows_by_stratum(keys: np.ndarray, offset: int) -> Dict[int, np.ndarray]:
+    # Row ids (plus ``offset``) of each distinct key, ascending.
+    order = np.argsort(keys, kind="stable")
+    unique, starts = np.unique(keys[order], return_index=True)
+    groups = np.split(order + offset, starts[1:])
+    return {int(key): rows for key, rows in zip(unique.tolist(), groups)}
+
+
+class StratifiedSample:
+    """Uniform random rows of every (Direction, Lane) stratum of a snapshot.
+
+    Each stratum keeps a reservoir of row ids sized in proportion to the
+    stratum, so estimates weight each sampled row by ``seen / kept`` for its
+    stratum. Snapshots only grow, so a later snapshot's sample is derived by
+    feeding just the appended rows through the reservoirs (Algorithm R);
+    every stratum stays a uniform sample of all its rows.
+    """
+
+    def __init__(self, capacity: Dict[int, int], seen: Dict[int, int], reservoirs: Dict[int, np.ndarray],
+                 columns: TrafficColumns, rng: np.random.Generator):
+        self.capacity = capacity
+        self.seen = seen
+        self.reservoirs = reservoirs
+        self.rows = len(columns)
+        self.lineage = columns.lineage
+        self.rng = rng
+        keys = sorted(reservoirs)
+        ids = np.concatenate([reservoirs[key] for key in keys]) if keys else np.empty(0, dtype=np.int64)
+        # Per sampled row: its stratum's position in the arrays below.
+        self.stratum = np.repeat(np.arange(len(keys)), [len(reservoirs[key]) for key in keys])
+        self.population = np.array([seen[key] for key in keys], dtype=np.float64)
+        self.kept = np.array([len(reservoirs[key]) for key in keys], dtype=np.float64)
+        self.columns = TrafficColumns(
+            collection_time=columns.collection_time[ids],
+            direction_codes=columns.direction_codes[ids],
+            direction_labels=columns.direction_labels,
+            lane=columns.lane[ids],
+            speed=columns.speed[ids],
+        )
+
+    @classmethod
+    def build(cls, columns: TrafficColumns, budget: int, seed: int = SAMPLE_SEED) -> "StratifiedSample":
+        rng = np.random.default_rng(seed)
+        total = max(len(columns), 1)
+        capacity, seen, reservoirs = {}, {}, {}
+        for key, rows in _rows_by_stratum(_strata(columns), 0).items():
+            capacity[key] = max(MIN_STRATUM_ROWS, round(budget * len(rows) / total))
+            seen[key] = len(rows)
+            kept = rows if len(rows) <= capacity[key] else rng.choice(rows, capacity[key], replace=False)
+            reservoirs[key] = np.sort(kept)
+        return cls(capacity, seen, reservoirs, columns, rng)
+
+    def extended(self, columns: TrafficColumns) -> "StratifiedSample":
+        """Sample of ``columns``, which is this sample's snapshot plus appended rows."""
+        capacity, seen, reservoirs = dict(self.capacity), dict(self.seen), dict(self.reservoirs)
+        rng = np.random.default_rng(self.rng.bit_generator.random_raw())
+        for key, rows in _rows_by_stratum(_strata(columns, self.rows), self.rows).items():
+            limit = capacity.setdefault(key, MIN_STRATUM_ROWS)
+            reservoir = reservoirs.get(key, np.empty(0, dtype=np.int64))
+            count = seen.get(key, 0)
+            # Fill the reservoir first, then each later row replaces a random
+            # slot with probability limit / rows seen so far.
+            room = max(limit - len(reservoir), 0)
+            reservoir = np.concatenate([reservoir, rows[:room]])
+            rest = rows[room:]
+            count += min(room, len(rows))
+            if len(rest):
+                slots = np.floor(rng.random(len(rest)) * np.arange(count + 1, count + len(rest) + 1)).astype(np.int64)
+                accepted = np.flatnonzero(slots < limit)
+                if len(accepted):
+                    reservoir = reservoir.copy()
+                    for position in accepted.tolist():
+                        reservoir[slots[position]] = rest[position]
+                count += len(rest)
+            seen[key] = count
+            reservoirs[key] = np.sort(reservoir)
+        return StratifiedSample(capacity, seen, reservoirs, columns, rng)
+
+    def estimate(self, filter_object: FilterObject) -> Estimate:
+        """Estimate a supported aggregate with a CONFIDENCE interval for each value."""
+        matched = apply_filter_mask(self.columns, filter_object.conditions)
+        hits = np.bincount(self.stratum[matched], minlength=len(self.kept)).astype(np.float64)
+        # Finite population correction: fully kept strata contribute no error.
+        correction = 1.0 - self.kept / np.maximum(self.population, 1.0)
+        operation = filter_object.operation
+        if operation == "count_vehicles":
+            result, interval = self._count(hits, correction)
+        elif operation == "average_speed":
+            result, interval = self._average(matched, hits, correction)
+        else:
+            result, interval = self._percentiles(matched, hits)
+        return Estimate(result, {
+            "method": "stratified_sample",
+            "confidence": CONFIDENCE,
+            "interval": interval,
+            "sample_rows": len(self.stratum),
+            "matched_sample_rows": len(matched),
+            "population_rows": self.rows,
+            "strata": len(self.kept),
+        })
+
+    def _count(self, hits: np.ndarray, correction: np.ndarray) -> Tuple[Dict, Dict]:
+        shares = hits / np.maximum(self.kept, 1.0)
+        count = float(np.sum(self.population * shares))
+        variance = np.sum(
+            self.population ** 2 * correction * shares * (1 - shares) / np.maximum(self.kept - 1, 1.0)
+        )
+        low, high = count - Z_SCORE * math.sqrt(variance), count + Z_SCORE * math.sqrt(variance)
+        if hits.sum() == 0:
+            # Nothing matched: bound the count by the "rule of three" per sampled stratum.
+            high = float(np.sum(np.where(correction > 0, self.population * np.minimum(3 / np.maximum(self.kept, 1.0), 1), 0)))
+        # At least the matched sample rows exist, and no more rows than the snapshot has.
+        low, high = max(low, hits.sum()), min(high, self.rows)
+        return {"count": round(count)}, {"count": [math.floor(low), math.ceil(high)]}
+
+    def _average(self, matched: np.ndarray, hits: np.ndarray, correction: np.ndarray) -> Tuple[Dict, Dict]:
+        # Like the exact (SQL) answer: unrounded, and None when no row matches.
+        if len(matched) == 0:
+            return {"average_speed": None}, {"average_speed": None}
+        speeds = self.columns.speed[matched].astype(np.float64)
+        strata = self.stratum[matched]
+        weights = (self.population / self.kept)[strata]
+        average = float(np.sum(weights * speeds) / np.sum(weights))
+        # Ratio estimator; its variance comes from the residuals speed - average
+        # of matched rows (unmatched sampled rows have residual 0).
+        residuals = speeds - average
+        sums = np.bincount(strata, residuals, minlength=len(self.kept))
+        squares = np.bincount(strata, residuals ** 2, minlength=len(self.kept))
+        spread = (squares - sums ** 2 / self.kept) / np.maximum(self.kept - 1, 1.0)
+        matched_rows = np.sum(self.population * hits / self.kept)
+        variance = np.sum(self.population ** 2 * correction * spread / self.kept) / matched_rows ** 2
+        margin = Z_SCORE * math.sqrt(max(variance, 0.0))
+        return {"average_speed": average}, {"average_speed": [average - margin, average + margin]}
+
+    def _percentiles(self, matched: np.ndarray, hits: np.ndarray) -> Tuple[Dict, Dict]:
+        if len(matched) == 0:
+            return empty_percentiles(), {percentile_key(p): None for p in SPEED_PERCENTILES}
+        order = np.argsort(self.columns.speed[matched], kind="stable")
+        speeds = self.columns.speed[matched][order]
+        weights = (self.population / self.kept)[self.stratum[matched]][order]
+        cumulative = np.cumsum(weights)
+        total = float(cumulative[-1])
+        # Woodruff intervals: bound the share of rows at or below the
+        # percentile, then read speeds at those shares. The effective sample
+        # size accounts for unequal weights across strata.
+        effective = total ** 2 / float(np.sum(weights ** 2))
+        correction = max(1.0 - len(matched) / total, 0.0)
+
+        def speed_at(share: float) -> int:
+            position = np.searchsorted(cumulative, min(max(share, 0.0), 1.0) * total * (1 - 1e-12), side="left")
+            return int(speeds[min(position, len(speeds) - 1)])
+
+        result, interval = {}, {}
+        for percentile in SPEED_PERCENTILES:
+            share = percentile / 100
+            margin = Z_SCORE * math.sqrt(correction * share * (1 - share) / effective)
+            result[percentile_key(percentile)] = speed_at(share)
+            interval[percentile_key(percentile)] = [speed_at(share - margin), speed_at(share + margin)]
+        return result, interval
+
+    def stats(self) -> Dict[str, Any]:
+        return {"rows": self.rows, "sample_rows": len(self.stratum), "strata": len(self.kept)}
+
+
+def sample_budget() -> int:
+    return int(os.environ.get("ROSA_SAMPLE_ROWS", DEFAULT_SAMPLE_ROWS))
+
+
+_sample: Optional[StratifiedSample] = None
+_sample_source: Optional[TrafficColumns] = None
+_sample_lock = threading.Lock()
+
+
+def get_sample(columns: TrafficColumns) -> StratifiedSample:
+    """The sample of ``columns``, carried forward from the previous snapshot when it only grew."""
+    global _sample, _sample_source
+    with _sample_lock:
+        if _sample_source is columns and _sample is not None:
+            return _sample
+        if (
+            _sample is not None
+            and columns.lineage is not None
+            and columns.lineage == _sample.lineage
+            and len(columns) >= _sample.rows
+        ):
+            _sample = _sample.extended(columns)
+        else:
+            _sample = StratifiedSample.build(columns, sample_budget())
+        _sample_source = columns
+        return _sample
+
+
+def estimate_filter(columns: TrafficColumns, filter_object: FilterObject) -> Estimate:
+    return get_sample(columns).estimate(filter_object)
@@ -0,0 +1,154 @@
+import json
+from collections.abc import Sequence
+from json.encoder import encode_basestring
+from operator import itemgetter
+from typing import Any, Dict, Iterator, List, Tuple
+
+# The options starlette's JSONResponse renders with; every fast path below
+# produces exactly the bytes json.dumps gives with them.
+JSON_OPTIONS: Dict[str, Any] = {"ensure_ascii": False, "allow_nan": False, "indent": None, "separators": (",", ":")}
+RESPONSE_SHAPES = ("records", "columnar")
+
+
+class RowSet(Sequence):
+    """Rows of a list result, kept as column names plus one value tuple per row.
+
+    Indexing and iterating give the usual row dicts, so every consumer of
+    list results keeps working; encode_json writes the tuples straight to
+    JSON without ever building those dicts.
+    """
+
+    __slots__ = ("columns", "rows")
+
+    def __init__(self, columns: Sequence, rows: List[tuple]):
+        self.columns: Tuple[str, ...] = tuple(columns)
+        self.rows = rows
+
+    @classmethod
+    def from_records(cls, records: List[Dict[str, Any]]) -> "RowSet":
+        # Rows share the first row's keys, as every engine's rows do.
+        if not records:
+            return cls((), [])
+        columns = tuple(records[0])
+        if len(columns) == 1:
+            return cls(columns, [(record[columns[0]],) for record in records])
+        return cls(columns, list(map(itemgetter(*columns), records)))
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return RowSet(self.columns, self.rows[index])
+        return dict(zip(self.columns, self.rows[index]))
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        columns = self.columns
+        return (dict(zip(columns, row)) for row in self.rows)
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, RowSet) and other.columns == self.columns:
+            return other.rows == self.rows
+        if isinstance(other, (RowSet, list)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return f"RowSet({list(self.columns)!r}, {len(self.rows)} rows)"
+
+    def with_column(self, name: str, values: Sequence) -> "RowSet":
+        return RowSet(self.columns + (name,), [row + (value,) for row, value in zip(self.rows, values)])
+
+    def without(self, name: str) -> "RowSet":
+        if name not in self.columns:
+            return self
+        keep = [i for i, column in enumerate(self.columns) if column != name]
+        pick = itemgetter(*keep) if len(keep) > 1 else (lambda row: (row[keep[0]],))
+        return RowSet([self.columns[i] for i in keep], list(map(pick, self.rows)))
+
+
+def is_rows(value: Any) -> bool:
+    """Whether ``value`` is a list result: a list or a RowSet."""
+    return isinstance(value, (list, RowSet))
+
+
+def json_default(value: Any) -> Any:
+    # ``default`` hook for json.dumps: RowSets become lists of row dicts.
+    if isinstance(value, RowSet):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _encode_column(values: Sequence) -> List[str]:
+    # One JSON text per value. Plain strings and ints, the usual case, go
+    # through the C encoders json.dumps itself uses.
+    kinds = set(map(type, values))
+    if kinds <= {str}:
+        return list(map(encode_basestring, values))
+    if kinds <= {int}:
+        return list(map(int.__repr__, values))
+    return [json.dumps(value, **JSON_OPTIONS) for value in values]
+
+
+def _encode_rows(rows: List[tuple], template: str) -> str:
+    # Every row formatted through ``template``, which has one %s per column.
+    if not rows:
+        return "[]"
+    encoded = [_encode_column(column) for column in zip(*rows)]
+    return "[" + ",".join(map(template.__mod__, zip(*encoded))) + "]"
+
+
+def encode_records(rows: RowSet) -> str:
+    """The RowSet as a JSON array of row objects, as json.dumps(list(rows)) gives it."""
+    fields = ",".join(encode_basestring(column).replace("%", "%%") + ":%s" for column in rows.columns)
+    return _encode_rows(rows.rows, "{" + fields + "}")
+
+
+def encode_columnar(rows: RowSet) -> str:
+    """The RowSet as ``{"columns": [...], "rows": [[...], ...]}``."""
+    template = "[" + ",".join(["%s"] * len(rows.columns)) + "]"
+    columns = json.dumps(list(rows.columns), **JSON_OPTIONS)
+    return '{"columns":' + columns + ',"rows":' + _encode_rows(rows.rows, template) + "}"
+
+
+class Columnar:
+    """Marks a RowSet to be encoded in the columnar shape."""
+
+    __slots__ = ("rows",)
+
+    def __init__(self, rows: RowSet):
+        self.rows = rows
+
+
+def to_shape(result: Any, shape: str) -> Any:
+    """``result`` in the requested response shape; only list results have a columnar form."""
+    if shape == "columnar" and is_rows(result):
+        return Columnar(result if isinstance(result, RowSet) else RowSet.from_records(result))
+    return result
+
+
+def _encode_value(value: Any) -> str:
+    if isinstance(value, RowSet):
+        return encode_records(value)
+    if isinstance(value, Columnar):
+        return encode_columnar(value.rows)
+    return json.dumps(value, default=json_default, **JSON_OPTIONS)
+
+
+def encode_json(content: Any) -> bytes:
+    """JSONResponse's rendering of ``content``, byte for byte.
+
+    RowSets (and columnar results) among the top-level values of a dict
+    are encoded column by column straight from their tuples; everything
+    else goes through json.dumps as before.
+    """
+    if isinstance(content, dict) and all(type(key) is str for key in content):
+        # Same layout json.dumps gives a dict: no spaces, keys in order.
+        text = "{" + ",".join(
+            encode_basestring(key) + ":" + _encode_value(value) for key, value in content.items()
+        ) + "}"
+    else:
+        text = _encode_value(content)
+    return text.encode("utf-8")
@@ -0,0 +1,79 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key into one execution.
+
+    The first caller for a key (the leader) starts the work as a task; callers
+    arriving while it runs await the same task and get the same result or
+    exception. Nothing is cached: once the task finishes, the next call starts
+    fresh. A caller that is cancelled only stops waiting; the work is
+    cancelled once no caller is left waiting for it.
+
+    Tasks belong to one event loop, so in-flight work is tracked per loop.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._in_flight: Dict[Hashable, "_Flight"] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.shared = 0
+
+    async def run(self, key: Hashable, work: Callable[[], Awaitable[Any]]) -> Any:
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop, self._in_flight = loop, {}
+        flight = self._in_flight.get(key)
+        if flight is None:
+            flight = _Flight(loop.create_task(work()))
+            self._in_flight[key] = flight
+            flight.task.add_done_callback(lambda _: self._finished(key, flight))
+            with self._lock:
+                self.leaders += 1
+        else:
+            with self._lock:
+                self.shared += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if not flight.task.done() and flight.waiters == 1:
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def _finished(self, key: Hashable, flight: "_Flight") -> None:
+        if self._in_flight.get(key) is flight:
+            del self._in_flight[key]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"leaders": self.leaders, "shared": self.shared, "in_flight": len(self._in_flight)}
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Task[Any]"):
+        self.task = task
+        self.waiters = 0
+
+
+_question_flight = SingleFlight("questions")
+_query_flight = SingleFlight("queries")
+
+
+def get_question_flight() -> SingleFlight:
+    """Coalesces LLM calls for the same normalized question."""
+    return _question_flight
+
+
+def get_query_flight() -> SingleFlight:
+    """Coalesces executions of the same canonical filter."""
+    return _query_flight
@@ -0,0 +1,129 @@
+import json
+import logging
+import os
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from ..models.aiModel import FilterObject
+from .column_store import get_traffic_columns
+from .indexes import explain_selection
+from .metrics import RequestTimings
+from .sql_engine import explain_sql_statement, plan_sql_statement
+
+DEFAULT_THRESHOLD_MS = 500.0
+DEFAULT_MAX_ENTRIES = 200
+
+logger = logging.getLogger("rosa.slow_queries")
+
+
+def explain_filter_sql(filter_object: FilterObject) -> Dict[str, Any]:
+    # EXPLAIN QUERY PLAN only plans the statement, so this stays cheap even for slow queries.
+    return explain_sql_statement(plan_sql_statement(filter_object))
+
+
+def explain_engine(filter_object: FilterObject, engine: Optional[str]) -> Dict[str, Any]:
+    """Plan of the engine that answered the request.
+
+    SQLite's query plan for SQL (and streamed) answers, the index selection
+    for the Python engine; cached and sampled answers read no plan at all.
+    """
+    if engine == "python":
+        return explain_selection(get_traffic_columns(), filter_object.conditions)
+    if engine in (None, "sql"):
+        return explain_filter_sql(filter_object)
+    return {"engine": engine}
+
+
+class SlowQueryLog:
+    """Requests that took ``threshold_ms`` or longer, with their filter, plan and timings.
+
+    The newest ``max_entries`` are kept in memory. Every entry is also logged
+    as one JSON line on the ``rosa.slow_queries`` logger and, if ``path`` is
+    set, appended to that file, so indexes can be tuned from real traffic.
+    A negative threshold turns the log off.
+
+    ``slow_ms`` is cheap and can run anywhere; ``record`` explains the plan
+    and writes the file, so request handlers run it off the event loop.
+    """
+
+    def __init__(
+        self,
+        threshold_ms: float = DEFAULT_THRESHOLD_MS,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        path: Optional[Path] = None,
+        explain: Callable[[FilterObject, Optional[str]], Dict[str, Any]] = explain_engine,
+    ):
+        self.threshold_ms = threshold_ms
+        self.path = Path(path) if path else None
+        self._explain = explain
+        self._entries: "deque[Dict[str, Any]]" = deque(maxlen=max_entries)
+        self._lock = threading.Lock()
+        self.recorded = 0
+
+    def slow_ms(self, timings: RequestTimings) -> Optional[float]:
+        """The request's duration in milliseconds if it is slow enough to record, else None."""
+        if self.threshold_ms < 0 or timings.filter_object is None:
+            return None
+        duration_ms = timings.elapsed() * 1000
+        return duration_ms if duration_ms >= self.threshold_ms else None
+
+    def observe(self, timings: RequestTimings) -> Optional[Dict[str, Any]]:
+        """Blocking: record the request if it was slow; returns the entry, or None."""
+        duration_ms = self.slow_ms(timings)
+        return None if duration_ms is None else self.record(timings, duration_ms)
+
+    def record(self, timings: RequestTimings, duration_ms: float) -> Dict[str, Any]:
+        """Blocking: explain the request's plan and keep the entry."""
+        try:
+            plan = self._explain(timings.filter_object, timings.engine)
+        except Exception as exc:  # The request already succeeded; never fail it over logging.
+            plan = {"error": str(exc)}
+        entry = {
+            "time": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            "endpoint": timings.endpoint,
+            "duration_ms": round(duration_ms, 3),
+            "filter": timings.filter_object.model_dump(exclude_none=True),
+            "engine": timings.engine,
+            "plan": plan,
+            "stages_ms": [[name, round(seconds * 1000, 3)] for name, seconds in timings.stages],
+            "rows_scanned": timings.rows_scanned,
+            "rows_returned": timings.rows_returned,
+        }
+        line = json.dumps(entry)
+        with self._lock:
+            self._entries.append(entry)
+            self.recorded += 1
+            if self.path is not None:
+                with open(self.path, "a") as file:
+                    file.write(line + "\n")
+        logger.warning("slow query: %s", line)
+        return entry
+
+    def entries(self) -> List[Dict[str, Any]]:
+        # Newest first.
+        with self._lock:
+            return list(reversed(self._entries))
+
+    def stats(self) -> Dict[str, Any]:
+        return {"threshold_ms": self.threshold_ms, "recorded": self.recorded, "entries": self.entries()}
+
+
+_slow_query_log: Optional[SlowQueryLog] = None
+_slow_query_log_lock = threading.Lock()
+
+
+def get_slow_query_log() -> SlowQueryLog:
+    """Process-wide log configured from ROSA_SLOW_QUERY_* environment variables."""
+    global _slow_query_log
+    if _slow_query_log is None:
+        with _slow_query_log_lock:
+            if _slow_query_log is None:
+                _slow_query_log = SlowQueryLog(
+                    threshold_ms=float(os.environ.get("ROSA_SLOW_QUERY_MS", DEFAULT_THRESHOLD_MS)),
+                    max_entries=int(os.environ.get("ROSA_SLOW_QUERY_ENTRIES", DEFAULT_MAX_ENTRIES)),
+                    path=os.environ.get("ROSA_SLOW_QUERY_LOG") or None,
+                )
+    return _slow_query_log
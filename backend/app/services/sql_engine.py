@@ -1,99 +1,532 @@
-from ..models.aiModel import FilterObject
-from .filter_engine import load_traffic_data
+from ..models.aiModel import FilterCondition, FilterObject
+from .operations import SPEED_PERCENTILES, percentile_key, window_minutes
+from .metrics import RequestTimings
+from .pagination import AGGREGATE_OPERATIONS, ROWID_KEY, decode_cursor, is_paged
+from .partitions import ALL_ROWS_VIEW, DATA_COLUMNS, PARTITION_PREFIX, PUBLIC_VIEW, ROW_COLUMNS, prune_partitions
+from .rollups import ROLLUP_AGGREGATES, ROLLUP_TABLES, rollup_plan
+from .serialization import RowSet
+from .traffic_store import STATEMENT_CACHE_SIZE, get_store
+import json
+import re
 import sqlite3
-from typing import Dict, Any
+import time
+from functools import lru_cache
+from typing import Dict, Any, Iterator, List, NamedTuple, Optional, Sequence, Tuple
 
+STREAM_BATCH_SIZE = 1000
+NUMERIC_FIELDS = ("Lane", "Speed")
+SQL_OPERATORS = {"==", "!=", ">", "<", ">=", "<="}
+# Field names are spliced into the SQL text, so they must be plain identifiers.
+_IDENTIFIER_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+_ROW_SOURCE_RE = re.compile(rf"\b(?:{PARTITION_PREFIX}\d{{8}}|{ALL_ROWS_VIEW}|{PUBLIC_VIEW})\b")
+
+# SQL expression and result key for each aggregate operation.
+AGGREGATES = {
+    "count_vehicles": ("COUNT(*)", "count"),
+    "average_speed": ("AVG(Speed)", "average_speed"),
+    "max_speed": ("MAX(Speed)", "max_speed"),
+    "min_speed": ("MIN(Speed)", "min_speed"),
+}
+# Operations answered with exactly one row, returned as a dict instead of a list.
+SINGLE_ROW_OPERATIONS = set(AGGREGATES) | {"speed_percentiles"}
+
+
+def returns_single_row(filter_object: FilterObject) -> bool:
+    # Grouped aggregates return one row per group instead.
+    return filter_object.operation in SINGLE_ROW_OPERATIONS and not filter_object.group_by
+
+
+class SqlStatement(NamedTuple):
+    """Parameterized SQL text plus the values bound to its ``?`` placeholders."""
+
+    sql: str
+    params: Tuple[Any, ...] = ()
+
+
+def _identifier(name: str) -> str:
+    if not _IDENTIFIER_RE.match(name):
+        raise ValueError(f"Invalid field name '{name}'.")
+    return name
+
+
+def _bind_value(field: str, value: str) -> Any:
+    # Numbers are bound as numbers; anything else is bound as text, so no
+    # value ever needs quoting.
+    if field in NUMERIC_FIELDS:
+        for convert in (int, float):
+            try:
+                return convert(value)
+            except ValueError:
+                pass
+    return value
+
+
+def _condition_sql(field: str, operator: str) -> str:
+    if operator not in SQL_OPERATORS:
+        raise ValueError(f"Invalid operator '{operator}'.")
+    return f"{_identifier(field)} {operator} ?"
+
+
+def _query_shape(filter_object: FilterObject) -> Tuple:
+    # Everything that changes the SQL text; values only change the parameters.
+    paged = is_paged(filter_object)
+    operation = filter_object.operation if filter_object.operation in AGGREGATE_OPERATIONS else None
+    return (
+        (operation, window_minutes(filter_object)) if operation == "count_by_window" else operation,
+        tuple((c.field, c.operator) for c in filter_object.conditions),
+        filter_object.sort_by or None,
+        filter_object.sort_direction or "ascending",
+        paged,
+        paged and filter_object.cursor is not None,
+        paged and filter_object.limit is not None,
+        paged and bool(filter_object.offset),
+        tuple(filter_object.group_by or ()) if operation else (),
+    )
+
+
+@lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def _compile_shape(shape: Tuple, source: str = PUBLIC_VIEW, row_id: str = "rowid", columns: str = "*") -> str:
+    # ``source`` is what the rows are read from, ``row_id`` its stable row
+    # number and ``columns`` the row columns returned by list queries.
+    operation, conditions, sort_by, sort_direction, paged, has_cursor, has_limit, has_offset, group_by = shape
+
+    if operation == "speed_percentiles":
+        return _percentiles_sql(source, conditions, group_by)
+    if isinstance(operation, tuple):  # ("count_by_window", minutes)
+        return _window_sql(source, "CollectionTime", "COUNT(*)", operation[1], conditions, group_by)
+    if operation and group_by:
+        expression, alias = AGGREGATES[operation]
+        return f"SELECT {_group_columns(group_by)}{expression} as {alias} FROM {source}{_where(conditions)}" + (
+            _group_clause(group_by)
+        )
 
-def generate_sql_query(filter_object: FilterObject) -> str:
-    """Generate SQL query from FilterObject for demonstration purposes only.
-    
-    This shows users what SQL query would be executed, even though
-    the actual filtering is done by the Python filter_engine.
-    """
     # Build SELECT clause based on operation
-    if filter_object.operation == "count_vehicles":
-        select_clause = "COUNT(*) as count"
-    elif filter_object.operation == "average_speed":
-        select_clause = "AVG(Speed) as average_speed"
-    elif filter_object.operation == "max_speed":
-        select_clause = "MAX(Speed) as max_speed"
+    if operation:
+        expression, alias = AGGREGATES[operation]
+        select_clause = f"{expression} as {alias}"
+    elif paged:
+        # The row id is needed to build the next-page cursor.
+        select_clause = f"{row_id} AS {ROWID_KEY}, {columns}"
     else:  # list_vehicles
-        select_clause = "*"
-    
-    # Build WHERE clause from conditions
-    where_parts = []
-    for condition in filter_object.conditions:
-        field = condition.field
-        operator = condition.operator
-        value = condition.value
-        
-        # Handle string vs numeric comparisons
-        if field in ("Direction",):
-            # String comparison - quote the value
-            where_parts.append(f"{field} {operator} '{value}'")
+        select_clause = columns
+
+    where_parts = [_condition_sql(field, operator) for field, operator in conditions]
+    if has_cursor:
+        # Rows strictly after the cursor in (sort_by, rowid) order.
+        if sort_by:
+            field = _identifier(sort_by)
+            comparison = "<" if sort_direction == "descending" else ">"
+            where_parts.append(f"({field} {comparison} ? OR ({field} = ? AND {row_id} > ?))")
         else:
-            # Numeric comparison - no quotes
-            where_parts.append(f"{field} {operator} {value}")
-    
-    where_clause = " AND ".join(where_parts) if where_parts else ""
-    
-    # Build ORDER BY clause
+            where_parts.append(f"{row_id} > ?")
+
+    # Build ORDER BY clause; paged queries break ties by rowid so pages are stable
     order_clause = ""
-    if filter_object.sort_by:
-        direction = filter_object.sort_direction or "ascending"
-        order_direction = "ASC" if direction == "ascending" else "DESC"
-        order_clause = f"ORDER BY {filter_object.sort_by} {order_direction}"
-    
+    if sort_by:
+        order_direction = "ASC" if sort_direction == "ascending" else "DESC"
+        order_clause = f"ORDER BY {_identifier(sort_by)} {order_direction}"
+        if paged:
+            order_clause += f", {row_id} ASC"
+    elif paged:
+        order_clause = f"ORDER BY {row_id} ASC"
+
+    # Build LIMIT/OFFSET clause (SQLite needs a LIMIT before OFFSET)
+    limit_clause = ""
+    if has_limit or has_offset:
+        limit_clause = "LIMIT ?"
+        if has_offset:
+            limit_clause += " OFFSET ?"
+
     # Combine into full SQL query
-    sql = f"SELECT {select_clause} FROM vehicles"
-    if where_clause:
-        sql += f" WHERE {where_clause}"
+    sql = f"SELECT {select_clause} FROM {source}"
+    if where_parts:
+        sql += " WHERE " + " AND ".join(where_parts)
     if order_clause:
         sql += f" {order_clause}"
-    
+    if limit_clause:
+        sql += f" {limit_clause}"
     return sql
 
 
-#Execute SQL query against traffic data using SQLite.
-def execute_sql_query(sql_query: str) -> Dict[str, Any]:
-    # Load traffic data
-    records = load_traffic_data()
-    
-    # Create in-memory SQLite connection
-    conn = sqlite3.connect(":memory:")
-    conn.row_factory = sqlite3.Row
+def _where(conditions: Tuple[Tuple[str, str], ...]) -> str:
+    if not conditions:
+        return ""
+    return " WHERE " + " AND ".join(_condition_sql(field, operator) for field, operator in conditions)
+
+
+def _group_columns(group_by: Tuple[str, ...]) -> str:
+    # Group columns lead the SELECT list, so each result row names its group.
+    return "".join(f"{_identifier(field)}, " for field in group_by)
+
+
+def _group_clause(group_by: Tuple[str, ...], *keys: str) -> str:
+    # GROUP BY and ORDER BY the groups, then ``keys``; empty when nothing is grouped.
+    names = [_identifier(field) for field in group_by] + list(keys)
+    if not names:
+        return ""
+    return f" GROUP BY {', '.join(names)} ORDER BY {', '.join(names)}"
+
+
+def _percentiles_sql(source: str, conditions: Tuple[Tuple[str, str], ...], group_by: Tuple[str, ...] = ()) -> str:
+    # One sort numbers the matching speeds (per group); each percentile is the
+    # first speed whose rank reaches ceil(p * n / 100), i.e. rn * 100 >= p * n.
+    select_clause = ", ".join(
+        f"MIN(CASE WHEN rn * 100 >= {p} * n THEN Speed END) AS {percentile_key(p)}" for p in SPEED_PERCENTILES
+    )
+    partition = f"PARTITION BY {', '.join(_identifier(field) for field in group_by)}" if group_by else ""
+    ranked = (
+        f"SELECT {_group_columns(group_by)}Speed,"
+        f" ROW_NUMBER() OVER ({partition + ' ' if partition else ''}ORDER BY Speed) AS rn,"
+        f" COUNT(*) OVER ({partition}) AS n"
+        f" FROM {source}{_where(conditions)}"
+    )
+    return f"SELECT {_group_columns(group_by)}{select_clause} FROM ({ranked}){_group_clause(group_by)}"
+
+
+def _window_sql(
+    source: str,
+    time_expression: str,
+    count_expression: str,
+    minutes: int,
+    conditions: Tuple[Tuple[str, str], ...],
+    group_by: Tuple[str, ...] = (),
+) -> str:
+    # Windows are whole multiples of ``minutes`` since the epoch, which for
+    # windows dividing a day means since midnight.
+    width = int(minutes) * 60
+    window = f"datetime(CAST(strftime('%s', {time_expression}) AS INTEGER) / {width} * {width}, 'unixepoch')"
+    return (
+        f"SELECT {_group_columns(group_by)}{window} AS window_start, {count_expression} AS count"
+        f" FROM {source}{_where(conditions)}{_group_clause(group_by, 'window_start')}"
+    )
+
+
+def _statement(filter_object: FilterObject, **source: str) -> SqlStatement:
+    shape = _query_shape(filter_object)
+    params = [_bind_value(c.field, c.value) for c in filter_object.conditions]
+    _, _, sort_by, _, paged, has_cursor, has_limit, has_offset, _ = shape
+    if has_cursor:
+        sort_value, rowid = decode_cursor(filter_object.cursor, sort_by)
+        params += [sort_value, sort_value, rowid] if sort_by else [rowid]
+    if has_limit or has_offset:
+        params.append(filter_object.limit if has_limit else -1)
+        if has_offset:
+            params.append(filter_object.offset)
+    return SqlStatement(_compile_shape(shape, **source), tuple(params))
+
+
+def build_sql_statement(filter_object: FilterObject) -> SqlStatement:
+    """Parameterized statement for a FilterObject, written against the vehicles view.
+
+    The SQL text depends only on the query's shape (operation, condition
+    fields and operators, sort, paging) and is compiled once per shape.
+    Values travel as parameters, so SQLite's per-connection statement cache
+    reuses the prepared statement for every question with the same shape.
+    Raises ValueError for field names or operators that cannot be used.
+    Paged listings read the vehicle_rows view instead, whose ``id`` column
+    is the row id their cursors use; the vehicles view has no row id.
+    """
+    if is_paged(filter_object):
+        return _statement(filter_object, source=ALL_ROWS_VIEW, row_id="id", columns=DATA_COLUMNS)
+    return _statement(filter_object)
+
+
+# Row source of a query whose CollectionTime range matches no partition.
+_EMPTY_ROW_SOURCE = f"(SELECT {ROW_COLUMNS} FROM {ALL_ROWS_VIEW} WHERE 0)"
+
+
+def _row_source(conditions: List[FilterCondition]) -> str:
+    # Read only the day partitions that CollectionTime conditions can match.
+    partitions = get_store().partitions()
+    tables = prune_partitions(partitions, conditions)
+    if tables is None or len(tables) == len(partitions):
+        return ALL_ROWS_VIEW
+    if not tables:
+        return _EMPTY_ROW_SOURCE
+    return "(" + " UNION ALL ".join(f"SELECT {ROW_COLUMNS} FROM {table}" for table in tables) + ")"
+
+
+_ROLLUP_PREFIXES = dict(ROLLUP_TABLES.values())
+_ROLLUP_TABLE_NAMES = set(_ROLLUP_PREFIXES)
+
+
+@lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def _compile_aggregate(
+    table: str,
+    operations: Tuple[str, ...],
+    conditions: Tuple[Tuple[str, str], ...],
+    group_by: Tuple[str, ...] = (),
+) -> str:
+    # One SELECT computing every operation over ``table``, raw rows or rollup,
+    # once per group when grouped.
+    expressions = ROLLUP_AGGREGATES if table in _ROLLUP_TABLE_NAMES else AGGREGATES
+    select_clause = ", ".join(f"{expressions[op][0]} as {expressions[op][1]}" for op in operations)
+    return f"SELECT {_group_columns(group_by)}{select_clause} FROM {table}{_where(conditions)}{_group_clause(group_by)}"
+
+
+def aggregate_statement(
+    operations: Sequence[str], conditions: List[FilterCondition], group_by: Sequence[str] = ()
+) -> SqlStatement:
+    """Cheapest statement computing ``operations`` over rows matching ``conditions``.
+
+    Conditions and groups on Direction/Lane and whole-hour or whole-minute
+    time ranges are answered from the pre-aggregated rollup tables; anything
+    else (e.g. a Speed range) scans the raw rows of the day partitions it can
+    match.
+    """
+    triples = [(c.field, c.operator, c.value) for c in conditions]
+    plan = rollup_plan(triples, group_by=group_by)
+    if plan is not None:
+        table, triples = plan
+    else:
+        table = _row_source(conditions)
+    shape = tuple((field, operator) for field, operator, _ in triples)
+    params = tuple(_bind_value(field, value) for field, _, value in triples)
+    return SqlStatement(_compile_aggregate(table, tuple(operations), shape, tuple(group_by)), params)
+
+
+@lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def _compile_rollup_windows(
+    table: str, minutes: int, conditions: Tuple[Tuple[str, str], ...], group_by: Tuple[str, ...] = ()
+) -> str:
+    # Buckets are named by a CollectionTime prefix; pad it back to a timestamp.
+    prefix = _ROLLUP_PREFIXES[table]
+    bucket_time = f"Bucket || '{'0000-00-00 00:00:00'[prefix:]}'"
+    return _window_sql(table, bucket_time, "SUM(vehicle_count)", minutes, conditions, group_by)
+
+
+def rollup_window_statement(
+    minutes: int, conditions: List[FilterCondition], group_by: Sequence[str] = ()
+) -> Optional[SqlStatement]:
+    """Vehicle counts per ``minutes`` window summed from a rollup whose buckets fit the windows.
+
+    None when the conditions or groups need raw rows.
+    """
+    plan = rollup_plan([(c.field, c.operator, c.value) for c in conditions], minutes, group_by)
+    if plan is None:
+        return None
+    table, triples = plan
+    shape = tuple((field, operator) for field, operator, _ in triples)
+    params = tuple(_bind_value(field, value) for field, _, value in triples)
+    return SqlStatement(_compile_rollup_windows(table, minutes, shape, tuple(group_by)), params)
+
+
+def plan_sql_statement(filter_object: FilterObject) -> SqlStatement:
+    """Statement to execute for a FilterObject.
+
+    Aggregates go through aggregate_statement and may be served from rollups.
+    Everything else reads the day partitions left after pruning on
+    CollectionTime, paging by the stored row id. Results are identical to
+    running build_sql_statement against the vehicles view.
+    """
+    group_by = filter_object.group_by or ()
+    if filter_object.operation in AGGREGATES:
+        return aggregate_statement([filter_object.operation], filter_object.conditions, group_by)
+    if filter_object.operation == "count_by_window":
+        statement = rollup_window_statement(window_minutes(filter_object), filter_object.conditions, group_by)
+        if statement is not None:
+            return statement
+    return _statement(
+        filter_object, source=_row_source(filter_object.conditions), row_id="id", columns=DATA_COLUMNS
+    )
+
+
+def _sql_literal(value: Any) -> str:
+    if isinstance(value, (int, float)):
+        return repr(value)
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def render_sql(statement: SqlStatement) -> str:
+    # Inline the parameters for display; the compiled SQL has no literals of its
+    # own, so every "?" is a placeholder.
+    pieces = statement.sql.split("?")
+    rendered = [pieces[0]]
+    for value, piece in zip(statement.params, pieces[1:]):
+        rendered.append(_sql_literal(value))
+        rendered.append(piece)
+    return "".join(rendered)
+
+
+def generate_sql_query(filter_object: FilterObject) -> str:
+    """Human-readable SQL for a FilterObject, returned to users for transparency.
+
+    This is build_sql_statement with its values inlined; execution uses the
+    equivalent plan_sql_statement.
+    """
+    return render_sql(build_sql_statement(filter_object))
+
+
+def statement_cache_stats() -> Dict[str, int]:
+    info = _compile_shape.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "size": info.currsize, "max_size": info.maxsize}
+
+
+def _partitions_read(sql_query: str) -> List[str]:
+    sources = set(_ROW_SOURCE_RE.findall(sql_query.replace(_EMPTY_ROW_SOURCE, "")))
+    if sources & {ALL_ROWS_VIEW, PUBLIC_VIEW}:
+        return [table for _, table in get_store().partitions()]
+    return sorted(sources)
+
+
+def rollups_read(sql_query: str) -> List[str]:
+    # Rollup tables a statement reads; these statements read no partition rows.
+    return sorted(_ROLLUP_TABLE_NAMES & set(re.findall(r"\w+", sql_query)))
+
+
+def rows_scanned(sql_query: str) -> int:
+    """Rows in the day partitions a statement reads.
+
+    An upper bound: index range scans on CollectionTime read fewer. Rollup
+    statements read no partition rows at all.
+    """
+    sizes = get_store().partition_sizes()
+    return sum(sizes.get(table, 0) for table in _partitions_read(sql_query))
+
+
+def explain_sql_statement(statement: SqlStatement) -> Dict[str, Any]:
+    """SQLite's EXPLAIN QUERY PLAN for a statement, plus the tables it reads.
+
+    ``query_plan`` lists SQLite's steps (``SCAN``, ``SEARCH ... USING INDEX``)
+    with their ids and parents, so the tree can be rebuilt. Nothing is executed.
+    """
+    conn = get_store().connection()
+    steps = conn.execute("EXPLAIN QUERY PLAN " + statement.sql, statement.params).fetchall()
+    return {
+        "engine": "sqlite",
+        "sql": render_sql(statement),
+        "query_plan": [{"id": step[0], "parent": step[1], "detail": step[3]} for step in steps],
+        "rollups": rollups_read(statement.sql),
+        "partitions": _partitions_read(statement.sql),
+        "rows_scanned": rows_scanned(statement.sql),
+    }
+
+
+#Execute SQL query against the persistent traffic store.
+def execute_sql_query(
+    sql_query: str,
+    params: Sequence[Any] = (),
+    single_row: bool = False,
+    timings: Optional[RequestTimings] = None,
+) -> Dict[str, Any]:
+    # The partitions are built once by the store; requests only run the SELECT.
+    conn = get_store().connection()
     cursor = conn.cursor()
-    
+
     try:
-        # Create table and insert records
-        cursor.execute("""
-            CREATE TABLE vehicles (
-                CollectionTime TEXT,
-                Direction TEXT,
-                Lane INTEGER,
-                Speed INTEGER
-            )
-        """)
-        
-        for record in records:
-            cursor.execute(
-                "INSERT INTO vehicles VALUES (?, ?, ?, ?)",
-                (record["CollectionTime"], record["Direction"], record["Lane"], record["Speed"])
-            )
-        
-        # Execute the query
-        cursor.execute(sql_query)
+        started = time.perf_counter()
+        cursor.execute(sql_query, params)
         result = cursor.fetchall()
-        
-        # Convert rows to dictionaries
+        executed = time.perf_counter()
+
+        # Rows stay as the cursor's tuples; they are encoded to JSON straight from them.
         columns = [description[0] for description in cursor.description]
-        data = [dict(zip(columns, row)) for row in result]
+        data = RowSet(columns, result)
+
+        if timings is not None:
+            timings.add("execute", executed - started)
+            timings.add("build_rows", time.perf_counter() - executed)
+            timings.rows_scanned = rows_scanned(sql_query)
 
         # If this was an aggregate (count/avg/max), return a single dict instead of a list
-        if len(data) == 1 and len(columns) == 1:
+        if single_row or (len(data) == 1 and len(columns) == 1):
             return data[0]
 
         return data
-    
+
+    finally:
+        cursor.close()
+
+
+def stream_sql_query_ndjson(
+    sql_query: str, params: Sequence[Any] = (), batch_size: int = STREAM_BATCH_SIZE
+) -> Iterator[bytes]:
+    """Yield the query's rows as NDJSON, ``batch_size`` rows per chunk.
+
+    Rows are pulled from the cursor with fetchmany, so memory stays flat no
+    matter how many rows match.
+    """
+    conn = get_store().open_reader()
+    try:
+        cursor = conn.execute(sql_query, params)
+        columns = [description[0] for description in cursor.description]
+        # Paged queries select the row id for cursors; it is not part of the row.
+        keep = [i for i, name in enumerate(columns) if name != ROWID_KEY]
+        columns = [columns[i] for i in keep]
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield "".join(
+                json.dumps(dict(zip(columns, [row[i] for i in keep]))) + "\n" for row in rows
+            ).encode()
     finally:
         conn.close()
+
+
+def execute_sql_batch(filter_objects: List[FilterObject]) -> List[Tuple[Any, Optional[str]]]:
+    """Execute many filters in one read transaction.
+
+    Aggregate filters that share the same conditions and grouping are merged
+    into a single SELECT computing every requested aggregate, so each distinct
+    WHERE clause is evaluated once, from the rollups when possible. Identical
+    list queries run once. Returns one ``(result, error)`` pair per filter, in
+    input order.
+    """
+    outcomes: List[Tuple[Any, Optional[str]]] = [(None, None)] * len(filter_objects)
+    if not filter_objects:
+        return outcomes
+
+    aggregate_groups: Dict[Tuple, List[int]] = {}
+    list_groups: Dict[SqlStatement, List[int]] = {}
+    for position, filter_object in enumerate(filter_objects):
+        try:
+            statement = plan_sql_statement(filter_object)
+        except ValueError as exc:
+            outcomes[position] = (None, str(exc))
+            continue
+        if filter_object.operation in AGGREGATES:
+            key = (
+                tuple(sorted((c.field, c.operator, c.value) for c in filter_object.conditions)),
+                tuple(filter_object.group_by or ()),
+            )
+            aggregate_groups.setdefault(key, []).append(position)
+        else:
+            list_groups.setdefault(statement, []).append(position)
+
+    conn = get_store().connection()
+    cursor = conn.cursor()
+    cursor.execute("BEGIN")
+    try:
+        for (_, group_by), positions in aggregate_groups.items():
+            operations = sorted({filter_objects[p].operation for p in positions})
+            sql, params = aggregate_statement(operations, filter_objects[positions[0]].conditions, group_by)
+            try:
+                cursor.execute(sql, params)
+                columns = [d[0] for d in cursor.description]
+                rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            except sqlite3.Error as exc:
+                for p in positions:
+                    outcomes[p] = (None, f"SQL execution failed: {exc}")
+                continue
+            for p in positions:
+                keys = list(group_by) + [AGGREGATES[filter_objects[p].operation][1]]
+                picked = [{key: row[key] for key in keys} for row in rows]
+                outcomes[p] = (picked if group_by else picked[0], None)
+
+        for (sql, params), positions in list_groups.items():
+            try:
+                cursor.execute(sql, params)
+                columns = [d[0] for d in cursor.description]
+                data = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            except sqlite3.Error as exc:
+                for p in positions:
+                    outcomes[p] = (None, f"SQL execution failed: {exc}")
+                continue
+            for p in positions:
+                outcomes[p] = (data[0] if returns_single_row(filter_objects[p]) else data, None)
+    finally:
+        cursor.execute("COMMIT")
+        cursor.close()
+
+    return outcomes
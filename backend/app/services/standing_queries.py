@@ -0,0 +1,296 @@
+import asyncio
+import itertools
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..models.aiModel import FilterObject
+from .column_store import get_traffic_columns
+from .columnar_engine import TrafficColumns, apply_filter_mask, condition_mask
+from .result_cache import canonical_filter_key
+
+# Operations whose answer can be kept up to date from appended rows alone.
+STANDING_OPERATIONS = frozenset({"count_vehicles", "average_speed", "max_speed", "min_speed"})
+
+# (count, speed sum, max speed, min speed) of the matching rows.
+State = Tuple[int, int, Optional[int], Optional[int]]
+EMPTY_STATE: State = (0, 0, None, None)
+
+
+def supports_standing(filter_object: FilterObject) -> bool:
+    return filter_object.operation in STANDING_OPERATIONS and not filter_object.group_by
+
+
+def _aggregate(speeds: np.ndarray, state: State = EMPTY_STATE) -> State:
+    # Fold ``speeds`` into ``state``.
+    if len(speeds) == 0:
+        return state
+    count, total, high, low = state
+    batch_high, batch_low = int(speeds.max()), int(speeds.min())
+    return (
+        count + len(speeds),
+        total + int(speeds.sum(dtype=np.int64)),
+        batch_high if high is None else max(high, batch_high),
+        batch_low if low is None else min(low, batch_low),
+    )
+
+
+def render_state(state: State, operation: str) -> Dict[str, Any]:
+    """The state as the result /api/assistant returns for ``operation``."""
+    count, total, high, low = state
+    if operation == "count_vehicles":
+        return {"count": count}
+    if operation == "average_speed":
+        # The API answers averages from SQL: AVG is unrounded and NULL without rows.
+        return {"average_speed": total / count if count else None}
+    if operation == "max_speed":
+        return {"max_speed": high}
+    return {"min_speed": low}
+
+
+def _rows(columns: TrafficColumns, start: int, stop: int) -> TrafficColumns:
+    # Views of rows [start, stop); nothing is copied.
+    return TrafficColumns(
+        collection_time=columns.collection_time[start:stop],
+        direction_codes=columns.direction_codes[start:stop],
+        direction_labels=columns.direction_labels,
+        lane=columns.lane[start:stop],
+        speed=columns.speed[start:stop],
+    )
+
+
+class StandingQuery:
+    """Running aggregates of the rows matching one set of conditions.
+
+    Count, average, max and min questions with the same conditions share one
+    StandingQuery. ``state`` is replaced as a whole, so readers on other
+    threads always see a consistent tuple.
+    """
+
+    def __init__(self, key: str, filter_object: FilterObject):
+        self.key = key
+        self.conditions = filter_object.conditions
+        self.state: State = EMPTY_STATE
+        self.subscriptions = 0
+
+
+class Subscriber:
+    """Outbox of one client connection.
+
+    Updates for the same subscription are merged until the client takes
+    them, so a slow client gets the latest result rather than a backlog.
+    ``added`` stays None once any merged update was a recompute.
+    """
+
+    def __init__(self):
+        self._pending: Dict[int, Dict[str, Any]] = {}
+        self._ready = asyncio.Event()
+
+    def push(self, message: Dict[str, Any]) -> None:
+        previous = self._pending.get(message["subscription"])
+        if previous is not None:
+            if message["added"] is None or previous["added"] is None:
+                added = None
+            else:
+                added = previous["added"] + message["added"]
+            message = {**message, "added": added}
+        self._pending[message["subscription"]] = message
+        self._ready.set()
+
+    async def updates(self) -> List[Dict[str, Any]]:
+        """Wait for and take every pending update."""
+        await self._ready.wait()
+        self._ready.clear()
+        pending, self._pending = self._pending, {}
+        return list(pending.values())
+
+
+class Subscription:
+    def __init__(self, subscription_id: int, subscriber: Subscriber, query: StandingQuery,
+                 filter_object: FilterObject, question: str):
+        self.id = subscription_id
+        self.subscriber = subscriber
+        self.query = query
+        self.operation = filter_object.operation
+        self.question = question
+
+    def result(self) -> Dict[str, Any]:
+        return render_state(self.query.state, self.operation)
+
+
+class StandingQueryRegistry:
+    """Standing queries kept current as rows are ingested.
+
+    Each registered condition set is computed once over the current column
+    snapshot. After that, only appended rows are evaluated: on each batch
+    every distinct condition is evaluated once and shared by all the queries
+    that use it, and only queries whose result changed are pushed to
+    their subscribers.
+
+    The blocking parts (register, advance) run on worker threads under one
+    lock; subscriptions and pushes live on the event loop.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._queries: Dict[str, StandingQuery] = {}
+        # Rows of the snapshot already folded into every query, and its lineage.
+        self.position = 0
+        self.lineage: Any = None
+        self._subscriptions: Dict[str, Dict[int, Subscription]] = {}
+        self._ids = itertools.count(1)
+        self._recomputed = False
+        self._dirty = False
+        self._refreshing: Optional[asyncio.Future] = None
+        self.batches = 0
+        self.rows = 0
+        self.condition_evaluations = 0
+        self.pushes = 0
+
+    def register(self, filter_object: FilterObject) -> StandingQuery:
+        """Blocking: the query for these conditions, computed over the snapshot if it is new."""
+        key = canonical_filter_key(FilterObject(conditions=filter_object.conditions, operation="count_vehicles"))
+        with self._lock:
+            query = self._queries.get(key)
+            if query is None:
+                columns = get_traffic_columns()
+                if not self._queries:
+                    # Nothing to keep current yet: start from this snapshot.
+                    self.position, self.lineage = len(columns), columns.lineage
+                elif columns.lineage != self.lineage or len(columns) < self.position:
+                    self._reset(columns)
+                query = StandingQuery(key, filter_object)
+                # Up to the folded position; rows after it arrive with the next advance.
+                prefix = _rows(columns, 0, self.position)
+                query.state = _aggregate(prefix.speed[apply_filter_mask(prefix, query.conditions)])
+                self._queries[key] = query
+            query.subscriptions += 1
+            return query
+
+    def release(self, query: StandingQuery) -> None:
+        with self._lock:
+            query.subscriptions -= 1
+            if query.subscriptions <= 0:
+                self._queries.pop(query.key, None)
+
+    def advance(self) -> List[Tuple[StandingQuery, Optional[int]]]:
+        """Blocking: fold rows appended since the last call into every query.
+
+        Returns ``(query, matched rows added)`` for each query whose result
+        may have changed. A replaced snapshot (new lineage, or fewer rows)
+        recomputes every query; those report None as the rows added.
+        """
+        with self._lock:
+            columns = get_traffic_columns()
+            if self._recomputed or columns.lineage != self.lineage or len(columns) < self.position:
+                # Also after a reset by register, whose subscribers were not told yet.
+                self._reset(columns)
+                self._recomputed = False
+                return [(query, None) for query in self._queries.values()]
+            if len(columns) == self.position or not self._queries:
+                self.position = len(columns)
+                return []
+
+            batch = _rows(columns, self.position, len(columns))
+            masks: Dict[Tuple[str, str, str], np.ndarray] = {}
+            changed = []
+            for query in self._queries.values():
+                matched = np.ones(len(batch), dtype=bool)
+                for condition in query.conditions:
+                    condition_key = (condition.field, condition.operator, condition.value)
+                    mask = masks.get(condition_key)
+                    if mask is None:
+                        mask = masks[condition_key] = condition_mask(batch, condition)
+                    matched &= mask
+                speeds = batch.speed[matched]
+                if len(speeds):
+                    query.state = _aggregate(speeds, query.state)
+                    changed.append((query, len(speeds)))
+            self.batches += 1
+            self.rows += len(batch)
+            self.condition_evaluations += len(masks)
+            self.position = len(columns)
+            return changed
+
+    def _reset(self, columns: TrafficColumns) -> None:
+        # The snapshot was replaced rather than extended: recompute every query.
+        self.position, self.lineage = len(columns), columns.lineage
+        for query in self._queries.values():
+            query.state = _aggregate(columns.speed[apply_filter_mask(columns, query.conditions)])
+        self._recomputed = True
+
+    async def subscribe(self, subscriber: Subscriber, filter_object: FilterObject, question: str) -> Subscription:
+        """Register ``filter_object`` for ``subscriber``; raises ValueError if it cannot stand."""
+        if not supports_standing(filter_object):
+            raise ValueError(
+                "Only ungrouped count, average, max and min questions can be subscribed to; "
+                f"got '{filter_object.operation}'."
+            )
+        query = await asyncio.to_thread(self.register, filter_object)
+        subscription = Subscription(next(self._ids), subscriber, query, filter_object, question)
+        self._subscriptions.setdefault(query.key, {})[subscription.id] = subscription
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscriptions = self._subscriptions.get(subscription.query.key, {})
+        if subscriptions.pop(subscription.id, None) is None:
+            return
+        if not subscriptions:
+            self._subscriptions.pop(subscription.query.key, None)
+        self.release(subscription.query)
+
+    def notify(self) -> None:
+        """Called on the event loop after rows are committed.
+
+        Schedules one refresh; commits arriving while it runs are folded in
+        by a single further pass. Without subscribers this costs nothing.
+        """
+        if not self._subscriptions:
+            return
+        self._dirty = True
+        if self._refreshing is None or self._refreshing.done():
+            self._refreshing = asyncio.ensure_future(self.refresh())
+
+    async def refresh(self) -> None:
+        """Advance until no commit is left unprocessed, pushing each change."""
+        self._dirty = True
+        while self._dirty:
+            self._dirty = False
+            self.publish(await asyncio.to_thread(self.advance))
+
+    def publish(self, changed: List[Tuple[StandingQuery, Optional[int]]]) -> None:
+        for query, added in changed:
+            for subscription in self._subscriptions.get(query.key, {}).values():
+                subscription.subscriber.push({
+                    "type": "update",
+                    "subscription": subscription.id,
+                    "result": subscription.result(),
+                    "added": added,
+                })
+                self.pushes += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "queries": len(self._queries),
+                "subscriptions": sum(len(subscriptions) for subscriptions in self._subscriptions.values()),
+                "position": self.position,
+                "batches": self.batches,
+                "rows": self.rows,
+                "condition_evaluations": self.condition_evaluations,
+                "pushes": self.pushes,
+            }
+
+
+_registry: Optional[StandingQueryRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_standing_queries() -> StandingQueryRegistry:
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = StandingQueryRegistry()
+    return _registry
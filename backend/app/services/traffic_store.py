@@ -0,0 +1,425 @@
+import csv
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .partitions import (
+    ALL_ROWS_VIEW,
+    DATA_COLUMNS,
+    DEFAULT_RETENTION_DAYS,
+    create_partition_catalog,
+    drop_partitions_before,
+    refresh_views,
+    retention_cutoff,
+    write_rows,
+)
+from .query_pool import query_cancelled
+from .rollups import add_rows_to_rollups, create_rollup_tables, delete_rollups_before
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+DEFAULT_CSV_PATH = DATA_DIR / "traffic.csv"
+DEFAULT_DB_PATH = DATA_DIR / "traffic.db"
+
+# Bump when the on-disk layout changes so stale files get rebuilt.
+SCHEMA_VERSION = "4"
+INSERT_BATCH_SIZE = 10_000
+# Prepared statements kept per connection; queries are parameterized, so one
+# entry serves every question of the same shape.
+STATEMENT_CACHE_SIZE = 256
+# SQLite VM steps between checks for a cancelled query.
+PROGRESS_CHECK_STEPS = 10_000
+# How long the ingest head may be reused before it is read again. Commits
+# made by this process refresh it at once; this only bounds how late
+# appends by other processes are noticed.
+HEAD_REFRESH_SECONDS = 0.05
+
+
+def source_signature(csv_path: Path) -> Tuple[int, int]:
+    # Size and mtime are enough to notice a replaced or edited CSV.
+    stat = os.stat(csv_path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def iter_csv_rows(csv_path: Path) -> Iterator[Tuple[str, str, int, int]]:
+    # Stream typed rows straight from the CSV without building dicts.
+    with open(csv_path, mode="r", newline="") as file:
+        reader = csv.reader(file)
+        header = next(reader, None)
+        if header is None:
+            return
+        positions = [header.index(name) for name in ("CollectionTime", "Direction", "Lane", "Speed")]
+        time_pos, direction_pos, lane_pos, speed_pos = positions
+        for row in reader:
+            if not row:
+                continue
+            yield (
+                row[time_pos],
+                row[direction_pos],
+                int(row[lane_pos]),
+                int(row[speed_pos]),
+            )
+
+
+class TrafficStore:
+    """Long-lived SQLite copy of the traffic CSV.
+
+    The database file is built once from the CSV and reused across requests
+    and restarts. It is rebuilt only when the CSV's size or mtime changes,
+    which also drops rows added later through append_rows. Each thread gets
+    its own read-only connection, so request handlers only ever run SELECT
+    statements. The file is in WAL mode: appends commit atomically and every
+    read sees a consistent snapshot while they run.
+
+    Rows are partitioned into one table per day (see partitions.py). Only the
+    newest ``retention_days`` days are kept; older partitions are dropped
+    whole as new days arrive.
+    """
+
+    def __init__(
+        self,
+        csv_path: Path = DEFAULT_CSV_PATH,
+        db_path: Path = DEFAULT_DB_PATH,
+        retention_days: int = DEFAULT_RETENTION_DAYS,
+        head_refresh_seconds: float = HEAD_REFRESH_SECONDS,
+    ):
+        self.csv_path = Path(csv_path)
+        self.db_path = Path(db_path)
+        self.retention_days = retention_days
+        self.head_refresh_seconds = head_refresh_seconds
+        self.build_count = 0
+        self._generation = 0
+        self._signature: Optional[Tuple[int, int]] = None
+        # (ingest revision, next row id, row count), read together in one query.
+        # The revision is bumped in the database by every append, so other
+        # processes see it too.
+        self._head: Tuple[int, int, int] = (0, 0, 0)
+        self._head_read_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._writer: Optional[sqlite3.Connection] = None
+        self._writer_generation = 0
+        self._partitions: Tuple[Optional[str], List[Tuple[str, str]], Dict[str, int]] = (None, [], {})
+        self._local = threading.local()
+
+    @property
+    def revision(self) -> int:
+        return self._head[0]
+
+    @property
+    def next_row_id(self) -> int:
+        # Id the next appended row gets; every row so far has a smaller one.
+        return self._head[1]
+
+    @property
+    def row_count(self) -> int:
+        return self._head[2]
+
+    @property
+    def version(self) -> str:
+        # Changes whenever the data behind the store changes. The row id
+        # watermark and row count let rows_between tell appends from drops.
+        size, mtime_ns = self._signature or (0, 0)
+        revision, next_id, row_count = self._head
+        return f"{size}:{mtime_ns}:{self._generation}:{revision}:{next_id}:{row_count}"
+
+    def ensure_current(self) -> None:
+        signature = source_signature(self.csv_path)
+        if signature != self._signature:
+            with self._lock:
+                if signature != self._signature:
+                    if self._read_signature() != signature:
+                        self._build(signature)
+                    self._signature = signature
+                    self._generation += 1
+                    self._head_read_at = None
+        # Rows may have been appended since the last look, possibly by another
+        # process; callers reach here several times per request, so the head
+        # is only read again once it is older than head_refresh_seconds.
+        read_at = self._head_read_at
+        if read_at is None or time.monotonic() - read_at >= self.head_refresh_seconds:
+            self._refresh_head()
+
+    def connection(self) -> sqlite3.Connection:
+        """Return this thread's read-only connection, opening it if needed."""
+        self.ensure_current()
+        return self._thread_connection()
+
+    def _thread_connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.generation == self._generation:
+            return conn
+        if conn is not None:
+            conn.close()
+        conn = sqlite3.connect(
+            f"file:{self.db_path}?mode=ro", uri=True, cached_statements=STATEMENT_CACHE_SIZE
+        )
+        # A non-zero return aborts the running statement, so a timed-out
+        # request stops its query instead of holding the worker.
+        conn.set_progress_handler(query_cancelled, PROGRESS_CHECK_STEPS)
+        self._local.conn = conn
+        self._local.generation = self._generation
+        return conn
+
+    def open_reader(self) -> sqlite3.Connection:
+        """Open a dedicated read-only connection that may move between threads.
+
+        Used for streaming responses, whose batches can be produced on
+        different worker threads. The caller must close it.
+        """
+        self.ensure_current()
+        return sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False)
+
+    def append_rows(self, rows: Sequence[Tuple[str, str, int, int]]) -> int:
+        """Append ``(time, direction, lane, speed)`` rows and return the new row count.
+
+        All rows land in one write transaction together with their rollup
+        updates and any retention drops, so readers see either none of them
+        or all of them.
+        """
+        self.ensure_current()
+        with self._write_lock:
+            conn = self._writer_connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                next_id = int(conn.execute(
+                    "SELECT value FROM store_meta WHERE key = 'next_row_id'"
+                ).fetchone()[0])
+                created = False
+                for start in range(0, len(rows), INSERT_BATCH_SIZE):
+                    batch = rows[start:start + INSERT_BATCH_SIZE]
+                    created = write_rows(conn, batch, next_id) or created
+                    add_rows_to_rollups(conn, batch)
+                    next_id += len(batch)
+                conn.execute("UPDATE store_meta SET value = ? WHERE key = 'next_row_id'", (str(next_id),))
+                dropped = self._apply_retention(conn)
+                if created or dropped:
+                    refresh_views(conn)
+                conn.execute(
+                    "UPDATE store_meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'ingest_revision'"
+                )
+                row_count = conn.execute("SELECT COALESCE(SUM(row_count), 0) FROM partitions").fetchone()[0]
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        self._refresh_head()
+        return row_count
+
+    def drop_partitions_before(self, day: str) -> List[str]:
+        """Drop every day partition older than ``day`` (YYYY-MM-DD); returns the dropped days."""
+        self.ensure_current()
+        with self._write_lock:
+            conn = self._writer_connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                dropped = drop_partitions_before(conn, day)
+                if dropped:
+                    delete_rollups_before(conn, day)
+                    refresh_views(conn)
+                    conn.execute(
+                        "UPDATE store_meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'ingest_revision'"
+                    )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        self._refresh_head()
+        return dropped
+
+    def partitions(self) -> List[Tuple[str, str]]:
+        """``(day, table)`` for every partition, oldest first."""
+        return self._partition_catalog()[0]
+
+    def partition_sizes(self) -> Dict[str, int]:
+        """Row count of every partition table."""
+        return self._partition_catalog()[1]
+
+    def _partition_catalog(self) -> Tuple[List[Tuple[str, str]], Dict[str, int]]:
+        # Read once per data version.
+        self.ensure_current()
+        version = self.version
+        cached_version, partitions, sizes = self._partitions
+        if cached_version != version:
+            catalog = self._thread_connection().execute(
+                "SELECT day, table_name, row_count FROM partitions ORDER BY day"
+            ).fetchall()
+            partitions = [(day, table) for day, table, _ in catalog]
+            sizes = {table: row_count for _, table, row_count in catalog}
+            self._partitions = (version, partitions, sizes)
+        return partitions, sizes
+
+    def rows_after(self, row_id: int, before: Optional[int] = None, with_ids: bool = False) -> List[tuple]:
+        # Rows with an id above ``row_id`` (and below ``before``), i.e. appended
+        # after it, in insertion order; with_ids puts each row's id first.
+        columns = f"id, {DATA_COLUMNS}" if with_ids else DATA_COLUMNS
+        if before is None:
+            return self.connection().execute(
+                f"SELECT {columns} FROM {ALL_ROWS_VIEW} WHERE id > ? ORDER BY id",
+                (row_id,),
+            ).fetchall()
+        return self.connection().execute(
+            f"SELECT {columns} FROM {ALL_ROWS_VIEW} WHERE id > ? AND id < ? ORDER BY id",
+            (row_id, before),
+        ).fetchall()
+
+    def rows_between(self, old_version: str, new_version: str) -> Optional[List[Tuple[str, str, int, int]]]:
+        """Rows appended between two versions of this store, in insertion order.
+
+        None unless appending is all that happened in between: a rebuild,
+        a reload or dropped partitions cannot be described by rows.
+        """
+        old, new = old_version.split(":"), new_version.split(":")
+        if len(old) != 6 or len(new) != 6 or old[:3] != new[:3]:
+            return None
+        old_id, old_count, new_id, new_count = (int(v) for v in (old[4], old[5], new[4], new[5]))
+        if new_id < old_id or new_count - old_count != new_id - old_id:
+            return None
+        rows = self.rows_after(old_id - 1, before=new_id)
+        # Fewer rows means some were dropped again since new_version.
+        return rows if len(rows) == new_id - old_id else None
+
+    def _apply_retention(self, conn: sqlite3.Connection) -> List[str]:
+        cutoff = retention_cutoff(conn, self.retention_days)
+        if cutoff is None:
+            return []
+        dropped = drop_partitions_before(conn, cutoff)
+        if dropped:
+            delete_rollups_before(conn, cutoff)
+        return dropped
+
+    def close(self) -> None:
+        # Only closes the calling thread's connection; others close on reuse.
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+        with self._write_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+    def _writer_connection(self) -> sqlite3.Connection:
+        # One shared read-write connection, only used under _write_lock.
+        if self._writer is not None and self._writer_generation == self._generation:
+            return self._writer
+        if self._writer is not None:
+            self._writer.close()
+        self._writer = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False)
+        self._writer.execute("PRAGMA synchronous = NORMAL")
+        self._writer_generation = self._generation
+        return self._writer
+
+    def _refresh_head(self) -> None:
+        read_at = time.monotonic()
+        self._head = self._read_head()
+        self._head_read_at = read_at
+
+    def _read_head(self) -> Tuple[int, int, int]:
+        # One statement, so all three come from the same snapshot.
+        revision, next_id, row_count = self._thread_connection().execute(
+            "SELECT (SELECT value FROM store_meta WHERE key = 'ingest_revision'),"
+            " (SELECT value FROM store_meta WHERE key = 'next_row_id'),"
+            " (SELECT COALESCE(SUM(row_count), 0) FROM partitions)"
+        ).fetchone()
+        return int(revision or 0), int(next_id or 0), int(row_count)
+
+    def _read_signature(self) -> Optional[Tuple[int, int]]:
+        if not self.db_path.exists():
+            return None
+        try:
+            conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True)
+        except sqlite3.Error:
+            return None
+        try:
+            meta = dict(conn.execute("SELECT key, value FROM store_meta").fetchall())
+        except sqlite3.Error:
+            return None
+        finally:
+            conn.close()
+        if meta.get("schema_version") != SCHEMA_VERSION:
+            return None
+        try:
+            return int(meta["source_size"]), int(meta["source_mtime_ns"])
+        except (KeyError, ValueError):
+            return None
+
+    def _build(self, signature: Tuple[int, int]) -> None:
+        # Build into a temp file and swap it in so readers never see a half-built table.
+        tmp_path = self.db_path.with_name(self.db_path.name + ".tmp")
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+        conn = sqlite3.connect(tmp_path)
+        try:
+            conn.execute("PRAGMA journal_mode = OFF")
+            conn.execute("PRAGMA synchronous = OFF")
+            conn.execute("CREATE TABLE store_meta (key TEXT PRIMARY KEY, value TEXT)")
+            create_partition_catalog(conn)
+            create_rollup_tables(conn)
+
+            # Rows get ids in CSV order; rollups are maintained batch by batch
+            # as rows are ingested.
+            next_id = 1
+            batch = []
+            for row in iter_csv_rows(self.csv_path):
+                batch.append(row)
+                if len(batch) >= INSERT_BATCH_SIZE:
+                    write_rows(conn, batch, next_id)
+                    add_rows_to_rollups(conn, batch)
+                    next_id += len(batch)
+                    batch = []
+            if batch:
+                write_rows(conn, batch, next_id)
+                add_rows_to_rollups(conn, batch)
+                next_id += len(batch)
+            self._apply_retention(conn)
+            refresh_views(conn)
+
+            size, mtime_ns = signature
+            conn.executemany(
+                "INSERT INTO store_meta VALUES (?, ?)",
+                [
+                    ("schema_version", SCHEMA_VERSION),
+                    ("source_size", str(size)),
+                    ("source_mtime_ns", str(mtime_ns)),
+                    ("ingest_revision", "0"),
+                    ("next_row_id", str(next_id)),
+                ],
+            )
+            conn.commit()
+            # WAL lets appends commit while readers keep their snapshot.
+            conn.execute("PRAGMA journal_mode = WAL")
+        finally:
+            conn.close()
+
+        # A leftover WAL belongs to the old file and must not be applied to the new one.
+        for suffix in ("-wal", "-shm"):
+            stale = self.db_path.with_name(self.db_path.name + suffix)
+            if stale.exists():
+                stale.unlink()
+        os.replace(tmp_path, self.db_path)
+        self.build_count += 1
+
+
+_store: Optional[TrafficStore] = None
+_store_lock = threading.Lock()
+
+
+def traffic_csv_path() -> Path:
+    # The CSV the app serves; ROSA_TRAFFIC_CSV points it at another dataset (e.g. for benchmarks).
+    return Path(os.environ.get("ROSA_TRAFFIC_CSV", str(DEFAULT_CSV_PATH)))
+
+
+def get_store() -> TrafficStore:
+    """Return the process-wide store, creating it on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                db_path = os.environ.get("ROSA_TRAFFIC_DB", str(DEFAULT_DB_PATH))
+                retention_days = int(os.environ.get("ROSA_RETENTION_DAYS", DEFAULT_RETENTION_DAYS))
+                _store = TrafficStore(traffic_csv_path(), Path(db_path), retention_days)
+    return _store
@@ -0,0 +1 @@
+"""Benchmark harness for the assistant pipeline; run with ``python -m benchmarks``."""
@@ -0,0 +1,118 @@
+from datetime import date
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+
+HEADER = "CollectionTime,Direction,Lane,Speed\n"
+DEFAULT_START_DAY = "2025-12-01"
+DEFAULT_DAYS = 7
+CHUNK_ROWS = 1_000_000
+
+DIRECTIONS = ("North", "South")
+DIRECTION_WEIGHTS = (0.52, 0.48)
+# Lane 1 is the slow lane and carries most of the traffic.
+LANE_WEIGHTS = (0.5, 0.35, 0.15)
+LANE_MEAN_SPEEDS = (52.0, 58.0, 64.0)
+SPEED_SD = 7.0
+SPEED_RANGE = (5, 140)
+# Rush hours are busier and slower.
+RUSH_HOURS = ((8.0, 1.5), (17.5, 2.0))  # (peak hour, spread in hours)
+RUSH_SLOWDOWN = 10.0
+
+
+def _rush_intensity(hours: np.ndarray) -> np.ndarray:
+    return sum(np.exp(-0.5 * ((hours - peak) / spread) ** 2) for peak, spread in RUSH_HOURS)
+
+
+def minute_weights() -> np.ndarray:
+    """Share of a day's traffic in each of its 1440 minutes: a quiet night, two rush-hour peaks."""
+    hours = np.arange(1440) / 60.0
+    weights = 0.15 + _rush_intensity(hours)
+    return weights / weights.sum()
+
+
+def _day_blocks(minute_counts: np.ndarray, chunk_rows: int) -> Iterator[Tuple[int, int]]:
+    # Consecutive minute ranges holding at most ``chunk_rows`` rows (at least one minute each).
+    start = 0
+    while start < len(minute_counts):
+        end = start + 1
+        total = int(minute_counts[start])
+        while end < len(minute_counts) and total + minute_counts[end] <= chunk_rows:
+            total += int(minute_counts[end])
+            end += 1
+        yield start, end
+        start = end
+
+
+def iter_rows(
+    rows: int,
+    days: int = DEFAULT_DAYS,
+    start_day: str = DEFAULT_START_DAY,
+    seed: int = 0,
+    chunk_rows: int = CHUNK_ROWS,
+) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]]:
+    """Yield ``(times, direction_codes, lanes, speeds)`` chunks of a synthetic feed.
+
+    Rows are spread evenly over ``days`` days starting at ``start_day`` and
+    come out in time order, like a live sensor feed. Each chunk holds at most
+    ``chunk_rows`` rows (more only if a single minute has more).
+    """
+    rng = np.random.default_rng(seed)
+    weights = minute_weights()
+    first = np.datetime64(date.fromisoformat(start_day), "s")
+    per_day = np.full(days, rows // days)
+    per_day[: rows % days] += 1
+
+    for day, day_rows in enumerate(per_day.tolist()):
+        minute_counts = rng.multinomial(day_rows, weights)
+        day_start = first + np.timedelta64(day * 86400, "s")
+        for start, end in _day_blocks(minute_counts, chunk_rows):
+            counts = minute_counts[start:end]
+            n = int(counts.sum())
+            if n == 0:
+                continue
+            minutes = np.repeat(np.arange(start, end), counts)
+            seconds = np.sort(minutes * 60 + rng.integers(0, 60, n))
+            times = day_start + seconds.astype("timedelta64[s]")
+
+            directions = rng.choice(len(DIRECTIONS), n, p=DIRECTION_WEIGHTS)
+            lanes = rng.choice(len(LANE_WEIGHTS), n, p=LANE_WEIGHTS)
+            means = np.asarray(LANE_MEAN_SPEEDS)[lanes] - RUSH_SLOWDOWN * _rush_intensity(seconds / 3600.0)
+            speeds = np.clip(np.rint(rng.normal(means, SPEED_SD)), *SPEED_RANGE).astype(np.int64)
+            yield times, directions, lanes + 1, speeds
+
+
+def write_dataset(
+    path: Path, rows: int, days: int = DEFAULT_DAYS, start_day: str = DEFAULT_START_DAY, seed: int = 0
+) -> Path:
+    """Write a synthetic traffic CSV with ``rows`` rows, chunk by chunk.
+
+    Memory stays bounded by one chunk, so 1e8-row files can be generated.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w") as file:
+        file.write(HEADER)
+        for times, directions, lanes, speeds in iter_rows(rows, days, start_day, seed):
+            stamps = np.datetime_as_string(times, unit="s").tolist()
+            names = [DIRECTIONS[code] for code in directions.tolist()]
+            file.write("".join(
+                f"{stamp[:10]} {stamp[11:]},{name},{lane},{speed}\n"
+                for stamp, name, lane, speed in zip(stamps, names, lanes.tolist(), speeds.tolist())
+            ))
+    tmp_path.replace(path)
+    return path
+
+
+def dataset_path(data_dir: Path, rows: int, seed: int = 0) -> Path:
+    return Path(data_dir) / f"traffic-{rows}-{seed}.csv"
+
+
+def ensure_dataset(data_dir: Path, rows: int, seed: int = 0, days: Optional[int] = None) -> Path:
+    # Generated files are reused across runs; large ones take minutes to write.
+    path = dataset_path(data_dir, rows, seed)
+    if not path.exists():
+        write_dataset(path, rows, days or DEFAULT_DAYS, seed=seed)
+    return path
@@ -0,0 +1,141 @@
+"""Local stand-in for an LLM service, with configurable latency.
+
+Speaks the batch protocol of app.services.llm_client.HttpLLMClient and
+answers with the mock keyword parser, so the real client, timeouts and
+micro-batching can be exercised without a model:
+
+    python -m benchmarks.fake_llm --port 8100 --latency-ms 300
+    ROSA_LLM_URL=http://127.0.0.1:8100/ uvicorn app.main:app
+"""
+
+import argparse
+import asyncio
+import json
+from typing import Optional, Set
+
+from app.services.question_parser import parse_question_json
+
+
+class FakeLLMServer:
+    """HTTP/1.1 keep-alive server answering ``{"questions": [...]}`` batches.
+
+    Each batch waits ``latency_ms`` plus ``per_question_ms`` per question
+    before answering. With ``chunked`` the answer is sent with
+    ``Transfer-Encoding: chunked``, as many proxies do, instead of a
+    Content-Length. Counters record requests, questions, the largest batch
+    and connections accepted, so tests can check batching and connection reuse.
+    """
+
+    def __init__(self, latency_ms: float = 0.0, per_question_ms: float = 0.0, host: str = "127.0.0.1", port: int = 0,
+                 chunked: bool = False):
+        self.latency_ms = latency_ms
+        self.per_question_ms = per_question_ms
+        self.chunked = chunked
+        self.host = host
+        self.port = port
+        self.requests = 0
+        self.questions = 0
+        self.largest_batch = 0
+        self.connections = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._handlers: Set[asyncio.Task] = set()
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}/"
+
+    async def start(self) -> "FakeLLMServer":
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            # Connections still open (idle keep-alives, or a batch a timed
+            # out client gave up on) end here rather than when the loop closes.
+            for task in list(self._handlers):
+                task.cancel()
+            await asyncio.gather(*self._handlers, return_exceptions=True)
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self) -> "FakeLLMServer":
+        return await self.start()
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.stop()
+
+    def answer(self, question: str) -> dict:
+        try:
+            return {"output": parse_question_json(question)}
+        except ValueError as exc:
+            return {"error": str(exc)}
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        task = asyncio.current_task()
+        self._handlers.add(task)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                length = 0
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    if name.strip().lower() == "content-length":
+                        length = int(value)
+                questions = json.loads(await reader.readexactly(length))["questions"]
+                self.requests += 1
+                self.questions += len(questions)
+                self.largest_batch = max(self.largest_batch, len(questions))
+                await asyncio.sleep((self.latency_ms + self.per_question_ms * len(questions)) / 1000)
+                body = json.dumps({"results": [self.answer(question) for question in questions]}).encode()
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n")
+                if self.chunked:
+                    writer.write(b"Transfer-Encoding: chunked\r\n\r\n")
+                    # A few uneven chunks, one with an extension, then an empty trailer.
+                    cut = len(body) // 3
+                    for index, piece in enumerate((body[:cut], body[cut:cut + 7], body[cut + 7:])):
+                        extension = b";part=1" if index == 1 else b""
+                        writer.write(f"{len(piece):x}".encode() + extension + b"\r\n" + piece + b"\r\n")
+                    writer.write(b"0\r\n\r\n")
+                else:
+                    writer.write(f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            # Clients hanging up and stop() cancelling are both a normal end.
+            pass
+        finally:
+            self._handlers.discard(task)
+            writer.close()
+
+
+async def serve(args: argparse.Namespace) -> None:
+    server = await FakeLLMServer(args.latency_ms, args.per_question_ms, args.host, args.port, args.chunked).start()
+    print(f"fake LLM listening on {server.url} ({args.latency_ms:g} ms per batch)", flush=True)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="Delay before answering each batch.")
+    parser.add_argument("--per-question-ms", type=float, default=0.0, help="Extra delay per question in a batch.")
+    parser.add_argument("--chunked", action="store_true", help="Send answers with chunked transfer encoding.")
+    try:
+        asyncio.run(serve(parser.parse_args(argv)))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
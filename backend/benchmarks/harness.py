@@ -0,0 +1,174 @@
+import json
+import math
+import resource
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+DEFAULT_REPEATS = 5
+# Stages slower than the baseline by more than this fraction are regressions...
+DEFAULT_THRESHOLD = 0.2
+# ...unless the difference is below timer noise.
+MIN_DELTA_MS = 0.05
+
+
+def percentile(samples: Sequence[float], p: float) -> float:
+    # Nearest rank, matching the speed percentiles the API reports.
+    ordered = sorted(samples)
+    return ordered[max(math.ceil(p * len(ordered) / 100), 1) - 1]
+
+
+def summarize(samples_ms: Sequence[float]) -> Dict[str, float]:
+    return {
+        "runs": len(samples_ms),
+        "p50_ms": round(percentile(samples_ms, 50), 4),
+        "p99_ms": round(percentile(samples_ms, 99), 4),
+        "mean_ms": round(sum(samples_ms) / len(samples_ms), 4),
+        "max_ms": round(max(samples_ms), 4),
+    }
+
+
+def time_calls(fn: Callable[[Any], Any], inputs: Iterable[Any], repeats: int = DEFAULT_REPEATS) -> List[float]:
+    """Milliseconds per ``fn(item)`` call, ``repeats`` passes over ``inputs``."""
+    inputs = list(inputs)
+    samples = []
+    for _ in range(repeats):
+        for item in inputs:
+            start = time.perf_counter()
+            fn(item)
+            samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def peak_memory_mb(fn: Callable[[Any], Any], inputs: Iterable[Any]) -> float:
+    """Peak Python allocation (MiB) during one traced pass over ``inputs``.
+
+    Tracing slows allocation down, so it runs separately from the timed passes.
+    NumPy buffers are traced too; SQLite's own memory is not.
+    """
+    tracemalloc.start()
+    try:
+        for item in inputs:
+            fn(item)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return round(peak / 2**20, 3)
+
+
+def measure_stage(
+    fn: Callable[[Any], Any], inputs: Iterable[Any], repeats: int = DEFAULT_REPEATS, memory: bool = True
+) -> Dict[str, float]:
+    inputs = list(inputs)
+    # One untimed pass warms lazily built state (connections, compiled SQL).
+    for item in inputs:
+        fn(item)
+    result = summarize(time_calls(fn, inputs, repeats))
+    if memory:
+        result["peak_mb"] = peak_memory_mb(fn, inputs)
+    return result
+
+
+def time_once(fn: Callable[[], Any]) -> Dict[str, float]:
+    # Setup stages (building the store, the columns) only happen once per process.
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        fn()
+        elapsed = (time.perf_counter() - start) * 1000
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"ms": round(elapsed, 4), "peak_mb": round(peak / 2**20, 3)}
+
+
+def max_rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux and bytes on macOS.
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (2**20 if sys.platform == "darwin" else 2**10), 3)
+
+
+def load_results(path: Path) -> Dict[str, Any]:
+    return json.loads(Path(path).read_text())
+
+
+def save_results(path: Path, results: Dict[str, Any]) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(results, indent=2, sort_keys=True) + "\n")
+
+
+def _changes(
+    dataset: str, section: str, current: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], threshold: float
+) -> List[Dict[str, Any]]:
+    changes = []
+    for stage, stats in current.items():
+        before = baseline.get(stage)
+        if not before:
+            continue
+        for metric in ("p50_ms", "p99_ms", "peak_mb"):
+            old, new = before.get(metric), stats.get(metric)
+            if old is None or new is None or old <= 0:
+                continue
+            if metric != "peak_mb" and abs(new - old) < MIN_DELTA_MS:
+                continue
+            change = (new - old) / old
+            changes.append({
+                "dataset": dataset,
+                "stage": f"{section}.{stage}",
+                "metric": metric,
+                "baseline": old,
+                "current": new,
+                "change": round(change, 4),
+                "regression": change > threshold,
+            })
+    return changes
+
+
+def compare_results(
+    current: Dict[str, Any], baseline: Dict[str, Any], threshold: float = DEFAULT_THRESHOLD
+) -> List[Dict[str, Any]]:
+    """Per-stage changes of ``current`` against ``baseline``.
+
+    Only datasets and stages present in both runs are compared; entries more
+    than ``threshold`` slower (or bigger) than the baseline are flagged as
+    regressions.
+    """
+    changes = []
+    for dataset, run in current.get("datasets", {}).items():
+        before = baseline.get("datasets", {}).get(dataset)
+        if not before:
+            continue
+        for section in ("stages", "http"):
+            changes += _changes(dataset, section, run.get(section, {}), before.get(section, {}), threshold)
+    return changes
+
+
+def format_report(results: Dict[str, Any], changes: Optional[List[Dict[str, Any]]] = None) -> str:
+    lines = []
+    for dataset, run in results.get("datasets", {}).items():
+        lines.append(f"== {dataset} rows (max RSS {run.get('max_rss_mb', 0)} MiB)")
+        for stage, stats in run.get("setup", {}).items():
+            lines.append(f"  setup  {stage:<22} {stats['ms']:>12.2f} ms  peak {stats['peak_mb']:>9.2f} MiB")
+        for section in ("stages", "http"):
+            for stage, stats in run.get(section, {}).items():
+                if "peak_mb" in stats:
+                    extra = f"  peak {stats['peak_mb']:>9.2f} MiB"
+                else:
+                    extra = f"  {stats.get('throughput_rps', 0)} req/s, {stats.get('errors', 0)} errors"
+                lines.append(
+                    f"  {section:<6} {stage:<22} p50 {stats['p50_ms']:>10.3f} ms  p99 {stats['p99_ms']:>10.3f} ms{extra}"
+                )
+        for stage in run.get("skipped", []):
+            lines.append(f"  skip   {stage}")
+    if changes:
+        lines.append("== changes against baseline")
+        for change in changes:
+            flag = "REGRESSION" if change["regression"] else "ok"
+            lines.append(
+                f"  {change['dataset']:>10} {change['stage']:<30} {change['metric']:<8}"
+                f" {change['baseline']:>10} -> {change['current']:>10} ({change['change']:+.1%}) {flag}"
+            )
+    return "\n".join(lines)
@@ -0,0 +1,262 @@
+"""Benchmark the assistant pipeline stage by stage on synthetic datasets.
+
+Each dataset size runs in its own process, pointed at its CSV through
+ROSA_TRAFFIC_CSV, so stores and caches never leak between sizes. Example::
+
+    python -m benchmarks --rows 10000 100000 1000000 --output results.json
+    python -m benchmarks --rows 10000 --baseline results.json --fail-on-regression
+    python -m benchmarks --rows 1e8 --scan-workers 8 --requests 0
+"""
+
+import argparse
+import http.client
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .datasets import DEFAULT_DAYS, DEFAULT_START_DAY, ensure_dataset
+from .harness import (
+    DEFAULT_REPEATS,
+    DEFAULT_THRESHOLD,
+    compare_results,
+    format_report,
+    load_results,
+    max_rss_mb,
+    measure_stage,
+    save_results,
+    summarize,
+    time_once,
+)
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+DEFAULT_ROWS = (10_000, 100_000)
+DEFAULT_DATA_DIR = Path(tempfile.gettempdir()) / "rosa-benchmarks"
+# load_traffic_data builds one dict per row; past this it only measures swap.
+DEFAULT_MAX_DICT_ROWS = 1_000_000
+DEFAULT_CONCURRENCY = 16
+DEFAULT_REQUESTS = 200
+SERVER_START_TIMEOUT = 600.0
+
+# A mix of the query shapes the assistant answers. Listings are bounded so
+# large datasets measure the engines, not response size.
+QUESTIONS = (
+    "How many vehicles are going north?",
+    "Average speed of southbound vehicles over 50",
+    "What is the max speed in lane 1?",
+    "Minimum speed of northbound vehicles",
+    "Top 10 fastest northbound vehicles",
+    "Top 20 slowest vehicles in lane 3",
+    "85th percentile speed per lane",
+    "Count vehicles per lane and direction",
+    "How many vehicles per hour?",
+    f"How many vehicles on {DEFAULT_START_DAY}?",
+)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _post_question(port: int, question: str) -> Tuple[float, int]:
+    body = json.dumps({"question": question})
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+    try:
+        start = time.perf_counter()
+        conn.request("POST", "/api/assistant", body, {"Content-Type": "application/json"})
+        response = conn.getresponse()
+        response.read()
+        return (time.perf_counter() - start) * 1000, response.status
+    finally:
+        conn.close()
+
+
+def _wait_for_server(process: subprocess.Popen, port: int) -> None:
+    deadline = time.monotonic() + SERVER_START_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"API server exited with code {process.returncode}")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/health")
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("API server did not start in time")
+
+
+def measure_http(questions, concurrency: int, requests: int) -> Dict[str, Any]:
+    """End-to-end latency of ``requests`` POSTs to /api/assistant from ``concurrency`` clients.
+
+    The server is a real uvicorn process started with this process's
+    environment, so it serves the same dataset and reuses the store built by
+    the stage measurements.
+    """
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=os.environ.copy(),
+    )
+    try:
+        _wait_for_server(process, port)
+        work = [questions[i % len(questions)] for i in range(requests)]
+        # One warm-up request per question, like the untimed pass of the stages.
+        for question in questions:
+            _post_question(port, question)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            outcomes = list(executor.map(lambda q: _post_question(port, q), work))
+        elapsed = time.perf_counter() - start
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+    latencies = [ms for ms, status in outcomes if status == 200]
+    key = f"assistant_c{concurrency}"
+    stats = summarize(latencies) if latencies else {"runs": 0, "p50_ms": 0.0, "p99_ms": 0.0}
+    stats.update({
+        "errors": len(outcomes) - len(latencies),
+        "throughput_rps": round(len(outcomes) / elapsed, 2),
+    })
+    return {key: stats}
+
+
+def run_dataset(args: argparse.Namespace, csv_path: Path) -> Dict[str, Any]:
+    """Measure every stage against ``csv_path``; runs inside the per-dataset process."""
+    db_path = csv_path.with_suffix(".db")
+    os.environ["ROSA_TRAFFIC_CSV"] = str(csv_path)
+    os.environ["ROSA_TRAFFIC_DB"] = str(db_path)
+    # Keep every synthetic day, and answer every request from the engines.
+    os.environ["ROSA_RETENTION_DAYS"] = "0"
+    os.environ["ROSA_RESULT_CACHE_SIZE"] = "0"
+    if args.scan_workers is not None:
+        os.environ["ROSA_SCAN_WORKERS"] = str(args.scan_workers)
+    # Setup is timed from scratch, not from files left by an earlier run.
+    for leftover in db_path.parent.glob(db_path.name + "*"):
+        leftover.unlink()
+    shutil.rmtree(csv_path.with_suffix(".columns"), ignore_errors=True)
+
+    # Imported only now so the app picks up the environment above.
+    from app.api.assistant import build_mock_filter, generate_mock_llm_response, validate_json
+    from app.services import question_parser
+    from app.services.column_store import get_traffic_columns
+    from app.services.filter_engine import load_traffic_data, process_filter
+    from app.services.sql_engine import (
+        execute_sql_query,
+        generate_sql_query,
+        plan_sql_statement,
+        returns_single_row,
+    )
+    from app.services.traffic_store import get_store
+
+    run: Dict[str, Any] = {"setup": {}, "stages": {}, "skipped": []}
+    run["setup"]["build_store"] = time_once(lambda: get_store().ensure_current())
+    run["setup"]["build_columns"] = time_once(get_traffic_columns)
+
+    questions = list(QUESTIONS)
+    filters = [build_mock_filter(question) for question in questions]
+    raw_responses = [generate_mock_llm_response(question) for question in questions]
+    statements = [(plan_sql_statement(f), returns_single_row(f)) for f in filters]
+
+    def parse_cold(question: str):
+        # Parses are memoized per question; clear them so every call really parses.
+        question_parser._parse_normalized.cache_clear()
+        return build_mock_filter(question)
+
+    stages = run["stages"]
+    if args.rows_in_run <= args.max_dict_rows:
+        stages["load_traffic_data"] = measure_stage(
+            lambda _: load_traffic_data(csv_path), [None], max(1, min(args.repeats, 3))
+        )
+    else:
+        run["skipped"].append(f"load_traffic_data (over --max-dict-rows={args.max_dict_rows})")
+    stages["build_mock_filter"] = measure_stage(parse_cold, questions, args.repeats)
+    stages["validate_json"] = measure_stage(validate_json, raw_responses, args.repeats)
+    stages["generate_sql_query"] = measure_stage(generate_sql_query, filters, args.repeats)
+    stages["execute_sql_query"] = measure_stage(
+        lambda item: execute_sql_query(item[0].sql, item[0].params, item[1]), statements, args.repeats
+    )
+    stages["process_filter"] = measure_stage(process_filter, filters, args.repeats)
+
+    if args.requests > 0:
+        run["http"] = measure_http(questions, args.concurrency, args.requests)
+    run["max_rss_mb"] = max_rss_mb()
+    return run
+
+
+def _run_child(args: argparse.Namespace, rows: int, csv_path: Path) -> Dict[str, Any]:
+    command = [
+        sys.executable, "-m", "benchmarks.run",
+        "--child-csv", str(csv_path),
+        "--rows-in-run", str(rows),
+        "--repeats", str(args.repeats),
+        "--max-dict-rows", str(args.max_dict_rows),
+        "--concurrency", str(args.concurrency),
+        "--requests", str(args.requests),
+    ]
+    if args.scan_workers is not None:
+        command += ["--scan-workers", str(args.scan_workers)]
+    completed = subprocess.run(command, cwd=BACKEND_DIR, stdout=subprocess.PIPE, check=True, text=True)
+    # The child prints its result as the last line of its output.
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=float, nargs="+", default=list(DEFAULT_ROWS),
+                        help="dataset sizes, e.g. 1e4 1e6 (default: %(default)s)")
+    parser.add_argument("--days", type=int, default=DEFAULT_DAYS, help="days each dataset spans")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", type=Path, default=DEFAULT_DATA_DIR,
+                        help="where generated datasets are kept and reused (default: %(default)s)")
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS, help="timed passes per stage")
+    parser.add_argument("--max-dict-rows", type=float, default=DEFAULT_MAX_DICT_ROWS,
+                        help="skip load_traffic_data above this many rows")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="concurrent HTTP clients")
+    parser.add_argument("--requests", type=int, default=DEFAULT_REQUESTS, help="HTTP requests per dataset; 0 skips HTTP")
+    parser.add_argument("--scan-workers", type=int,
+                        help="processes for parallel Python-engine scans; 1 keeps them serial (default: CPU count)")
+    parser.add_argument("--output", type=Path, help="write the results as JSON")
+    parser.add_argument("--baseline", type=Path, help="compare against a saved results file")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="fractional slowdown counted as a regression (default: %(default)s)")
+    parser.add_argument("--fail-on-regression", action="store_true", help="exit with status 1 on regressions")
+    parser.add_argument("--child-csv", type=Path, help=argparse.SUPPRESS)
+    parser.add_argument("--rows-in-run", type=int, default=0, help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    if args.child_csv:
+        print(json.dumps(run_dataset(args, args.child_csv)))
+        return 0
+
+    results: Dict[str, Any] = {"python": sys.version.split()[0], "datasets": {}}
+    for rows in (int(n) for n in args.rows):
+        print(f"benchmarking {rows} rows...", file=sys.stderr)
+        csv_path = ensure_dataset(args.data_dir, rows, args.seed, args.days)
+        results["datasets"][str(rows)] = _run_child(args, rows, csv_path)
+
+    changes = compare_results(results, load_results(args.baseline), args.threshold) if args.baseline else None
+    print(format_report(results, changes))
+    if args.output:
+        save_results(args.output, results)
+    if changes and args.fail_on_regression and any(change["regression"] for change in changes):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
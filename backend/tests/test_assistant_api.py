@@ -1,19 +1,25 @@
 import sys
 from pathlib import Path
+import asyncio
 import json
 import unittest
 
+from fastapi import HTTPException
+
 # Ensure backend is importable
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
 
 from app.api.assistant import (
+    assistant_batch_endpoint,
+    assistant_endpoint,
     build_mock_filter,
     generate_mock_llm_response,
     validate_json,
 )  # type: ignore
-from app.models.aiModel import FilterObject  # type: ignore
+from app.models.aiModel import AssistantRequest, BatchAssistantRequest, FilterObject  # type: ignore
+from app.services.result_cache import get_result_cache  # type: ignore
 
 
 class AssistantApiTests(unittest.TestCase):
@@ -49,6 +55,66 @@ class AssistantApiTests(unittest.TestCase):
         with self.assertRaises(Exception):
             validate_json(json.dumps(bad))
 
+    def test_endpoint_reuses_cached_result(self):
+        cache = get_result_cache()
+        first = asyncio.run(assistant_endpoint(AssistantRequest(question="how many north vehicles in lane 1")))
+        hits = cache.stats()["hits"]
+        second = asyncio.run(assistant_endpoint(AssistantRequest(question="count north vehicles in lane 1")))
+        self.assertEqual(first.result, second.result)
+        self.assertEqual(cache.stats()["hits"], hits + 1)
+
+    def test_batch_endpoint_returns_per_question_results(self):
+        questions = ["how many south vehicles", "", "what is the weather", "max speed for north lane 1"]
+        response = asyncio.run(assistant_batch_endpoint(BatchAssistantRequest(questions=questions)))
+        self.assertEqual([item.question for item in response.results], questions)
+        count, empty, unparsable, max_speed = response.results
+        single = asyncio.run(assistant_endpoint(AssistantRequest(question="how many south vehicles")))
+        self.assertEqual(count.result, single.result)
+        self.assertEqual(count.sql, single.sql)
+        self.assertEqual(empty.error, "Question cannot be empty.")
+        self.assertIsNotNone(unparsable.error)
+        self.assertIsNone(unparsable.result)
+        self.assertIn("max_speed", max_speed.result)
+
+    def test_list_question_streams_ndjson(self):
+        async def collect():
+            response = await assistant_endpoint(
+                AssistantRequest(question="list north vehicles sorted by speed"), stream=True
+            )
+            body = b"".join([chunk async for chunk in response.body_iterator])
+            return response, body
+
+        response, body = asyncio.run(collect())
+        self.assertEqual(response.media_type, "application/x-ndjson")
+        rows = [json.loads(line) for line in body.decode().splitlines()]
+        expected = asyncio.run(assistant_endpoint(AssistantRequest(question="list north vehicles sorted by speed")))
+        self.assertEqual(rows, expected.result)
+
+    def test_list_pages_follow_next_cursor(self):
+        question = "list north vehicles sorted by speed descending"
+        everything = asyncio.run(assistant_endpoint(AssistantRequest(question=question))).result
+        first = asyncio.run(assistant_endpoint(AssistantRequest(question=question, limit=4)))
+        self.assertEqual(first.result, everything[:4])
+        self.assertIsNotNone(first.next_cursor)
+        second = asyncio.run(assistant_endpoint(
+            AssistantRequest(question=question, limit=4, cursor=first.next_cursor)
+        ))
+        self.assertEqual(second.result, everything[4:8])
+        self.assertNotIn("_rowid", second.result[0])
+
+    def test_bad_cursor_is_rejected(self):
+        with self.assertRaises(HTTPException) as ctx:
+            asyncio.run(assistant_endpoint(
+                AssistantRequest(question="list north vehicles sorted by speed", limit=2, cursor="not-a-cursor")
+            ))
+        self.assertEqual(ctx.exception.status_code, 400)
+
+    def test_aggregate_ignores_stream_request(self):
+        response = asyncio.run(assistant_endpoint(
+            AssistantRequest(question="how many north vehicles"), accept="application/x-ndjson"
+        ))
+        self.assertIn("count", response.result)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,90 @@
+import sys
+from pathlib import Path
+import tempfile
+import unittest
+
+# Ensure backend directory is on the import path
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+import numpy as np
+
+from app.services.column_store import load_traffic_columns  # type: ignore
+from benchmarks.datasets import iter_rows, write_dataset  # type: ignore
+from benchmarks.harness import compare_results, measure_stage, percentile, summarize  # type: ignore
+
+
+def run_with(stages):
+    return {"datasets": {"10000": {"stages": stages}}}
+
+
+class DatasetTests(unittest.TestCase):
+    def test_rows_are_time_ordered_and_in_range(self):
+        chunks = list(iter_rows(20_000, days=2, seed=3, chunk_rows=4_000))
+        self.assertGreater(len(chunks), 2)
+        times = np.concatenate([chunk[0] for chunk in chunks])
+        lanes = np.concatenate([chunk[2] for chunk in chunks])
+        speeds = np.concatenate([chunk[3] for chunk in chunks])
+        self.assertEqual(len(times), 20_000)
+        self.assertTrue(np.all(times[1:] >= times[:-1]))
+        self.assertEqual(str(times[0])[:10], "2025-12-01")
+        self.assertEqual(str(times[-1])[:10], "2025-12-02")
+        self.assertEqual(set(lanes.tolist()), {1, 2, 3})
+        self.assertTrue(5 <= speeds.min() and speeds.max() <= 140)
+        # The slow lane is the busiest one.
+        self.assertGreater(np.sum(lanes == 1), np.sum(lanes == 3))
+
+    def test_rush_hour_is_busier_than_the_night(self):
+        times = np.concatenate([chunk[0] for chunk in iter_rows(20_000, days=1)])
+        hours = (times - times.astype("datetime64[D]")).astype("timedelta64[h]").astype(int)
+        self.assertGreater(np.sum(hours == 8), 3 * np.sum(hours == 3))
+
+    def test_written_dataset_loads(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = write_dataset(Path(tmp) / "traffic.csv", 1_000, days=3, seed=1)
+            columns = load_traffic_columns(path, Path(tmp) / "traffic.columns")
+            self.assertEqual(len(columns), 1_000)
+            # Generation is deterministic for a seed.
+            first = path.read_text()
+            write_dataset(path, 1_000, days=3, seed=1)
+            self.assertEqual(path.read_text(), first)
+
+
+class HarnessTests(unittest.TestCase):
+    def test_percentiles_use_nearest_rank(self):
+        samples = list(range(1, 101))
+        self.assertEqual(percentile(samples, 50), 50)
+        self.assertEqual(percentile(samples, 99), 99)
+        self.assertEqual(percentile([7.0], 99), 7.0)
+        stats = summarize([3.0, 1.0, 2.0])
+        self.assertEqual((stats["runs"], stats["p50_ms"], stats["max_ms"]), (3, 2.0, 3.0))
+
+    def test_measure_stage_times_every_call(self):
+        calls = []
+        stats = measure_stage(calls.append, ["a", "b"], repeats=3)
+        # One warm-up pass, three timed passes and one traced pass.
+        self.assertEqual(len(calls), 10)
+        self.assertEqual(stats["runs"], 6)
+        self.assertIn("peak_mb", stats)
+
+    def test_compare_flags_regressions_over_threshold(self):
+        baseline = run_with({
+            "execute_sql_query": {"p50_ms": 10.0, "p99_ms": 20.0, "peak_mb": 1.0},
+            "validate_json": {"p50_ms": 0.01, "p99_ms": 0.02, "peak_mb": 0.01},
+        })
+        current = run_with({
+            "execute_sql_query": {"p50_ms": 13.0, "p99_ms": 21.0, "peak_mb": 1.0},
+            # Twice as slow, but within timer noise.
+            "validate_json": {"p50_ms": 0.02, "p99_ms": 0.04, "peak_mb": 0.01},
+            "process_filter": {"p50_ms": 5.0, "p99_ms": 9.0, "peak_mb": 2.0},
+        })
+        changes = compare_results(current, baseline, threshold=0.2)
+        flagged = {(c["stage"], c["metric"]) for c in changes if c["regression"]}
+        self.assertEqual(flagged, {("stages.execute_sql_query", "p50_ms")})
+        self.assertNotIn("stages.process_filter", {c["stage"] for c in changes})
+        self.assertEqual(compare_results(current, {"datasets": {}}), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
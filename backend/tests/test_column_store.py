@@ -0,0 +1,71 @@
+import sys
+from pathlib import Path
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+# Ensure backend directory is on the import path
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.services.column_store import (
+    default_cache_dir,
+    load_traffic_columns,
+    open_column_cache,
+    write_column_cache,
+)  # type: ignore
+from app.services.traffic_store import source_signature  # type: ignore
+from tests.test_columnar_engine import synthetic_records  # type: ignore
+
+
+def write_csv(path, records):
+    lines = ["CollectionTime,Direction,Lane,Speed"]
+    lines += [f"{r['CollectionTime']},{r['Direction']},{r['Lane']},{r['Speed']}" for r in records]
+    path.write_text("\n".join(lines) + "\n")
+
+
+class ColumnStoreTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.csv_path = Path(self.tmp.name) / "traffic.csv"
+        self.records = synthetic_records(1000)
+        write_csv(self.csv_path, self.records)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_cache_round_trips_rows(self):
+        columns = load_traffic_columns(self.csv_path)
+        self.assertTrue((default_cache_dir(self.csv_path) / "meta.json").exists())
+        self.assertIsInstance(columns.speed, np.memmap)
+        self.assertEqual(columns.to_records(np.arange(len(columns))), self.records)
+
+    def test_chunk_boundaries_do_not_change_result(self):
+        cache_dir = Path(self.tmp.name) / "small-chunks"
+        write_column_cache(self.csv_path, cache_dir, chunk_rows=7)
+        columns = open_column_cache(cache_dir, source_signature(self.csv_path))
+        self.assertEqual(columns.to_records(np.arange(len(columns))), self.records)
+
+    def test_cache_is_invalidated_when_csv_changes(self):
+        load_traffic_columns(self.csv_path)
+        cache_dir = default_cache_dir(self.csv_path)
+        self.assertIsNotNone(open_column_cache(cache_dir, source_signature(self.csv_path)))
+
+        write_csv(self.csv_path, self.records[:10])
+        stat = os.stat(self.csv_path)
+        os.utime(self.csv_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        self.assertIsNone(open_column_cache(cache_dir, source_signature(self.csv_path)))
+        self.assertEqual(len(load_traffic_columns(self.csv_path)), 10)
+
+    def test_empty_csv(self):
+        self.csv_path.write_text("CollectionTime,Direction,Lane,Speed\n")
+        columns = load_traffic_columns(self.csv_path)
+        self.assertEqual(len(columns), 0)
+        self.assertEqual(columns.to_records(np.arange(0)), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,218 @@
+import sys
+from pathlib import Path
+import random
+import unittest
+
+# Ensure backend directory is on the import path
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.models.aiModel import FilterCondition, FilterObject  # type: ignore
+from app.services.column_store import get_traffic_columns  # type: ignore
+from app.services.columnar_engine import (
+    TrafficColumns,
+    apply_filter_mask,
+    process_filter_columnar,
+    sort_indices,
+    top_k_indices,
+)  # type: ignore
+from app.services.pagination import split_page  # type: ignore
+from app.services.sql_engine import execute_sql_query, plan_sql_statement  # type: ignore
+from app.services.filter_engine import (
+    apply_filter_conditions,
+    apply_sorting,
+    execute_grouped_operation,
+    execute_operation,
+    load_traffic_data,
+)  # type: ignore
+
+
+def reference_process(records, filt):
+    # The original dict-list pipeline, used as the source of truth.
+    rows = apply_filter_conditions(records, filt.conditions)
+    if filt.sort_by:
+        rows = apply_sorting(rows, filt.sort_by, filt.sort_direction or "ascending")
+    if filt.group_by:
+        return execute_grouped_operation(rows, filt.operation, filt.group_by, filt.window_minutes)
+    return execute_operation(rows, filt.operation, filt.window_minutes)
+
+
+def synthetic_records(count, seed=7):
+    rng = random.Random(seed)
+    records = []
+    for i in range(count):
+        records.append({
+            "CollectionTime": f"2025-12-{7 + i % 3:02d} {rng.randrange(24):02d}:{rng.randrange(60):02d}:{rng.randrange(60):02d}",
+            "Direction": rng.choice(["North", "South", "East"]),
+            "Lane": rng.randint(1, 4),
+            "Speed": rng.randint(20, 120),
+        })
+    return records
+
+
+def to_columns(records):
+    return TrafficColumns.from_rows(
+        (r["CollectionTime"], r["Direction"], r["Lane"], r["Speed"]) for r in records
+    )
+
+
+FILTERS = [
+    FilterObject(operation="list_vehicles"),
+    FilterObject(
+        conditions=[FilterCondition(field="Direction", operator="==", value="North")],
+        operation="count_vehicles",
+    ),
+    FilterObject(
+        conditions=[
+            FilterCondition(field="Direction", operator="!=", value="South"),
+            FilterCondition(field="Speed", operator=">=", value="60"),
+        ],
+        operation="average_speed",
+    ),
+    FilterObject(
+        conditions=[
+            FilterCondition(field="Lane", operator="==", value="2"),
+            FilterCondition(field="Speed", operator="<", value="50"),
+        ],
+        operation="max_speed",
+    ),
+    FilterObject(
+        conditions=[FilterCondition(field="Speed", operator=">", value="1000")],
+        operation="average_speed",
+    ),
+    FilterObject(
+        conditions=[FilterCondition(field="Speed", operator=">", value="1000")],
+        operation="max_speed",
+    ),
+    FilterObject(
+        conditions=[FilterCondition(field="Lane", operator="<=", value="2")],
+        operation="list_vehicles",
+        sort_by="Speed",
+        sort_direction="descending",
+    ),
+    FilterObject(
+        conditions=[FilterCondition(field="Direction", operator="==", value="West")],
+        operation="list_vehicles",
+    ),
+    FilterObject(operation="list_vehicles", sort_by="CollectionTime"),
+    FilterObject(operation="list_vehicles", sort_by="Direction", sort_direction="descending"),
+    FilterObject(
+        conditions=[FilterCondition(field="Lane", operator="==", value="02")],
+        operation="count_vehicles",
+    ),
+    FilterObject(
+        conditions=[FilterCondition(field="Direction", operator="==", value="South")],
+        operation="min_speed",
+    ),
+    FilterObject(
+        conditions=[FilterCondition(field="Speed", operator=">", value="1000")],
+        operation="min_speed",
+    ),
+    FilterObject(operation="speed_percentiles"),
+    FilterObject(
+        conditions=[FilterCondition(field="Lane", operator="==", value="3")],
+        operation="speed_percentiles",
+    ),
+    FilterObject(
+        conditions=[FilterCondition(field="Speed", operator=">", value="1000")],
+        operation="speed_percentiles",
+    ),
+    FilterObject(operation="count_by_window"),
+    FilterObject(
+        conditions=[FilterCondition(field="Direction", operator="==", value="North")],
+        operation="count_by_window",
+        window_minutes=5,
+    ),
+    FilterObject(operation="count_by_window", window_minutes=60),
+    FilterObject(
+        conditions=[FilterCondition(field="Speed", operator=">", value="1000")],
+        operation="count_by_window",
+    ),
+    FilterObject(operation="count_vehicles", group_by=["Lane"]),
+    FilterObject(
+        conditions=[FilterCondition(field="Speed", operator=">=", value="60")],
+        operation="average_speed",
+        group_by=["Direction", "Lane"],
+    ),
+    FilterObject(operation="max_speed", group_by=["Lane", "Direction"]),
+    FilterObject(operation="speed_percentiles", group_by=["Direction"]),
+    FilterObject(operation="count_by_window", window_minutes=60, group_by=["Direction"]),
+    FilterObject(
+        conditions=[FilterCondition(field="Speed", operator=">", value="1000")],
+        operation="min_speed",
+        group_by=["Lane"],
+    ),
+]
+
+
+class ColumnarEngineTests(unittest.TestCase):
+    def assert_equivalent(self, records):
+        columns = to_columns(records)
+        for filt in FILTERS:
+            with self.subTest(filter=filt.model_dump()):
+                self.assertEqual(process_filter_columnar(columns, filt), reference_process(records, filt))
+
+    def test_matches_dict_engine_on_sample_data(self):
+        self.assert_equivalent(load_traffic_data())
+
+    def test_matches_dict_engine_on_synthetic_data(self):
+        self.assert_equivalent(synthetic_records(2000))
+
+    def test_filter_mask_returns_matching_indices(self):
+        records = synthetic_records(500)
+        columns = to_columns(records)
+        cond = [FilterCondition(field="Direction", operator="==", value="East")]
+        indices = apply_filter_mask(columns, cond)
+        self.assertEqual(
+            indices.tolist(),
+            [i for i, r in enumerate(records) if r["Direction"] == "East"],
+        )
+
+    def test_range_operator_rejects_text_field(self):
+        columns = to_columns(synthetic_records(10))
+        cond = [FilterCondition(field="Direction", operator=">", value="North")]
+        with self.assertRaises(ValueError):
+            apply_filter_mask(columns, cond)
+
+    def test_top_k_matches_full_sort(self):
+        records = synthetic_records(3000)
+        columns = to_columns(records)
+        indices = apply_filter_mask(columns, [FilterCondition(field="Lane", operator="!=", value="2")])
+        for sort_by in ("Speed", "Lane", "CollectionTime", "Direction"):
+            for direction in ("ascending", "descending"):
+                full = sort_indices(columns, indices, sort_by, direction)
+                for k in (0, 1, 17, 500, len(indices) + 5):
+                    with self.subTest(sort_by=sort_by, direction=direction, k=k):
+                        self.assertEqual(
+                            top_k_indices(columns, indices, sort_by, direction, k).tolist(),
+                            full[:k].tolist(),
+                        )
+
+    def test_pages_match_sql_engine(self):
+        columns = get_traffic_columns()
+        for sort_by, direction in ((None, None), ("Speed", "descending"), ("CollectionTime", "ascending")):
+            page = FilterObject(
+                operation="list_vehicles",
+                conditions=[FilterCondition(field="Speed", operator=">", value="30")],
+                sort_by=sort_by,
+                sort_direction=direction,
+                limit=9,
+                offset=2,
+            )
+            for _ in range(4):
+                with self.subTest(sort_by=sort_by, cursor=page.cursor):
+                    expected = execute_sql_query(*plan_sql_statement(page))
+                    result = process_filter_columnar(columns, page)
+                    self.assertEqual(result, expected)
+                _, next_cursor = split_page(page, result)
+                if next_cursor is None:
+                    break
+                page = page.model_copy(update={"cursor": next_cursor, "offset": None})
+
+    def test_columns_are_cached(self):
+        self.assertIs(get_traffic_columns(), get_traffic_columns())
+
+
+if __name__ == "__main__":
+    unittest.main()
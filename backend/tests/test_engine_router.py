@@ -0,0 +1,191 @@
+import sys
+from pathlib import Path
+import asyncio
+import unittest
+from unittest import mock
+
+# Ensure backend is importable
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.api import assistant  # type: ignore
+from app.api.assistant import answer_filter, engine_stats, explain_filter  # type: ignore
+from app.models.aiModel import FilterCondition, FilterObject  # type: ignore
+from app.services.columnar_engine import TrafficColumns  # type: ignore
+from app.services.engine_router import EngineRouter, TableStats, results_match  # type: ignore
+from app.services.metrics import RequestTimings  # type: ignore
+from app.services.result_cache import get_result_cache  # type: ignore
+from app.services.sql_engine import plan_sql_statement  # type: ignore
+
+ROWS = [
+    ("2025-12-07 00:00:00", "North", 1, 30),
+    ("2025-12-07 06:00:00", "North", 1, 40),
+    ("2025-12-07 12:00:00", "South", 2, 50),
+    ("2025-12-07 18:00:00", "South", 3, 60),
+    ("2025-12-08 06:00:00", "East", 3, 70),
+    ("2025-12-08 18:00:00", "North", 2, 80),
+]
+
+
+def cond(field, operator, value):
+    return FilterCondition(field=field, operator=operator, value=value)
+
+
+FILTERS = [
+    FilterObject(operation="count_vehicles", conditions=[cond("Direction", "==", "North")]),
+    FilterObject(operation="max_speed", conditions=[cond("Speed", ">", "20")]),
+    FilterObject(operation="speed_percentiles", group_by=["Lane"]),
+    FilterObject(operation="count_by_window", window_minutes=60),
+    FilterObject(operation="list_vehicles", conditions=[cond("Speed", ">", "40")]),
+    FilterObject(operation="list_vehicles", sort_by="Speed", sort_direction="descending"),
+    FilterObject(operation="list_vehicles", sort_by="Speed", limit=5, offset=2),
+]
+
+
+class TableStatsTests(unittest.TestCase):
+    def setUp(self):
+        columns = TrafficColumns.from_rows(ROWS)
+        self.stats = TableStats.from_columns(columns, {"2025-12-07": 4, "2025-12-08": 2})
+
+    def test_equality_and_range_estimates_are_exact_per_column(self):
+        estimate = self.stats.estimate_rows
+        self.assertEqual(estimate(cond("Direction", "==", "North")), 3)
+        self.assertEqual(estimate(cond("Direction", "!=", "North")), 3)
+        self.assertEqual(estimate(cond("Lane", "==", "3")), 2)
+        self.assertEqual(estimate(cond("Speed", ">", "50")), 3)
+        self.assertEqual(estimate(cond("Speed", "<=", "50")), 3)
+        self.assertEqual(estimate(cond("Speed", ">=", "45.5")), 4)
+        self.assertEqual(estimate(cond("Speed", "==", "1000")), 0)
+
+    def test_time_bounds_use_rows_per_day(self):
+        # Half of the first day, assuming rows are spread evenly over it.
+        self.assertEqual(self.stats.estimate_rows(cond("CollectionTime", "<", "2025-12-07 12:00:00")), 2)
+        self.assertEqual(self.stats.estimate_rows(cond("CollectionTime", ">=", "2025-12-08 00:00:00")), 2)
+
+    def test_bounds_on_one_column_select_the_rows_between_them(self):
+        between = [cond("Speed", ">", "35"), cond("Speed", "<", "65")]
+        self.assertEqual(self.stats.estimate_matched(between), 3)
+        # Different columns are independent: 3/6 of the rows are North, 3/6 are faster than 50.
+        mixed = [cond("Direction", "==", "North"), cond("Speed", ">", "50")]
+        self.assertEqual(self.stats.estimate_matched(mixed), 1.5)
+
+
+class ResultsMatchTests(unittest.TestCase):
+    def test_unpaged_lists_compare_as_multisets(self):
+        listing = FilterObject(operation="list_vehicles")
+        a, b = {"Speed": 1, "Lane": 1}, {"Speed": 2, "Lane": 1}
+        self.assertTrue(results_match(listing, [a, b], [b, a]))
+        self.assertFalse(results_match(listing, [a, b], [a, a]))
+
+    def test_sorted_lists_must_agree_on_sort_keys_only(self):
+        listing = FilterObject(operation="list_vehicles", sort_by="Speed")
+        a, b, c = {"Speed": 1, "Lane": 1}, {"Speed": 1, "Lane": 2}, {"Speed": 2, "Lane": 1}
+        self.assertTrue(results_match(listing, [a, b, c], [b, a, c]))
+        self.assertFalse(results_match(listing, [a, b, c], [c, a, b]))
+
+    def test_pages_and_aggregates_must_be_identical(self):
+        page = FilterObject(operation="list_vehicles", limit=2)
+        a, b = {"Speed": 1}, {"Speed": 2}
+        self.assertFalse(results_match(page, [a, b], [b, a]))
+        self.assertTrue(results_match(FilterObject(operation="count_vehicles"), {"count": 3}, {"count": 3}))
+
+
+class EngineRouterTests(unittest.TestCase):
+    def setUp(self):
+        get_result_cache().invalidate()
+
+    def choose(self, router, filter_object):
+        return router.choose(filter_object, plan_sql_statement(filter_object))
+
+    def test_rollup_aggregates_stay_on_sql_and_scans_go_to_python(self):
+        router = EngineRouter()
+        count = self.choose(router, FilterObject(operation="count_vehicles"))
+        self.assertEqual(count.engine, "sql")
+        percentiles = self.choose(router, FilterObject(operation="speed_percentiles"))
+        self.assertEqual(percentiles.engine, "python")
+        self.assertLess(percentiles.costs["python"], percentiles.costs["sql"])
+        self.assertEqual(router.stats()["chosen"], {"sql": 1, "python": 1})
+
+    def test_mode_overrides_the_cost_model_except_for_averages(self):
+        forced = EngineRouter(mode="python")
+        self.assertEqual(self.choose(forced, FilterObject(operation="count_vehicles")).engine, "python")
+        self.assertEqual(self.choose(forced, FilterObject(operation="average_speed")).engine, "sql")
+        sql_only = EngineRouter(mode="sql")
+        self.assertEqual(self.choose(sql_only, FilterObject(operation="speed_percentiles")).engine, "sql")
+        with self.assertRaises(ValueError):
+            EngineRouter(mode="fastest")
+
+    def test_stale_snapshot_falls_back_to_sql(self):
+        router = EngineRouter(mode="python")
+        with mock.patch.object(router, "python_available", lambda: None):
+            choice = self.choose(router, FilterObject(operation="speed_percentiles"))
+        self.assertEqual(choice.engine, "sql")
+
+    def test_both_engines_answer_every_filter_the_same(self):
+        sql, python = EngineRouter(mode="sql"), EngineRouter(mode="python")
+        for filt in FILTERS:
+            with self.subTest(filt=filt):
+                get_result_cache().invalidate()
+                with mock.patch.object(assistant, "get_engine_router", lambda: sql):
+                    expected = answer_filter(filt)[:2]
+                get_result_cache().invalidate()
+                with mock.patch.object(assistant, "get_engine_router", lambda: python):
+                    answer, cursor, timings = answer_filter(filt)
+                self.assertTrue(results_match(filt, answer, expected[0]))
+                self.assertEqual(cursor, expected[1])
+                self.assertIsNotNone(timings.rows_scanned)
+
+    def test_shadow_mode_compares_fresh_answers(self):
+        router = EngineRouter(shadow=True)
+        with mock.patch.object(assistant, "get_engine_router", lambda: router):
+            for filt in FILTERS:
+                _, _, timings = answer_filter(filt)
+                self.assertIn("shadow", [name for name, _ in timings.stages])
+            answer_filter(FilterObject(operation="average_speed"))
+            # Cached answers are not recomputed, so there is nothing to compare.
+            answer_filter(FILTERS[0])
+        stats = router.stats()
+        self.assertEqual((stats["shadow_runs"], stats["shadow_skipped"], stats["mismatches"]), (len(FILTERS), 1, 0))
+
+    def test_spellings_of_a_number_agree_across_engines(self):
+        router = EngineRouter(mode="python", shadow=True)
+        with mock.patch.object(assistant, "get_engine_router", lambda: router):
+            for value in ("1", "01", " 1", "1.0"):
+                with self.subTest(value=value):
+                    filt = FilterObject(operation="count_vehicles", conditions=[cond("Lane", "==", value)])
+                    self.assertEqual(filt.conditions[0].value, "1")
+                    get_result_cache().invalidate()
+                    answer, _, _ = answer_filter(filt)
+                    self.assertGreater(answer["count"], 0)
+        stats = router.stats()
+        self.assertEqual((stats["shadow_runs"], stats["mismatches"]), (4, 0))
+
+    def test_shadow_mismatches_are_recorded(self):
+        router = EngineRouter(mode="sql", shadow=True)
+        filt = FilterObject(operation="count_vehicles")
+        real_run = router.run
+
+        def wrong_python(engine, *args, **kwargs):
+            return {"count": -1} if engine == "python" else real_run(engine, *args, **kwargs)
+
+        with mock.patch.object(router, "run", wrong_python), self.assertLogs("rosa.engine_router", "WARNING"):
+            router.execute(self.choose(router, filt), filt, plan_sql_statement(filt), True, RequestTimings())
+        stats = router.stats()
+        self.assertEqual(stats["mismatches"], 1)
+        self.assertEqual(stats["recent_mismatches"][0]["filter"], {"conditions": [], "operation": "count_vehicles"})
+
+    def test_explain_and_stats_report_the_router(self):
+        router = EngineRouter()
+        with mock.patch.object(assistant, "get_engine_router", lambda: router):
+            plan = explain_filter(FilterObject(operation="speed_percentiles"))
+            stats = asyncio.run(engine_stats())
+        self.assertEqual(plan["engine"], "python")
+        self.assertEqual(set(plan["estimated_cost_us"]), {"sql", "python"})
+        # Explaining does not count as answering.
+        self.assertEqual(stats["chosen"], {"sql": 0, "python": 0})
+        self.assertEqual(stats["mode"], "auto")
+
+
+if __name__ == "__main__":
+    unittest.main()
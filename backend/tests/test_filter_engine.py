@@ -11,6 +11,8 @@ from app.models.aiModel import FilterCondition, FilterObject  # type: ignore
 from app.services.filter_engine import (
     apply_filter_conditions,
     apply_sorting,
+    apply_top_k,
+    execute_grouped_operation,
     execute_operation,
     load_traffic_data,
     process_filter,
@@ -38,6 +40,12 @@ class FilterEngineTests(unittest.TestCase):
         speeds = [row["Speed"] for row in sorted_rows]
         self.assertEqual(speeds, sorted(speeds, reverse=True))
 
+    def test_top_k_matches_sorted_prefix(self):
+        for sort_by in ("Speed", "CollectionTime"):
+            for direction in ("ascending", "descending"):
+                expected = apply_sorting(self.dataset, sort_by, direction)[:5]
+                self.assertEqual(apply_top_k(self.dataset, sort_by, direction, 5), expected)
+
     def test_execute_operation_count(self):
         result = execute_operation(self.dataset, "count_vehicles")
         self.assertIsInstance(result, dict)
@@ -55,6 +63,43 @@ class FilterEngineTests(unittest.TestCase):
         self.assertIn("max_speed", result)
         self.assertEqual(result["max_speed"], max(int(r["Speed"]) for r in self.dataset))
 
+    def test_execute_operation_min(self):
+        result = execute_operation(self.dataset, "min_speed")
+        self.assertEqual(result["min_speed"], min(int(r["Speed"]) for r in self.dataset))
+        self.assertEqual(execute_operation([], "min_speed"), {"min_speed": None})
+
+    def test_execute_operation_percentiles_use_nearest_rank(self):
+        records = [{"Speed": speed} for speed in (70, 10, 40, 20, 50, 30, 60, 80, 90, 100)]
+        self.assertEqual(
+            execute_operation(records, "speed_percentiles"),
+            {"p50": 50, "p85": 90, "p95": 100},
+        )
+        self.assertEqual(execute_operation([], "speed_percentiles"), {"p50": None, "p85": None, "p95": None})
+
+    def test_execute_operation_count_by_window(self):
+        records = [
+            {"CollectionTime": t}
+            for t in ("2025-12-07 06:14:59", "2025-12-07 06:00:00", "2025-12-07 06:15:00", "2025-12-08 23:59:59")
+        ]
+        self.assertEqual(
+            execute_operation(records, "count_by_window", 15),
+            [
+                {"window_start": "2025-12-07 06:00:00", "count": 2},
+                {"window_start": "2025-12-07 06:15:00", "count": 1},
+                {"window_start": "2025-12-08 23:45:00", "count": 1},
+            ],
+        )
+        hourly = execute_operation(records, "count_by_window", 60)
+        self.assertEqual([w["count"] for w in hourly], [3, 1])
+
+    def test_execute_grouped_operation(self):
+        result = execute_grouped_operation(self.dataset, "count_vehicles", ["Direction"])
+        directions = sorted({r["Direction"] for r in self.dataset})
+        self.assertEqual([row["Direction"] for row in result], directions)
+        self.assertEqual(sum(row["count"] for row in result), len(self.dataset))
+        for row in result:
+            self.assertEqual(row["count"], sum(1 for r in self.dataset if r["Direction"] == row["Direction"]))
+
     def test_process_filter_pipeline(self):
         filt = FilterObject(
             conditions=[
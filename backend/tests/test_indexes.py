@@ -0,0 +1,153 @@
+import sys
+from pathlib import Path
+import unittest
+from unittest import mock
+
+# Ensure backend directory is on the import path
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.models.aiModel import FilterCondition  # type: ignore
+from app.services import columnar_engine  # type: ignore
+from app.services.columnar_engine import apply_filter_mask  # type: ignore
+from app.services.indexes import TrafficIndexes, build_indexes, explain_selection, extend_snapshot  # type: ignore
+from tests.test_columnar_engine import synthetic_records, to_columns  # type: ignore
+
+
+def cond(field, operator, value):
+    return FilterCondition(field=field, operator=operator, value=value)
+
+
+CONDITION_SETS = [
+    [cond("Direction", "==", "North")],
+    [cond("Direction", "==", "North"), cond("Lane", "==", "2")],
+    [cond("Lane", "==", "3"), cond("Speed", ">", "90")],
+    [cond("Speed", ">=", "100"), cond("Direction", "!=", "South")],
+    [cond("Speed", "<", "25"), cond("Speed", ">", "21")],
+    [cond("Speed", "<=", "20")],
+    [cond("Speed", "==", "77"), cond("Lane", "==", "1")],
+    [cond("CollectionTime", "==", "2025-12-07 10:00:00")],
+    [cond("Direction", "==", "West"), cond("Lane", "==", "1")],
+    [cond("Lane", "==", "01")],
+    [cond("Direction", "!=", "North")],
+]
+
+
+class IndexTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.records = synthetic_records(5000)
+        cls.columns = to_columns(cls.records)
+        cls.indexes = TrafficIndexes(cls.columns)
+
+    def test_planner_matches_full_scan(self):
+        for conditions in CONDITION_SETS:
+            with self.subTest(conditions=[c.model_dump() for c in conditions]):
+                self.assertEqual(
+                    self.indexes.select_rows(conditions).tolist(),
+                    apply_filter_mask(self.columns, conditions).tolist(),
+                )
+
+    def test_explain_follows_the_planner(self):
+        columns = to_columns(self.records)
+        build_indexes(columns)
+        for conditions in CONDITION_SETS:
+            with self.subTest(conditions=[c.model_dump() for c in conditions]):
+                plan = explain_selection(columns, conditions)
+                self.assertEqual(plan["rows_matched"], len(columns.indexes.select_rows(conditions)))
+                self.assertEqual(len(plan["steps"]), len(conditions))
+                # Each step can only narrow the rows down.
+                counts = [step["rows_after"] for step in plan["steps"]]
+                self.assertEqual(counts, sorted(counts, reverse=True))
+
+        plan = explain_selection(columns, [cond("Direction", "==", "North"), cond("Speed", ">", "118")])
+        self.assertEqual(plan["index"]["field"], "Speed")
+        self.assertEqual(plan["index"]["kind"], "sorted")
+        self.assertEqual([step["access"] for step in plan["steps"]], ["sorted index", "filter"])
+        self.assertEqual(plan["rows_scanned"], self.indexes.estimate(cond("Speed", ">", "118")))
+
+        plan = explain_selection(columns, [cond("Direction", "!=", "North")])
+        self.assertIsNone(plan["index"])
+        self.assertEqual(plan["rows_scanned"], len(columns))
+
+    def test_estimates_are_exact(self):
+        estimate = self.indexes.estimate(cond("Lane", "==", "2"))
+        self.assertEqual(estimate, sum(1 for r in self.records if r["Lane"] == 2))
+        estimate = self.indexes.estimate(cond("Speed", ">", "100"))
+        self.assertEqual(estimate, sum(1 for r in self.records if r["Speed"] > 100))
+        self.assertIsNone(self.indexes.estimate(cond("Direction", "!=", "North")))
+
+    def test_most_selective_index_is_used_first(self):
+        conditions = [cond("Direction", "==", "North"), cond("Speed", ">", "118")]
+        looked_up = []
+        original = self.indexes.lookup
+
+        def spy(condition):
+            looked_up.append(condition.field)
+            return original(condition)
+
+        self.indexes.lookup = spy
+        try:
+            self.indexes.select_rows(conditions)
+        finally:
+            del self.indexes.lookup
+        self.assertEqual(looked_up, ["Speed"])
+
+    def test_extended_snapshot_matches_fresh_build(self):
+        base = to_columns(self.records[:3000])
+        build_indexes(base)
+        # West is a Direction label the base snapshot has never seen.
+        appended = [
+            (r["CollectionTime"], "West" if i % 7 == 0 else r["Direction"], r["Lane"], r["Speed"])
+            for i, r in enumerate(self.records[3000:])
+        ]
+        extended = extend_snapshot(base, appended)
+        self.assertEqual(len(base), 3000)
+        self.assertEqual(len(extended), 5000)
+        for conditions in CONDITION_SETS:
+            with self.subTest(conditions=[c.model_dump() for c in conditions]):
+                self.assertEqual(
+                    extended.indexes.select_rows(conditions).tolist(),
+                    apply_filter_mask(extended, conditions).tolist(),
+                )
+        fresh = TrafficIndexes(extended)
+        for conditions in CONDITION_SETS:
+            for condition in conditions:
+                self.assertEqual(extended.indexes.estimate(condition), fresh.estimate(condition))
+                if fresh.estimate(condition) is not None:
+                    self.assertEqual(extended.indexes.lookup(condition).tolist(), fresh.lookup(condition).tolist())
+
+    def test_appends_grow_only_the_open_chunk(self):
+        base = to_columns(self.records[:3000])
+        build_indexes(base)
+        snapshot = base
+        with mock.patch.object(columnar_engine, "DELTA_ROWS", 100):
+            for start in range(3000, 5000, 40):
+                batch = [(r["CollectionTime"], r["Direction"], r["Lane"], r["Speed"])
+                         for r in self.records[start:start + 40]]
+                previous, snapshot = snapshot, extend_snapshot(snapshot, batch)
+                # The loaded arrays are the first chunk of every snapshot, never copied.
+                self.assertIs(snapshot.speed.chunks[0], base.speed)
+                # Chunks both snapshots have keep their indexes.
+                shared = set(previous.indexes.parts) & set(snapshot.indexes.parts)
+                for bounds in shared:
+                    self.assertIs(snapshot.indexes.parts[bounds], previous.indexes.parts[bounds])
+        # Sealed chunks are merged, so few remain; the open chunk is at most DELTA_ROWS.
+        bounds = snapshot.chunk_bounds()
+        self.assertLessEqual(len(bounds), 6)
+        self.assertEqual(bounds[0], (0, 3000))
+        self.assertEqual(bounds[-1][1], 5000)
+        for conditions in CONDITION_SETS:
+            with self.subTest(conditions=[c.model_dump() for c in conditions]):
+                expected = apply_filter_mask(to_columns(self.records), conditions).tolist()
+                self.assertEqual(snapshot.indexes.select_rows(conditions).tolist(), expected)
+                self.assertEqual(apply_filter_mask(snapshot, conditions).tolist(), expected)
+
+    def test_invalid_range_still_raises(self):
+        with self.assertRaises(ValueError):
+            self.indexes.select_rows([cond("Lane", "==", "1"), cond("Direction", ">", "North")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import sys
+from pathlib import Path
+import asyncio
+import tempfile
+import unittest
+from unittest import mock
+
+# Ensure backend directory is on the import path
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from fastapi import HTTPException
+from pydantic import ValidationError
+
+from app.api import ingest as ingest_api  # type: ignore
+from app.models.aiModel import FilterCondition, FilterObject, IngestRow  # type: ignore
+from app.services import column_store  # type: ignore
+from app.services.columnar_engine import process_filter_columnar  # type: ignore
+from app.services.ingest import IngestBatcher  # type: ignore
+from app.services.traffic_store import TrafficStore  # type: ignore
+from tests.test_traffic_store import SAMPLE_CSV  # type: ignore
+
+
+def row(minute, direction="North", lane=1, speed=50):
+    return IngestRow(CollectionTime=f"2025-12-07 07:{minute:02d}:00", Direction=direction, Lane=lane, Speed=speed)
+
+
+class IngestTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.csv_path = Path(self.tmp.name) / "traffic.csv"
+        self.csv_path.write_text(SAMPLE_CSV)
+        self.store = TrafficStore(self.csv_path, Path(self.tmp.name) / "traffic.db")
+        self.batcher = IngestBatcher(self.store, max_delay_seconds=0.01)
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+
+    def test_concurrent_requests_share_one_commit(self):
+        async def main():
+            return await asyncio.gather(*(
+                self.batcher.submit([row(minute).as_tuple()]) for minute in range(20)
+            ))
+
+        row_counts = asyncio.run(main())
+        self.assertEqual(row_counts, [23] * 20)
+        self.assertEqual(self.batcher.commits, 1)
+        self.assertEqual(self.batcher.rows, 20)
+
+    def test_endpoint_accepts_single_rows_and_arrays(self):
+        with mock.patch.object(ingest_api, "get_ingest_batcher", lambda: self.batcher), \
+                mock.patch.object(ingest_api, "get_store", lambda: self.store):
+            single = asyncio.run(ingest_api.ingest_endpoint(row(1)))
+            bulk = asyncio.run(ingest_api.ingest_endpoint([row(2), row(3, "South", 2, 44)]))
+            with self.assertRaises(HTTPException):
+                asyncio.run(ingest_api.ingest_endpoint([]))
+        self.assertEqual((single.ingested, single.row_count), (1, 4))
+        self.assertEqual((bulk.ingested, bulk.row_count), (2, 6))
+        self.assertEqual(bulk.version, self.store.version)
+
+    def test_rejects_malformed_collection_time(self):
+        with self.assertRaises(ValidationError):
+            IngestRow(CollectionTime="07/12/2025 07:00", Direction="North", Lane=1, Speed=50)
+
+    def test_python_engine_sees_ingested_rows(self):
+        count_north = FilterObject(
+            operation="count_vehicles",
+            conditions=[FilterCondition(field="Direction", operator="==", value="North")],
+        )
+        with mock.patch.object(column_store, "get_store", lambda: self.store):
+            before = column_store.get_traffic_columns(self.csv_path)
+            self.store.append_rows([row(5).as_tuple(), row(6, "West").as_tuple()])
+            after = column_store.get_traffic_columns(self.csv_path)
+            self.assertIs(column_store.get_traffic_columns(self.csv_path), after)
+        self.assertEqual(process_filter_columnar(before, count_north), {"count": 2})
+        self.assertEqual(process_filter_columnar(after, count_north), {"count": 3})
+        self.assertEqual(len(after), 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+import sys
+from pathlib import Path
+import asyncio
+import json
+import time
+import unittest
+
+# Ensure backend is importable
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.services.llm_client import HttpLLMClient, LLMClient, LLMError, LLMTimeout, MockLLMClient  # type: ignore
+from app.services.question_parser import parse_question_json  # type: ignore
+from benchmarks.fake_llm import FakeLLMServer  # type: ignore
+
+QUESTIONS = [
+    "how many north vehicles",
+    "max speed in lane 2",
+    "list south vehicles faster than 60",
+    "average speed of vehicles in lane 1",
+    "speed percentiles by lane",
+]
+
+
+class HttpLLMClientTests(unittest.TestCase):
+    def test_concurrent_questions_are_micro_batched(self):
+        async def scenario():
+            async with FakeLLMServer(latency_ms=20) as server:
+                client = HttpLLMClient(server.url, batch_window_ms=10, max_batch=16)
+                answers = await asyncio.gather(*(client.complete(q) for q in QUESTIONS * 4))
+                await client.close()
+                return server, client, answers
+
+        server, client, answers = asyncio.run(scenario())
+        self.assertEqual(answers, [parse_question_json(q) for q in QUESTIONS * 4])
+        # 20 questions, at most 16 per batch.
+        self.assertEqual((server.requests, server.largest_batch), (2, 16))
+        self.assertEqual(client.stats()["mean_batch_size"], 10)
+
+    def test_connections_are_reused_across_batches(self):
+        async def scenario():
+            async with FakeLLMServer() as server:
+                client = HttpLLMClient(server.url, batch_window_ms=0)
+                for question in QUESTIONS:
+                    await client.complete(question)
+                await client.close()
+                return server, client
+
+        server, client = asyncio.run(scenario())
+        self.assertEqual(server.requests, len(QUESTIONS))
+        self.assertEqual(server.connections, 1)
+        self.assertEqual(client.stats()["connections_opened"], 1)
+
+    def test_parallel_batches_are_bounded_by_max_connections(self):
+        async def scenario():
+            async with FakeLLMServer(latency_ms=50) as server:
+                client = HttpLLMClient(server.url, batch_window_ms=0, max_batch=1, max_connections=2)
+                started = time.perf_counter()
+                await asyncio.gather(*(client.complete(q) for q in QUESTIONS[:4]))
+                elapsed = time.perf_counter() - started
+                await client.close()
+                return server, elapsed
+
+        server, elapsed = asyncio.run(scenario())
+        self.assertEqual(server.connections, 2)
+        # Four 50 ms batches over two connections take two rounds.
+        self.assertGreaterEqual(elapsed, 0.1)
+
+    def test_chunked_responses_are_read(self):
+        async def scenario():
+            async with FakeLLMServer(chunked=True) as server:
+                client = HttpLLMClient(server.url, batch_window_ms=5)
+                answers = await asyncio.gather(*(client.complete(q) for q in QUESTIONS))
+                # The connection stays usable after a chunked body.
+                answers.append(await client.complete(QUESTIONS[0]))
+                await client.close()
+                return server, client, answers
+
+        server, client, answers = asyncio.run(scenario())
+        self.assertEqual(answers, [parse_question_json(q) for q in QUESTIONS + QUESTIONS[:1]])
+        self.assertEqual((server.requests, client.stats()["connections_opened"]), (2, 1))
+
+    def test_slow_service_times_out(self):
+        async def scenario():
+            async with FakeLLMServer(latency_ms=500) as server:
+                client = HttpLLMClient(server.url, timeout_seconds=0.05, batch_window_ms=0)
+                try:
+                    with self.assertRaises(LLMTimeout):
+                        await client.complete(QUESTIONS[0])
+                finally:
+                    await client.close()
+                return client
+
+        self.assertEqual(asyncio.run(scenario()).stats()["timeouts"], 1)
+
+    def test_rejected_questions_and_service_errors(self):
+        async def scenario():
+            async with FakeLLMServer() as server:
+                client = HttpLLMClient(server.url, batch_window_ms=0)
+                try:
+                    with self.assertRaises(ValueError) as rejected:
+                        await client.complete("   ")
+                    self.assertNotIsInstance(rejected.exception, LLMError)
+                finally:
+                    await client.close()
+            # The server is gone now.
+            with self.assertRaises(LLMError):
+                await HttpLLMClient(server.url, batch_window_ms=0).complete(QUESTIONS[0])
+
+        asyncio.run(scenario())
+
+    def test_invalid_url_is_rejected(self):
+        with self.assertRaises(ValueError):
+            HttpLLMClient("ftp://example.com/")
+
+
+class MockLLMClientTests(unittest.TestCase):
+    def test_clients_must_implement_complete(self):
+        with self.assertRaises(TypeError):
+            LLMClient()
+
+    def test_mock_client_returns_parser_json(self):
+        raw = asyncio.run(MockLLMClient().complete("how many south vehicles"))
+        self.assertEqual(json.loads(raw)["operation"], "count_vehicles")
+
+
+if __name__ == "__main__":
+    unittest.main()
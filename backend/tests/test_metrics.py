@@ -0,0 +1,128 @@
+import sys
+from pathlib import Path
+import asyncio
+import os
+import pickle
+import unittest
+from unittest import mock
+
+# Ensure backend is importable
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.api.assistant import TimedJSONResponse, answer_filter, assistant_endpoint  # type: ignore
+from app.main import metrics as metrics_endpoint  # type: ignore
+from app.models.aiModel import AssistantRequest, FilterCondition, FilterObject  # type: ignore
+from app.services.metrics import (  # type: ignore
+    Histogram,
+    MetricsRegistry,
+    RequestTimings,
+    get_metrics,
+)
+from app.services.sql_engine import plan_sql_statement, rows_scanned  # type: ignore
+from app.services.traffic_store import get_store  # type: ignore
+
+
+class HistogramTests(unittest.TestCase):
+    def test_buckets_are_cumulative(self):
+        histogram = Histogram("rosa_test_seconds", "Test.", (0.1, 1.0), ("stage",))
+        for value in (0.05, 0.5, 0.7, 3.0):
+            histogram.observe(value, "parse")
+        lines = histogram.render()
+        self.assertEqual(lines[:2], ["# HELP rosa_test_seconds Test.", "# TYPE rosa_test_seconds histogram"])
+        self.assertEqual(lines[2:], [
+            'rosa_test_seconds_bucket{stage="parse",le="0.1"} 1',
+            'rosa_test_seconds_bucket{stage="parse",le="1"} 3',
+            'rosa_test_seconds_bucket{stage="parse",le="+Inf"} 4',
+            'rosa_test_seconds_sum{stage="parse"} 4.25',
+            'rosa_test_seconds_count{stage="parse"} 4',
+        ])
+
+    def test_registry_records_stages_and_rows(self):
+        registry = MetricsRegistry()
+        timings = RequestTimings("assistant")
+        timings.add("parse", 0.002)
+        timings.add("execute", 0.03)
+        timings.rows_scanned, timings.rows_returned = 500, 1
+        registry.record(timings)
+        self.assertEqual(registry.stage_seconds.series("execute"), {"count": 1, "sum": 0.03})
+        self.assertEqual(registry.rows_scanned.series("assistant"), {"count": 1, "sum": 500})
+        text = registry.render()
+        self.assertIn('rosa_request_duration_seconds_count{endpoint="assistant"} 1', text)
+        self.assertIn('rosa_rows_returned_bucket{endpoint="assistant",le="1"} 1', text)
+
+
+class RequestTimingsTests(unittest.TestCase):
+    def test_server_timing_lists_stages_in_order(self):
+        timings = RequestTimings()
+        timings.add("parse", 0.0012)
+        with timings.stage("execute"):
+            pass
+        self.assertEqual([name for name, _ in timings.stages], ["parse", "execute"])
+        self.assertTrue(timings.server_timing().startswith("parse;dur=1.200, execute;dur="))
+
+    def test_answer_filter_reports_worker_stages(self):
+        filt = FilterObject(
+            operation="list_vehicles",
+            conditions=[FilterCondition(field="Speed", operator=">", value="1000")],
+        )
+        result, next_cursor, timings = answer_filter(filt)
+        self.assertEqual(result, [])
+        stages = [name for name, _ in timings.stages]
+        self.assertEqual(stages[0], "plan")
+        self.assertIn("page", stages)
+        self.assertEqual(timings.rows_returned, 0)
+        # Timings come back from process pool workers, so they must pickle.
+        self.assertEqual(pickle.loads(pickle.dumps(timings)).stages, timings.stages)
+
+    def test_rows_scanned_counts_partition_rows(self):
+        store = get_store()
+        total = sum(store.partition_sizes().values())
+        listing = FilterObject(operation="list_vehicles", conditions=[FilterCondition(field="Lane", operator="==", value="1")])
+        self.assertEqual(rows_scanned(plan_sql_statement(listing).sql), total)
+        # Counts are answered from the rollups, which hold no raw rows.
+        count = FilterObject(operation="count_vehicles")
+        self.assertEqual(rows_scanned(plan_sql_statement(count).sql), 0)
+
+
+class EndpointTimingTests(unittest.TestCase):
+    def render_in_request(self, question):
+        # One request context: the endpoint starts the timings, the response finishes them.
+        async def handle():
+            response = await assistant_endpoint(AssistantRequest(question=question))
+            return TimedJSONResponse(response.model_dump())
+        return asyncio.run(handle())
+
+    def test_server_timing_header_is_opt_in(self):
+        with mock.patch.dict(os.environ, {"ROSA_SERVER_TIMING": "1"}):
+            response = self.render_in_request("max speed for north vehicles")
+        stages = [entry.split(";")[0] for entry in response.headers["server-timing"].split(", ")]
+        self.assertEqual(stages[:4], ["parse", "validate", "sql", "queue"])
+        self.assertEqual(stages[-1], "serialize")
+
+        with mock.patch.dict(os.environ, {"ROSA_SERVER_TIMING": ""}):
+            response = self.render_in_request("max speed for south vehicles")
+        self.assertNotIn("server-timing", response.headers)
+
+    def test_metrics_endpoint_exports_histograms(self):
+        before = get_metrics().request_seconds.series("assistant") or {"count": 0}
+        self.render_in_request("how many vehicles in lane 2")
+        after = get_metrics().request_seconds.series("assistant")
+        self.assertEqual(after["count"], before["count"] + 1)
+
+        response = asyncio.run(metrics_endpoint())
+        self.assertTrue(response.media_type.startswith("text/plain; version=0.0.4"))
+        text = response.body.decode()
+        self.assertIn("# TYPE rosa_stage_duration_seconds histogram", text)
+        self.assertIn('rosa_stage_duration_seconds_count{stage="serialize"}', text)
+
+    def test_direct_calls_record_nothing(self):
+        # Without a request context the response class just renders.
+        response = TimedJSONResponse({"result": 1})
+        self.assertEqual(response.body, b'{"result":1}')
+        self.assertNotIn("server-timing", response.headers)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+import sys
+from pathlib import Path
+import os
+import tempfile
+import unittest
+
+# Ensure backend is importable
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.models.aiModel import FilterCondition, FilterObject  # type: ignore
+from app.services.column_store import load_traffic_columns  # type: ignore
+from app.services.columnar_engine import process_filter_columnar  # type: ignore
+from app.services.indexes import build_indexes, extend_snapshot  # type: ignore
+from app.services.parallel_scan import ParallelScanner  # type: ignore
+from tests.test_column_store import write_csv  # type: ignore
+from tests.test_columnar_engine import FILTERS, synthetic_records, to_columns  # type: ignore
+
+PAGED_FILTERS = [
+    FilterObject(operation="list_vehicles", limit=10, offset=3),
+    FilterObject(operation="list_vehicles", sort_by="Speed", sort_direction="descending", limit=10, offset=5),
+    FilterObject(operation="list_vehicles", sort_by="Direction", limit=7),
+    FilterObject(operation="speed_percentiles", group_by=["Lane", "Direction"]),
+    FilterObject(
+        conditions=[FilterCondition(field="Speed", operator=">", value="100")],
+        operation="count_vehicles",
+        group_by=["Direction"],
+    ),
+]
+
+
+class ParallelScannerTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        csv_path = Path(cls.tmp.name) / "traffic.csv"
+        write_csv(csv_path, synthetic_records(5000))
+        # Segments of 1500 rows: three full ones and a partial tail.
+        cls.scanner = ParallelScanner(workers=2, min_rows=0, segment_rows=1500)
+        cls.columns = load_traffic_columns(csv_path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.scanner.shutdown()
+        cls.tmp.cleanup()
+
+    def assertMatchesSerial(self, columns, filters):
+        for filter_object in filters:
+            with self.subTest(filter=filter_object.model_dump(exclude_none=True)):
+                self.assertEqual(self.scanner.process(columns, filter_object),
+                                 process_filter_columnar(columns, filter_object))
+
+    def test_parallel_results_equal_serial_results(self):
+        self.assertMatchesSerial(self.columns, FILTERS + PAGED_FILTERS)
+
+    def test_in_memory_snapshots_are_written_to_shared_files(self):
+        columns = to_columns(synthetic_records(4000, seed=3))
+        self.assertMatchesSerial(columns, FILTERS[:6])
+        segments = self.scanner.publish(columns)
+        self.assertEqual([(s.start, s.stop) for s in segments], [(0, 1500), (1500, 3000), (3000, 4000)])
+        self.assertTrue(all(os.path.exists(c.path) for s in segments for c in s.columns.values()))
+
+    def test_cached_columns_are_mapped_in_place(self):
+        segments = self.scanner.publish(self.columns)
+        speed = segments[1].columns["speed"]
+        self.assertEqual(Path(speed.path).name, "speed.bin")
+        self.assertEqual(speed.offset, 1500 * self.columns.speed.itemsize)
+
+    def test_appends_only_republish_the_tail(self):
+        before = self.scanner.publish(self.columns)
+        extended = extend_snapshot(self.columns, [("2025-12-09 10:00:00", "West", 5, 130)] * 600)
+        after = self.scanner.publish(extended)
+        # The cached rows keep their segments, still mapped from the cache files.
+        self.assertEqual(after[:4], before)
+        self.assertEqual(Path(after[3].columns["speed"].path).name, "speed.bin")
+        self.assertEqual([(s.start, s.stop) for s in after[4:]], [(5000, 5600)])
+        # Filters no index narrows still scan in parallel on the new snapshot.
+        scans = self.scanner.stats()["scans"]
+        self.assertMatchesSerial(extended, [FILTERS[0], FILTERS[2], PAGED_FILTERS[1]])
+        self.assertEqual(self.scanner.stats()["scans"], scans + 3)
+
+    def test_indexed_and_small_scans_stay_serial(self):
+        columns = to_columns(synthetic_records(3000, seed=5))
+        build_indexes(columns)
+        lane = [FilterCondition(field="Lane", operator="==", value="2")]
+        self.assertFalse(self.scanner.applies(columns, lane))
+        self.assertFalse(ParallelScanner(workers=1, min_rows=0).applies(columns, []))
+        self.assertFalse(ParallelScanner(workers=4, min_rows=10_000).applies(columns, []))
+        scans = self.scanner.stats()["scans"]
+        self.scanner.process(columns, FilterObject(operation="count_vehicles", conditions=lane))
+        self.assertEqual(self.scanner.stats()["scans"], scans)
+
+
+if __name__ == "__main__":
+    unittest.main()
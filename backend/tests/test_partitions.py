@@ -0,0 +1,224 @@
+import sys
+from pathlib import Path
+import tempfile
+import unittest
+from unittest import mock
+
+# Ensure backend directory is on the import path
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from pydantic import ValidationError
+
+from app.models.aiModel import FilterCondition, FilterObject  # type: ignore
+from app.services import column_store, sql_engine  # type: ignore
+from app.services.columnar_engine import process_filter_columnar  # type: ignore
+from app.services.pagination import split_page  # type: ignore
+from app.services.partitions import day_bounds, prune_partitions  # type: ignore
+from app.services.sql_engine import (  # type: ignore
+    build_sql_statement,
+    execute_sql_query,
+    explain_sql_statement,
+    plan_sql_statement,
+)
+from app.services.traffic_store import TrafficStore  # type: ignore
+from tests.test_columnar_engine import synthetic_records, to_columns  # type: ignore
+
+PARTITIONS = [
+    ("2025-12-07", "vehicles_20251207"),
+    ("2025-12-08", "vehicles_20251208"),
+    ("2025-12-09", "vehicles_20251209"),
+]
+
+
+def time_range(start=None, end=None):
+    conditions = []
+    if start:
+        conditions.append(FilterCondition(field="CollectionTime", operator=">=", value=start))
+    if end:
+        conditions.append(FilterCondition(field="CollectionTime", operator="<", value=end))
+    return conditions
+
+
+def write_csv(path, records):
+    lines = ["CollectionTime,Direction,Lane,Speed"]
+    lines += [f"{r['CollectionTime']},{r['Direction']},{r['Lane']},{r['Speed']}" for r in records]
+    path.write_text("\n".join(lines) + "\n")
+
+
+class PruningTests(unittest.TestCase):
+    def test_day_bounds(self):
+        self.assertEqual(day_bounds([]), (None, None))
+        self.assertEqual(day_bounds(time_range("2025-12-08")), ("2025-12-08", None))
+        # "< midnight" does not reach into that day.
+        self.assertEqual(day_bounds(time_range(end="2025-12-09")), (None, "2025-12-08"))
+        self.assertEqual(day_bounds(time_range(end="2025-12-09 00:00:01")), (None, "2025-12-09"))
+
+    def test_prune_partitions(self):
+        self.assertIsNone(prune_partitions(PARTITIONS, [FilterCondition(field="Lane", operator="==", value="1")]))
+        self.assertEqual(
+            prune_partitions(PARTITIONS, time_range("2025-12-08 12:00", "2025-12-09")),
+            ["vehicles_20251208"],
+        )
+        self.assertEqual(prune_partitions(PARTITIONS, time_range("2025-12-10")), [])
+
+    def test_condition_values_are_normalized(self):
+        condition = FilterCondition(field="CollectionTime", operator=">=", value="2025-12-08T06:30")
+        self.assertEqual(condition.value, "2025-12-08 06:30:00")
+        with self.assertRaises(ValidationError):
+            FilterCondition(field="CollectionTime", operator=">=", value="yesterday")
+
+
+class PartitionedStoreTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.records = synthetic_records(600)
+        self.csv_path = Path(self.tmp.name) / "traffic.csv"
+        write_csv(self.csv_path, self.records)
+        self.store = TrafficStore(self.csv_path, Path(self.tmp.name) / "traffic.db")
+        patcher = mock.patch.object(sql_engine, "get_store", lambda: self.store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+
+    def test_one_partition_per_day(self):
+        self.assertEqual(self.store.partitions(), PARTITIONS)
+
+    def test_pruned_plans_only_read_matching_days(self):
+        filt = FilterObject(
+            operation="list_vehicles",
+            conditions=time_range("2025-12-08 06:00", "2025-12-08 18:30") + [
+                FilterCondition(field="Speed", operator=">", value="60"),
+            ],
+            sort_by="Speed",
+            sort_direction="descending",
+            limit=25,
+        )
+        planned = plan_sql_statement(filt)
+        self.assertIn("vehicles_20251208", planned.sql)
+        self.assertNotIn("vehicles_20251207", planned.sql)
+        self.assertNotIn("vehicles_20251209", planned.sql)
+        self.assertEqual(
+            [row["Speed"] for row in execute_sql_query(*planned)],
+            [row["Speed"] for row in execute_sql_query(*build_sql_statement(filt))],
+        )
+
+    def test_time_ranges_match_columnar_engine(self):
+        columns = to_columns(self.records)
+        ranges = [
+            time_range("2025-12-08"),
+            time_range(end="2025-12-08 12:00"),
+            time_range("2025-12-07 23:00", "2025-12-09 01:00"),
+            time_range("2025-12-12"),
+        ]
+        for conditions in ranges:
+            # Averages are rounded by the Python engine, so only exact aggregates are compared.
+            for operation in ("count_vehicles", "max_speed"):
+                filt = FilterObject(operation=operation, conditions=conditions)
+                with self.subTest(operation=operation, conditions=[c.value for c in conditions]):
+                    self.assertEqual(process_filter_columnar(columns, filt), execute_sql_query(*plan_sql_statement(filt)))
+            page = FilterObject(operation="list_vehicles", conditions=conditions, limit=1000)
+            with self.subTest(operation="list_vehicles", conditions=[c.value for c in conditions]):
+                self.assertEqual(process_filter_columnar(columns, page), execute_sql_query(*plan_sql_statement(page)))
+
+    def test_explain_names_the_tables_read(self):
+        page = FilterObject(operation="list_vehicles", conditions=time_range("2025-12-08", "2025-12-09"), limit=10)
+        plan = explain_sql_statement(plan_sql_statement(page))
+        self.assertEqual(plan["engine"], "sqlite")
+        self.assertEqual(plan["partitions"], ["vehicles_20251208"])
+        self.assertEqual(plan["rows_scanned"], sum(1 for r in self.records if r["CollectionTime"][:10] == "2025-12-08"))
+        self.assertTrue(any("vehicles_20251208" in step["detail"] for step in plan["query_plan"]))
+        self.assertIn("'2025-12-08 00:00:00'", plan["sql"])
+
+        count = FilterObject(operation="count_vehicles", conditions=time_range("2025-12-08"))
+        plan = explain_sql_statement(plan_sql_statement(count))
+        self.assertEqual((plan["rollups"], plan["partitions"], plan["rows_scanned"]), (["vehicle_rollup_hour"], [], 0))
+
+        # A range outside every partition reads nothing.
+        empty = FilterObject(operation="list_vehicles", conditions=time_range("2026-01-01"), limit=10)
+        self.assertEqual(explain_sql_statement(plan_sql_statement(empty))["rows_scanned"], 0)
+
+    def test_drop_partitions_before(self):
+        version = self.store.version
+        self.assertEqual(self.store.drop_partitions_before("2025-12-09"), ["2025-12-07", "2025-12-08"])
+        self.assertNotEqual(self.store.version, version)
+        self.assertEqual(self.store.partitions(), PARTITIONS[2:])
+
+        expected = sum(1 for r in self.records if r["CollectionTime"] >= "2025-12-09")
+        count = FilterObject(operation="count_vehicles")
+        self.assertEqual(execute_sql_query(*plan_sql_statement(count)), {"count": expected})
+        self.assertEqual(execute_sql_query(*build_sql_statement(count)), {"count": expected})
+
+    def test_retention_drops_old_days_as_new_ones_arrive(self):
+        self.store.retention_days = 2
+        row_count = self.store.append_rows([("2025-12-10 00:00:05", "North", 1, 50)])
+        self.assertEqual([day for day, _ in self.store.partitions()], ["2025-12-09", "2025-12-10"])
+        expected = sum(1 for r in self.records if r["CollectionTime"] >= "2025-12-09") + 1
+        self.assertEqual(row_count, expected)
+        # The rollups forget the dropped days too.
+        count = FilterObject(operation="count_vehicles")
+        self.assertIn("vehicle_rollup_", plan_sql_statement(count).sql)
+        self.assertEqual(execute_sql_query(*plan_sql_statement(count)), {"count": expected})
+        # Row ids keep counting from where the CSV left off.
+        self.assertEqual(self.store.rows_after(len(self.records)), [("2025-12-10 00:00:05", "North", 1, 50)])
+
+    def test_future_timestamps_do_not_move_the_retention_horizon(self):
+        self.store.retention_days = 3
+        self.store.append_rows([("2099-01-01 00:00:00", "North", 1, 50)])
+        days = [day for day, _ in self.store.partitions()]
+        # The horizon stays at the newest real day, so nothing is dropped.
+        self.assertEqual(days, [day for day, _ in PARTITIONS] + ["2099-01-01"])
+
+    def test_retention_trims_the_column_snapshot(self):
+        with mock.patch.object(column_store, "get_store", lambda: self.store):
+            before = column_store.get_traffic_columns(self.csv_path)
+            self.store.retention_days = 2
+            self.store.append_rows([("2025-12-10 00:00:05", "North", 1, 50)])
+            after = column_store.get_traffic_columns(self.csv_path)
+            # Rows went away, so consumers that fold in appended rows must start over.
+            self.assertNotEqual(after.lineage, before.lineage)
+            self.assertEqual(len(after), sum(self.store.partition_sizes().values()))
+            for operation in ("count_vehicles", "min_speed"):
+                filt = FilterObject(operation=operation)
+                self.assertEqual(process_filter_columnar(after, filt), execute_sql_query(*build_sql_statement(filt)))
+
+            # Later appends extend the trimmed snapshot.
+            self.store.append_rows([("2025-12-10 00:01:00", "South", 2, 61)])
+            extended = column_store.get_traffic_columns(self.csv_path)
+            self.assertEqual((extended.lineage, len(extended)), (after.lineage, len(after) + 1))
+            self.store.drop_partitions_before("2025-12-10")
+            self.assertEqual(len(column_store.get_traffic_columns(self.csv_path)), 2)
+
+    def test_pages_continue_across_engines_after_a_trim(self):
+        with mock.patch.object(column_store, "get_store", lambda: self.store):
+            self.store.retention_days = 2
+            self.store.append_rows([("2025-12-10 00:00:05", "North", 1, 50)])
+            columns = column_store.get_traffic_columns(self.csv_path)
+            engines = {
+                "sql": lambda filt: execute_sql_query(*plan_sql_statement(filt)),
+                "python": lambda filt: process_filter_columnar(columns, filt),
+            }
+            expected = execute_sql_query(*build_sql_statement(FilterObject(operation="list_vehicles", sort_by="Speed")))
+            for first in ("sql", "python"):
+                with self.subTest(first=first):
+                    rows, cursor, engine = [], None, first
+                    while True:
+                        filt = FilterObject(operation="list_vehicles", sort_by="Speed", limit=40, cursor=cursor)
+                        # Both engines return the same page, row ids and cursor...
+                        page, cursor = split_page(filt, engines[engine](filt))
+                        other = "python" if engine == "sql" else "sql"
+                        self.assertEqual((page, cursor), split_page(filt, engines[other](filt)))
+                        rows.extend(page)
+                        if cursor is None:
+                            break
+                        # ...so the next page can go to the other one.
+                        engine = other
+                    self.assertEqual(rows, list(expected))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+import sys
+from pathlib import Path
+import asyncio
+import sqlite3
+import threading
+import time
+import unittest
+from unittest import mock
+
+# Ensure backend directory is on the import path
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from fastapi import HTTPException
+
+from app.api import assistant  # type: ignore
+from app.models.aiModel import AssistantRequest  # type: ignore
+from app.services.query_pool import (
+    PoolSaturated,
+    QueryPool,
+    QueryTimeout,
+    query_cancelled,
+)  # type: ignore
+from app.services.traffic_store import get_store  # type: ignore
+
+ENDLESS_QUERY = "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c) SELECT COUNT(*) FROM c"
+
+
+def run_endless_query():
+    return get_store().connection().execute(ENDLESS_QUERY).fetchone()
+
+
+class QueryPoolTests(unittest.TestCase):
+    def setUp(self):
+        self.pool = QueryPool(max_workers=1, max_queue=1, timeout_seconds=5)
+
+    def tearDown(self):
+        self.pool.shutdown()
+
+    def test_runs_job_off_the_event_loop(self):
+        async def main():
+            loop_thread = threading.get_ident()
+            return loop_thread, await self.pool.run(threading.get_ident)
+
+        loop_thread, worker_thread = asyncio.run(main())
+        self.assertNotEqual(loop_thread, worker_thread)
+        stats = self.pool.stats()
+        self.assertEqual(stats["completed"], 1)
+        self.assertEqual(stats["in_flight"], 0)
+
+    def test_rejects_when_queue_is_full(self):
+        release = threading.Event()
+
+        async def main():
+            running = asyncio.ensure_future(self.pool.run(release.wait))
+            queued = asyncio.ensure_future(self.pool.run(release.wait))
+            await asyncio.sleep(0.05)
+            self.assertEqual(self.pool.stats()["queue_depth"], 1)
+            with self.assertRaises(PoolSaturated):
+                await self.pool.run(release.wait)
+            release.set()
+            await asyncio.gather(running, queued)
+
+        asyncio.run(main())
+        stats = self.pool.stats()
+        self.assertEqual(stats["rejected"], 1)
+        self.assertEqual(stats["completed"], 2)
+        self.assertGreater(stats["max_wait_ms"], 0)
+
+    def test_timeout_cancels_running_job(self):
+        stopped = threading.Event()
+
+        def spin():
+            while not query_cancelled():
+                time.sleep(0.001)
+            stopped.set()
+
+        with self.assertRaises(QueryTimeout):
+            asyncio.run(self.pool.run(spin, timeout=0.05))
+        self.assertTrue(stopped.wait(1))
+        self.assertEqual(self.pool.stats()["timed_out"], 1)
+
+    def test_timeout_interrupts_sqlite_query(self):
+        async def main():
+            with self.assertRaises(QueryTimeout):
+                await self.pool.run(run_endless_query, timeout=0.05)
+            # The interrupted query frees the only worker for the next job.
+            return await self.pool.run(lambda: get_store().connection().execute("SELECT 1").fetchone())
+
+        self.assertEqual(asyncio.run(main()), (1,))
+
+    def test_job_errors_propagate(self):
+        def broken():
+            raise sqlite3.OperationalError("no such column")
+
+        with self.assertRaises(sqlite3.OperationalError):
+            asyncio.run(self.pool.run(broken))
+        self.assertEqual(self.pool.stats()["failed"], 1)
+
+
+class AssistantBackpressureTests(unittest.TestCase):
+    def test_saturated_pool_returns_503(self):
+        class FullPool:
+            async def run(self, fn, *args):
+                raise PoolSaturated()
+
+        with mock.patch.object(assistant, "get_query_pool", FullPool):
+            with self.assertRaises(HTTPException) as ctx:
+                asyncio.run(assistant.assistant_endpoint(AssistantRequest(question="how many north vehicles")))
+        self.assertEqual(ctx.exception.status_code, 503)
+        self.assertIn("Retry-After", ctx.exception.headers)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+import sys
+from pathlib import Path
+import json
+import unittest
+
+# Ensure backend directory is on the import path
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.services.question_parser import parse_question, parse_question_json  # type: ignore
+
+# (question, conditions, operation, sort_by, sort_direction) as produced by the
+# original keyword-scan implementation of build_mock_filter, quirks included.
+CORPUS = [
+    ('list north vehicles faster than 55 kph sorted by speed descending', [('Direction', '==', 'North'), ('Speed', '>', '55')], 'list_vehicles', 'Speed', 'descending'),
+    ('how many south vehicles', [('Direction', '==', 'South')], 'count_vehicles', None, None),
+    ('max speed for north lane 1', [('Direction', '==', 'North'), ('Lane', '==', '1')], 'max_speed', None, None),
+    ('average speed of northbound vehicles over 50', [('Direction', '==', 'North'), ('Speed', '>', '50')], 'average_speed', None, None),
+    ('show me southbound cars below 45 mph in lane 2', [('Direction', '==', 'South'), ('Speed', '<', '45'), ('Lane', '==', '2')], 'list_vehicles', None, None),
+    ('count vehicles in lane 3', [('Lane', '==', '3')], 'count_vehicles', None, None),
+    ('highest speed southbound', [('Direction', '==', 'South')], 'max_speed', None, None),
+    ('list vehicles sorted by lane', [], 'list_vehicles', 'Lane', 'ascending'),
+    ('list vehicles sorted by collection time from highest to lowest', [], 'max_speed', 'CollectionTime', 'descending'),
+    ('show me cars order by time', [], 'list_vehicles', 'CollectionTime', 'ascending'),
+    ('list all vehicles from lowest to highest', [], 'max_speed', None, 'ascending'),
+    ('how many cars are slower than 40 km/h', [('Speed', '<', '40')], 'count_vehicles', None, None),
+    ('Count North lane2 faster than 60', [('Direction', '==', 'North'), ('Speed', '>', '2'), ('Lane', '==', '2')], 'count_vehicles', None, None),
+    ('list everything sorted by speed ascending', [], 'list_vehicles', 'Speed', 'ascending'),
+]
+
+
+class QuestionParserTests(unittest.TestCase):
+    def test_matches_original_parser_on_corpus(self):
+        for question, conditions, operation, sort_by, sort_direction in CORPUS:
+            with self.subTest(question=question):
+                filt = parse_question(question)
+                self.assertEqual([(c.field, c.operator, c.value) for c in filt.conditions], conditions)
+                self.assertEqual(filt.operation, operation)
+                self.assertEqual(filt.sort_by, sort_by)
+                self.assertEqual(filt.sort_direction, sort_direction)
+
+    def test_rejects_question_without_filter_or_operation(self):
+        with self.assertRaises(ValueError):
+            parse_question("what is the weather")
+
+    def test_memoized_result_is_not_shared(self):
+        first = parse_question("how many south vehicles")
+        first.conditions.clear()
+        second = parse_question("  HOW MANY south vehicles ")
+        self.assertEqual(len(second.conditions), 1)
+
+    def test_top_n_superlative_is_a_sorted_page(self):
+        filt = parse_question("top 10 fastest northbound vehicles over 50")
+        self.assertEqual(filt.limit, 10)
+        self.assertEqual(filt.operation, "list_vehicles")
+        self.assertEqual((filt.sort_by, filt.sort_direction), ("Speed", "descending"))
+        # The page size is not mistaken for the speed threshold.
+        self.assertEqual(
+            [(c.field, c.operator, c.value) for c in filt.conditions],
+            [("Direction", "==", "North"), ("Speed", ">", "50")],
+        )
+        slowest = parse_question("first 3 slowest vehicles in lane 2")
+        self.assertEqual((slowest.limit, slowest.sort_by, slowest.sort_direction), (3, "Speed", "ascending"))
+
+    def test_date_phrases_become_time_ranges(self):
+        filt = parse_question("how many north vehicles over 50 on 2025-12-07")
+        self.assertEqual(
+            [(c.field, c.operator, c.value) for c in filt.conditions],
+            [
+                ("Direction", "==", "North"),
+                ("Speed", ">", "50"),
+                ("CollectionTime", ">=", "2025-12-07 00:00:00"),
+                ("CollectionTime", "<", "2025-12-08 00:00:00"),
+            ],
+        )
+        # Date digits are never taken as the speed threshold.
+        since = parse_question("count vehicles faster than 60 since 2025-12-07 08:30")
+        self.assertEqual(
+            [(c.field, c.operator, c.value) for c in since.conditions],
+            [("Speed", ">", "60"), ("CollectionTime", ">=", "2025-12-07 08:30:00")],
+        )
+
+    def test_min_percentile_and_window_phrases(self):
+        self.assertEqual(parse_question("min speed in lane 2").operation, "min_speed")
+        self.assertEqual(parse_question("85th percentile speed northbound").operation, "speed_percentiles")
+        windows = parse_question("how many vehicles per 15 minutes over 50")
+        self.assertEqual((windows.operation, windows.window_minutes), ("count_by_window", 15))
+        # The window size is not mistaken for the speed threshold.
+        self.assertEqual([(c.field, c.operator, c.value) for c in windows.conditions], [("Speed", ">", "50")])
+        hourly = parse_question("count north vehicles hourly")
+        self.assertEqual((hourly.operation, hourly.window_minutes), ("count_by_window", 60))
+        with self.assertRaises(ValueError):
+            parse_question("count vehicles per 7 minutes")
+
+    def test_group_phrases(self):
+        lanes = parse_question("count per lane for northbound")
+        self.assertEqual((lanes.operation, lanes.group_by), ("count_vehicles", ["Lane"]))
+        self.assertEqual([(c.field, c.operator, c.value) for c in lanes.conditions], [("Direction", "==", "North")])
+        both = parse_question("max speed by lane and direction")
+        self.assertEqual((both.operation, both.group_by), ("max_speed", ["Direction", "Lane"]))
+        # "sorted by lane" is a sort, not a grouping.
+        self.assertIsNone(parse_question("list vehicles sorted by lane").group_by)
+        # Nor is it when a later sort clause wins; no operation means a listing.
+        sorted_twice = parse_question("north sorted by lane order by speed")
+        self.assertEqual((sorted_twice.operation, sorted_twice.sort_by, sorted_twice.group_by), ("", "Speed", None))
+        grouped = parse_question("count vehicles grouped by lane sorted by speed")
+        self.assertEqual((grouped.operation, grouped.group_by), ("count_vehicles", ["Lane"]))
+
+    def test_json_form_matches_model(self):
+        question = "max speed for north lane 1"
+        self.assertEqual(json.loads(parse_question_json(question)), parse_question(question).model_dump())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,134 @@
+import sys
+from pathlib import Path
+import tempfile
+import unittest
+
+# Ensure backend directory is on the import path
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.models.aiModel import FilterCondition, FilterObject  # type: ignore
+from app.services.result_cache import (
+    ResultCache,
+    SqliteCacheTier,
+    canonical_filter_key,
+)  # type: ignore
+from app.services.traffic_store import TrafficStore  # type: ignore
+from tests.test_traffic_store import SAMPLE_CSV  # type: ignore
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class ResultCacheTests(unittest.TestCase):
+    def test_key_ignores_condition_order_and_number_formatting(self):
+        first = FilterObject(
+            conditions=[
+                FilterCondition(field="Direction", operator="==", value="North"),
+                FilterCondition(field="Lane", operator="==", value="02"),
+            ],
+            operation="count_vehicles",
+        )
+        second = FilterObject(
+            conditions=[
+                FilterCondition(field="Lane", operator="==", value="2"),
+                FilterCondition(field="Direction", operator="==", value="North"),
+            ],
+            operation="count_vehicles",
+        )
+        self.assertEqual(canonical_filter_key(first), canonical_filter_key(second))
+
+    def test_key_distinguishes_operations_and_sorting(self):
+        base = FilterObject(operation="list_vehicles", sort_by="Speed")
+        explicit = FilterObject(operation="list_vehicles", sort_by="Speed", sort_direction="ascending")
+        descending = FilterObject(operation="list_vehicles", sort_by="Speed", sort_direction="descending")
+        self.assertEqual(canonical_filter_key(base), canonical_filter_key(explicit))
+        self.assertNotEqual(canonical_filter_key(base), canonical_filter_key(descending))
+        self.assertNotEqual(
+            canonical_filter_key(FilterObject(operation="count_vehicles")),
+            canonical_filter_key(FilterObject(operation="max_speed")),
+        )
+
+    def test_hits_and_misses_are_counted(self):
+        cache = ResultCache()
+        calls = []
+        compute = lambda: calls.append(1) or {"count": 3}
+        self.assertEqual(cache.get_or_compute("k", "v1", compute), {"count": 3})
+        self.assertEqual(cache.get_or_compute("k", "v1", compute), {"count": 3})
+        self.assertEqual(len(calls), 1)
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["size"]), (1, 1, 1))
+
+    def test_lru_eviction(self):
+        cache = ResultCache(max_entries=2)
+        cache.set("a", "v", 1)
+        cache.set("b", "v", 2)
+        cache.get("a", "v")
+        cache.set("c", "v", 3)
+        self.assertEqual(cache.get_or_compute("a", "v", lambda: "recomputed"), 1)
+        self.assertEqual(cache.get_or_compute("b", "v", lambda: "recomputed"), "recomputed")
+        self.assertEqual(cache.stats()["evictions"], 2)
+
+    def test_entries_expire(self):
+        clock = FakeClock()
+        cache = ResultCache(ttl_seconds=10, clock=clock)
+        cache.set("k", "v", 1)
+        clock.now += 11
+        self.assertEqual(cache.get_or_compute("k", "v", lambda: 2), 2)
+
+    def test_new_data_version_invalidates(self):
+        cache = ResultCache()
+        cache.set("k", "v1", 1)
+        self.assertEqual(cache.get_or_compute("k", "v2", lambda: 2), 2)
+        self.assertEqual(cache.stats()["invalidations"], 1)
+
+    def test_ingest_drops_only_entries_the_new_rows_match(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_path = Path(tmp) / "traffic.csv"
+            csv_path.write_text(SAMPLE_CSV)
+            store = TrafficStore(csv_path, Path(tmp) / "traffic.db")
+            cache = ResultCache(rows_between=store.rows_between)
+            store.ensure_current()
+
+            def key(*conditions):
+                return canonical_filter_key(FilterObject(
+                    conditions=[FilterCondition(field=f, operator=o, value=v) for f, o, v in conditions],
+                    operation="count_vehicles",
+                ))
+
+            north, south = key(("Direction", "==", "North")), key(("Direction", "==", "South"))
+            early = key(("CollectionTime", "<", "2025-12-07 07:00:00"))
+            for entry in (north, south, early, key(), "not a filter key"):
+                cache.set(entry, store.version, "before")
+
+            store.append_rows([("2025-12-07 07:30:00", "North", 1, 50)])
+            fresh = lambda: "after"
+            self.assertEqual(cache.get_or_compute(south, store.version, fresh), "before")
+            self.assertEqual(cache.get_or_compute(early, store.version, fresh), "before")
+            self.assertEqual(cache.get_or_compute(north, store.version, fresh), "after")
+            self.assertEqual(cache.get_or_compute(key(), store.version, fresh), "after")
+            self.assertEqual(cache.get_or_compute("not a filter key", store.version, fresh), "after")
+
+            # Dropped partitions are not appends: everything goes.
+            store.drop_partitions_before("2025-12-08")
+            self.assertEqual(cache.get_or_compute(south, store.version, lambda: "dropped"), "dropped")
+            store.close()
+
+    def test_second_tier_survives_restart(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "cache.db"
+            ResultCache(second_tier=SqliteCacheTier(path)).set("k", "v", [{"Speed": 50}])
+            restarted = ResultCache(second_tier=SqliteCacheTier(path))
+            self.assertEqual(restarted.get_or_compute("k", "v", lambda: None), [{"Speed": 50}])
+            self.assertEqual(restarted.stats()["hits"], 1)
+            self.assertEqual(restarted.get_or_compute("k", "other", lambda: "fresh"), "fresh")
+
+
+if __name__ == "__main__":
+    unittest.main()
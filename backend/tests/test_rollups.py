@@ -0,0 +1,130 @@
+import sys
+from pathlib import Path
+import sqlite3
+import unittest
+
+# Ensure backend directory is on the import path
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.models.aiModel import FilterCondition, FilterObject  # type: ignore
+from app.services.rollups import ROLLUP_TABLES, add_rows_to_rollups, create_rollup_tables  # type: ignore
+from app.services.sql_engine import (
+    build_sql_statement,
+    execute_sql_query,
+    plan_sql_statement,
+)  # type: ignore
+from tests.test_columnar_engine import synthetic_records  # type: ignore
+
+CONDITION_SETS = [
+    [],
+    [FilterCondition(field="Direction", operator="==", value="North")],
+    [FilterCondition(field="Lane", operator="==", value="1")],
+    [
+        FilterCondition(field="Direction", operator="!=", value="South"),
+        FilterCondition(field="Lane", operator=">=", value="2"),
+    ],
+    [FilterCondition(field="Direction", operator="==", value="East")],
+]
+
+
+class RollupTests(unittest.TestCase):
+    def test_rollups_match_raw_scan(self):
+        for conditions in CONDITION_SETS:
+            for operation in ("count_vehicles", "average_speed", "max_speed", "min_speed"):
+                filt = FilterObject(operation=operation, conditions=conditions)
+                with self.subTest(operation=operation, conditions=[c.model_dump() for c in conditions]):
+                    planned = plan_sql_statement(filt)
+                    self.assertIn("vehicle_rollup_", planned.sql)
+                    self.assertEqual(execute_sql_query(*planned), execute_sql_query(*build_sql_statement(filt)))
+
+    def test_speed_condition_scans_raw_rows(self):
+        filt = FilterObject(
+            operation="count_vehicles",
+            conditions=[
+                FilterCondition(field="Direction", operator="==", value="North"),
+                FilterCondition(field="Speed", operator=">", value="50"),
+            ],
+        )
+        planned = plan_sql_statement(filt)
+        self.assertNotIn("vehicle_rollup_", planned.sql)
+        self.assertEqual(execute_sql_query(*planned), execute_sql_query(*build_sql_statement(filt)))
+
+    def test_lists_are_not_planned_onto_rollups(self):
+        filt = FilterObject(operation="list_vehicles", conditions=CONDITION_SETS[1])
+        planned = plan_sql_statement(filt)
+        self.assertNotIn("vehicle_rollup_", planned.sql)
+        self.assertEqual(execute_sql_query(*planned), execute_sql_query(*build_sql_statement(filt)))
+
+    def test_aligned_time_ranges_use_the_coarsest_rollup(self):
+        cases = [
+            ("2025-12-07 08:00:00", "2025-12-07 12:00:00", "vehicle_rollup_hour"),
+            ("2025-12-07 08:30:00", "2025-12-07 12:00:00", "vehicle_rollup_minute"),
+            ("2025-12-07 08:30:15", "2025-12-07 12:00:00", None),
+        ]
+        for start, end, table in cases:
+            filt = FilterObject(
+                operation="count_vehicles",
+                conditions=[
+                    FilterCondition(field="CollectionTime", operator=">=", value=start),
+                    FilterCondition(field="CollectionTime", operator="<", value=end),
+                ],
+            )
+            with self.subTest(start=start):
+                planned = plan_sql_statement(filt)
+                if table:
+                    self.assertIn(f"FROM {table}", planned.sql)
+                else:
+                    self.assertNotIn("vehicle_rollup_", planned.sql)
+                self.assertEqual(execute_sql_query(*planned), execute_sql_query(*build_sql_statement(filt)))
+
+    def test_grouped_aggregates_use_rollups(self):
+        for group_by in (["Lane"], ["Direction", "Lane"]):
+            for conditions in CONDITION_SETS[:4]:
+                filt = FilterObject(operation="max_speed", conditions=conditions, group_by=group_by)
+                with self.subTest(group_by=group_by, conditions=[c.model_dump() for c in conditions]):
+                    planned = plan_sql_statement(filt)
+                    self.assertIn("vehicle_rollup_hour", planned.sql)
+                    self.assertEqual(execute_sql_query(*planned), execute_sql_query(*build_sql_statement(filt)))
+        by_speed = FilterObject(operation="count_vehicles", group_by=["Speed"])
+        self.assertNotIn("vehicle_rollup_", plan_sql_statement(by_speed).sql)
+
+    def test_window_counts_from_rollups_match_raw_rows(self):
+        for minutes, table in ((5, "vehicle_rollup_minute"), (60, "vehicle_rollup_hour"), (120, "vehicle_rollup_hour")):
+            for conditions in CONDITION_SETS[:3]:
+                filt = FilterObject(
+                    operation="count_by_window", window_minutes=minutes, conditions=conditions, group_by=["Lane"]
+                )
+                with self.subTest(minutes=minutes, conditions=[c.model_dump() for c in conditions]):
+                    planned = plan_sql_statement(filt)
+                    self.assertIn(f"FROM {table}", planned.sql)
+                    self.assertEqual(execute_sql_query(*planned), execute_sql_query(*build_sql_statement(filt)))
+
+    def test_incremental_updates_match_full_grouping(self):
+        rows = [
+            (r["CollectionTime"], r["Direction"], r["Lane"], r["Speed"])
+            for r in synthetic_records(3000)
+        ]
+        conn = sqlite3.connect(":memory:")
+        conn.execute("CREATE TABLE vehicles (CollectionTime TEXT, Direction TEXT, Lane INTEGER, Speed INTEGER)")
+        conn.executemany("INSERT INTO vehicles VALUES (?, ?, ?, ?)", rows)
+        create_rollup_tables(conn)
+        # Uneven batches so buckets are split across several upserts.
+        for start, end in ((0, 1), (1, 1234), (1234, 3000)):
+            add_rows_to_rollups(conn, rows[start:end])
+
+        for table, prefix in ROLLUP_TABLES.values():
+            with self.subTest(table=table):
+                expected = conn.execute(
+                    f"SELECT Direction, Lane, substr(CollectionTime, 1, {prefix}) AS Bucket,"
+                    " COUNT(*), SUM(Speed), MIN(Speed), MAX(Speed)"
+                    " FROM vehicles GROUP BY Direction, Lane, Bucket ORDER BY 1, 2, 3"
+                ).fetchall()
+                actual = conn.execute(f"SELECT * FROM {table} ORDER BY 1, 2, 3").fetchall()
+                self.assertEqual(actual, expected)
+        conn.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
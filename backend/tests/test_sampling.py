@@ -0,0 +1,148 @@
+import sys
+from pathlib import Path
+import asyncio
+import unittest
+
+import numpy as np
+
+# Ensure backend is importable
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.api.assistant import assistant_endpoint  # type: ignore
+from app.models.aiModel import AssistantRequest, FilterCondition, FilterObject  # type: ignore
+from app.services.columnar_engine import apply_filter_mask, process_filter_columnar  # type: ignore
+from app.services.indexes import extend_snapshot  # type: ignore
+from app.services import sampling  # type: ignore
+from app.services.sampling import StratifiedSample, get_sample, supports_approximation  # type: ignore
+from tests.test_columnar_engine import synthetic_records, to_columns  # type: ignore
+
+SOUTH_OVER_60 = [
+    FilterCondition(field="Direction", operator="==", value="South"),
+    FilterCondition(field="Speed", operator=">", value="60"),
+]
+ESTIMATED = [
+    FilterObject(operation="count_vehicles"),
+    FilterObject(operation="count_vehicles", conditions=SOUTH_OVER_60),
+    FilterObject(operation="average_speed", conditions=SOUTH_OVER_60),
+    FilterObject(operation="average_speed", conditions=[FilterCondition(field="Lane", operator="==", value="2")]),
+    FilterObject(operation="speed_percentiles"),
+    FilterObject(operation="speed_percentiles", conditions=[FilterCondition(field="Direction", operator="==", value="East")]),
+]
+
+
+def exact_answer(columns, filter_object):
+    # Averages are always answered by SQL: unrounded, and None without matches.
+    if filter_object.operation == "average_speed":
+        speeds = columns.speed[apply_filter_mask(columns, filter_object.conditions)]
+        return {"average_speed": float(speeds.sum()) / len(speeds) if len(speeds) else None}
+    return process_filter_columnar(columns, filter_object)
+
+
+class StratifiedSampleTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.columns = to_columns(synthetic_records(20000))
+        cls.sample = StratifiedSample.build(cls.columns, budget=2000)
+
+    def test_strata_are_sampled_in_proportion(self):
+        # Three directions by four lanes, about 2000 rows but at least MIN_STRATUM_ROWS each.
+        self.assertEqual(self.sample.stats()["strata"], 12)
+        self.assertTrue(np.all(self.sample.kept == sampling.MIN_STRATUM_ROWS))
+        self.assertEqual(self.sample.population.sum(), len(self.columns))
+
+    def test_exact_answers_fall_inside_the_intervals(self):
+        for filter_object in ESTIMATED:
+            with self.subTest(filter=filter_object.model_dump(exclude_none=True)):
+                exact = exact_answer(self.columns, filter_object)
+                estimate = self.sample.estimate(filter_object)
+                for key, (low, high) in estimate.approximation["interval"].items():
+                    self.assertLessEqual(low, estimate.result[key])
+                    self.assertLessEqual(estimate.result[key], high)
+                    self.assertTrue(low <= exact[key] <= high, (key, exact[key], low, high))
+
+    def test_no_matches(self):
+        none = [FilterCondition(field="Speed", operator=">", value="1000")]
+        count = self.sample.estimate(FilterObject(operation="count_vehicles", conditions=none))
+        self.assertEqual(count.result, {"count": 0})
+        self.assertEqual(count.approximation["interval"]["count"][0], 0)
+        self.assertGreater(count.approximation["interval"]["count"][1], 0)
+        average = self.sample.estimate(FilterObject(operation="average_speed", conditions=none))
+        self.assertEqual(average.result, {"average_speed": None})
+        percentiles = self.sample.estimate(FilterObject(operation="speed_percentiles", conditions=none))
+        self.assertEqual(percentiles.result, {"p50": None, "p85": None, "p95": None})
+
+    def test_fully_sampled_snapshots_give_exact_answers(self):
+        columns = to_columns(synthetic_records(1500, seed=3))
+        sample = StratifiedSample.build(columns, budget=10_000)
+        for filter_object in ESTIMATED:
+            with self.subTest(filter=filter_object.model_dump(exclude_none=True)):
+                estimate = sample.estimate(filter_object)
+                exact = exact_answer(columns, filter_object)
+                self.assertEqual(estimate.result, exact)
+                for key, interval in estimate.approximation["interval"].items():
+                    self.assertEqual(interval, [exact[key], exact[key]])
+
+    def test_appended_rows_go_through_the_reservoirs(self):
+        appended = [("2025-12-09 10:00:00", "West", 1, 99)] * 3000 + [("2025-12-09 10:00:00", "North", 1, 99)] * 3000
+        extended = extend_snapshot(self.columns, appended)
+        sample = self.sample.extended(extended)
+        self.assertEqual(sample.rows, len(extended))
+        self.assertEqual(sample.population.sum(), len(extended))
+        # A new stratum, capped at its capacity; existing strata keep their size.
+        self.assertEqual(sample.stats()["strata"], 13)
+        self.assertTrue(np.all(sample.kept == sampling.MIN_STRATUM_ROWS))
+        filter_object = FilterObject(operation="count_vehicles", conditions=[
+            FilterCondition(field="Speed", operator="==", value="99"),
+        ])
+        low, high = sample.estimate(filter_object).approximation["interval"]["count"]
+        exact = process_filter_columnar(extended, filter_object)["count"]
+        self.assertTrue(low <= exact <= high, (exact, low, high))
+        # The original sample is left untouched for queries still using it.
+        self.assertEqual(self.sample.rows, len(self.columns))
+
+    def test_samples_follow_the_snapshot_lineage(self):
+        columns = to_columns(synthetic_records(3000, seed=9))
+        columns.lineage = ("test", 1)
+        first = get_sample(columns)
+        self.assertIs(get_sample(columns), first)
+        extended = extend_snapshot(columns, [("2025-12-09 10:00:00", "North", 1, 99)] * 10)
+        second = get_sample(extended)
+        self.assertEqual(second.capacity, first.capacity)
+        self.assertEqual(second.rows, 3010)
+
+    def test_supported_operations(self):
+        self.assertTrue(supports_approximation(FilterObject(operation="average_speed")))
+        self.assertFalse(supports_approximation(FilterObject(operation="max_speed")))
+        self.assertFalse(supports_approximation(FilterObject(operation="count_vehicles", group_by=["Lane"])))
+
+
+class ApproximateEndpointTests(unittest.TestCase):
+    def ask(self, question, **params):
+        return asyncio.run(assistant_endpoint(AssistantRequest(question=question), **params))
+
+    def test_approximate_answers_carry_intervals(self):
+        response = self.ask("average speed southbound over 60", approximate=True, explain=True)
+        self.assertEqual(set(response.result), {"average_speed"})
+        self.assertEqual(response.approximation["method"], "stratified_sample")
+        self.assertEqual(set(response.approximation["interval"]), {"average_speed"})
+        self.assertEqual(response.plan["engine"], "sample")
+
+    def test_averages_keep_the_exact_answers_type_and_precision(self):
+        # The bundled dataset is fully sampled, so the estimate is the exact answer.
+        for question in ("average speed north", "average speed north faster than 200"):
+            with self.subTest(question=question):
+                exact = self.ask(question).result
+                approximate = self.ask(question, approximate=True).result
+                self.assertAlmostEqual(approximate["average_speed"], exact["average_speed"], places=9)
+                self.assertIs(type(approximate["average_speed"]), type(exact["average_speed"]))
+
+    def test_exact_execution_stays_the_default(self):
+        self.assertIsNone(self.ask("average speed southbound over 60").approximation)
+        # Operations without an estimator are answered exactly.
+        self.assertIsNone(self.ask("max speed in lane 1", approximate=True).approximation)
+
+
+if __name__ == "__main__":
+    unittest.main()
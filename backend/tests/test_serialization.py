@@ -0,0 +1,129 @@
+import sys
+from pathlib import Path
+import asyncio
+import importlib.util
+import json
+import pickle
+import unittest
+
+from fastapi.responses import JSONResponse
+
+# Ensure backend is importable
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.api.assistant import TimedJSONResponse, assistant_endpoint  # type: ignore
+from app.models.aiModel import AssistantRequest, AssistantResponse, FilterObject  # type: ignore
+from app.services.pagination import ROWID_KEY, split_page  # type: ignore
+from app.services.serialization import RowSet, encode_json, to_shape  # type: ignore
+
+AWKWARD = RowSet(
+    ("name", "100%", 'quote"d', "ünï"),
+    [
+        ("plain", 1, None, True),
+        ('tab\t"quote" \\ ✓  ', -7, 2.5, False),
+        ("%s %(x)s", 2**70, 1e-7, [1, "two"]),
+        ("", 0, {"nested": [None]}, "🚗"),
+    ],
+)
+
+
+def rendered(result, **fields):
+    # What FastAPI sent before: the response model dumped to JSON, rendered by JSONResponse.
+    plain = list(result) if isinstance(result, RowSet) else result
+    return JSONResponse(AssistantResponse(result=plain, **fields).model_dump(mode="json")).body
+
+
+class EncodeJsonTests(unittest.TestCase):
+    def test_bytes_match_the_response_model(self):
+        for result in (AWKWARD, RowSet(("Speed",), [(1,), (2,)]), RowSet(("a",), []),
+                       {"count": 3}, [{"Lane": 1, "count": 2}], None):
+            with self.subTest(result=result):
+                body = encode_json({"result": result, "sql": "SELECT 1", "next_cursor": None,
+                                    "plan": None, "approximation": None})
+                self.assertEqual(body, rendered(result, sql="SELECT 1"))
+
+    def test_endpoint_answers_match_the_response_model(self):
+        for question in ("list north vehicles sorted by speed", "how many south vehicles",
+                         "count vehicles by lane"):
+            with self.subTest(question=question):
+                response = asyncio.run(assistant_endpoint(AssistantRequest(question=question), explain=True))
+                self.assertEqual(
+                    TimedJSONResponse(response.model_dump()).body,
+                    rendered(response.result, sql=response.sql, plan=response.plan),
+                )
+
+    def test_columnar_shape(self):
+        encoded = json.loads(encode_json({"result": to_shape(AWKWARD, "columnar")}))["result"]
+        self.assertEqual(encoded["columns"], list(AWKWARD.columns))
+        self.assertEqual([dict(zip(encoded["columns"], row)) for row in encoded["rows"]], json.loads(json.dumps(list(AWKWARD))))
+        # Aggregates have no columnar form; plain row lists get one.
+        self.assertEqual(to_shape({"count": 1}, "columnar"), {"count": 1})
+        listed = json.loads(encode_json(to_shape([{"Lane": 1}, {"Lane": 2}], "columnar")))
+        self.assertEqual(listed, {"columns": ["Lane"], "rows": [[1], [2]]})
+
+
+class RowSetTests(unittest.TestCase):
+    def test_behaves_like_a_list_of_rows(self):
+        records = list(AWKWARD)
+        self.assertEqual(AWKWARD, records)
+        self.assertEqual(AWKWARD[1], records[1])
+        self.assertEqual(AWKWARD[1:3], records[1:3])
+        self.assertEqual(RowSet.from_records(records), AWKWARD)
+        self.assertEqual(pickle.loads(pickle.dumps(AWKWARD)), AWKWARD)
+
+    def test_pages_drop_the_row_ids(self):
+        filter_object = FilterObject(operation="list_vehicles", limit=2)
+        rows = RowSet(("Speed",), [(50,), (60,)]).with_column(ROWID_KEY, [4, 9])
+        page, cursor = split_page(filter_object, rows)
+        self.assertIsInstance(page, RowSet)
+        self.assertEqual(page, [{"Speed": 50}, {"Speed": 60}])
+        expected_page, expected_cursor = split_page(filter_object, list(rows))
+        self.assertEqual((page, cursor), (expected_page, expected_cursor))
+
+
+@unittest.skipUnless(importlib.util.find_spec("httpx"), "TestClient needs httpx")
+class ResponseTests(unittest.TestCase):
+    def setUp(self):
+        from fastapi.testclient import TestClient
+
+        from app.main import app
+
+        self.client = TestClient(app)
+
+    def test_columnar_listings_and_uncompressed_small_answers(self):
+        question = {"question": "list north vehicles sorted by speed"}
+        records = self.client.post("/api/assistant", json=question)
+        columnar = self.client.post("/api/assistant", params={"shape": "columnar"}, json=question)
+        self.assertEqual(records.status_code, 200)
+        self.assertNotIn("content-encoding", records.headers)
+        result = columnar.json()["result"]
+        self.assertEqual([dict(zip(result["columns"], row)) for row in result["rows"]], records.json()["result"])
+        self.assertEqual(self.client.post("/api/assistant", params={"shape": "csv"}, json=question).status_code, 422)
+
+    def test_only_large_responses_are_gzipped(self):
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+
+        from app import main
+
+        # The production middleware settings, in front of a listing larger than the threshold.
+        gzip = next(m for m in main.app.user_middleware if m.cls.__name__ == "GZipMiddleware")
+        size = gzip.kwargs["minimum_size"]
+        rows = RowSet(("CollectionTime", "Speed"), [("2025-12-09 08:00:00", n % 120) for n in range(size // 20)])
+        app = FastAPI()
+        app.add_middleware(gzip.cls, **gzip.kwargs)
+        app.get("/rows")(lambda: TimedJSONResponse({"result": rows}))
+        app.get("/count")(lambda: TimedJSONResponse({"result": {"count": len(rows)}}))
+        client = TestClient(app)
+
+        large = client.get("/rows")
+        self.assertEqual(large.headers["content-encoding"], "gzip")
+        self.assertEqual(large.json()["result"], list(rows))
+        self.assertLess(int(large.headers["content-length"]), size)
+        self.assertNotIn("content-encoding", client.get("/count").headers)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,164 @@
+import sys
+from pathlib import Path
+import asyncio
+import unittest
+from unittest import mock
+
+# Ensure backend is importable
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from fastapi import HTTPException
+
+from app.api import assistant  # type: ignore
+from app.api.assistant import assistant_batch_endpoint, assistant_endpoint, llm_stats  # type: ignore
+from app.models.aiModel import AssistantRequest, BatchAssistantRequest  # type: ignore
+from app.services.llm_client import HttpLLMClient, LLMClient, LLMTimeout  # type: ignore
+from app.services.question_parser import parse_question_json  # type: ignore
+from app.services.result_cache import get_result_cache  # type: ignore
+from app.services.single_flight import SingleFlight  # type: ignore
+from benchmarks.fake_llm import FakeLLMServer  # type: ignore
+
+
+class CountingClient(LLMClient):
+    """Slow in-process model that counts its calls."""
+
+    def __init__(self, delay=0.02, error=None):
+        self.delay = delay
+        self.error = error
+        self.calls = []
+
+    async def complete(self, question):
+        self.calls.append(question)
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return parse_question_json(question)
+
+
+class SingleFlightTests(unittest.TestCase):
+    def test_concurrent_callers_share_one_execution(self):
+        flight = SingleFlight("test")
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return len(calls)
+
+        async def scenario():
+            first = await asyncio.gather(*(flight.run("key", work) for _ in range(5)))
+            # Finished work is not cached: the next call runs again.
+            second = await flight.run("key", work)
+            return first, second
+
+        first, second = asyncio.run(scenario())
+        self.assertEqual((first, second), ([1] * 5, 2))
+        self.assertEqual(flight.stats(), {"leaders": 2, "shared": 4, "in_flight": 0})
+
+    def test_exceptions_reach_every_caller(self):
+        flight = SingleFlight("test")
+
+        async def work():
+            await asyncio.sleep(0.01)
+            raise ValueError("bad question")
+
+        async def scenario():
+            return await asyncio.gather(*(flight.run("key", work) for _ in range(3)), return_exceptions=True)
+
+        results = asyncio.run(scenario())
+        self.assertTrue(all(isinstance(result, ValueError) for result in results))
+
+    def test_cancelled_caller_does_not_cancel_the_others(self):
+        flight = SingleFlight("test")
+        finished = []
+
+        async def work():
+            await asyncio.sleep(0.05)
+            finished.append(True)
+            return "answer"
+
+        async def scenario():
+            leader = asyncio.ensure_future(flight.run("key", work))
+            follower = asyncio.ensure_future(flight.run("key", work))
+            await asyncio.sleep(0.01)
+            leader.cancel()
+            return await follower
+
+        self.assertEqual(asyncio.run(scenario()), "answer")
+        self.assertEqual(finished, [True])
+
+    def test_work_is_cancelled_once_nobody_waits(self):
+        flight = SingleFlight("test")
+        finished = []
+
+        async def work():
+            await asyncio.sleep(0.05)
+            finished.append(True)
+
+        async def scenario():
+            caller = asyncio.ensure_future(flight.run("key", work))
+            await asyncio.sleep(0.01)
+            caller.cancel()
+            await asyncio.sleep(0.08)
+
+        asyncio.run(scenario())
+        self.assertEqual(finished, [])
+
+
+class EndpointCoalescingTests(unittest.TestCase):
+    def setUp(self):
+        get_result_cache().invalidate()
+
+    def test_identical_questions_share_the_llm_call_and_the_query(self):
+        client = CountingClient()
+        executions = []
+        real_answer_filter = assistant.answer_filter
+
+        def counting_answer_filter(filter_object):
+            executions.append(filter_object)
+            return real_answer_filter(filter_object)
+
+        async def scenario():
+            # Normalization makes these the same question.
+            questions = ["How many north vehicles?", "  how many north vehicles?  "] * 5
+            return await asyncio.gather(*(assistant_endpoint(AssistantRequest(question=q)) for q in questions))
+
+        with mock.patch.object(assistant, "get_llm_client", lambda: client), \
+                mock.patch.object(assistant, "answer_filter", counting_answer_filter):
+            responses = asyncio.run(scenario())
+        self.assertEqual(len(client.calls), 1)
+        self.assertEqual(len(executions), 1)
+        self.assertEqual(len({str(response.result) for response in responses}), 1)
+
+    def test_llm_failures_map_to_http_errors(self):
+        for error, status in ((LLMTimeout("slow"), 504), (ValueError("unclear"), 400)):
+            with self.subTest(error=error):
+                client = CountingClient(delay=0, error=error)
+                with mock.patch.object(assistant, "get_llm_client", lambda: client):
+                    with self.assertRaises(HTTPException) as raised:
+                        asyncio.run(assistant_endpoint(AssistantRequest(question="max speed in lane 1")))
+                self.assertEqual(raised.exception.status_code, status)
+
+    def test_batch_questions_reach_the_fake_server_together(self):
+        async def scenario():
+            async with FakeLLMServer(latency_ms=10) as server:
+                client = HttpLLMClient(server.url, batch_window_ms=5)
+                with mock.patch.object(assistant, "get_llm_client", lambda: client):
+                    response = await assistant_batch_endpoint(BatchAssistantRequest(questions=[
+                        "how many vehicles in lane 1", "max speed for south vehicles", "   ",
+                    ]))
+                    stats = await llm_stats()
+                await client.close()
+                return server, response, stats
+
+        server, response, stats = asyncio.run(scenario())
+        self.assertEqual(server.requests, 1)
+        self.assertEqual([item.error is None for item in response.results], [True, True, False])
+        self.assertEqual(stats["batches"], 1)
+        self.assertIn("queries", stats["coalesced"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+import sys
+from pathlib import Path
+import asyncio
+import json
+import tempfile
+import unittest
+from unittest import mock
+
+# Ensure backend is importable
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.api import assistant  # type: ignore
+from app.api.assistant import TimedJSONResponse, assistant_endpoint  # type: ignore
+from app.models.aiModel import AssistantRequest, FilterCondition, FilterObject  # type: ignore
+from app.services.metrics import RequestTimings  # type: ignore
+from app.services.slow_queries import SlowQueryLog, explain_engine, explain_filter_sql  # type: ignore
+
+# Recorded entries are logged as warnings; tests capture them rather than
+# printing them to stderr.
+SLOW_QUERY_LOGGER = "rosa.slow_queries"
+
+
+def finished_request(seconds, filter_object=None):
+    timings = RequestTimings("assistant")
+    timings.started -= seconds
+    timings.filter_object = filter_object or FilterObject(
+        operation="count_vehicles", conditions=[FilterCondition(field="Lane", operator="==", value="2")]
+    )
+    timings.add("execute", seconds)
+    timings.rows_scanned, timings.rows_returned = 0, 1
+    return timings
+
+
+class SlowQueryLogTests(unittest.TestCase):
+    def test_only_requests_over_the_threshold_are_kept(self):
+        log = SlowQueryLog(threshold_ms=100, max_entries=2)
+        self.assertIsNone(log.observe(finished_request(0.01)))
+        with self.assertLogs(SLOW_QUERY_LOGGER, "WARNING") as logged:
+            for _ in range(3):
+                log.observe(finished_request(0.2))
+        entries = log.entries()
+        self.assertEqual(len(entries), 2)
+        self.assertEqual(log.recorded, 3)
+        self.assertEqual(len(logged.output), 3)
+        self.assertEqual(json.loads(logged.records[-1].args[0]), entries[0])
+        entry = entries[0]
+        self.assertGreaterEqual(entry["duration_ms"], 200)
+        self.assertEqual(entry["filter"]["operation"], "count_vehicles")
+        self.assertEqual(entry["stages_ms"], [["execute", 200.0]])
+        self.assertEqual(entry["plan"]["rollups"], ["vehicle_rollup_hour"])
+
+    def test_negative_threshold_turns_the_log_off(self):
+        log = SlowQueryLog(threshold_ms=-1)
+        self.assertIsNone(log.observe(finished_request(5.0)))
+
+    def test_entries_are_appended_to_the_log_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "slow.jsonl"
+            log = SlowQueryLog(threshold_ms=0, path=path)
+            with self.assertLogs(SLOW_QUERY_LOGGER, "WARNING"):
+                log.observe(finished_request(0.001))
+                log.observe(finished_request(0.002))
+            lines = [json.loads(line) for line in path.read_text().splitlines()]
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(lines[0]["endpoint"], "assistant")
+
+    def test_explain_failures_are_recorded_not_raised(self):
+        def broken(*_):
+            raise RuntimeError("no store")
+        log = SlowQueryLog(threshold_ms=0, explain=broken)
+        with self.assertLogs(SLOW_QUERY_LOGGER, "WARNING"):
+            entry = log.observe(finished_request(0.001))
+        self.assertEqual(entry["plan"], {"error": "no store"})
+
+    def test_sql_plan_is_explained(self):
+        listing = FilterObject(operation="list_vehicles", conditions=[FilterCondition(field="Speed", operator=">", value="70")])
+        plan = explain_filter_sql(listing)
+        self.assertTrue(plan["query_plan"])
+        self.assertEqual(plan["rollups"], [])
+
+    def test_the_answering_engine_is_explained(self):
+        timings = finished_request(0.001)
+        timings.engine = "python"
+        with self.assertLogs(SLOW_QUERY_LOGGER, "WARNING"):
+            entry = SlowQueryLog(threshold_ms=0).observe(timings)
+        self.assertEqual((entry["engine"], entry["plan"]["engine"]), ("python", "python"))
+        self.assertEqual(entry["plan"], explain_engine(timings.filter_object, "python"))
+        self.assertEqual(explain_engine(timings.filter_object, "cache"), {"engine": "cache"})
+        self.assertEqual(explain_engine(timings.filter_object, "sql")["engine"], "sqlite")
+
+
+class ExplainEndpointTests(unittest.TestCase):
+    def test_explain_returns_both_engine_plans(self):
+        response = asyncio.run(assistant_endpoint(
+            AssistantRequest(question="list north vehicles faster than 60"), explain=True
+        ))
+        self.assertEqual(response.plan["engine"], "sql")
+        self.assertTrue(response.plan["sql"]["query_plan"])
+        python_plan = response.plan["python"]
+        self.assertEqual(python_plan["rows_matched"], len(response.result))
+        self.assertEqual(len(python_plan["steps"]), 2)
+
+    def test_plan_is_omitted_by_default(self):
+        response = asyncio.run(assistant_endpoint(AssistantRequest(question="how many south vehicles")))
+        self.assertIsNone(response.plan)
+
+    def test_slow_requests_are_logged_by_the_response(self):
+        log = SlowQueryLog(threshold_ms=0)
+
+        async def handle():
+            response = await assistant_endpoint(AssistantRequest(question="max speed in lane 3"))
+            return TimedJSONResponse(response.model_dump())
+
+        with mock.patch.object(assistant, "get_slow_query_log", lambda: log):
+            response = asyncio.run(handle())
+        # The entry is written by a background task, after the response is sent.
+        self.assertEqual(log.entries(), [])
+        with self.assertLogs(SLOW_QUERY_LOGGER, "WARNING"):
+            asyncio.run(response.background())
+        entry = log.entries()[0]
+        self.assertEqual(entry["filter"]["operation"], "max_speed")
+        self.assertIn(entry["engine"], ("sql", "python", "cache"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -7,8 +7,23 @@ PROJECT_ROOT = Path(__file__).resolve().parents[1]
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
 
+from pydantic import ValidationError
+
 from app.models.aiModel import FilterCondition, FilterObject  # type: ignore
-from app.services.sql_engine import generate_sql_query, execute_sql_query  # type: ignore
+from app.services.column_store import get_traffic_columns  # type: ignore
+from app.services.columnar_engine import process_filter_columnar  # type: ignore
+from app.services.pagination import encode_cursor, split_page  # type: ignore
+from app.services.serialization import RowSet  # type: ignore
+from app.services.sql_engine import (
+    build_sql_statement,
+    execute_sql_batch,
+    execute_sql_query,
+    generate_sql_query,
+    plan_sql_statement,
+    render_sql,
+    returns_single_row,
+    statement_cache_stats,
+)  # type: ignore
 
 
 class SqlEngineTests(unittest.TestCase):
@@ -32,6 +47,87 @@ class SqlEngineTests(unittest.TestCase):
         self.assertIn("Direction == 'North' AND Speed > 50", sql)
         self.assertIn("ORDER BY Speed DESC", sql)
 
+    def test_statement_binds_values(self):
+        filt = FilterObject(
+            operation="list_vehicles",
+            conditions=[
+                FilterCondition(field="Direction", operator="==", value="North"),
+                FilterCondition(field="Speed", operator=">=", value="50"),
+            ],
+        )
+        statement = build_sql_statement(filt)
+        self.assertEqual(statement.sql, "SELECT * FROM vehicles WHERE Direction == ? AND Speed >= ?")
+        self.assertEqual(statement.params, ("North", 50))
+        self.assertEqual(render_sql(statement), "SELECT * FROM vehicles WHERE Direction == 'North' AND Speed >= 50")
+        self.assertEqual(execute_sql_query(*statement), execute_sql_query(render_sql(statement)))
+
+    def test_same_shape_reuses_compiled_sql(self):
+        def count_over(speed):
+            return FilterObject(
+                operation="count_vehicles",
+                conditions=[FilterCondition(field="Speed", operator=">", value=speed)],
+            )
+
+        first = build_sql_statement(count_over("41"))
+        hits = statement_cache_stats()["hits"]
+        second = build_sql_statement(count_over("57"))
+        self.assertIs(first.sql, second.sql)
+        self.assertEqual(statement_cache_stats()["hits"], hits + 1)
+
+    def test_quotes_in_values_are_data(self):
+        filt = FilterObject(
+            operation="count_vehicles",
+            conditions=[FilterCondition(field="Direction", operator="==", value="North' OR '1'='1")],
+        )
+        statement = build_sql_statement(filt)
+        self.assertEqual(execute_sql_query(*statement), {"count": 0})
+        self.assertIn("'North'' OR ''1''=''1'", render_sql(statement))
+
+    def test_rejects_unsafe_field_names(self):
+        filt = FilterObject(
+            operation="count_vehicles",
+            conditions=[FilterCondition(field="Speed > 0 OR Lane", operator="==", value="1")],
+        )
+        with self.assertRaises(ValueError):
+            build_sql_statement(filt)
+
+    def test_generate_sql_page_with_cursor(self):
+        first = FilterObject(operation="list_vehicles", sort_by="Speed", sort_direction="descending", limit=5)
+        self.assertEqual(
+            generate_sql_query(first),
+            "SELECT id AS _rowid, CollectionTime, Direction, Lane, Speed FROM vehicle_rows"
+            " ORDER BY Speed DESC, id ASC LIMIT 5",
+        )
+        following = first.model_copy(update={"cursor": encode_cursor(80, 12)})
+        self.assertIn("WHERE (Speed < 80 OR (Speed = 80 AND id > 12))", generate_sql_query(following))
+        offset_only = FilterObject(operation="list_vehicles", offset=3)
+        self.assertTrue(generate_sql_query(offset_only).endswith("ORDER BY id ASC LIMIT -1 OFFSET 3"))
+        # The displayed SQL runs and returns the page the executed statement does.
+        for filt in (first, following, offset_only):
+            statement = plan_sql_statement(filt)
+            self.assertEqual(
+                execute_sql_query(generate_sql_query(filt)), execute_sql_query(statement.sql, params=statement.params)
+            )
+
+    def test_aggregates_ignore_paging(self):
+        filt = FilterObject(operation="count_vehicles", limit=5, offset=2)
+        self.assertEqual(generate_sql_query(filt), "SELECT COUNT(*) as count FROM vehicles")
+
+    def test_cursor_walk_covers_every_row_once(self):
+        filt = FilterObject(operation="list_vehicles", sort_by="Speed", sort_direction="descending")
+        everything = execute_sql_query(
+            "SELECT CollectionTime, Direction, Lane, Speed FROM vehicle_rows ORDER BY Speed DESC, id ASC"
+        )
+        walked = []
+        page = filt.model_copy(update={"limit": 7})
+        while True:
+            rows, next_cursor = split_page(page, execute_sql_query(*plan_sql_statement(page)))
+            walked.extend(rows)
+            if next_cursor is None:
+                break
+            page = page.model_copy(update={"cursor": next_cursor})
+        self.assertEqual(walked, everything)
+
     def test_count_vehicles(self):
         result = execute_sql_query("SELECT COUNT(*) as count FROM vehicles")
         self.assertIsInstance(result, dict)
@@ -52,7 +148,7 @@ class SqlEngineTests(unittest.TestCase):
 
     def test_list_records(self):
         result = execute_sql_query("SELECT * FROM vehicles LIMIT 5")
-        self.assertIsInstance(result, list)
+        self.assertIsInstance(result, RowSet)
         self.assertLessEqual(len(result), 5)
         if result:
             sample = result[0]
@@ -61,6 +157,87 @@ class SqlEngineTests(unittest.TestCase):
             self.assertIn("Lane", sample)
             self.assertIn("Speed", sample)
 
+    def test_batch_matches_individual_queries(self):
+        north = FilterCondition(field="Direction", operator="==", value="North")
+        fast = FilterCondition(field="Speed", operator=">", value="50")
+        filters = [
+            FilterObject(operation="count_vehicles", conditions=[north, fast]),
+            FilterObject(operation="average_speed", conditions=[fast, north]),
+            FilterObject(operation="max_speed", conditions=[north]),
+            FilterObject(operation="list_vehicles", conditions=[fast], sort_by="Speed"),
+            FilterObject(operation="count_vehicles", conditions=[north, fast]),
+        ]
+        outcomes = execute_sql_batch(filters)
+        self.assertEqual(len(outcomes), len(filters))
+        for filt, (result, error) in zip(filters, outcomes):
+            self.assertIsNone(error)
+            self.assertEqual(result, execute_sql_query(generate_sql_query(filt)))
+
+    def test_new_operations_and_groups_match_columnar_engine(self):
+        columns = get_traffic_columns()
+        fast = FilterCondition(field="Speed", operator=">", value="50")
+        north = FilterCondition(field="Direction", operator="==", value="North")
+        filters = [
+            FilterObject(operation="min_speed", conditions=[north]),
+            FilterObject(operation="min_speed", conditions=[fast]),
+            FilterObject(operation="speed_percentiles"),
+            FilterObject(operation="speed_percentiles", conditions=[north, fast]),
+            FilterObject(operation="speed_percentiles", conditions=[FilterCondition(field="Speed", operator=">", value="1000")]),
+            FilterObject(operation="count_by_window", window_minutes=5),
+            FilterObject(operation="count_by_window", window_minutes=15, conditions=[fast]),
+            FilterObject(operation="count_by_window", window_minutes=60, conditions=[north]),
+            FilterObject(operation="count_vehicles", group_by=["Lane"], conditions=[north]),
+            FilterObject(operation="max_speed", group_by=["Direction", "Lane"], conditions=[fast]),
+            FilterObject(operation="min_speed", group_by=["Speed"]),
+            FilterObject(operation="speed_percentiles", group_by=["Lane"]),
+            FilterObject(operation="count_by_window", window_minutes=60, group_by=["Direction"]),
+            FilterObject(operation="count_vehicles", group_by=["Lane"], conditions=[FilterCondition(field="Lane", operator=">", value="99")]),
+        ]
+        batch = execute_sql_batch(filters)
+        for filt, (batch_result, error) in zip(filters, batch):
+            with self.subTest(filter=filt.model_dump()):
+                single_row = returns_single_row(filt)
+                expected = process_filter_columnar(columns, filt)
+                self.assertEqual(execute_sql_query(*plan_sql_statement(filt), single_row=single_row), expected)
+                self.assertEqual(execute_sql_query(generate_sql_query(filt), single_row=single_row), expected)
+                self.assertIsNone(error)
+                self.assertEqual(batch_result, expected)
+
+    def test_group_by_emits_group_clause(self):
+        filt = FilterObject(
+            operation="count_vehicles",
+            conditions=[FilterCondition(field="Direction", operator="==", value="North")],
+            group_by=["Lane"],
+        )
+        self.assertEqual(
+            generate_sql_query(filt),
+            "SELECT Lane, COUNT(*) as count FROM vehicles WHERE Direction == 'North' GROUP BY Lane ORDER BY Lane",
+        )
+        # Group columns are spliced into the SQL, so unknown ones never get that far.
+        with self.assertRaises(ValidationError):
+            FilterObject(operation="count_vehicles", group_by=["Lane; DROP TABLE partitions"])
+
+    def test_batch_merges_grouped_aggregates_separately(self):
+        lanes = [FilterObject(operation=op, group_by=["Lane"]) for op in ("count_vehicles", "max_speed")]
+        plain = FilterObject(operation="count_vehicles")
+        outcomes = execute_sql_batch(lanes + [plain])
+        for filt, (result, error) in zip(lanes, outcomes):
+            self.assertIsNone(error)
+            self.assertEqual(result, execute_sql_query(generate_sql_query(filt)))
+        self.assertEqual(outcomes[2][0], execute_sql_query(generate_sql_query(plain)))
+
+    def test_batch_reports_per_item_errors(self):
+        bad = FilterObject(
+            operation="count_vehicles",
+            conditions=[FilterCondition(field="NoSuchColumn", operator="==", value="1")],
+        )
+        good = FilterObject(operation="count_vehicles")
+        (bad_result, bad_error), (good_result, good_error) = execute_sql_batch([bad, good])
+        self.assertIsNone(bad_result)
+        self.assertIn("NoSuchColumn", bad_error)
+        self.assertIsNone(good_error)
+        self.assertGreater(good_result["count"], 0)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,238 @@
+import sys
+from pathlib import Path
+import asyncio
+import importlib.util
+import unittest
+from unittest import mock
+
+# Ensure backend is importable
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from fastapi import FastAPI
+
+from app.api import assistant, ingest as ingest_api  # type: ignore
+from app.models.aiModel import AssistantRequest, FilterCondition, FilterObject  # type: ignore
+from app.services import standing_queries  # type: ignore
+from app.services.columnar_engine import process_filter_columnar  # type: ignore
+from app.services.indexes import extend_snapshot  # type: ignore
+from app.services.standing_queries import StandingQueryRegistry, Subscriber  # type: ignore
+from tests.test_columnar_engine import synthetic_records, to_columns  # type: ignore
+from tests.test_sampling import exact_answer  # type: ignore
+
+SOUTH = [FilterCondition(field="Direction", operator="==", value="South")]
+FAST_SOUTH = SOUTH + [FilterCondition(field="Speed", operator=">", value="60")]
+
+
+def appended(count, direction="South", speed=70):
+    return [(f"2025-12-09 08:{minute % 60:02d}:00", direction, 1 + minute % 3, speed + minute % 7)
+            for minute in range(count)]
+
+
+class Snapshots:
+    """Stands in for get_traffic_columns: an indexed snapshot that only grows."""
+
+    def __init__(self, rows=2000):
+        self.columns = to_columns(synthetic_records(rows))
+        self.columns.lineage = ("test", rows)
+
+    def __call__(self):
+        return self.columns
+
+    def append(self, rows):
+        self.columns = extend_snapshot(self.columns, rows)
+
+
+class StandingQueryRegistryTests(unittest.TestCase):
+    def setUp(self):
+        self.snapshots = Snapshots()
+        patcher = mock.patch.object(standing_queries, "get_traffic_columns", self.snapshots)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.registry = StandingQueryRegistry()
+
+    def exact(self, operation, conditions):
+        return exact_answer(self.snapshots.columns, FilterObject(operation=operation, conditions=conditions))
+
+    def test_incremental_results_equal_recomputed_results(self):
+        async def scenario():
+            subscriber = Subscriber()
+            subscriptions = [
+                await self.registry.subscribe(subscriber, FilterObject(operation=operation, conditions=conditions), "q")
+                for operation in ("count_vehicles", "average_speed", "max_speed", "min_speed")
+                for conditions in (SOUTH, FAST_SOUTH, [])
+            ]
+            for batch in (appended(50), appended(30, "North", 95), appended(10, "West", 130)):
+                self.snapshots.append(batch)
+                await self.registry.refresh()
+                for subscription in subscriptions:
+                    self.assertEqual(
+                        subscription.result(), self.exact(subscription.operation, subscription.query.conditions)
+                    )
+            return subscriptions
+
+        subscriptions = asyncio.run(scenario())
+        # Operations with the same conditions share one query.
+        self.assertEqual(len({id(s.query) for s in subscriptions}), 3)
+        self.assertEqual(self.registry.stats()["batches"], 3)
+
+    def test_conditions_are_evaluated_once_per_batch(self):
+        async def scenario():
+            subscriber = Subscriber()
+            for limit in range(40, 80):
+                conditions = SOUTH + [FilterCondition(field="Speed", operator=">", value=str(limit))]
+                await self.registry.subscribe(subscriber, FilterObject(operation="count_vehicles", conditions=conditions), "q")
+            self.snapshots.append(appended(20))
+            await self.registry.refresh()
+
+        asyncio.run(scenario())
+        stats = self.registry.stats()
+        self.assertEqual((stats["queries"], stats["batches"]), (40, 1))
+        # One Direction condition shared by all, plus 40 Speed thresholds.
+        self.assertEqual(stats["condition_evaluations"], 41)
+
+    def test_only_changed_results_are_pushed_and_merged_per_subscription(self):
+        async def scenario():
+            subscriber = Subscriber()
+            south = await self.registry.subscribe(subscriber, FilterObject(operation="count_vehicles", conditions=SOUTH), "q")
+            north_count = self.exact("count_vehicles", [FilterCondition(field="Direction", operator="==", value="North")])
+            north = await self.registry.subscribe(subscriber, FilterObject(
+                operation="count_vehicles", conditions=[FilterCondition(field="Direction", operator="==", value="North")]
+            ), "q")
+            self.snapshots.append(appended(5))
+            await self.registry.refresh()
+            self.snapshots.append(appended(7))
+            await self.registry.refresh()
+            return south, north, north_count, await subscriber.updates()
+
+        south, north, north_count, updates = asyncio.run(scenario())
+        self.assertEqual(updates, [{
+            "type": "update", "subscription": south.id, "result": south.result(), "added": 12,
+        }])
+        self.assertEqual(north.result(), north_count)
+
+    def test_unsubscribing_the_last_subscriber_drops_the_query(self):
+        async def scenario():
+            subscriber = Subscriber()
+            first = await self.registry.subscribe(subscriber, FilterObject(operation="count_vehicles", conditions=SOUTH), "q")
+            second = await self.registry.subscribe(subscriber, FilterObject(operation="max_speed", conditions=SOUTH), "q")
+            self.registry.unsubscribe(first)
+            self.assertEqual(self.registry.stats()["queries"], 1)
+            self.registry.unsubscribe(second)
+
+        asyncio.run(scenario())
+        self.assertEqual(self.registry.stats()["queries"], 0)
+
+    def test_replaced_snapshots_are_recomputed(self):
+        async def scenario():
+            subscriber = Subscriber()
+            subscription = await self.registry.subscribe(subscriber, FilterObject(operation="count_vehicles", conditions=SOUTH), "q")
+            self.snapshots.columns = to_columns(synthetic_records(500, seed=4))
+            self.snapshots.columns.lineage = ("test", "replaced")
+            await self.registry.refresh()
+            return subscription, await subscriber.updates()
+
+        subscription, updates = asyncio.run(scenario())
+        self.assertEqual(subscription.result(), self.exact("count_vehicles", SOUTH))
+        self.assertIsNone(updates[0]["added"])
+
+    def test_a_pending_recompute_is_not_reported_as_an_extension(self):
+        async def scenario():
+            subscriber = Subscriber()
+            subscription = await self.registry.subscribe(subscriber, FilterObject(operation="count_vehicles", conditions=SOUTH), "q")
+            self.snapshots.columns = to_columns(synthetic_records(500, seed=4))
+            self.snapshots.columns.lineage = ("test", "replaced")
+            await self.registry.refresh()
+            self.snapshots.append(appended(5))
+            await self.registry.refresh()
+            return subscription, await subscriber.updates()
+
+        subscription, updates = asyncio.run(scenario())
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(updates[0]["result"], subscription.result())
+        self.assertIsNone(updates[0]["added"])
+
+    def test_unsupported_questions_are_rejected(self):
+        for filter_object in (FilterObject(operation="list_vehicles"),
+                              FilterObject(operation="count_vehicles", group_by=["Lane"])):
+            with self.assertRaises(ValueError):
+                asyncio.run(self.registry.subscribe(Subscriber(), filter_object, "q"))
+
+
+class ApiAgreementTests(unittest.TestCase):
+    def test_pushed_results_equal_the_api_answers(self):
+        questions = ("average speed north", "average speed north faster than 200",
+                     "how many north vehicles", "max speed north faster than 200")
+
+        async def scenario():
+            registry = StandingQueryRegistry()
+            pairs = []
+            for question in questions:
+                response = await assistant.assistant_endpoint(AssistantRequest(question=question))
+                filter_object = assistant.build_mock_filter(question)
+                subscription = await registry.subscribe(Subscriber(), filter_object, question)
+                pairs.append((question, subscription.result(), response.result))
+            return pairs
+
+        for question, pushed, answered in asyncio.run(scenario()):
+            with self.subTest(question=question):
+                self.assertEqual(pushed, answered)
+
+
+class FakeBatcher:
+    def __init__(self, snapshots):
+        self.snapshots = snapshots
+
+    async def submit(self, rows):
+        self.snapshots.append(rows)
+        return len(self.snapshots.columns)
+
+
+@unittest.skipUnless(importlib.util.find_spec("httpx"), "TestClient needs httpx")
+class LiveEndpointTests(unittest.TestCase):
+    def setUp(self):
+        from fastapi.testclient import TestClient
+
+        self.snapshots = Snapshots()
+        self.registry = StandingQueryRegistry()
+        for target, name, value in (
+            (standing_queries, "get_traffic_columns", self.snapshots),
+            (assistant, "get_standing_queries", lambda: self.registry),
+            (ingest_api, "get_standing_queries", lambda: self.registry),
+            (ingest_api, "get_ingest_batcher", lambda: FakeBatcher(self.snapshots)),
+            (ingest_api, "get_store", lambda: mock.Mock(version="test")),
+        ):
+            patcher = mock.patch.object(target, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        app = FastAPI()
+        app.include_router(assistant.router)
+        app.include_router(ingest_api.router)
+        self.client = TestClient(app)
+
+    def test_subscribers_receive_updates_after_ingest(self):
+        with self.client as client, client.websocket_connect("/api/assistant/live") as socket:
+            socket.send_json({"action": "subscribe", "question": "how many south vehicles"})
+            subscribed = socket.receive_json()
+            self.assertEqual(subscribed["type"], "subscribed")
+            self.assertEqual(subscribed["result"], process_filter_columnar(
+                self.snapshots.columns, FilterObject(operation="count_vehicles", conditions=SOUTH)
+            ))
+
+            rows = [{"CollectionTime": "2025-12-09 08:00:00", "Direction": "South", "Lane": 1, "Speed": 70}] * 3
+            self.assertEqual(client.post("/api/ingest", json=rows).status_code, 200)
+            update = socket.receive_json()
+            self.assertEqual(update["subscription"], subscribed["subscription"])
+            self.assertEqual(update["added"], 3)
+            self.assertEqual(update["result"]["count"], subscribed["result"]["count"] + 3)
+
+            socket.send_json({"action": "subscribe", "question": "list south vehicles"})
+            self.assertEqual(socket.receive_json()["type"], "error")
+            socket.send_json({"action": "unsubscribe", "subscription": subscribed["subscription"]})
+            self.assertEqual(socket.receive_json()["type"], "unsubscribed")
+            self.assertEqual(client.get("/api/assistant/live").json()["subscriptions"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+import sys
+from pathlib import Path
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+# Ensure backend directory is on the import path
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.services.traffic_store import TrafficStore  # type: ignore
+
+SAMPLE_CSV = """CollectionTime,Direction,Lane,Speed
+2025-12-07 06:05:12,North,1,52
+2025-12-07 06:17:44,South,1,48
+2025-12-07 06:29:30,North,2,55
+"""
+
+
+class TrafficStoreTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.csv_path = Path(self.tmp.name) / "traffic.csv"
+        self.csv_path.write_text(SAMPLE_CSV)
+        self.db_path = Path(self.tmp.name) / "traffic.db"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_builds_table_from_csv(self):
+        store = TrafficStore(self.csv_path, self.db_path)
+        rows = store.connection().execute(
+            "SELECT CollectionTime, Direction, Lane, Speed FROM vehicles"
+        ).fetchall()
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[2], ("2025-12-07 06:29:30", "North", 2, 55))
+        self.assertEqual(store.build_count, 1)
+        store.close()
+
+    def test_reuses_existing_file_across_instances(self):
+        TrafficStore(self.csv_path, self.db_path).ensure_current()
+        store = TrafficStore(self.csv_path, self.db_path)
+        store.ensure_current()
+        self.assertEqual(store.build_count, 0)
+
+    def test_rebuilds_when_csv_changes(self):
+        store = TrafficStore(self.csv_path, self.db_path)
+        version = store.version
+        self.assertEqual(store.connection().execute("SELECT COUNT(*) FROM vehicles").fetchone()[0], 3)
+
+        with open(self.csv_path, "a") as file:
+            file.write("2025-12-07 06:45:03,South,2,50\n")
+        stat = os.stat(self.csv_path)
+        os.utime(self.csv_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+        self.assertEqual(store.connection().execute("SELECT COUNT(*) FROM vehicles").fetchone()[0], 4)
+        self.assertEqual(store.build_count, 2)
+        self.assertNotEqual(store.version, version)
+        store.close()
+
+    def test_append_rows_updates_table_rollups_and_version(self):
+        store = TrafficStore(self.csv_path, self.db_path)
+        version = store.version
+        row_count = store.append_rows([
+            ("2025-12-07 06:50:00", "North", 1, 61),
+            ("2025-12-07 07:02:00", "West", 3, 40),
+        ])
+        self.assertEqual(row_count, 5)
+        self.assertNotEqual(store.version, version)
+        self.assertEqual(store.rows_after(3), [("2025-12-07 06:50:00", "North", 1, 61), ("2025-12-07 07:02:00", "West", 3, 40)])
+        hour = store.connection().execute(
+            "SELECT vehicle_count, speed_sum, speed_max FROM vehicle_rollup_hour"
+            " WHERE Direction = 'North' AND Lane = 1 AND Bucket = '2025-12-07 06'"
+        ).fetchone()
+        self.assertEqual(hour, (2, 113, 61))
+        self.assertEqual(store.build_count, 1)
+
+        # Appended rows survive a restart and are visible to other instances.
+        reopened = TrafficStore(self.csv_path, self.db_path)
+        reopened.ensure_current()
+        self.assertEqual(reopened.build_count, 0)
+        self.assertEqual(reopened.version, store.version)
+        self.assertEqual(len(reopened.rows_after(0)), 5)
+        store.close()
+        reopened.close()
+
+    def test_head_is_read_once_per_refresh_interval(self):
+        store = TrafficStore(self.csv_path, self.db_path, head_refresh_seconds=60)
+        other = TrafficStore(self.csv_path, self.db_path, head_refresh_seconds=60)
+        store.ensure_current()
+        with mock.patch.object(store, "_read_head", wraps=store._read_head) as read_head:
+            store.connection()
+            store.partitions()
+            version = store.version
+            self.assertEqual(read_head.call_count, 0)
+            # Own appends refresh the head at once...
+            store.append_rows([("2025-12-07 06:50:00", "North", 1, 61)])
+            self.assertEqual(read_head.call_count, 1)
+            self.assertNotEqual(store.version, version)
+            # ...other processes' appends show up once the interval is over.
+            other.append_rows([("2025-12-07 06:55:00", "South", 1, 44)])
+            store.ensure_current()
+            self.assertNotEqual(store.version, other.version)
+            store.head_refresh_seconds = 0
+            store.ensure_current()
+            self.assertEqual(store.version, other.version)
+        store.close()
+        other.close()
+
+    def test_readers_keep_their_snapshot_during_append(self):
+        store = TrafficStore(self.csv_path, self.db_path)
+        reader = store.open_reader()
+        reader.execute("BEGIN")
+        self.assertEqual(reader.execute("SELECT COUNT(*) FROM vehicles").fetchone()[0], 3)
+        store.append_rows([("2025-12-07 06:50:00", "North", 1, 61)])
+        self.assertEqual(reader.execute("SELECT COUNT(*) FROM vehicles").fetchone()[0], 3)
+        reader.execute("COMMIT")
+        self.assertEqual(reader.execute("SELECT COUNT(*) FROM vehicles").fetchone()[0], 4)
+        reader.close()
+        store.close()
+
+    def test_connection_is_read_only(self):
+        store = TrafficStore(self.csv_path, self.db_path)
+        with self.assertRaises(sqlite3.OperationalError):
+            store.connection().execute("DELETE FROM vehicles")
+        store.close()
+
+
+if __name__ == "__main__":
+    unittest.main()